@@ -0,0 +1,142 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import pathlib
+import statistics
+import tempfile
+import threading
+import time
+
+from benchmarks import data
+from benchmarks.bench_scheduler import percentile
+from ooresults import model
+from ooresults.model.results import parse_cardreader_log
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils.backup import BackupScheduler
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import scheduler
+
+
+"""
+Benchmark of the latency of card readouts during online backups.
+
+The database holds a large event and a small event. A reader thread
+stores card reads of the small event in regular intervals while backups
+of the database are created one after another. Measured is the time needed
+to store a card read without backups, with backups copied in steps of
+--pages pages and with backups copied in a single step.
+
+    python -m benchmarks.bench_backup
+    python -m benchmarks.bench_backup --classes 40 --entries 250 --interval 0.02
+"""
+
+
+MODES = {"no backup": None, "steps": "steps", "single step": -1}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--readouts", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--pages", type=int, default=100)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=250, help="entries per class")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        database = pathlib.Path(directory) / "bench.sqlite"
+        model.db = SqliteRepo(db=str(database))
+        data.create_event(
+            db=model.db,
+            number_of_classes=args.classes,
+            entries_per_class=args.entries,
+        )
+        card_reads: list[dict] = []
+        data.create_event(
+            db=model.db,
+            number_of_classes=4,
+            entries_per_class=50,
+            seed=1,
+            card_reads=card_reads,
+        )
+        model.db.close()
+        print(
+            f"database {database.stat().st_size / 1024 / 1024:.1f} MiB, "
+            f"{args.readouts} readouts every {1000 * args.interval:.0f} ms"
+        )
+
+        i = 0
+        for mode, pages in MODES.items():
+            backup = BackupScheduler(
+                database=database,
+                path=pathlib.Path(directory) / "backups",
+                interval=3600,
+                keep=1,
+                pages=args.pages if pages == "steps" else -1,
+            )
+            stop = threading.Event()
+
+            def run_backups() -> None:
+                while not stop.is_set():
+                    backup.backup()
+
+            thread = threading.Thread(target=run_backups)
+            if pages is not None:
+                thread.start()
+                # let the backups start
+                time.sleep(0.2)
+
+            latencies = []
+            for _ in range(args.readouts):
+                # a card read of an unknown card is stored as a new entry
+                card_read = card_reads[i % len(card_reads)]
+                card_read = card_read | {"controlCard": str(9000000 + i)}
+                item = parse_cardreader_log(item=card_read)
+                i += 1
+                t1 = time.monotonic()
+                scheduler.run(
+                    Priority.READOUT,
+                    model.results.store_cardreader_result,
+                    event_key="key-1",
+                    item=item,
+                )
+                latencies.append(time.monotonic() - t1)
+                time.sleep(args.interval)
+
+            stop.set()
+            if pages is not None:
+                thread.join()
+            backup.close()
+            model.db.close()
+
+            latencies.sort()
+            metrics = backup.metrics()
+            print(
+                f"  {mode:12} readout median {1000 * statistics.median(latencies):5.1f} ms,"
+                f" p99 {1000 * percentile(latencies, 0.99):6.1f} ms,"
+                f" max {1000 * latencies[-1]:6.1f} ms;"
+                f" {metrics['backups']} backups, {metrics['restarts']} restarts,"
+                f" last {1000 * metrics['last_duration']:.0f} ms,"
+                f" longest step {1000 * metrics['max_step_time']:.1f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
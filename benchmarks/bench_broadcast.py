@@ -0,0 +1,197 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import statistics
+import time
+from multiprocessing.connection import Connection
+
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import serve
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
+
+from benchmarks import data
+from ooresults import model
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.websocket_server import websocket_server
+from ooresults.websocket_server.credentials import credentials
+from ooresults.websocket_server.websocket_handler import WebSocketHandler
+
+
+"""
+Benchmark of sending results and reader tables to many /si1 and /si2 clients.
+
+The server runs in this process, the clients in a second process. Measured
+is the time between triggering an update and the reception of the frame by
+the last client, and the size of the frames on the wire.
+
+    python -m benchmarks.bench_broadcast --clients 200
+"""
+
+
+async def run_clients(
+    port: int, token: str, event_id: int, path: str, clients: int, pipe: Connection
+) -> None:
+    received: list[list[float]] = [[] for _ in range(clients)]
+    size = 0
+    ready = asyncio.Event()
+    connected = 0
+
+    async def client(i: int) -> None:
+        nonlocal connected, size
+        async with connect(
+            uri=f"ws://localhost:{port}{path}", max_size=None
+        ) as websocket:
+            await websocket.send(json.dumps({"token": token}))
+            await websocket.send(json.dumps({"event_id": event_id, "view": 0}))
+            connected += 1
+            if connected == clients:
+                ready.set()
+            async for message in websocket:
+                received[i].append(time.time())
+                size = len(message)
+
+    tasks = [asyncio.create_task(client(i)) for i in range(clients)]
+    await ready.wait()
+    pipe.send("ready")
+    # wait until the server is finished
+    await asyncio.to_thread(pipe.recv)
+    pipe.send((received, size))
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def clients_process(*args) -> None:
+    asyncio.run(run_clients(*args))
+
+
+async def benchmark(args: argparse.Namespace, event_id: int) -> None:
+    handler = WebSocketHandler()
+    if args.compression == "none":
+        options: dict = {"compression": None}
+    elif args.compression == "default":
+        options = {}
+    elif args.compression == "tuned":
+        options = {"extensions": websocket_server.EXTENSIONS}
+    elif args.compression == "tuned":
+        options = {"extensions": websocket_server.EXTENSIONS}
+    else:
+        w, m, level = (int(v) for v in args.compression.split(","))
+        options = {
+            "extensions": [
+                ServerPerMessageDeflateFactory(
+                    server_max_window_bits=w,
+                    client_max_window_bits=w,
+                    compress_settings={"memLevel": m, "level": level},
+                )
+            ]
+        }
+
+    server = await serve(
+        handler=handler.handler, host="localhost", port=args.port, **options
+    )
+    send_new_result = asyncio.create_task(handler.send_new_result())
+    event = await asyncio.to_thread(model.events.get_event, id=event_id)
+
+    pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.Process(
+        target=clients_process,
+        args=(
+            args.port,
+            credentials.create_token(),
+            event_id,
+            args.path,
+            args.clients,
+            child_pipe,
+        ),
+    )
+    process.start()
+    await asyncio.to_thread(pipe.recv)
+    # let the initial frames arrive
+    await asyncio.sleep(2)
+
+    starts = []
+    cpu = time.process_time()
+    for _ in range(args.repeat):
+        t1 = time.time()
+        starts.append(t1)
+        if args.path == "/si1":
+            handler.update_result.set()
+        else:
+            handler.messages[event_id].append(
+                {"controlCard": "1234", "firstName": "A", "lastName": "B"}
+            )
+            await handler.send_to_all(event=event, message={})
+        await asyncio.sleep(args.interval)
+    cpu = time.process_time() - cpu
+
+    pipe.send("done")
+    received, size = await asyncio.to_thread(pipe.recv)
+    process.join()
+    send_new_result.cancel()
+    server.close()
+    await server.wait_closed()
+
+    # the last frames of each client belong to the triggered updates
+    latencies = []
+    for times in received:
+        for t1, t2 in zip(starts, times[-len(starts) :]):
+            latencies.append(t2 - t1)
+    latencies.sort()
+    print(
+        f"{args.path} {args.clients} clients, frame {size / 1000:.0f} kB, "
+        f"compression {args.compression}: "
+        f"server cpu {1000 * cpu / args.repeat:.0f} ms/update, "
+        f"median {1000 * statistics.median(latencies):.0f} ms, "
+        f"p95 {1000 * latencies[int(0.95 * len(latencies))]:.0f} ms, "
+        f"max {1000 * latencies[-1]:.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--path", choices=["/si1", "/si2"], default="/si1")
+    parser.add_argument(
+        "--compression",
+        default="tuned",
+        help="none, default, tuned or WBITS,MEMLEVEL,LEVEL",
+    )
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=50, help="entries per class")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--interval", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=9181)
+    args = parser.parse_args()
+
+    model.db = SqliteRepo(db="bench-broadcast", memory=True)
+    event_id = data.create_event(
+        db=model.db,
+        number_of_classes=args.classes,
+        entries_per_class=args.entries,
+    )
+    asyncio.run(benchmark(args=args, event_id=event_id))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import json
+import pathlib
+import time
+from collections.abc import Callable
+
+from benchmarks import data
+from ooresults import model
+from ooresults.plugins import iof_result_list
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils import compression
+from ooresults.utils.compression import Encoding
+
+
+"""
+Benchmark of the encodings used for binary websocket messages.
+
+Measures compression time, decompression time and compression ratio of
+IOF result lists (streaming, /import) and card reads (/cardreader).
+
+    python -m benchmarks.bench_compression
+    python -m benchmarks.bench_compression --result-list results.xml --log cardreader-2026-06-20.log
+"""
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Return the best time of repeat calls in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        func()
+        t2 = time.perf_counter()
+        best = min(best, t2 - t1)
+    return 1000 * best
+
+
+def benchmark(title: str, messages: list[bytes], repeat: int) -> None:
+    size = sum(len(m) for m in messages)
+    print(f"{title}: {len(messages)} message(s), {size / len(messages):.0f} bytes")
+    print(
+        f"  {'encoding':8}  {'size':>10}  {'ratio':>6}  {'compress':>12}  {'decompress':>12}"
+    )
+    for encoding in Encoding:
+        compressed = [compression.compress(m, encoding=encoding) for m in messages]
+        t_compress = measure(
+            lambda: [compression.compress(m, encoding=encoding) for m in messages],
+            repeat=repeat,
+        )
+        t_decompress = measure(
+            lambda: [compression.decompress(m, encoding=encoding) for m in compressed],
+            repeat=repeat,
+        )
+        c_size = sum(len(m) for m in compressed)
+        print(
+            f"  {encoding.value:8}  {c_size / len(messages):10.0f}  {size / c_size:6.1f}"
+            f"  {t_compress / len(messages):9.3f} ms  {t_decompress / len(messages):9.3f} ms"
+        )
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=40)
+    parser.add_argument("--entries", type=int, default=50, help="entries per class")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--result-list", type=pathlib.Path, action="append")
+    parser.add_argument("--log", type=pathlib.Path, help="ooresults-reader log file")
+    args = parser.parse_args()
+
+    result_lists = []
+    card_reads: list[dict] = []
+    if args.result_list:
+        for path in args.result_list:
+            result_lists.append(path.read_bytes())
+    else:
+        model.db = SqliteRepo(db=":memory:")
+        event_id = data.create_event(
+            db=model.db,
+            number_of_classes=args.classes,
+            entries_per_class=args.entries,
+            card_reads=card_reads,
+        )
+        event, class_results = model.results.event_class_results(event_id=event_id)
+        result_lists.append(
+            iof_result_list.create_result_list(
+                event=event,
+                class_results=class_results,
+                status=iof_result_list.ResultListStatus.SNAPSHOT,
+            )
+        )
+
+    if args.log:
+        with open(args.log) as f:
+            card_reads = [json.loads(line) for line in f if line.strip()]
+
+    benchmark(title="IOF result list", messages=result_lists, repeat=args.repeat)
+    benchmark(
+        title="Card reads",
+        messages=[json.dumps(item).encode() for item in card_reads],
+        repeat=args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
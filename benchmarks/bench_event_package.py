@@ -0,0 +1,81 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import gzip
+import time
+
+from benchmarks import data
+from ooresults import model
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Benchmark of the export and import of an event package.
+
+Creates an event, exports it as an event package and imports the package
+into an empty database and into the database holding the clubs and
+competitors of the event already.
+
+    python -m benchmarks.bench_event_package
+    python -m benchmarks.bench_event_package --classes 40 --entries 250
+"""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=250, help="entries per class")
+    args = parser.parse_args()
+
+    model.db = SqliteRepo(db=":memory:")
+    event_id = data.create_event(
+        db=model.db,
+        number_of_classes=args.classes,
+        entries_per_class=args.entries,
+    )
+
+    t1 = time.perf_counter()
+    package = model.events.export_event_package(event_id=event_id)
+    t2 = time.perf_counter()
+    size = len(gzip.decompress(package))
+
+    print(f"Event package ({args.classes * args.entries} entries):")
+    print(
+        f"  size          {len(package) / 1024:10.1f} KiB"
+        f" ({size / 1024:.1f} KiB uncompressed)"
+    )
+    print(f"  export        {1000 * (t2 - t1):10.1f} ms")
+
+    # import into the database holding the clubs and competitors already
+    model.events.delete_event(id=event_id)
+    t1 = time.perf_counter()
+    model.events.import_event_package(source=package)
+    t2 = time.perf_counter()
+    print(f"  import        {1000 * (t2 - t1):10.1f} ms (competitors stored)")
+
+    model.db = SqliteRepo(db=":memory:")
+    t1 = time.perf_counter()
+    model.events.import_event_package(source=package)
+    t2 = time.perf_counter()
+    print(f"  import        {1000 * (t2 - t1):10.1f} ms (empty database)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import io
+import pathlib
+import statistics
+import tempfile
+import time
+
+import bottle
+
+from benchmarks import data
+from ooresults import model
+from ooresults.handler import results
+from ooresults.model.results import parse_cardreader_log
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils import render
+
+
+"""
+Benchmark of the fragment cache of the results table.
+
+Creates an event, stores a card read of a runner not yet finished and
+measures the time of /result/update with and without the rendered
+classes of the previous update in the fragment cache.
+
+    python -m benchmarks.bench_fragment_cache
+    python -m benchmarks.bench_fragment_cache --classes 40 --entries 50
+"""
+
+
+def post_update(event_id: int) -> str:
+    body = f"event_id={event_id}".encode()
+    bottle.request.bind(
+        {
+            "REQUEST_METHOD": "POST",
+            "CONTENT_TYPE": "application/x-www-form-urlencoded",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.input": io.BytesIO(body),
+        }
+    )
+    content = results.post_update()
+    assert isinstance(content, str)
+    return content
+
+
+def change(item: dict) -> None:
+    model.results.store_cardreader_result(
+        event_key="key-0", item=parse_cardreader_log(item=item)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--entries", type=int, default=20, help="entries per class")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        model.db = SqliteRepo(db=str(pathlib.Path(td) / "ooresults.sqlite"))
+        card_reads: list[dict] = []
+        event_id = data.create_event(
+            db=model.db,
+            number_of_classes=args.classes,
+            entries_per_class=args.entries,
+            finished=0.8,
+            card_reads=card_reads,
+        )
+
+        # card reads of runners not yet finished, copied from a runner of the class
+        entries = model.db.get_entries(event_id=event_id)
+        class_of_chip = {e.chip: e.class_id for e in entries}
+        read_of_class = {class_of_chip[c["controlCard"]]: c for c in card_reads}
+        pending = [
+            read_of_class[e.class_id] | {"controlCard": e.chip}
+            for e in entries
+            if e.result.status == ResultStatus.INACTIVE
+        ]
+
+        print(f"Event with {args.classes} classes and {len(entries)} entries:")
+        for cached in (False, True):
+            render_times = []
+            update_times = []
+            render.fragments.clear()
+            post_update(event_id=event_id)
+            for i in range(args.repeat):
+                # a single entry is changed before each request
+                change(item=pending[(2 * i) % len(pending)])
+                if not cached:
+                    render.fragments.clear()
+                t1 = time.perf_counter()
+                post_update(event_id=event_id)
+                update_times.append(1000 * (time.perf_counter() - t1))
+
+                change(item=pending[(2 * i + 1) % len(pending)])
+                if not cached:
+                    render.fragments.clear()
+                event, class_results = model.results.event_class_results(
+                    event_id=event_id
+                )
+                t1 = time.perf_counter()
+                render.results_table(event=event, class_results=class_results)
+                render_times.append(1000 * (time.perf_counter() - t1))
+
+            print(f"  fragment cache {'used' if cached else 'empty'}:")
+            print(f"    render results table {statistics.median(render_times):8.2f} ms")
+            print(f"    /result/update       {statistics.median(update_times):8.2f} ms")
+        model.db.close()
+
+
+if __name__ == "__main__":
+    main()
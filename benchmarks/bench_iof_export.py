@@ -0,0 +1,143 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import resource
+import subprocess
+import sys
+import time
+from collections.abc import Iterator
+
+from lxml import etree
+
+from benchmarks import data
+from ooresults import model
+from ooresults.plugins import iof_result_list
+from ooresults.plugins import iof_writer
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Benchmark of the incremental writer of the IOF result list.
+
+Compares writing the result list by building the complete lxml tree and
+serializing it with etree.tostring (as done before the incremental
+writer) with writing it incrementally with iof_writer. Each mode runs in
+a separate process, the peak memory is the maximum resident set size of
+the process minus the resident set size after creating the event.
+
+    python -m benchmarks.bench_iof_export
+    python -m benchmarks.bench_iof_export --classes 200 --entries 250
+"""
+
+
+MODES = ["tree", "stream"]
+
+
+def maxrss() -> int:
+    """Return the maximum resident set size of the process in KiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def tree(event, class_results) -> Iterator[bytes]:
+    # build the complete tree like the writer before the incremental writer
+    N = iof_writer.ElementMaker(
+        namespace=iof_writer.IOF_NAMESPACE, nsmap=iof_writer.NSMAP
+    )
+    root = N.ResultList(
+        iofVersion="3.0",
+        creator="ooresults (https://pypi.org/project/ooresults)",
+    )
+    stack = [root]
+    items = iof_result_list.result_list_items(event=event, class_results=class_results)
+    for item in items:
+        if isinstance(item, iof_writer.Start):
+            element = etree.SubElement(stack[-1], item.tag)
+            stack.append(element)
+        elif isinstance(item, iof_writer.End):
+            stack.pop()
+        else:
+            stack[-1].append(item)
+    yield etree.tostring(
+        root, encoding="UTF-8", xml_declaration=True, pretty_print=True
+    )
+
+
+def stream(event, class_results) -> Iterator[bytes]:
+    return iof_result_list.iter_result_list(event=event, class_results=class_results)
+
+
+def run(mode: str, classes: int, entries: int) -> None:
+    model.db = SqliteRepo(db=":memory:")
+    event_id = data.create_event(
+        db=model.db,
+        number_of_classes=classes,
+        entries_per_class=entries,
+    )
+    event, class_results = model.results.event_class_results(event_id=event_id)
+    base = maxrss()
+
+    t1 = time.perf_counter()
+    chunks = (
+        tree(event, class_results) if mode == "tree" else stream(event, class_results)
+    )
+    first = next(chunks)
+    t2 = time.perf_counter()
+    size = len(first) + sum(len(chunk) for chunk in chunks)
+    t3 = time.perf_counter()
+
+    print(
+        f"  {mode:8} {size / 1024 / 1024:8.1f} MiB"
+        f" {1000 * (t2 - t1):12.1f} ms {1000 * (t3 - t1):10.1f} ms"
+        f" {(maxrss() - base) / 1024:13.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=50)
+    parser.add_argument("--entries", type=int, default=100, help="entries per class")
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        run(mode=args.mode, classes=args.classes, entries=args.entries)
+        return
+
+    print(f"IOF result list ({args.classes * args.entries} entries):")
+    print("  mode         size   first byte      total   peak memory")
+    for mode in MODES:
+        subprocess.run(
+            [
+                sys.executable,
+                "-m",
+                "benchmarks.bench_iof_export",
+                "--mode",
+                mode,
+                "--classes",
+                str(args.classes),
+                "--entries",
+                str(args.entries),
+            ],
+            check=True,
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from lxml import etree
+
+from ooresults.otypes import result_type
+from ooresults.plugins import iof_entry_list
+from ooresults.plugins import iof_reader
+from ooresults.plugins import iof_schema
+
+
+"""
+Benchmark of the incremental reader of the IOF entry list.
+
+Compares reading an entry list with the former parser, which parses and
+validates the complete tree and then converts the entries with find,
+with reading it incrementally with iterparse_entry_list. Each
+mode runs in a separate process reading the same file, the peak memory
+is the maximum resident set size of the process minus the resident set
+size before reading.
+
+    python -m benchmarks.bench_iof_import
+    python -m benchmarks.bench_iof_import --entries 200000
+"""
+
+
+MODES = ["tree", "iterparse"]
+
+HEADER = """\
+<?xml version='1.0' encoding='UTF-8'?>
+<EntryList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0">
+  <Event>
+    <Name>Event</Name>
+    <StartTime>
+      <Date>2026-10-19</Date>
+    </StartTime>
+  </Event>
+"""
+
+PERSON_ENTRY = """\
+  <PersonEntry>
+    <Person sex="{sex}">
+      <Name>
+        <Family>Family {i}</Family>
+        <Given>Given {i}</Given>
+      </Name>
+      <BirthDate>{year}-01-01</BirthDate>
+    </Person>
+    <Organisation>
+      <Name>Club {club}</Name>
+    </Organisation>
+    <ControlCard punchingSystem="SI">{chip}</ControlCard>
+    <Class>
+      <Name>Class {class_}</Name>
+    </Class>
+  </PersonEntry>
+"""
+
+
+def write_entry_list(path: str, entries: int) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(HEADER)
+        for i in range(entries):
+            f.write(
+                PERSON_ENTRY.format(
+                    i=i,
+                    sex="F" if i % 2 else "M",
+                    year=1950 + i % 60,
+                    club=i % 300,
+                    chip=1000000 + i,
+                    class_=i % 40,
+                )
+            )
+        f.write("</EntryList>\n")
+
+
+def parse_tree(content: bytes) -> list[dict]:
+    # the former parser of iof_entry_list
+    namespaces = {"": iof_reader.IOF_NAMESPACE}
+    root = etree.XML(content)
+    iof_schema.validate(root=root)
+    entries = []
+    for pe in root.findall("PersonEntry", namespaces=namespaces):
+        e = {
+            "first_name": pe.find("Person/Name/Given", namespaces=namespaces).text,
+            "last_name": pe.find("Person/Name/Family", namespaces=namespaces).text,
+            "class_": "",
+            "club": "",
+            "chip": "",
+            "gender": pe.find("Person", namespaces=namespaces).get("sex", ""),
+            "year": None,
+            "result": result_type.PersonRaceResult(),
+        }
+        e_birthdate = pe.find("Person/BirthDate", namespaces=namespaces)
+        if e_birthdate is not None:
+            e["year"] = int(e_birthdate.text[0:4])
+        e_organization = pe.find("Organisation/Name", namespaces=namespaces)
+        if e_organization is not None:
+            e["club"] = e_organization.text
+        e_controlcard = pe.find("ControlCard", namespaces=namespaces)
+        if e_controlcard is not None:
+            e["chip"] = e_controlcard.text
+        e_class = pe.find("Class/Name", namespaces=namespaces)
+        if e_class is not None:
+            e["class_"] = e_class.text
+        entries.append(e)
+    return entries
+
+
+def maxrss() -> int:
+    """Return the maximum resident set size of the process in KiB."""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(mode: str, path: str) -> None:
+    iof_schema.schema()
+    base = maxrss()
+
+    t1 = time.perf_counter()
+    if mode == "tree":
+        with open(path, "rb") as f:
+            n = len(parse_tree(content=f.read()))
+    else:
+        with open(path, "rb") as f:
+            _, entries = iof_entry_list.iterparse_entry_list(source=f)
+            n = sum(1 for _ in entries)
+    t2 = time.perf_counter()
+
+    print(
+        f"  {mode:10} {n:8} entries {1000 * (t2 - t1):10.1f} ms"
+        f" {(maxrss() - base) / 1024:10.1f} MiB"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=100000)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode is not None:
+        run(mode=args.mode, path=args.path)
+        return
+
+    with tempfile.NamedTemporaryFile(suffix=".xml") as f:
+        write_entry_list(path=f.name, entries=args.entries)
+        size = f.seek(0, 2)
+        print(f"IOF entry list ({args.entries} entries, {size / 1024 / 1024:.1f} MiB):")
+        print("  mode                           time  peak memory")
+        for mode in MODES:
+            subprocess.run(
+                [
+                    sys.executable,
+                    "-m",
+                    "benchmarks.bench_iof_import",
+                    "--mode",
+                    mode,
+                    "--path",
+                    f.name,
+                ],
+                check=True,
+            )
+
+
+if __name__ == "__main__":
+    main()
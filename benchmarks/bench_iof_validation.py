@@ -0,0 +1,114 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import time
+from collections.abc import Callable
+
+from lxml import etree
+
+from benchmarks import data
+from ooresults import model
+from ooresults.plugins import iof_entry_list
+from ooresults.plugins import iof_result_list
+from ooresults.plugins import iof_schema
+from ooresults.plugins.iof_schema import ValidationPolicy
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Benchmark of the XSD validation of the IOF documents created by ooresults.
+
+Measures the time to build and serialize an IOF document without
+validation and the time to validate it against the IOF schema, and the
+mean time per document with the validation policies.
+
+    python -m benchmarks.bench_iof_validation
+    python -m benchmarks.bench_iof_validation --classes 100 --entries 100
+"""
+
+
+def measure(func: Callable[[], object], repeat: int) -> float:
+    """Return the best time of repeat calls in milliseconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        t1 = time.perf_counter()
+        func()
+        t2 = time.perf_counter()
+        best = min(best, t2 - t1)
+    return 1000 * best
+
+
+def benchmark(title: str, create: Callable[[], bytes], repeat: int) -> None:
+    iof_schema.validator.configure(policy=ValidationPolicy.TESTS)
+    t_create = measure(create, repeat=repeat)
+    root = etree.XML(create())
+    t_validate = measure(lambda: iof_schema.validate(root=root), repeat=repeat)
+
+    print(f"{title}:")
+    print(f"  build and serialize  {t_create:9.1f} ms")
+    print(f"  validate             {t_validate:9.1f} ms")
+    for policy in ValidationPolicy:
+        iof_schema.validator.configure(policy=policy, sample_rate=10)
+        # mean time of 10 documents, the sampled policy validates one of them
+        t = measure(lambda: [create() for _ in range(10)], repeat=1) / 10
+        print(f"  policy {policy.value:8}      {t:9.1f} ms per document")
+    print()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=40)
+    parser.add_argument("--entries", type=int, default=50, help="entries per class")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    t1 = time.perf_counter()
+    iof_schema.schema()
+    t2 = time.perf_counter()
+    print(f"Parsing IOF.xsd: {1000 * (t2 - t1):.1f} ms (once per process)")
+    print()
+
+    model.db = SqliteRepo(db=":memory:")
+    event_id = data.create_event(
+        db=model.db,
+        number_of_classes=args.classes,
+        entries_per_class=args.entries,
+    )
+    event, class_results = model.results.event_class_results(event_id=event_id)
+    entries = model.entries.get_entries(event_id=event_id)
+
+    benchmark(
+        title=f"IOF result list ({args.classes * args.entries} entries)",
+        create=lambda: iof_result_list.create_result_list(
+            event=event,
+            class_results=class_results,
+            status=iof_result_list.ResultListStatus.SNAPSHOT,
+        ),
+        repeat=args.repeat,
+    )
+    benchmark(
+        title=f"IOF entry list ({args.classes * args.entries} entries)",
+        create=lambda: iof_entry_list.create_entry_list(event=event, entries=entries),
+        repeat=args.repeat,
+    )
+
+
+if __name__ == "__main__":
+    main()
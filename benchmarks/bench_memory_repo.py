@@ -0,0 +1,107 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import pathlib
+import statistics
+import tempfile
+import time
+
+from benchmarks import data
+from benchmarks.bench_scheduler import percentile
+from ooresults import model
+from ooresults.model.results import parse_cardreader_log
+from ooresults.repo.memory_repo import MemoryRepo
+from ooresults.repo.repo import Repo
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Benchmark of the in-memory repository.
+
+Creates an event in a database file, loads it into a MemoryRepo and
+compares the time to compute the results of the event and to store
+card reads. Measures the time to refresh the MemoryRepo.
+
+    python -m benchmarks.bench_memory_repo
+    python -m benchmarks.bench_memory_repo --classes 40 --entries 100
+"""
+
+
+def measure(db: Repo, card_reads: list[dict], repeat: int) -> None:
+    model.db = db
+    times = []
+    for _ in range(repeat):
+        db.close()
+        t1 = time.perf_counter()
+        model.results.event_class_results(event_id=1)
+        times.append(1000 * (time.perf_counter() - t1))
+    print(f"    results          {statistics.median(times):8.2f} ms median")
+
+    latencies = []
+    for i in range(repeat):
+        # a card read of an unknown card is stored as a new entry
+        card_read = card_reads[i % len(card_reads)]
+        card_read = card_read | {"controlCard": str(9000000 + i)}
+        item = parse_cardreader_log(item=card_read)
+        t1 = time.perf_counter()
+        model.results.store_cardreader_result(event_key="key-0", item=item)
+        latencies.append(1000 * (time.perf_counter() - t1))
+    latencies.sort()
+    print(
+        f"    card read        {statistics.median(latencies):8.2f} ms median"
+        f" {percentile(latencies, 0.95):8.2f} ms p95"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=50, help="entries per class")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        source = SqliteRepo(db=str(pathlib.Path(td) / "ooresults.sqlite"))
+        card_reads: list[dict] = []
+        data.create_event(
+            db=source,
+            number_of_classes=args.classes,
+            entries_per_class=args.entries,
+            card_reads=card_reads,
+        )
+
+        t1 = time.perf_counter()
+        memory = MemoryRepo(source=source)
+        t2 = time.perf_counter()
+        memory.refresh(source=source, event_id=1)
+        t3 = time.perf_counter()
+
+        print(f"Event with {args.classes * args.entries} entries:")
+        print(f"  refresh MemoryRepo {1000 * (t2 - t1):8.1f} ms (all events)")
+        print(f"  refresh MemoryRepo {1000 * (t3 - t2):8.1f} ms (one event)")
+        print("  SqliteRepo (file):")
+        measure(db=source, card_reads=card_reads, repeat=args.repeat)
+        print("  MemoryRepo:")
+        measure(db=memory, card_reads=card_reads, repeat=args.repeat)
+        source.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import datetime
+import io
+import time
+from collections.abc import Callable
+
+import clevercsv
+
+from benchmarks.bench_iof_validation import measure
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.entry_type import EntryType
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.plugins import oe12
+from ooresults.plugins import oe2003
+
+
+"""
+Benchmark of the OE2003 and OE12 CSV export and import.
+
+Measures the export of the entries, the time to the first chunk of the
+streamed export and the import of the exported file with the csv module
+of the standard library (known OE dialect) and with the dialect
+detection of clevercsv (unknown files).
+
+    python -m benchmarks.bench_oe_csv
+    python -m benchmarks.bench_oe_csv --entries 10000 --classes 200
+"""
+
+
+def create_classes(number_of_classes: int) -> list[ClassInfoType]:
+    return [
+        ClassInfoType(
+            id=i,
+            name=f"Class {i}",
+            short_name=f"C{i}",
+            course_id=None,
+            course_name=None,
+            course_length=None,
+            course_climb=None,
+            number_of_controls=None,
+            params=ClassParams(),
+        )
+        for i in range(1, number_of_classes + 1)
+    ]
+
+
+def create_entries(number_of_entries: int, number_of_classes: int) -> list[EntryType]:
+    start = datetime.datetime(2026, 10, 19, 10, 0, 0)
+    entries = []
+    for i in range(number_of_entries):
+        s = start + datetime.timedelta(minutes=i % 120)
+        entries.append(
+            EntryType(
+                id=i,
+                event_id=1,
+                competitor_id=i,
+                first_name=f"Given {i}",
+                last_name=f"Family {i}",
+                gender="F" if i % 2 else "M",
+                year=1950 + i % 60,
+                class_id=number_of_classes - i % number_of_classes,
+                chip=str(1000000 + i),
+                result=PersonRaceResult(
+                    status=ResultStatus.OK,
+                    start_time=s,
+                    finish_time=s + datetime.timedelta(seconds=1800 + i),
+                    time=1800 + i,
+                ),
+                club_id=i % 300,
+                club_name=f"Club {i % 300}",
+            )
+        )
+    return entries
+
+
+def parse_clevercsv(content: bytes) -> int:
+    text = content.decode(encoding="windows-1252")
+    dialect = clevercsv.Sniffer().sniff(text, delimiters=",;\t")
+    return sum(1 for _ in clevercsv.reader(io.StringIO(text), dialect=dialect))
+
+
+def first_chunk(iter_create: Callable, entries: list, classes: list) -> None:
+    next(iter_create(entries=entries, class_list=classes))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--entries", type=int, default=10000)
+    parser.add_argument("--classes", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    classes = create_classes(number_of_classes=args.classes)
+    entries = create_entries(
+        number_of_entries=args.entries, number_of_classes=args.classes
+    )
+
+    for module in [oe2003, oe12]:
+        name = module.__name__.rpartition(".")[2]
+        content = module.create(entries=entries, class_list=classes)
+        print(f"{name} ({args.entries} entries, {args.classes} classes):")
+        t = measure(
+            lambda: module.create(entries=entries, class_list=classes),
+            repeat=args.repeat,
+        )
+        print(f"  export                  {t:9.1f} ms")
+        t = measure(
+            lambda: first_chunk(module.iter_create, entries, classes),
+            repeat=args.repeat,
+        )
+        print(f"  export, first chunk     {t:9.1f} ms")
+        t = measure(lambda: oe2003.parse(content=content), repeat=args.repeat)
+        print(f"  import (csv)            {t:9.1f} ms")
+        t1 = time.perf_counter()
+        parse_clevercsv(content=content)
+        t2 = time.perf_counter()
+        print(f"  clevercsv reader only   {1000 * (t2 - t1):9.1f} ms")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import pathlib
+import statistics
+import tempfile
+import threading
+import time
+
+import ooresults.pdf.result
+from benchmarks import data
+from ooresults import model
+from ooresults.model.results import parse_cardreader_log
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import scheduler
+
+
+"""
+Benchmark of the latency of card readouts under a synthetic report load.
+
+Several threads create result PDFs in a loop while a reader thread stores
+card reads in regular intervals. Measured is the time needed to store a
+card read, with and without the priority scheduler.
+
+    python -m benchmarks.bench_scheduler --reports 4
+    python -m benchmarks.bench_scheduler --reports 4 --no-scheduler
+"""
+
+
+def percentile(values: list[float], p: float) -> float:
+    return values[min(len(values) - 1, int(p * len(values)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=4, help="report threads")
+    parser.add_argument("--readouts", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.05)
+    parser.add_argument("--classes", type=int, default=20)
+    parser.add_argument("--entries", type=int, default=50, help="entries per class")
+    parser.add_argument("--no-scheduler", action="store_true")
+    args = parser.parse_args()
+
+    scheduler.enabled = not args.no_scheduler
+    with tempfile.TemporaryDirectory() as directory:
+        model.db = SqliteRepo(db=str(pathlib.Path(directory) / "bench.sqlite"))
+        card_reads: list[dict] = []
+        event_id = data.create_event(
+            db=model.db,
+            number_of_classes=args.classes,
+            entries_per_class=args.entries,
+            card_reads=card_reads,
+        )
+        stop = threading.Event()
+        reports = 0
+
+        def report() -> None:
+            nonlocal reports
+            while not stop.is_set():
+                with scheduler.slot(Priority.REPORT):
+                    event, class_results = model.results.event_class_results(
+                        event_id=event_id
+                    )
+                    ooresults.pdf.result.create_pdf(event=event, results=class_results)
+                reports += 1
+
+        threads = [threading.Thread(target=report) for _ in range(args.reports)]
+        for t in threads:
+            t.start()
+        # let the reports start
+        time.sleep(1)
+
+        latencies = []
+        for i in range(args.readouts):
+            item = parse_cardreader_log(item=card_reads[i % len(card_reads)])
+            t1 = time.monotonic()
+            scheduler.run(
+                Priority.READOUT,
+                model.results.store_cardreader_result,
+                event_key="key-0",
+                item=item,
+            )
+            latencies.append(time.monotonic() - t1)
+            time.sleep(args.interval)
+
+        stop.set()
+        for t in threads:
+            t.join()
+        model.db.close()
+
+    latencies.sort()
+    print(
+        f"scheduler {'off' if args.no_scheduler else 'on'}, "
+        f"{args.reports} report threads, {reports} reports: readout "
+        f"median {1000 * statistics.median(latencies):.1f} ms, "
+        f"p95 {1000 * percentile(latencies, 0.95):.1f} ms, "
+        f"p99 {1000 * percentile(latencies, 0.99):.1f} ms, "
+        f"max {1000 * latencies[-1]:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
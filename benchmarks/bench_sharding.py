@@ -0,0 +1,116 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import pathlib
+import statistics
+import tempfile
+import time
+
+from benchmarks import data
+from ooresults import model
+from ooresults.repo.repo import TransactionMode
+from ooresults.repo.sharded_repo import ShardedSqliteRepo
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Benchmark of the single-file and the sharded storage.
+
+Creates a database with many past events and one active event, in one
+database file and with one database file per event. Measures the size
+of the files and the time to read the results of the active event with
+a new connection, as done by every request of the web server.
+
+    python -m benchmarks.bench_sharding
+    python -m benchmarks.bench_sharding --events 40 --classes 20 --entries 50
+"""
+
+
+def size(*paths: pathlib.Path) -> float:
+    return sum(p.stat().st_size for p in paths) / 1024 / 1024
+
+
+def fill(db: SqliteRepo, rows: dict, events: int) -> int:
+    """Store events copies of the event and return the id of the last one."""
+    for i in range(events):
+        rows["events"][0]["name"] = f"Event {i}"
+        rows["events"][0]["key"] = f"key-{i}"
+        with db.transaction(mode=TransactionMode.IMMEDIATE):
+            event_id = db.add_event_rows(rows=rows)
+    return event_id
+
+
+def measure(db: SqliteRepo, event_id: int, repeat: int) -> tuple[float, float]:
+    model.db = db
+    times = []
+    for _ in range(repeat):
+        db.close()
+        t1 = time.perf_counter()
+        model.results.event_class_results(event_id=event_id)
+        times.append(time.perf_counter() - t1)
+    return 1000 * statistics.median(times), 1000 * max(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=30, help="number of events")
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=50, help="entries per class")
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    model.db = SqliteRepo(db=":memory:")
+    event_id = data.create_event(
+        db=model.db,
+        number_of_classes=args.classes,
+        entries_per_class=args.entries,
+    )
+    with model.db.transaction():
+        rows = model.db.get_event_rows(event_id=event_id)
+
+    with tempfile.TemporaryDirectory() as td:
+        path = pathlib.Path(td)
+        single = SqliteRepo(db=str(path / "single.sqlite"))
+        single_id = fill(db=single, rows=rows, events=args.events)
+        sharded = ShardedSqliteRepo(db=str(path / "sharded.sqlite"))
+        sharded_id = fill(db=sharded, rows=rows, events=args.events)
+
+        print(f"{args.events} events with {args.classes * args.entries} entries each:")
+        print(f"  single   database          {size(path / 'single.sqlite'):8.1f} MiB")
+        print(f"  sharded  catalogue         {size(path / 'sharded.sqlite'):8.1f} MiB")
+        print(
+            "  sharded  active event      "
+            f"{size(sharded.shard_path(event_id=sharded_id)):8.1f} MiB"
+        )
+        for name, db, id in (
+            ("single ", single, single_id),
+            ("sharded", sharded, sharded_id),
+        ):
+            median, maximum = measure(db=db, event_id=id, repeat=args.repeat)
+            print(
+                f"  {name}  results of the active event"
+                f" {median:6.1f} ms median, {maximum:6.1f} ms max"
+            )
+        single.close()
+        sharded.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import random
+from typing import Optional
+
+from ooresults.model.results import parse_cardreader_log
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.start_type import PersonRaceStart
+from ooresults.repo.repo import Repo
+
+
+"""
+Synthetic event data used by the benchmarks.
+
+The events are created with the Repo API, the card reads have the same
+format as the items sent by ooresults-reader.
+"""
+
+
+FIRST_NAMES = ["Anna", "Ben", "Clara", "David", "Emma", "Felix", "Greta", "Hans"]
+LAST_NAMES = ["Müller", "Schmidt", "Schneider", "Fischer", "Weber", "Meyer"]
+CLUBS = ["OL Bern", "OLG Zürich", "OK Hochwald", "TV Leonberg", "SV Kamenz"]
+
+
+def card_read(
+    control_card: str,
+    controls: list[str],
+    start_time: datetime.datetime,
+    rnd: random.Random,
+) -> dict:
+    """Create a card read in the format of the ooresults-reader log file."""
+    t = start_time
+    punches = []
+    for control in controls:
+        t += datetime.timedelta(seconds=rnd.randint(60, 600))
+        # some runners miss a control
+        if rnd.random() > 0.01:
+            punches.append({"controlCode": control, "punchTime": t.isoformat()})
+    finish_time = t + datetime.timedelta(seconds=rnd.randint(20, 60))
+    return {
+        "entryType": "cardRead",
+        "entryTime": (finish_time + datetime.timedelta(minutes=2)).isoformat(),
+        "cardType": "SI10",
+        "controlCard": control_card,
+        "checkTime": (start_time - datetime.timedelta(minutes=3)).isoformat(),
+        "startTime": start_time.isoformat(),
+        "finishTime": finish_time.isoformat(),
+        "punches": punches,
+    }
+
+
+def create_event(
+    db: Repo,
+    number_of_classes: int = 20,
+    entries_per_class: int = 50,
+    number_of_controls: int = 15,
+    finished: float = 1.0,
+    seed: int = 0,
+    card_reads: Optional[list[dict]] = None,
+) -> int:
+    """Create an event with courses, classes, competitors and entries.
+
+    The given part of the entries has a result computed from a card read.
+    If card_reads is a list, the card reads are appended to the list.
+    Returns the id of the created event.
+    """
+    rnd = random.Random(seed)
+    tz = datetime.timezone(datetime.timedelta(hours=2))
+    first_start = datetime.datetime(2026, 6, 20, 10, 0, 0, tzinfo=tz)
+
+    with db.transaction():
+        event_id = db.add_event(
+            name=f"Event {seed}",
+            date=first_start.date(),
+            key=f"key-{seed}",
+            publish=True,
+            series=None,
+            fields=[],
+        )
+        club_ids = []
+        for name in CLUBS:
+            club_ids.append(db.add_club(name=f"{name} {seed}"))
+
+        chip = 1000000 + 100000 * seed
+        for i in range(number_of_classes):
+            controls = [str(rnd.randint(31, 199)) for _ in range(number_of_controls)]
+            course_id = db.add_course(
+                event_id=event_id,
+                name=f"Course {i + 1}",
+                length=float(rnd.randint(2000, 12000)),
+                climb=float(rnd.randint(0, 400)),
+                controls=controls,
+            )
+            class_id = db.add_class(
+                event_id=event_id,
+                name=f"Class {i + 1}",
+                short_name=f"C{i + 1}",
+                course_id=course_id,
+                params=ClassParams(),
+            )
+            for j in range(entries_per_class):
+                chip += 1
+                club_id = rnd.choice(club_ids)
+                competitor_id = db.add_competitor(
+                    first_name=rnd.choice(FIRST_NAMES),
+                    last_name=f"{rnd.choice(LAST_NAMES)} {seed}-{i}-{j}",
+                    club_id=club_id,
+                    gender=rnd.choice(["F", "M"]),
+                    year=rnd.randint(1950, 2015),
+                    chip=str(chip),
+                )
+                start_time = first_start + datetime.timedelta(minutes=2 * j)
+                result = PersonRaceResult()
+                if rnd.random() < finished:
+                    item = card_read(
+                        control_card=str(chip),
+                        controls=controls,
+                        start_time=start_time,
+                        rnd=rnd,
+                    )
+                    if card_reads is not None:
+                        card_reads.append(item)
+                    result = parse_cardreader_log(item=item).result
+                    result.compute_result(
+                        controls=controls,
+                        class_params=ClassParams(),
+                        start_time=start_time,
+                    )
+                db.add_entry(
+                    event_id=event_id,
+                    competitor_id=competitor_id,
+                    class_id=class_id,
+                    club_id=club_id,
+                    not_competing=False,
+                    chip=str(chip),
+                    fields={},
+                    result=result,
+                    start=PersonRaceStart(start_time=start_time),
+                )
+    return event_id
@@ -0,0 +1,171 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import argparse
+import json
+import pathlib
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+from benchmarks import data
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Start a tree of local ooresults-server processes and show the health of each hop.
+
+The origin server streams an event to the first level relays, each of them
+streams the event to the given number of second level relays:
+
+    python -m benchmarks.relay_tree --relays 2 --fanout 2
+"""
+
+
+def write_config(path: pathlib.Path, port: int, relay: bool, downstream: str) -> None:
+    path.mkdir(parents=True)
+    with open(path / "config.ini", "w") as f:
+        f.write("[Server]\n")
+        f.write(f"http_port = {port}\n")
+        f.write(f"websocket_port = {port + 1}\n")
+        f.write("streaming_interval = 0.5\n")
+        if relay:
+            f.write("relay = on\n")
+            f.write(f"relay_downstream = {downstream}\n")
+
+
+def health(port: int) -> dict:
+    context = ssl.SSLContext(protocol=ssl.PROTOCOL_TLS_CLIENT)
+    context.check_hostname = False
+    context.verify_mode = ssl.CERT_NONE
+    url = f"https://localhost:{port + 1}/health"
+    with urllib.request.urlopen(url, context=context, timeout=2) as response:
+        return json.loads(response.read())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--relays", type=int, default=2, help="first level relays")
+    parser.add_argument("--fanout", type=int, default=2, help="relays per relay")
+    parser.add_argument("--port", type=int, default=9080, help="first port")
+    parser.add_argument("--classes", type=int, default=10)
+    parser.add_argument("--entries", type=int, default=20, help="entries per class")
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as td:
+        path = pathlib.Path(td)
+        port = args.port
+
+        # nodes: name -> (port, downstream ports)
+        nodes: dict[str, tuple[int, list[int]]] = {"origin": (port, [])}
+        for i in range(args.relays):
+            port += 2
+            nodes[f"relay-{i}"] = (port, [])
+            nodes["origin"][1].append(port)
+            for j in range(args.fanout):
+                port += 2
+                nodes[f"relay-{i}-{j}"] = (port, [])
+                nodes[f"relay-{i}"][1].append(port)
+
+        def address(ports: list[int]) -> str:
+            return ", ".join(f"localhost:{p + 1}" for p in ports)
+
+        # the origin streams an event to the first level relays
+        db = SqliteRepo(db=str(path / "origin.sqlite"))
+        event_id = data.create_event(
+            db=db, number_of_classes=args.classes, entries_per_class=args.entries
+        )
+        with db.transaction():
+            event = db.get_event(id=event_id)
+            db.update_event(
+                id=event.id,
+                name=event.name,
+                date=event.date,
+                key=event.key,
+                publish=event.publish,
+                series=event.series,
+                fields=event.fields,
+                streaming_address=address(nodes["origin"][1]),
+                streaming_key=event.key,
+                streaming_enabled=True,
+            )
+        db.close()
+
+        processes = []
+        try:
+            # start the leaves first, a stream reconnects only after 20 seconds
+            for name, (node_port, downstream) in reversed(nodes.items()):
+                write_config(
+                    path=path / name,
+                    port=node_port,
+                    relay=name != "origin",
+                    downstream=address(downstream),
+                )
+                command = [sys.executable, "-m", "ooresults.server", "-p", "."]
+                if name == "origin":
+                    command += ["-d", str(path / "origin.sqlite")]
+                processes.append(
+                    subprocess.Popen(
+                        command, cwd=path / name, stdout=subprocess.DEVNULL
+                    )
+                )
+                time.sleep(0.5)
+
+            t1 = time.time()
+            states: dict[str, dict] = {}
+            while time.time() - t1 < args.timeout:
+                time.sleep(0.5)
+                for name, (node_port, _) in nodes.items():
+                    try:
+                        states[name] = health(port=node_port)
+                    except OSError:
+                        pass
+                relays = [n for n in nodes if n != "origin"]
+                if all(states.get(n, {}).get("upstream") for n in relays):
+                    break
+            else:
+                print(f"Not all relays received the results after {args.timeout} s")
+
+            print(f"{'node':12}  {'upstream':>10}  {'import':>8}  downstream")
+            for name in nodes:
+                state = states.get(name, {})
+                upstream = state.get("upstream", [])
+                received = f"{upstream[0]['received'] - t1:8.2f} s" if upstream else ""
+                import_time = (
+                    f"{1000 * upstream[0]['import_time']:5.0f} ms" if upstream else ""
+                )
+                hops = ", ".join(
+                    f"{h['address']} {h['status']}"
+                    + (f" lag {h['lag']:.2f} s" if h["lag"] is not None else "")
+                    for h in state.get("downstream", [])
+                )
+                print(f"{name:12}  {received:>10}  {import_time:>8}  {hops}")
+        finally:
+            for p in processes:
+                p.terminate()
+            for p in processes:
+                p.wait()
+
+
+if __name__ == "__main__":
+    main()
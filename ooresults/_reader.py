@@ -18,7 +18,7 @@
 
 
 import argparse
-import bz2
+import asyncio
 import configparser
 import datetime
 import json
@@ -27,6 +27,7 @@ import queue
 import ssl
 import threading
 import time
+from collections.abc import Callable
 from typing import Literal
 from typing import Optional
 from typing import TypeAlias
@@ -36,6 +37,15 @@ import serial.tools.list_ports
 import sireader
 import websocket
 
+from ooresults.model.results import parse_cardreader_log
+from ooresults.model.results import preview_cardreader_result
+from ooresults.utils import cardreader_batch
+from ooresults.utils import compression
+from ooresults.utils import preview
+from ooresults.utils import replay
+from ooresults.utils.preview import Preview
+from ooresults.utils.spool import Spool
+
 
 #
 # ConfigFile:
@@ -46,10 +56,13 @@ import websocket
 #
 #  [Cardreader]
 #  host = localhost
+#  port = 8081
 #  ssl_cert = cert/cert.pem
 #  ssl_verify = true
 #  key = 4711
 #  serial_number =
+#  spool = spool
+#  preview = false
 #
 
 
@@ -69,6 +82,7 @@ class WebSocketClient(threading.Thread):
         key: str = "",
         ssl_cert="cert/cert.pem",
         ssl_verify: bool = True,
+        spool: Optional[Spool] = None,
     ):
         super().__init__()
         self.daemon = True
@@ -79,16 +93,26 @@ class WebSocketClient(threading.Thread):
         self.ssl_verify = ssl_verify
         self.ws = None
         self.opened = False
+        self.encoding = compression.DEFAULT_ENCODING
+        # number of card reads per frame accepted by the server, 0 if not supported
+        self.batch_size = 0
+        self.seq = 0
         self.queue = queue.Queue()
-        self.entry_type: EntryType = "readerDisconnected"
-        self.entry_time = datetime.datetime.now()
-        self.card: Optional[str] = None
+        self.lock = threading.Lock()
+        # card reads are sent after they are written to the spool
+        self.spool = spool
+        self.flush_lock = threading.Lock()
+        self.reconnected = threading.Event()
+        # the last state message of each station, None for a single station
+        self.states: dict[Optional[str], dict] = {}
 
     def run(self):
         headers = {
             "Content-Type": "application/octet-stream",
             "X-Event-Key": self.key,
             "X-Suffix": ".json",
+            compression.HEADER: compression.offer(compression.CARDREADER_ENCODINGS),
+            cardreader_batch.HEADER: str(cardreader_batch.MAX_ITEMS),
         }
         sslopt = {"cert_reqs": ssl.CERT_REQUIRED}
 
@@ -100,6 +124,8 @@ class WebSocketClient(threading.Thread):
             sslopt["ca_certs"] = self.ssl_cert
 
         uri = f"wss://{self.host}:{str(self.port)}/cardreader"
+        if self.spool is not None:
+            threading.Thread(target=self.flush_on_reconnect, daemon=True).start()
         while True:
             print(f"Trying to connect to {uri} ...")
             self.ws = websocket.WebSocketApp(
@@ -113,29 +139,147 @@ class WebSocketClient(threading.Thread):
             self.ws.run_forever(sslopt=sslopt)
             time.sleep(5)
 
-    def set_state(
+    def state(
         self,
         entry_type: EntryType,
         entry_time: datetime.datetime,
         card: Optional[str] = None,
+        station: Optional[str] = None,
     ) -> dict:
-        self.entry_type = entry_type
-        self.entry_time = entry_time
-        self.card = card
-        # send a cardreader state message
+        """Return the state message of the station, it is sent again on reconnect."""
         item = {
-            "entryType": self.entry_type,
-            "entryTime": self.entry_time.astimezone().isoformat(),
+            "entryType": entry_type,
+            "entryTime": entry_time.astimezone().isoformat(),
         }
-        if self.entry_type == "cardInserted" and self.card is not None:
-            item["controlCard"] = self.card
+        if entry_type == "cardInserted" and card is not None:
+            item["controlCard"] = card
+        if station is not None:
+            item["station"] = station
+        self.states[station] = item
+        return item
+
+    def set_state(
+        self,
+        entry_type: EntryType,
+        entry_time: datetime.datetime,
+        card: Optional[str] = None,
+        station: Optional[str] = None,
+    ) -> dict:
+        # send a cardreader state message
+        item = self.state(
+            entry_type=entry_type, entry_time=entry_time, card=card, station=station
+        )
         return self.send_and_receive(item=item)
 
-    def send_and_receive(self, item: dict, timeout: Optional[int] = None) -> dict:
-        self.clear()
-        data = bz2.compress(json.dumps(item).encode())
-        self.send(data)
-        return self.receive(timeout=timeout)
+    def send_and_receive(
+        self,
+        item: dict,
+        timeout: Optional[int] = None,
+        expected: Optional[Callable[[dict], bool]] = None,
+    ) -> dict:
+        with self.lock:
+            self.clear()
+            data = compression.compress(
+                json.dumps(item).encode(), encoding=self.encoding
+            )
+            self.send(data)
+            r = self.receive(timeout=timeout)
+            # skip the replies to the messages sent by on_open
+            while r and expected is not None and not expected(r):
+                r = self.receive(timeout=timeout)
+            return r
+
+    def send_items(
+        self, items: list[tuple[int, dict]], timeout: Optional[int] = None
+    ) -> dict[int, dict]:
+        """Send the card reads (seq, item) and return the replies by seq.
+
+        Card reads not acknowledged by the server have no reply. If sending
+        fails, the replies received before are returned.
+        """
+        replies: dict[int, dict] = {}
+        try:
+            if self.batch_size == 0:
+                for seq, item in items:
+                    entry_type = item["entryType"]
+                    r = self.send_and_receive(
+                        item=item,
+                        timeout=timeout,
+                        expected=lambda r: r.get("readerStatus") == entry_type,
+                    )
+                    if not r:
+                        break
+                    replies[seq] = r
+                return replies
+
+            for i in range(0, len(items), self.batch_size):
+                r = self.send_and_receive(
+                    item=cardreader_batch.batch(items=items[i : i + self.batch_size]),
+                    timeout=timeout,
+                    expected=lambda r: "acks" in r,
+                )
+                for a in r.get("acks", []):
+                    replies[a.get("seq")] = a
+        except (queue.Empty, ValueError) as e:
+            print(f"Sending the card reads failed: {e}")
+        return replies
+
+    def send_batch(
+        self, items: list[dict], timeout: Optional[int] = None
+    ) -> list[dict]:
+        """Send the card reads and return the replies in the order of the items.
+
+        The reply of a card read not acknowledged by the server is {}.
+        """
+        numbered = []
+        for item in items:
+            self.seq += 1
+            numbered.append((self.seq, item))
+        replies = self.send_items(items=numbered, timeout=timeout)
+        return [replies.get(seq, {}) for seq, _ in numbered]
+
+    @property
+    def pending_count(self) -> int:
+        """Number of spooled card reads not yet acknowledged by the server."""
+        return self.spool.pending_count if self.spool is not None else 0
+
+    def send_card_read(self, item: dict) -> dict:
+        """Send the card read, if a spool is used after it is written to disk."""
+        if self.spool is None:
+            return self.send_and_receive(item=item)
+        seq = self.spool.append(item=item)
+        return self.flush().get(seq, {})
+
+    def flush(self, timeout: int = 10) -> dict[int, dict]:
+        """Send the pending card reads of the spool and return the replies by seq."""
+        if self.spool is None:
+            return {}
+        replies: dict[int, dict] = {}
+        with self.flush_lock:
+            if self.opened:
+                replies = self.send_items(items=self.spool.items(), timeout=timeout)
+                # only stored card reads are removed from the spool, card
+                # reads exceeding the batch size are sent again
+                self.spool.acknowledge(
+                    seqs=[seq for seq, r in replies.items() if "readerStatus" in r]
+                )
+                rejected = {
+                    seq: r["rejected"]
+                    for seq, r in replies.items()
+                    if "rejected" in r and r["rejected"] != cardreader_batch.TOO_LARGE
+                }
+                for seq, reason in rejected.items():
+                    print(f"Card read rejected by the server: {reason}")
+                self.spool.reject(reasons=rejected)
+            if self.spool.pending_count:
+                print(f"Spool: {self.spool.pending_count} card reads pending")
+        return replies
+
+    def flush_on_reconnect(self) -> None:
+        while True:
+            self.reconnected.wait()
+            self.reconnected.clear()
+            self.flush()
 
     def send(self, data: bytes) -> None:
         if self.opened:
@@ -161,15 +305,28 @@ class WebSocketClient(threading.Thread):
     def on_open(self, wsapp):
         if not self.opened:
             print("Connection established")
+            # use the encoding selected by the server, header names are in lower case
+            headers = wsapp.sock.getheaders() if wsapp.sock else None
+            self.encoding = compression.accepted(
+                headers.get(compression.HEADER.lower()) if headers else None
+            )
+            self.batch_size = cardreader_batch.accepted(
+                headers.get(cardreader_batch.HEADER.lower()) if headers else None
+            )
             self.opened = True
-            item = {
-                "entryType": self.entry_type,
-                "entryTime": self.entry_time.astimezone().isoformat(),
-            }
-            if self.entry_type == "cardInserted" and self.card is not None:
-                item["controlCard"] = self.card
-            data = bz2.compress(json.dumps(item).encode())
-            self.send(data=data)
+            items = list(self.states.values()) or [
+                {
+                    "entryType": "readerDisconnected",
+                    "entryTime": datetime.datetime.now().astimezone().isoformat(),
+                }
+            ]
+            for item in items:
+                data = compression.compress(
+                    json.dumps(item).encode(), encoding=self.encoding
+                )
+                self.send(data=data)
+            # send the card reads spooled while the connection was down
+            self.reconnected.set()
 
     def on_message(self, wsapp, message):
         self.queue.put(message)
@@ -185,17 +342,33 @@ class Cardreader:
     with open(data_path) as f:
         schema_cardreader_log = json.loads(f.read())
 
-    def __init__(self, webSocketClient: WebSocketClient, serial_number: str = ""):
+    def __init__(
+        self,
+        webSocketClient: WebSocketClient,
+        serial_number: Optional[str] = "",
+        preview: Optional[Preview] = None,
+    ):
         self.webSocketClient = webSocketClient
-        self.serial_number = serial_number
-
-    def convert(self, card_type: str, card_data: dict) -> dict:
+        self.preview = preview
+        # several stations are given as a comma separated list
+        self.serial_numbers = [
+            n.strip() for n in (serial_number or "").split(",") if n.strip()
+        ]
+        self.lock = threading.Lock()
+        self.protocol_lock = threading.Lock()
+        self.connected: set[str] = set()
+
+    def convert(
+        self, card_type: str, card_data: dict, station: Optional[str] = None
+    ) -> dict:
         item = {
             "entryType": "cardRead",
             "entryTime": datetime.datetime.now().astimezone().isoformat(),
             "cardType": card_type,
             "controlCard": str(card_data["card_number"]),
         }
+        if station is not None:
+            item["station"] = station
 
         if card_data.get("start", None) is not None:
             item["startTime"] = card_data["start"].astimezone().isoformat()
@@ -214,22 +387,35 @@ class Cardreader:
 
         return item
 
+    def preview_result(self, item: dict) -> Optional[dict]:
+        """Compute the result of the card read with the snapshot of the event."""
+        if self.preview is None or self.preview.snapshot is None:
+            return None
+        res = preview_cardreader_result(
+            snapshot=self.preview.snapshot, item=parse_cardreader_log(item=item)
+        )
+        del res["entryTime"]
+        res["status"] = res["status"].name
+        return res
+
     def protocol(self, item: dict) -> None:
         date_str = datetime.date.today().isoformat()
-        with open(f"cardreader-{date_str}.log", "a") as f:
-            f.write(json.dumps(item) + "\n")
+        with self.protocol_lock:
+            with open(f"cardreader-{date_str}.log", "a") as f:
+                f.write(json.dumps(item) + "\n")
 
-    def connect(self) -> sireader.SIReaderReadout:
+    def connect(self, serial_number: str = "") -> sireader.SIReaderReadout:
         errors = ""
         for port in serial.tools.list_ports.grep("sportident"):
+            # do not open the ports of the other stations, this would
+            # interrupt their communication
+            if serial_number and serial_number != port.serial_number:
+                print(f"SI Reader found, but serial number: {port.serial_number}")
+                continue
             try:
                 si = sireader.SIReaderReadout(port.device)
-                if not self.serial_number or self.serial_number == port.serial_number:
-                    print(f"SI Reader found, serial number: {port.serial_number}")
-                    return si
-                else:
-                    print(f"SI Reader found, but serial number: {port.serial_number}")
-
+                print(f"SI Reader found, serial number: {port.serial_number}")
+                return si
             except (sireader.SIReaderException, sireader.SIReaderTimeout) as msg:
                 errors += f"port: {port.device}: {msg}\n"
         errors = "No SI Reader found" if errors == "" else errors
@@ -237,7 +423,158 @@ class Cardreader:
             f"No SI Reader found. Possible reasons: {errors}"
         )
 
+    def stations(self) -> list["Station"]:
+        """Create a station for each configured serial number.
+
+        Without serial numbers the first SI reader found is used.
+        """
+        if not self.serial_numbers:
+            return [Station(cardreader=self)]
+        return [Station(cardreader=self, serial_number=n) for n in self.serial_numbers]
+
+    def station_connected(self, station: "Station") -> None:
+        with self.lock:
+            self.connected.add(station.name)
+        station.set_state(entry_type="readerConnected")
+
+    def station_disconnected(self, station: "Station") -> None:
+        with self.lock:
+            self.connected.discard(station.name)
+        # the server shows the reader as disconnected with its last station
+        station.set_state(entry_type="readerDisconnected")
+
+    def process_cards(self, stations: Optional[list["Station"]] = None) -> None:
+        print("#### process cards ###")
+        if stations is None:
+            stations = self.stations()
+        for station in stations:
+            station.start()
+        for station in stations:
+            station.join()
+
+    def process_log(self, cardreader_log: pathlib.Path) -> None:
+        send_all_entries = False
+        with open(cardreader_log) as f:
+            r = self.webSocketClient.set_state(
+                entry_type="readerConnected",
+                entry_time=datetime.datetime.now(),
+            )
+
+            line = f.readline()
+            while line != "":
+                if not send_all_entries:
+                    inp = input("Weiter? ")
+                else:
+                    inp = ""
+
+                if inp == "q":
+                    break
+                elif inp == "a":
+                    send_all_entries = True
+                elif inp == "c":
+                    self.webSocketClient.set_state(
+                        entry_type="readerConnected",
+                        entry_time=datetime.datetime.now(),
+                    )
+                elif inp == "d":
+                    self.webSocketClient.set_state(
+                        entry_type="readerDisconnected",
+                        entry_time=datetime.datetime.now(),
+                    )
+                elif inp == "i":
+                    self.webSocketClient.set_state(
+                        entry_type="cardInserted",
+                        entry_time=datetime.datetime.now(),
+                        card=json.loads(line)["controlCard"],
+                    )
+                elif inp == "r":
+                    self.webSocketClient.set_state(
+                        entry_type="cardRemoved",
+                        entry_time=datetime.datetime.now(),
+                    )
+                elif send_all_entries and self.webSocketClient.batch_size:
+                    # send the remaining entries in batches
+                    items = []
+                    while line != "":
+                        item = json.loads(line)
+                        jsonschema.validate(item, self.schema_cardreader_log)
+                        items.append(item)
+                        line = f.readline()
+                    print(f"{len(items)} entries ...")
+                    for r in self.webSocketClient.send_batch(items=items):
+                        print(r)
+                else:
+                    item = json.loads(line)
+                    line = f.readline()
+
+                    jsonschema.validate(item, self.schema_cardreader_log)
+                    print(f"{str(item.get('controlCard', item['entryType']))} ...")
+
+                    r = self.webSocketClient.send_and_receive(item=item)
+                    self.webSocketClient.state(
+                        entry_type="readerConnected",
+                        entry_time=datetime.datetime.now(),
+                    )
+
+                    print(r)
+
+
+class Station(threading.Thread):
+    """Reads out the SI cards inserted into one SPORTident station.
+
+    Each station runs in its own thread, all stations of a reader process
+    share the websocket connection of the cardreader. The state and card
+    read messages of a configured station carry its serial number as
+    station, so the server keeps the state of each station.
+    """
+
+    def __init__(
+        self,
+        cardreader: Cardreader,
+        serial_number: str = "",
+        connect: Optional[Callable[[], sireader.SIReaderReadout]] = None,
+        poll_interval: float = 0.2,
+    ):
+        super().__init__()
+        self.daemon = True
+        self.name = f"Station {serial_number}" if serial_number else "Station"
+        self.cardreader = cardreader
+        self.serial_number = serial_number
+        self.station = serial_number or None
+        self.connect = (
+            connect
+            if connect is not None
+            else lambda: cardreader.connect(serial_number=serial_number)
+        )
+        self.poll_interval = poll_interval
+        self.stopped = threading.Event()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.reader()
+            except (sireader.SIReaderException, sireader.SIReaderTimeout, OSError) as e:
+                print(f"{self.name}: SIReader or OSError exception:\n{str(e)}")
+                self.stopped.wait(5)
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+    def set_state(
+        self, entry_type: EntryType, card: Optional[str] = None, send: bool = True
+    ) -> dict:
+        client = self.cardreader.webSocketClient
+        set_state = client.set_state if send else client.state
+        return set_state(
+            entry_type=entry_type,
+            entry_time=datetime.datetime.now(),
+            card=card,
+            station=self.station,
+        )
+
     def reader(self) -> None:
+        webSocketClient = self.cardreader.webSocketClient
+
         # connect to base station, the station is automatically detected,
         # if this does not work, give the path to the port as an argument
         # see the pyserial documentation for further information.
@@ -253,24 +590,18 @@ class Cardreader:
             si.set_extended_protocol(True)
 
         try:
-            r = self.webSocketClient.set_state(
-                entry_type="readerConnected",
-                entry_time=datetime.datetime.now(),
-            )
+            self.cardreader.station_connected(station=self)
 
-            while True:
+            while not self.stopped.is_set():
                 # wait for a card to be inserted into the reader
-                while not si.poll_sicard() or si.sicard is None:
-                    time.sleep(0.2)
+                if not si.poll_sicard() or si.sicard is None:
+                    self.stopped.wait(self.poll_interval)
+                    continue
 
                 try:
                     # some properties are now set
                     card_type = si.cardtype  #  'SI10'
-                    self.webSocketClient.set_state(
-                        entry_type="cardInserted",
-                        entry_time=datetime.datetime.now(),
-                        card=str(si.sicard),
-                    )
+                    self.set_state(entry_type="cardInserted", card=str(si.sicard))
 
                     # read out card data
                     #
@@ -288,30 +619,39 @@ class Cardreader:
                     #
                     card_data = si.read_sicard()
 
-                    item = self.convert(card_type=card_type, card_data=card_data)
-                    self.protocol(item=item)
+                    item = self.cardreader.convert(
+                        card_type=card_type, card_data=card_data, station=self.station
+                    )
+                    self.cardreader.protocol(item=item)
                     print("")
+                    print("Station:     ", self.serial_number or "-")
                     print("Entry time:  ", item["entryTime"])
                     print("Card number: ", item["controlCard"])
                     print("Start time:  ", item.get("startTime", None))
                     print("Finish time: ", item.get("finishTime", None))
                     print("Controls:    ", len(item.get("punches", 0)))
 
-                    r = self.webSocketClient.send_and_receive(item=item)
+                    # give feedback before the server has stored the card read
+                    p = self.cardreader.preview_result(item=item)
+                    if p is not None:
+                        print("Preview:     ", p["status"], p["error"] or "")
+                        # beep
+                        si.ack_sicard()
+
+                    r = webSocketClient.send_card_read(item=item)
 
                     if "status" in r:
                         print(r["status"])
-                        # beep
-                        si.ack_sicard()
+                        if p is None:
+                            # beep
+                            si.ack_sicard()
+                        elif preview.differs(preview=p, reply=r):
+                            print("Server result differs from preview:", r["status"])
 
-                    self.webSocketClient.entry_type = "readerConnected"
-                    self.webSocketClient.entry_time = datetime.datetime.now()
+                    self.set_state(entry_type="readerConnected", send=False)
 
                 except sireader.SIReaderCardChanged:
-                    self.webSocketClient.set_state(
-                        entry_type="cardRemoved",
-                        entry_time=datetime.datetime.now(),
-                    )
+                    self.set_state(entry_type="cardRemoved")
 
         finally:
             try:
@@ -321,73 +661,7 @@ class Cardreader:
             finally:
                 si.disconnect()
                 # send readerDisconnected message
-                # send readerDisconnected message
-                r = self.webSocketClient.set_state(
-                    entry_type="readerDisconnected",
-                    entry_time=datetime.datetime.now(),
-                )
-
-    def process_cards(self) -> None:
-        print("#### process cards ###")
-        while True:
-            try:
-                self.reader()
-            except (sireader.SIReaderException, sireader.SIReaderTimeout, OSError) as e:
-                print(f"SIReader or OSError exception:\n{str(e)}")
-                time.sleep(5)
-
-    def process_log(self, cardreader_log: pathlib.Path) -> None:
-        send_all_entries = False
-        with open(cardreader_log) as f:
-            r = self.webSocketClient.set_state(
-                entry_type="readerConnected",
-                entry_time=datetime.datetime.now(),
-            )
-
-            line = f.readline()
-            while line != "":
-                if not send_all_entries:
-                    inp = input("Weiter? ")
-                else:
-                    inp = ""
-
-                if inp == "q":
-                    break
-                elif inp == "a":
-                    send_all_entries = True
-                elif inp == "c":
-                    self.webSocketClient.set_state(
-                        entry_type="readerConnected",
-                        entry_time=datetime.datetime.now(),
-                    )
-                elif inp == "d":
-                    self.webSocketClient.set_state(
-                        entry_type="readerDisconnected",
-                        entry_time=datetime.datetime.now(),
-                    )
-                elif inp == "i":
-                    self.webSocketClient.set_state(
-                        entry_type="cardInserted",
-                        entry_time=datetime.datetime.now(),
-                        card=json.loads(line)["controlCard"],
-                    )
-                elif inp == "r":
-                    self.webSocketClient.set_state(
-                        entry_type="cardRemoved",
-                        entry_time=datetime.datetime.now(),
-                    )
-                else:
-                    item = json.loads(line)
-                    line = f.readline()
-
-                    jsonschema.validate(item, self.schema_cardreader_log)
-                    print(f"{str(item.get('controlCard', item['entryType']))} ...")
-
-                    r = self.webSocketClient.send_and_receive(item=item)
-                    self.webSocketClient.entry_type = "readerConnected"
-                    self.webSocketClient.entry_time = datetime.datetime.now()
-
-                    print(r)
+                self.cardreader.station_disconnected(station=self)
 
 
 def main() -> Optional[int]:
@@ -400,7 +674,34 @@ def main() -> Optional[int]:
     )
     parser.add_argument("-f", "--file", type=pathlib.Path)
     parser.add_argument("-v", "--verbose", action="store_true")
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="send the card reads of the log file without prompting",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=0,
+        help="replay: 0 full speed (default), 1 original timing, 2 twice as fast",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=4,
+        help="replay: number of concurrent connections (default 4)",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=20,
+        help="replay: card reads per frame (default 20)",
+    )
     args = parser.parse_args()
+    if args.replay and args.file is None:
+        parser.error("--replay requires --file")
+    if args.concurrency < 1 or args.batch_size < 1:
+        parser.error("--concurrency and --batch-size must be positive")
 
     config_file = pathlib.Path(args.config)
     if not config_file.exists():
@@ -433,34 +734,101 @@ def main() -> Optional[int]:
     try:
         host = config["Cardreader"]["host"]
         key = config["Cardreader"]["key"]
+        # websocket port of the server, by default the port of a local server
+        try:
+            port = config.getint(
+                "Cardreader",
+                "port",
+                fallback=config.getint("Server", "websocket_port", fallback=8081),
+            )
+        except ValueError:
+            parser.error("Value for 'port' must be an integer")
         ssl_cert = config.get("Cardreader", "ssl_cert", fallback=None)
         serial_number = config.get("Cardreader", "serial_number", fallback=None)
+        # card reads not yet acknowledged by the server, "off" disables the spool
+        spool_path = config.get(
+            "Cardreader", "spool", fallback=str(config_file.parent / "spool")
+        )
         try:
             ssl_verify = config.getboolean("Cardreader", "ssl_verify", fallback=True)
         except ValueError:
             parser.error(
                 "Allowed values for 'ssl_verify' are 'true', 'false', 'on', 'off', 'yes', 'no'"
             )
+        try:
+            use_preview = config.getboolean("Cardreader", "preview", fallback=False)
+        except ValueError:
+            parser.error(
+                "Allowed values for 'preview' are 'true', 'false', 'on', 'off', 'yes', 'no'"
+            )
 
         # check ssl options
         if ssl_cert and not pathlib.Path(ssl_cert).exists():
             parser.error(f'Certificate file "{ssl_cert}" not found')
 
         print(f"Host:   {str(host)}")
+        print(f"Port:   {str(port)}")
         print(f"Cert:   {str(ssl_cert)}")
         print(f"Verify: {str(ssl_verify)}")
         print(f"Key:    {str(key)}")
         print(f"Serial: {str(serial_number)}")
+        print(f"Preview: {str(use_preview)}")
         print("")
 
+        ssl_context = ssl.create_default_context(cafile=ssl_cert)
+        if not ssl_verify:
+            ssl_context.check_hostname = False
+            ssl_context.verify_mode = ssl.CERT_NONE
+
+        if args.replay:
+            stats = asyncio.run(
+                replay.replay(
+                    uri=f"wss://{host}:{port}/cardreader",
+                    key=key,
+                    items=replay.read_log(
+                        path=args.file, schema=Cardreader.schema_cardreader_log
+                    ),
+                    rate=args.rate,
+                    concurrency=args.concurrency,
+                    batch_size=args.batch_size,
+                    ssl_context=ssl_context,
+                )
+            )
+            print(stats.summary())
+            return 0 if stats.errors == 0 else 1
+
+        spool = None
+        if spool_path.lower() not in ("", "off"):
+            spool = Spool(path=pathlib.Path(spool_path))
+            print(f"Spool:  {spool_path}, {spool.pending_count} card reads pending")
+            print("")
+
         # websocket.enableTrace(True)
         webSocketClient = WebSocketClient(
-            host=host, key=key, ssl_cert=ssl_cert, ssl_verify=ssl_verify
+            host=host,
+            port=port,
+            key=key,
+            ssl_cert=ssl_cert,
+            ssl_verify=ssl_verify,
+            spool=spool,
         )
         webSocketClient.start()
 
+        snapshot = None
+        if use_preview:
+            # results are previewed with the snapshot of the event
+            snapshot = Preview(
+                url=f"https://{host}:{port}{preview.PATH}",
+                key=key,
+                path=config_file.parent / "snapshot.json",
+                ssl_context=ssl_context,
+            )
+            snapshot.start()
+
         cardreader = Cardreader(
-            webSocketClient=webSocketClient, serial_number=serial_number
+            webSocketClient=webSocketClient,
+            serial_number=serial_number,
+            preview=snapshot,
         )
         if args.file is None:
             cardreader.process_cards()
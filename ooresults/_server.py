@@ -25,6 +25,7 @@ import re
 import sqlite3
 import sys
 import warnings
+from collections.abc import Iterator
 from typing import Optional
 
 import bottle
@@ -43,10 +44,20 @@ import ooresults.handler.series
 import ooresults.handler.si1
 from ooresults import configuration
 from ooresults import model
+from ooresults.model import cached_result
+from ooresults.plugins import iof_schema
+from ooresults.repo.memory_repo import MemoryRepo
+from ooresults.repo.sharded_repo import ShardedSqliteRepo
 from ooresults.repo.sqlite_repo import SqliteRepo
 from ooresults.user import Users
 from ooresults.utils import render
 from ooresults.utils import rental_cards
+from ooresults.utils.backup import BackupScheduler
+from ooresults.utils.scheduler import priority_of_path
+from ooresults.utils.scheduler import scheduler
+from ooresults.websocket_server.executors import Executors
+from ooresults.websocket_server.group_commit import GroupCommitWriter
+from ooresults.websocket_server.relay import Relay
 from ooresults.websocket_server.websocket_server import WebSocketServer
 
 
@@ -101,7 +112,12 @@ def my_plugin(callback):
             else:
                 return unauthorized()
         try:
-            return callback(*args, **kwargs)
+            priority = priority_of_path(path)
+            with scheduler.slot(priority):
+                result = callback(*args, **kwargs)
+            if isinstance(result, Iterator):
+                return scheduler.iterate(priority, result)
+            return result
         except bottle.MultipartError as e:
             logging.error(f"Exception: {type(e)}, {e}")
             return bottle.HTTPResponse(status=413, body="Content too large")
@@ -157,22 +173,77 @@ def main() -> Optional[int]:
     rental_cards.read_rental_cards(path=main_path / "rental_cards.txt")
 
     try:
-        model.db = SqliteRepo(db=str(database))
+        if config.relay:
+            # a relay keeps the received results only in memory
+            model.db = SqliteRepo(db="ooresults-relay", memory=True)
+        elif config.storage == "sharded":
+            model.db = ShardedSqliteRepo(db=str(database))
+        else:
+            model.db = SqliteRepo(db=str(database))
     except (RuntimeError, sqlite3.Error):
         exc_type, exc_value, _ = sys.exc_info()
         logging.error(f"{exc_type.__module__}.{exc_type.__name__}: {exc_value}")
         print(f"{exc_type.__module__}.{exc_type.__name__}: {exc_value}")
         return 2
 
+    if config.result_replica:
+        # the public results are computed from a copy of the data in memory
+        cached_result.use_replica(db=MemoryRepo(source=model.db))
+
     if config.demo_reader:
         bottle.route("/demo")(ooresults.handler.demo_reader.get_update)
 
     Users.update(path=main_path / "users.json")
 
+    iof_schema.validator.configure(
+        policy=config.iof_validation, sample_rate=config.iof_validation_sample_rate
+    )
+    relay = (
+        Relay(downstream=config.relay_downstream, keys=config.relay_keys)
+        if config.relay
+        else None
+    )
+    render.websocket_port = config.websocket_port
+    executors = Executors(
+        cardreader=config.threads_cardreader,
+        results=config.threads_results,
+        imports=config.threads_imports,
+        max_queued=config.max_queued_tasks,
+    )
+    writer = (
+        GroupCommitWriter(
+            max_items=config.group_commit_size, max_delay=config.group_commit_delay
+        )
+        if config.group_commit
+        else None
+    )
+    # a relay has no database file to back up
+    backup = (
+        BackupScheduler(
+            database=database,
+            path=config.backup_path,
+            shards=model.db.path if isinstance(model.db, ShardedSqliteRepo) else None,
+            interval=config.backup_interval,
+            keep=config.backup_keep,
+            pages=config.backup_pages,
+        )
+        if config.backup_interval > 0 and not config.relay
+        else None
+    )
+
     try:
         model.results.websocket_server = WebSocketServer(
             demo_reader=config.demo_reader,
             import_stream=config.import_stream,
+            streaming_interval=config.streaming_interval,
+            relay=relay,
+            reader_messages=config.reader_messages,
+            result_interval=config.result_interval,
+            result_max_latency=config.result_max_latency,
+            executors=executors,
+            writer=writer,
+            backup=backup,
+            port=config.websocket_port,
             ssl_cert=config.ssl_cert,
             ssl_key=config.ssl_key,
         )
@@ -180,6 +251,15 @@ def main() -> Optional[int]:
         model.results.websocket_server = WebSocketServer(
             demo_reader=config.demo_reader,
             import_stream=config.import_stream,
+            streaming_interval=config.streaming_interval,
+            relay=relay,
+            reader_messages=config.reader_messages,
+            result_interval=config.result_interval,
+            result_max_latency=config.result_max_latency,
+            executors=executors,
+            writer=writer,
+            backup=backup,
+            port=config.websocket_port,
         )
     model.results.websocket_server.start()
     logging.info("WebSocketServer started")
@@ -188,7 +268,7 @@ def main() -> Optional[int]:
     bottle.run(
         server="cheroot",
         host="0.0.0.0",
-        port=8080,
+        port=config.http_port,
         debug=True,
         certfile=config.ssl_cert,
         keyfile=config.ssl_key,
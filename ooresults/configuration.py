@@ -27,6 +27,8 @@ from cryptography.hazmat.primitives import serialization
 from cryptography.hazmat.primitives.asymmetric import rsa
 from cryptography.x509.oid import NameOID
 
+from ooresults.plugins.iof_schema import ValidationPolicy
+
 
 class Config:
     def __init__(self, path: pathlib.Path):
@@ -37,6 +39,30 @@ class Config:
         #  ssl_key = cert/privkey.pem
         #  demo_reader = off
         #  import_stream = off
+        #  streaming_interval = 2
+        #  http_port = 8080
+        #  websocket_port = 8081
+        #  relay = off
+        #  relay_downstream = relay1.example.com:8081, relay2.example.com:8081
+        #  relay_keys = key1, key2
+        #  reader_messages = 200
+        #  result_interval = 1
+        #  result_max_latency = 5
+        #  threads_cardreader = 2
+        #  threads_results = 5
+        #  threads_imports = 2
+        #  max_queued_tasks = 20
+        #  group_commit = off
+        #  group_commit_size = 20
+        #  group_commit_delay = 0.01
+        #  iof_validation = sampled
+        #  iof_validation_sample_rate = 50
+        #  backup_interval = 0
+        #  backup_path = backups
+        #  backup_keep = 10
+        #  backup_pages = 100
+        #  storage = single
+        #  result_replica = off
         #
 
         self.config_file = path / "config.ini"
@@ -44,6 +70,30 @@ class Config:
         self.ssl_key = pathlib.Path.home() / ".ooresults" / "cert" / "privkey.pem"
         self.demo_reader = False
         self.import_stream = False
+        self.streaming_interval = 2.0
+        self.http_port = 8080
+        self.websocket_port = 8081
+        self.relay = False
+        self.relay_downstream = ""
+        self.relay_keys: list[str] = []
+        self.reader_messages = 200
+        self.result_interval = 1.0
+        self.result_max_latency = 5.0
+        self.threads_cardreader = 2
+        self.threads_results = 5
+        self.threads_imports = 2
+        self.max_queued_tasks = 20
+        self.group_commit = False
+        self.group_commit_size = 20
+        self.group_commit_delay = 0.01
+        self.iof_validation = ValidationPolicy.SAMPLED
+        self.iof_validation_sample_rate = 50
+        self.backup_interval = 0.0
+        self.backup_path = path / "backups"
+        self.backup_keep = 10
+        self.backup_pages = 100
+        self.storage = "single"
+        self.result_replica = False
 
         config = configparser.ConfigParser()
         if self.config_file.exists():
@@ -54,6 +104,7 @@ class Config:
                 "ssl_key": "",
                 "demo_reader": "off",
                 "import_stream": "off",
+                "streaming_interval": "2",
             }
             config["Cardreader"] = {
                 "host": "127.0.0.1",
@@ -94,6 +145,158 @@ class Config:
                 "Allowed values for 'import_stream' are 'true', 'false', 'on', 'off', 'yes', 'no'"
             )
 
+        try:
+            self.streaming_interval = config.getfloat(
+                "Server", "streaming_interval", fallback=2.0
+            )
+        except ValueError:
+            raise RuntimeError("Value for 'streaming_interval' must be a number")
+        if self.streaming_interval < 0:
+            raise RuntimeError("Value for 'streaming_interval' must not be negative")
+
+        for option in ("http_port", "websocket_port"):
+            try:
+                port = config.getint("Server", option, fallback=getattr(self, option))
+            except ValueError:
+                raise RuntimeError(f"Value for '{option}' must be an integer")
+            if not 0 < port < 65536:
+                raise RuntimeError(f"Value for '{option}' must be a valid port number")
+            setattr(self, option, port)
+
+        try:
+            self.relay = config.getboolean("Server", "relay", fallback=False)
+        except ValueError:
+            raise RuntimeError(
+                "Allowed values for 'relay' are 'true', 'false', 'on', 'off', 'yes', 'no'"
+            )
+        # a relay receives the results of the events by streaming
+        if self.relay:
+            self.import_stream = True
+        self.relay_downstream = config.get("Server", "relay_downstream", fallback="")
+        # a relay creates events only for these keys
+        self.relay_keys = [
+            k.strip()
+            for k in config.get("Server", "relay_keys", fallback="").split(",")
+            if k.strip()
+        ]
+
+        try:
+            self.reader_messages = config.getint(
+                "Server", "reader_messages", fallback=200
+            )
+        except ValueError:
+            raise RuntimeError("Value for 'reader_messages' must be an integer")
+        if self.reader_messages < 1:
+            raise RuntimeError("Value for 'reader_messages' must be positive")
+
+        for option in ("result_interval", "result_max_latency"):
+            try:
+                value = config.getfloat(
+                    "Server", option, fallback=getattr(self, option)
+                )
+            except ValueError:
+                raise RuntimeError(f"Value for '{option}' must be a number")
+            if value < 0:
+                raise RuntimeError(f"Value for '{option}' must not be negative")
+            setattr(self, option, value)
+
+        for option in (
+            "threads_cardreader",
+            "threads_results",
+            "threads_imports",
+            "max_queued_tasks",
+        ):
+            try:
+                number = config.getint("Server", option, fallback=getattr(self, option))
+            except ValueError:
+                raise RuntimeError(f"Value for '{option}' must be an integer")
+            if number < 1:
+                raise RuntimeError(f"Value for '{option}' must be positive")
+            setattr(self, option, number)
+
+        try:
+            self.group_commit = config.getboolean(
+                "Server", "group_commit", fallback=False
+            )
+        except ValueError:
+            raise RuntimeError(
+                "Allowed values for 'group_commit' are 'true', 'false', 'on', 'off', 'yes', 'no'"
+            )
+
+        try:
+            self.group_commit_size = config.getint(
+                "Server", "group_commit_size", fallback=20
+            )
+        except ValueError:
+            raise RuntimeError("Value for 'group_commit_size' must be an integer")
+        if self.group_commit_size < 1:
+            raise RuntimeError("Value for 'group_commit_size' must be positive")
+
+        try:
+            self.group_commit_delay = config.getfloat(
+                "Server", "group_commit_delay", fallback=0.01
+            )
+        except ValueError:
+            raise RuntimeError("Value for 'group_commit_delay' must be a number")
+        if self.group_commit_delay < 0:
+            raise RuntimeError("Value for 'group_commit_delay' must not be negative")
+
+        value = config.get("Server", "iof_validation", fallback="sampled")
+        try:
+            self.iof_validation = ValidationPolicy(value)
+        except ValueError:
+            raise RuntimeError(
+                "Allowed values for 'iof_validation' are 'always', 'sampled', 'tests'"
+            )
+
+        try:
+            self.iof_validation_sample_rate = config.getint(
+                "Server", "iof_validation_sample_rate", fallback=50
+            )
+        except ValueError:
+            raise RuntimeError(
+                "Value for 'iof_validation_sample_rate' must be an integer"
+            )
+        if self.iof_validation_sample_rate < 1:
+            raise RuntimeError(
+                "Value for 'iof_validation_sample_rate' must be positive"
+            )
+
+        try:
+            self.backup_interval = config.getfloat(
+                "Server", "backup_interval", fallback=0.0
+            )
+        except ValueError:
+            raise RuntimeError("Value for 'backup_interval' must be a number")
+        if self.backup_interval < 0:
+            raise RuntimeError("Value for 'backup_interval' must not be negative")
+
+        backup_path = config.get("Server", "backup_path", fallback=None)
+        if backup_path:
+            self.backup_path = path / backup_path
+
+        for option in ("backup_keep", "backup_pages"):
+            try:
+                number = config.getint("Server", option, fallback=getattr(self, option))
+            except ValueError:
+                raise RuntimeError(f"Value for '{option}' must be an integer")
+            if number < 1:
+                raise RuntimeError(f"Value for '{option}' must be positive")
+            setattr(self, option, number)
+
+        self.storage = config.get("Server", "storage", fallback="single")
+        if self.storage not in ("single", "sharded"):
+            raise RuntimeError("Allowed values for 'storage' are 'single', 'sharded'")
+
+        try:
+            self.result_replica = config.getboolean(
+                "Server", "result_replica", fallback=False
+            )
+        except ValueError:
+            raise RuntimeError(
+                "Allowed values for 'result_replica' are 'true', 'false', 'on', 'off', 'yes', 'no'"
+            )
+
         # create cert files for localhost if files not exist
         if (
             not pathlib.Path(self.ssl_cert).exists()
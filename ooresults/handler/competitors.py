@@ -17,8 +17,8 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import io
 from collections import defaultdict
+from collections.abc import Iterator
 from typing import Optional
 
 import bottle
@@ -26,6 +26,7 @@ import bottle
 from ooresults import model
 from ooresults.otypes.competitor_type import CompetitorType
 from ooresults.plugins import iof_competitor_list
+from ooresults.plugins import iof_schema
 from ooresults.repo.repo import CompetitorUsedError
 from ooresults.repo.repo import ConstraintError
 from ooresults.utils import render
@@ -105,11 +106,10 @@ def post_import() -> str | bottle.HTTPResponse:
     data = bottle.request.forms
     try:
         if data.comp_import == "comp.import.1":
-            with io.BytesIO() as buffer:
-                bottle.request.files.browse1.save(buffer)
-                competitors = iof_competitor_list.parse_competitor_list(
-                    content=buffer.getvalue()
-                )
+            # the competitors are read without building the whole document tree
+            competitors = iof_competitor_list.iterparse_competitor_list(
+                source=bottle.request.files.browse1.file
+            )
             model.competitors.import_competitors(competitors=competitors)
 
     except Exception as e:
@@ -119,12 +119,15 @@ def post_import() -> str | bottle.HTTPResponse:
 
 
 @bottle.post("/competitor/export")
-def post_export() -> bytes | bottle.HTTPResponse:
+def post_export() -> bytes | Iterator[bytes] | bottle.HTTPResponse:
     """Export competitors."""
     data = bottle.request.forms
     if data.comp_export == "comp.export.1":
         competitors = model.competitors.get_competitors()
-        content = iof_competitor_list.create_competitor_list(competitors=competitors)
+        # the document is written while it is sent, unless it is validated
+        content = iof_schema.validator.validate_created_chunks(
+            iof_competitor_list.iter_competitor_list(competitors=competitors)
+        )
 
     return content
 
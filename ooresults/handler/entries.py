@@ -22,6 +22,8 @@ import io
 import itertools
 import json
 from collections import defaultdict
+from collections.abc import Iterable
+from collections.abc import Iterator
 from typing import Optional
 
 import bottle
@@ -35,6 +37,7 @@ from ooresults.otypes.entry_type import RankedEntryType
 from ooresults.otypes.result_type import ResultStatus
 from ooresults.plugins import iof_entry_list
 from ooresults.plugins import iof_result_list
+from ooresults.plugins import iof_schema
 from ooresults.plugins import oe12
 from ooresults.plugins import oe2003
 from ooresults.plugins.imports.entries import text
@@ -180,16 +183,16 @@ def post_import() -> str | bottle.HTTPResponse:
     data = bottle.request.forms
     event_id = int(data.event_id) if data.event_id != "" else -1
     try:
+        # IOF entries are read without building the whole document tree
+        entries: Iterable[dict]
         if data.entr_import == "entr.import.1":
-            with io.BytesIO() as buffer:
-                bottle.request.files.browse1.save(buffer)
-                _, entries = iof_entry_list.parse_entry_list(content=buffer.getvalue())
+            _, entries = iof_entry_list.iterparse_entry_list(
+                source=bottle.request.files.browse1.file
+            )
         elif data.entr_import == "entr.import.2":
-            with io.BytesIO() as buffer:
-                bottle.request.files.browse2.save(buffer)
-                _, entries, _ = iof_result_list.parse_result_list(
-                    content=buffer.getvalue()
-                )
+            _, _, entries = iof_result_list.iterparse_result_list(
+                source=bottle.request.files.browse2.file
+            )
         elif data.entr_import == "entr.import.3":
             event = model.events.get_event(id=event_id)
             with io.BytesIO() as buffer:
@@ -232,18 +235,22 @@ def post_import() -> str | bottle.HTTPResponse:
             return bottle.HTTPResponse(status=409, body="Internal server error")
 
         # import only the first entry of the entries with same last and first name
-        entries_1: list[dict] = []
         names_1: set[tuple[str, str]] = set()
         names_2: set[tuple[str, str]] = set()
-        for e in entries:
-            name = (e["last_name"], e["first_name"])
-            if name in names_1:
-                names_2.add(name)
-            else:
-                names_1.add(name)
-                entries_1.append(e)
+        number_of_entries = 0
 
-        model.entries.import_entries(event_id=event_id, entries=entries_1)
+        def entries_1() -> Iterator[dict]:
+            nonlocal number_of_entries
+            for e in entries:
+                number_of_entries += 1
+                name = (e["last_name"], e["first_name"])
+                if name in names_1:
+                    names_2.add(name)
+                else:
+                    names_1.add(name)
+                    yield e
+
+        model.entries.import_entries(event_id=event_id, entries=entries_1())
 
     except EventNotFoundError:
         return bottle.HTTPResponse(status=409, body="Event deleted")
@@ -251,39 +258,49 @@ def post_import() -> str | bottle.HTTPResponse:
     answer = {"table": update(event_id=event_id, view=data.view)}
     if names_2:
         answer["status"] = render.entries_import_status(
-            number_of_imported_entries=len(entries_1),
-            number_of_entries=len(entries),
+            number_of_imported_entries=len(names_1),
+            number_of_entries=number_of_entries,
             names=names_2,
         )
     return json.dumps(answer)
 
 
 @bottle.post("/entry/export")
-def post_export() -> bytes | bottle.HTTPResponse:
+def post_export() -> bytes | Iterator[bytes] | bottle.HTTPResponse:
     """Export entries."""
     data = bottle.request.forms
     event_id = int(data.event_id) if data.event_id != "" else -1
+    content: bytes | Iterator[bytes]
     try:
+        # the IOF documents are written while they are sent, unless
+        # they are validated
         if data.entr_export == "entr.export.1":
             entry_list = model.entries.get_entries(event_id=event_id)
             event = model.events.get_event(id=event_id)
-            content = iof_entry_list.create_entry_list(event, entry_list)
+            content = iof_schema.validator.validate_created_chunks(
+                iof_entry_list.iter_entry_list(event, entry_list)
+            )
         elif data.entr_export == "entr.export.2":
             event, class_results = model.results.event_class_results(event_id=event_id)
-            content = iof_result_list.create_result_list(event, class_results)
+            content = iof_schema.validator.validate_created_chunks(
+                iof_result_list.iter_result_list(event, class_results)
+            )
         elif data.entr_export == "entr.export.3":
             event, class_results = model.results.results_for_splitsbrowser(
                 event_id=event_id
             )
-            content = iof_result_list.create_result_list(event, class_results)
+            content = iof_schema.validator.validate_created_chunks(
+                iof_result_list.iter_result_list(event, class_results)
+            )
         elif data.entr_export == "entr.export.4":
             class_list = model.classes.get_classes(event_id=event_id)
             entry_list = model.entries.get_entries(event_id=event_id)
-            content = oe2003.create(entry_list, class_list)
+            # the CSV file is written while it is sent
+            content = oe2003.iter_create(entry_list, class_list)
         elif data.entr_export == "entr.export.5":
             class_list = model.classes.get_classes(event_id=event_id)
             entry_list = model.entries.get_entries(event_id=event_id)
-            content = oe12.create(entry_list, class_list)
+            content = oe12.iter_create(entry_list, class_list)
 
     except EventNotFoundError:
         return bottle.HTTPResponse(status=409, body="Event deleted")
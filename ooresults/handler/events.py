@@ -34,6 +34,8 @@ Handler for the event routes.
 /event/add
 /event/fill_edit_form
 /event/delete
+/event/import
+/event/export
 """
 
 
@@ -102,6 +104,27 @@ def post_delete() -> str | bottle.HTTPResponse:
     return update()
 
 
+@bottle.post("/event/import")
+def post_import() -> str | bottle.HTTPResponse:
+    """Import an event package."""
+    try:
+        model.events.import_event_package(source=bottle.request.files.browse1.file)
+    except Exception as e:
+        return bottle.HTTPResponse(status=409, body=str(e))
+
+    return update()
+
+
+@bottle.post("/event/export")
+def post_export() -> bytes | bottle.HTTPResponse:
+    """Export an event package."""
+    data = bottle.request.forms
+    try:
+        return model.events.export_event_package(event_id=int(data.id))
+    except EventNotFoundError:
+        return bottle.HTTPResponse(status=409, body="Event deleted")
+
+
 @bottle.post("/event/fill_edit_form")
 def post_fill_edit_form() -> str | bottle.HTTPResponse:
     """Query data to fill add or edit form."""
@@ -41,6 +41,10 @@ def get_si1() -> str:
     data = bottle.request.params
     if "view" in data and data.view in ["0", "1"]:
         view = int(data.view)
+    # the results are rendered by the page (json) or by the server (html)
+    format = "json"
+    if "format" in data and data.format in ["json", "html"]:
+        format = data.format
 
     try:
         for e in model.events.get_events():
@@ -50,4 +54,4 @@ def get_si1() -> str:
     except Exception:
         pass
 
-    return render.si1_page(event=event, view=view)
+    return render.si1_page(event=event, view=view, format=format)
@@ -25,6 +25,7 @@ from collections.abc import Callable
 from typing import Optional
 
 from ooresults import model
+from ooresults.repo.memory_repo import MemoryRepo
 
 
 @dataclasses.dataclass
@@ -39,6 +40,8 @@ MAX_SIZE = 4
 lock = threading.Lock()
 cache: typing.OrderedDict[int, Data] = OrderedDict()
 callbacks: set[Callable[[Optional[int]], None]] = set()
+# read replica used to compute the results, model.db if None
+replica: Optional[MemoryRepo] = None
 
 
 def get_cached_data(event_id: int):
@@ -62,7 +65,12 @@ def get_cached_data(event_id: int):
             cached_data = cache.get(event_id, None)
 
         if cached_data is None or cached_data.content is None or not cached_data.valid:
-            content = model.results.event_class_results(event_id=event_id)
+            if replica is None:
+                content = model.results.event_class_results(event_id=event_id)
+            else:
+                content = model.results.event_class_results(
+                    event_id=event_id, db=replica
+                )
 
             with lock:
                 cached_data = cache.get(event_id, None)
@@ -96,3 +104,17 @@ def register(callback: Callable[[Optional[int]], None]) -> None:
 def unregister(callback: Callable[[Optional[int]], None]) -> None:
     with lock:
         callbacks.remove(callback)
+
+
+def use_replica(db: Optional[MemoryRepo]) -> None:
+    """Compute the results from the read replica db instead of model.db.
+
+    The replica is refreshed with the changes reported by clear_cache.
+    """
+    global replica
+    if replica is not None:
+        unregister(callback=replica.changed)
+    if db is not None:
+        register(callback=db.changed)
+    replica = db
+    clear_cache()
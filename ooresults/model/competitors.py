@@ -17,6 +17,8 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+from collections.abc import Iterable
+
 from ooresults import model
 from ooresults.model import cached_result
 from ooresults.otypes.competitor_type import CompetitorBaseDataType
@@ -66,7 +68,9 @@ def delete_competitor(id: int) -> None:
         model.db.delete_competitor(id=id)
 
 
-def import_competitors(competitors: list[dict]) -> None:
+def import_competitors(competitors: Iterable[dict]) -> None:
+    # the competitors are parsed and validated before the database is locked
+    competitors = list(competitors)
     with model.db.transaction(mode=TransactionMode.IMMEDIATE):
         list_of_competitors = []
         for c in competitors:
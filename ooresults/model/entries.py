@@ -21,6 +21,7 @@ import copy
 import datetime
 import enum
 import sqlite3
+from collections.abc import Iterable
 from typing import Optional
 
 import tzlocal
@@ -43,10 +44,13 @@ from ooresults.repo.repo import TransactionMode
 
 def import_entries(
     event_id: int,
-    entries: list[dict],
+    entries: Iterable[dict],
     event_key: str = None,
     clear_entries: bool = False,
 ) -> None:
+    # the entries are parsed and validated before the database is locked,
+    # so card readouts are stored while a large document is read
+    entries = list(entries)
     with model.db.transaction(mode=TransactionMode.IMMEDIATE):
         # check if the event still exists
         event = model.db.get_event(id=event_id)
@@ -200,7 +204,7 @@ def import_entries(
     cached_result.clear_cache(event_id=event_id)
 
 
-def import_iof_result_list(event_key: str, content: bytes) -> None:
+def import_iof_result_list(event_key: str, content: bytes) -> int:
     #
     # 1. Find event corresponding to event_key
     # 2. Decode IOF xml data
@@ -214,7 +218,7 @@ def import_iof_result_list(event_key: str, content: bytes) -> None:
         else:
             raise repo.EventNotFoundError(f'Event for key "{event_key}" not found')
 
-    _, entries, status = iof_result_list.parse_result_list(content)
+    _, status, entries = iof_result_list.iterparse_result_list(source=content)
     import_entries(
         event_id=event_id,
         entries=entries,
@@ -222,6 +226,7 @@ def import_iof_result_list(event_key: str, content: bytes) -> None:
         clear_entries=status != ResultListStatus.DELTA,
     )
     cached_result.clear_cache(event_id=event_id)
+    return event_id
 
 
 def get_entries(event_id: int) -> list[EntryType]:
@@ -19,12 +19,15 @@
 
 import asyncio
 import datetime
+from typing import IO
 from typing import Optional
 
 from ooresults import model
 from ooresults.model import cached_result
 from ooresults.otypes.event_type import EventType
+from ooresults.plugins import event_package
 from ooresults.repo.repo import TransactionMode
+from ooresults.repo.update import update_tables
 
 
 def get_events() -> list[EventType]:
@@ -138,3 +141,33 @@ def delete_event(id: int) -> None:
         model.db.delete_event(id)
 
     cached_result.clear_cache(event_id=id)
+
+
+def export_event_package(event_id: int) -> bytes:
+    with model.db.transaction():
+        rows = model.db.get_event_rows(event_id=event_id)
+    return event_package.create(rows=rows, db_version=update_tables.VERSION)
+
+
+def import_event_package(source: bytes | IO[bytes]) -> int:
+    """Import an event package as a new event and return the id of the event.
+
+    Possible errors:
+    - RuntimeError, if the file is no valid event package
+    - ConstraintError, if the event or event key already exist
+    """
+    rows = event_package.parse(source=source, db_version=update_tables.VERSION)
+    with model.db.transaction(mode=TransactionMode.IMMEDIATE):
+        try:
+            event_id = model.db.add_event_rows(rows=rows)
+        except (KeyError, ValueError, TypeError) as e:
+            raise RuntimeError("Event package is invalid") from e
+        event = model.db.get_event(id=event_id)
+
+    if model.results.websocket_server is not None:
+        future = asyncio.run_coroutine_threadsafe(
+            coro=model.results.websocket_server.update_event(event=event),
+            loop=model.results.websocket_server.loop,
+        )
+        future.result()
+    return event_id
@@ -17,6 +17,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import copy
 import json
 import pathlib
 from typing import Optional
@@ -39,7 +40,9 @@ from ooresults.otypes.result_type import SpStatus
 from ooresults.otypes.series_type import Settings
 from ooresults.otypes.start_type import PersonRaceStart
 from ooresults.repo.repo import EventNotFoundError
+from ooresults.repo.repo import Repo
 from ooresults.repo.repo import TransactionMode
+from ooresults.utils import preview
 from ooresults.websocket_server.websocket_server import WebSocketServer
 
 
@@ -90,154 +93,323 @@ def parse_cardreader_log(item: dict) -> result_type.CardReaderMessage:
     return d
 
 
+def missing_controls(result: result_type.PersonRaceResult) -> list[str]:
+    if result.finish_time is None:
+        return ["FINISH"]
+    if result.start_time is None:
+        return ["START"]
+    controls = []
+    for sp in result.split_times:
+        if sp.status == SpStatus.MISSING:
+            controls.append(sp.control_code)
+    return controls
+
+
+def _store_cardreader_result(
+    event_key: str, item: result_type.CardReaderMessage
+) -> tuple[str, EventType, dict, Optional[int]]:
+    """Store the message in the active transaction.
+
+    Returns the entry type, the event, the reader message and the id
+    of the entry with an updated result. EventNotFoundError is raised
+    before anything is written.
+    """
+    updated_entry_id: Optional[int] = None
+    for e in model.db.get_events():
+        if event_key != "" and e.key == event_key:
+            event = e
+            break
+    else:
+        raise EventNotFoundError(f'Event for key "{event_key}" not found')
+
+    if item.entry_type == "cardRead":
+        result = item.result
+
+        entries = model.db.get_entries(event_id=event.id)
+        entries_control_card = [e for e in entries if e.chip == item.control_card]
+        assigned_entries = [e for e in entries_control_card if e.class_name is not None]
+        unassigned_entries = [e for e in entries_control_card if e.class_name is None]
+
+        for entry in assigned_entries:
+            r = entry.result
+            if r is not None and r.same_si_punches(other=result):
+                # result exists and is assigned to a competitor => nothing to do
+                res = {
+                    "entryTime": item.entry_time,
+                    "eventId": event.id,
+                    "controlCard": entry.chip,
+                    "firstName": entry.first_name,
+                    "lastName": entry.last_name,
+                    "club": entry.club_name,
+                    "class": entry.class_name,
+                    "status": r.status,
+                    "time": r.extensions.get("running_time", r.time),
+                    "error": None,
+                    "missingControls": missing_controls(result=r),
+                }
+                break
+        else:
+            # check if result is already read out
+            unassigned_entry = None
+            for entry in unassigned_entries:
+                if entry.result.same_si_punches(other=result):
+                    unassigned_entry = entry
+                    break
+
+            # result can be assigned to an entry if
+            #   (1) there is exactly one entry without result
+            #   (2) there is no unassigned entry or one unassigned entry with same result
+            if (
+                len(assigned_entries) == 1
+                and not assigned_entries[0].result.has_punches()
+                and (
+                    len(unassigned_entries) == 0
+                    or len(unassigned_entries) == 1
+                    and unassigned_entries[0].result.same_si_punches(other=result)
+                )
+            ):
+                entry = assigned_entries[0]
+                try:
+                    class_ = model.db.get_class(id=entry.class_id)
+                    course_id = class_.course_id
+                    class_params = class_.params
+                    controls = model.db.get_course(id=course_id).controls
+                except KeyError:
+                    class_params = ClassParams()
+                    controls = []
+
+                result.compute_result(
+                    controls=controls,
+                    class_params=class_params,
+                    start_time=entry.start.start_time,
+                    year=int(entry.year) if entry.year is not None else None,
+                    gender=entry.gender,
+                )
+                model.db.update_entry_result(
+                    id=entry.id,
+                    chip=entry.chip,
+                    result=result,
+                    start=entry.start,
+                )
+                res = {
+                    "entryTime": item.entry_time,
+                    "eventId": event.id,
+                    "controlCard": entry.chip,
+                    "firstName": entry.first_name,
+                    "lastName": entry.last_name,
+                    "club": entry.club_name,
+                    "class": entry.class_name,
+                    "status": result.status,
+                    "time": result.extensions.get("running_time", result.time),
+                    "error": None,
+                    "missingControls": missing_controls(result=result),
+                }
+                updated_entry_id = entry.id
+
+                # if there is an unassigned entry with the same result, delete it
+                if unassigned_entries == [unassigned_entry]:
+                    model.db.delete_entry(id=unassigned_entry.id)
+
+            else:
+                # create a new unassigned entry
+                result.compute_result(controls=[], class_params=ClassParams())
+                if unassigned_entry is None:
+                    model.db.add_entry_result(
+                        event_id=event.id,
+                        chip=item.control_card,
+                        result=result,
+                        start=PersonRaceStart(),
+                    )
+                res = {
+                    "entryTime": item.entry_time,
+                    "eventId": event.id,
+                    "controlCard": item.control_card,
+                    "firstName": None,
+                    "lastName": None,
+                    "club": None,
+                    "class": None,
+                    "status": result.status,
+                    "time": None,
+                }
+                if len(assigned_entries) == 0:
+                    res["error"] = "Control card unknown"
+                elif len(assigned_entries) >= 2:
+                    res["error"] = "There are several entries for this card"
+                else:
+                    res["error"] = "There are other results for this card"
+
+    elif item.entry_type == "cardInserted":
+        res = {"eventId": event.id, "controlCard": item.control_card}
+    else:
+        res = {"eventId": event.id}
+
+    return item.entry_type, event, res, updated_entry_id
+
+
 def store_cardreader_result(
     event_key: str, item: result_type.CardReaderMessage
 ) -> tuple[str, EventType, dict]:
-    def missing_controls(result: result_type.PersonRaceResult) -> list[str]:
-        if result.finish_time is None:
-            return ["FINISH"]
-        if result.start_time is None:
-            return ["START"]
-        controls = []
-        for sp in result.split_times:
-            if sp.status == SpStatus.MISSING:
-                controls.append(sp.control_code)
-        return controls
+    with model.db.transaction(mode=TransactionMode.IMMEDIATE):
+        entry_type, event, res, updated_entry_id = _store_cardreader_result(
+            event_key=event_key, item=item
+        )
 
+    # clear the cache after the commit, otherwise the registered
+    # callbacks could read the results before they are stored
+    if updated_entry_id is not None:
+        cached_result.clear_cache(event_id=event.id, entry_id=updated_entry_id)
+    return entry_type, event, res
+
+
+def store_cardreader_results(
+    items: list[tuple[str, result_type.CardReaderMessage]],
+) -> list[tuple[str, EventType, dict] | EventNotFoundError]:
+    """Store several messages (event key, message) in one transaction.
+
+    A message with an unknown event key does not abort the transaction,
+    EventNotFoundError is returned for it instead of the stored message.
+    """
+    results: list[tuple[str, EventType, dict] | EventNotFoundError] = []
+    updated: list[tuple[int, int]] = []
     with model.db.transaction(mode=TransactionMode.IMMEDIATE):
+        for event_key, item in items:
+            try:
+                entry_type, event, res, updated_entry_id = _store_cardreader_result(
+                    event_key=event_key, item=item
+                )
+            except EventNotFoundError as e:
+                results.append(e)
+                continue
+            results.append((entry_type, event, res))
+            if updated_entry_id is not None:
+                updated.append((event.id, updated_entry_id))
+
+    # clear the cache after the commit
+    for event_id, entry_id in updated:
+        cached_result.clear_cache(event_id=event_id, entry_id=entry_id)
+    return results
+
+
+def event_snapshot(event_key: str) -> dict:
+    """Return the snapshot of the event used by the reader to preview results."""
+    with model.db.transaction():
         for e in model.db.get_events():
             if event_key != "" and e.key == event_key:
                 event = e
                 break
         else:
             raise EventNotFoundError(f'Event for key "{event_key}" not found')
+        classes = model.db.get_classes(event_id=event.id)
+        courses = model.db.get_courses(event_id=event.id)
+        entries = model.db.get_entries(event_id=event.id)
+    return preview.snapshot(
+        event=event, classes=classes, courses=courses, entries=entries
+    )
 
-        if item.entry_type == "cardRead":
-            result = item.result
-
-            entries = model.db.get_entries(event_id=event.id)
-            entries_control_card = [e for e in entries if e.chip == item.control_card]
-            assigned_entries = [
-                e for e in entries_control_card if e.class_name is not None
-            ]
-            unassigned_entries = [
-                e for e in entries_control_card if e.class_name is None
-            ]
-
-            for entry in assigned_entries:
-                r = entry.result
-                if r is not None and r.same_si_punches(other=result):
-                    # result exists and is assigned to a competitor => nothing to do
-                    res = {
-                        "entryTime": item.entry_time,
-                        "eventId": event.id,
-                        "controlCard": entry.chip,
-                        "firstName": entry.first_name,
-                        "lastName": entry.last_name,
-                        "club": entry.club_name,
-                        "class": entry.class_name,
-                        "status": r.status,
-                        "time": r.extensions.get("running_time", r.time),
-                        "error": None,
-                        "missingControls": missing_controls(result=r),
-                    }
-                    break
-            else:
-                # check if result is already read out
-                unassigned_entry = None
-                for entry in unassigned_entries:
-                    if entry.result.same_si_punches(other=result):
-                        unassigned_entry = entry
-                        break
-
-                # result can be assigned to an entry if
-                #   (1) there is exactly one entry without result
-                #   (2) there is no unassigned entry or one unassigned entry with same result
-                if (
-                    len(assigned_entries) == 1
-                    and not assigned_entries[0].result.has_punches()
-                    and (
-                        len(unassigned_entries) == 0
-                        or len(unassigned_entries) == 1
-                        and unassigned_entries[0].result.same_si_punches(other=result)
-                    )
-                ):
-                    entry = assigned_entries[0]
-                    try:
-                        class_ = model.db.get_class(id=entry.class_id)
-                        course_id = class_.course_id
-                        class_params = class_.params
-                        controls = model.db.get_course(id=course_id).controls
-                    except KeyError:
-                        class_params = ClassParams()
-                        controls = []
-
-                    result.compute_result(
-                        controls=controls,
-                        class_params=class_params,
-                        start_time=entry.start.start_time,
-                        year=int(entry.year) if entry.year is not None else None,
-                        gender=entry.gender,
-                    )
-                    model.db.update_entry_result(
-                        id=entry.id,
-                        chip=entry.chip,
-                        result=result,
-                        start=entry.start,
-                    )
-                    res = {
-                        "entryTime": item.entry_time,
-                        "eventId": event.id,
-                        "controlCard": entry.chip,
-                        "firstName": entry.first_name,
-                        "lastName": entry.last_name,
-                        "club": entry.club_name,
-                        "class": entry.class_name,
-                        "status": result.status,
-                        "time": result.extensions.get("running_time", result.time),
-                        "error": None,
-                        "missingControls": missing_controls(result=result),
-                    }
-                    cached_result.clear_cache(event_id=event.id, entry_id=entry.id)
-
-                    # if there is an unassigned entry with the same result, delete it
-                    if unassigned_entries == [unassigned_entry]:
-                        model.db.delete_entry(id=unassigned_entry.id)
 
-                else:
-                    # create a new unassigned entry
-                    result.compute_result(controls=[], class_params=ClassParams())
-                    if unassigned_entry is None:
-                        model.db.add_entry_result(
-                            event_id=event.id,
-                            chip=item.control_card,
-                            result=result,
-                            start=PersonRaceStart(),
-                        )
-                    res = {
-                        "entryTime": item.entry_time,
-                        "eventId": event.id,
-                        "controlCard": item.control_card,
-                        "firstName": None,
-                        "lastName": None,
-                        "club": None,
-                        "class": None,
-                        "status": result.status,
-                        "time": None,
-                    }
-                    if len(assigned_entries) == 0:
-                        res["error"] = "Control card unknown"
-                    elif len(assigned_entries) >= 2:
-                        res["error"] = "There are several entries for this card"
-                    else:
-                        res["error"] = "There are other results for this card"
-
-        elif item.entry_type == "cardInserted":
-            res = {"eventId": event.id, "controlCard": item.control_card}
+def preview_cardreader_result(
+    snapshot: dict, item: result_type.CardReaderMessage
+) -> dict:
+    """Compute the result of a read control card with the snapshot of the event.
+
+    Works like storing the card read, but without the results stored in
+    the meantime: a card of an entry already read out is previewed as if
+    it were read out the first time.
+    """
+    if item.result is None:
+        raise ValueError("Card read without result")
+    result = copy.deepcopy(item.result)
+    entries = snapshot["entries"].get(item.control_card, [])
+
+    if len(entries) == 1:
+        entry = entries[0]
+        class_ = snapshot["classes"].get(str(entry["classId"]))
+        if class_ is not None:
+            class_params = ClassParams.from_dict(class_["params"])
+            controls = class_["controls"]
         else:
-            res = {"eventId": event.id}
+            class_params = ClassParams()
+            controls = []
+        start_time = entry["startTime"]
+        result.compute_result(
+            controls=controls,
+            class_params=class_params,
+            start_time=iso8601.parse_date(start_time) if start_time else None,
+            year=entry["year"],
+            gender=entry["gender"],
+        )
+        return {
+            "entryTime": item.entry_time,
+            "controlCard": item.control_card,
+            "firstName": entry["firstName"],
+            "lastName": entry["lastName"],
+            "club": entry["club"],
+            "class": class_["name"] if class_ is not None else None,
+            "status": result.status,
+            "time": result.extensions.get("running_time", result.time),
+            "error": None,
+            "missingControls": missing_controls(result=result),
+        }
+
+    result.compute_result(controls=[], class_params=ClassParams())
+    return {
+        "entryTime": item.entry_time,
+        "controlCard": item.control_card,
+        "firstName": None,
+        "lastName": None,
+        "club": None,
+        "class": None,
+        "status": result.status,
+        "time": None,
+        "error": (
+            "Control card unknown"
+            if len(entries) == 0
+            else "There are several entries for this card"
+        ),
+    }
+
+
+def cardreader_history(event_id: int) -> list[dict]:
+    """Return the messages of all read control cards of an event.
+
+    The messages are rebuilt from the stored results and sorted by the
+    finish time. The time of the readout is not stored, the finish time
+    is used instead.
+    """
+    with model.db.transaction():
+        entries = model.db.get_entries(event_id=event_id)
 
-    return item.entry_type, event, res
+    entries = [e for e in entries if e.result is not None and e.result.has_punches()]
+    # results without finish time first
+    entries.sort(
+        key=lambda e: (
+            e.result.punched_finish_time.timestamp()
+            if e.result.punched_finish_time is not None
+            else 0
+        )
+    )
+
+    messages = []
+    for entry in entries:
+        result = entry.result
+        finish_time = result.punched_finish_time
+        res = {
+            "entryTime": finish_time.strftime("%H:%M:%S") if finish_time else "",
+            "eventId": event_id,
+            "controlCard": entry.chip,
+            "firstName": entry.first_name,
+            "lastName": entry.last_name,
+            "club": entry.club_name,
+            "class": entry.class_name,
+            "status": result.status,
+            "time": result.extensions.get("running_time", result.time),
+            "error": None,
+            "missingControls": missing_controls(result=result),
+        }
+        if entry.class_name is None:
+            res["error"] = "Result not assigned to an entry"
+        messages.append(res)
+    return messages
 
 
 def get_series_settings() -> Settings:
@@ -251,14 +423,16 @@ def update_series_settings(settings: Settings) -> None:
 
 
 def event_class_results_and_unassigned_results(
-    event_id: int,
+    event_id: int, db: Optional[Repo] = None
 ) -> tuple[
     EventType, list[tuple[ClassInfoType, list[RankedEntryType]]], list[EntryType]
 ]:
-    with model.db.transaction():
-        event = model.db.get_event(id=event_id)
-        classes = model.db.get_classes(event_id=event_id)
-        entries = model.db.get_entries(event_id=event_id)
+    if db is None:
+        db = model.db
+    with db.transaction():
+        event = db.get_event(id=event_id)
+        classes = db.get_classes(event_id=event_id)
+        entries = db.get_entries(event_id=event_id)
 
     unassigned_results = [e for e in entries if e.class_id is None]
     class_results = build_results.build_results(
@@ -269,10 +443,10 @@ def event_class_results_and_unassigned_results(
 
 
 def event_class_results(
-    event_id: int,
+    event_id: int, db: Optional[Repo] = None
 ) -> tuple[EventType, list[tuple[ClassInfoType, list[RankedEntryType]]]]:
     event, class_results, _ = event_class_results_and_unassigned_results(
-        event_id=event_id
+        event_id=event_id, db=db
     )
     return event, class_results
 
@@ -329,19 +503,22 @@ def build_series_result() -> (
         events = model.db.get_events()
         events = create_event_list(events=events)
 
-        list_of_results = []
-        organizers = []
-        for i, event in enumerate(events):
+    list_of_results = []
+    organizers = []
+    for i, event in enumerate(events):
+        # one transaction per event, the sharded storage can use only
+        # a few event databases in one transaction
+        with model.db.transaction():
             classes = model.db.get_classes(event_id=event.id)
             entries = model.db.get_entries(event_id=event.id)
-            class_results = build_results.build_results(
-                class_infos=classes,
-                entries=entries,
-            )
-            list_of_results.append(class_results)
-            organizers.append(
-                [e for e in entries if e.class_name in ["Organizer", "Organizers"]]
-            )
+        class_results = build_results.build_results(
+            class_infos=classes,
+            entries=entries,
+        )
+        list_of_results.append(class_results)
+        organizers.append(
+            [e for e in entries if e.class_name in ["Organizer", "Organizers"]]
+        )
 
     ranked_classes = build_results.build_total_results(
         settings=settings,
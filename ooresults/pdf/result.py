@@ -25,6 +25,7 @@ from ooresults.otypes.event_type import EventType
 from ooresults.otypes.result_type import ResultStatus
 from ooresults.pdf.pdf import PDF
 from ooresults.utils import globals
+from ooresults.utils.scheduler import scheduler
 
 
 def create_pdf(
@@ -88,6 +89,8 @@ def create_pdf(
 
     first_class = True
     for class_, ranked_results in results:
+        # give way to card readouts
+        scheduler.checkpoint()
         if not include_dns:
             # filter results - use only started entries
             ranked_results = [
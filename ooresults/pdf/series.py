@@ -24,6 +24,7 @@ from ooresults.otypes.event_type import EventType
 from ooresults.otypes.series_type import PersonSeriesResult
 from ooresults.otypes.series_type import Settings
 from ooresults.pdf.pdf import PDF
+from ooresults.utils.scheduler import scheduler
 
 
 def create_pdf(
@@ -57,6 +58,8 @@ def create_pdf(
             pdf.cell(w=w, h=h, text=text, align=align)
 
     for i, class_results in enumerate(results):
+        # give way to card readouts
+        scheduler.checkpoint()
         class_name, series_results = class_results
         if i > 0:
             # insert a page break if there is not enough space left on the
@@ -31,6 +31,7 @@ from ooresults.otypes.result_type import SplitTime
 from ooresults.otypes.result_type import SpStatus
 from ooresults.pdf.pdf import PDF
 from ooresults.utils import globals
+from ooresults.utils.scheduler import scheduler
 
 
 def format_result(result: PersonRaceResult, standard: bool):
@@ -161,6 +162,8 @@ def create_pdf(
 
     first_class = True
     for class_, ranked_results in results:
+        # give way to card readouts
+        scheduler.checkpoint()
         standard = class_.params.otype == "standard"
 
         # filter results - use only finished entries
@@ -0,0 +1,100 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import gzip
+import io
+import json
+from typing import IO
+
+
+"""
+Event package: one compressed file with all data of an event.
+
+An event package is a gzip compressed JSON Lines file. The first line is
+the header
+
+    {"format": "ooresults-event", "version": 1, "db_version": 15}
+
+followed by one line per record
+
+    {"table": "entries", "row": {"id": 17, "event_id": 3, ...}}
+
+A record contains the stored values of the columns, the values of the
+columns result, start, fields, params and controls are the stored JSON
+documents. The records are read and written by Repo.get_event_rows and
+Repo.add_event_rows. A package can only be imported by ooresults using
+the same database version.
+"""
+
+
+FORMAT = "ooresults-event"
+VERSION = 1
+
+TABLES = ["events", "clubs", "competitors", "courses", "classes", "entries"]
+
+
+def create(rows: dict[str, list[dict]], db_version: int) -> bytes:
+    buffer = io.BytesIO()
+    # a low compression level is fast and still reduces the size a lot
+    with gzip.GzipFile(fileobj=buffer, mode="wb", compresslevel=1, mtime=0) as f:
+        header = {"format": FORMAT, "version": VERSION, "db_version": db_version}
+        f.write(json.dumps(header).encode() + b"\n")
+        for table in TABLES:
+            for row in rows[table]:
+                line = json.dumps({"table": table, "row": row}, ensure_ascii=False)
+                f.write(line.encode() + b"\n")
+    return buffer.getvalue()
+
+
+def parse(source: bytes | IO[bytes], db_version: int) -> dict[str, list[dict]]:
+    """Read an event package.
+
+    source is the content of the package or a binary file object.
+
+    Possible errors:
+    - RuntimeError, if the file is no event package or was created with
+      another database version
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    rows: dict[str, list[dict]] = {table: [] for table in TABLES}
+    try:
+        with gzip.GzipFile(fileobj=source, mode="rb") as f:
+            header = json.loads(f.readline())
+            if not isinstance(header, dict) or header.get("format") != FORMAT:
+                raise RuntimeError("File is not an event package")
+            if header.get("version") != VERSION:
+                raise RuntimeError(
+                    f"Event package version is {header.get('version')} "
+                    f"but must be {VERSION}"
+                )
+            if header.get("db_version") != db_version:
+                raise RuntimeError(
+                    f"Event package was created with DB version "
+                    f"{header.get('db_version')} but DB version is {db_version}"
+                )
+            for line in f:
+                record = json.loads(line)
+                rows[record["table"]].append(record["row"])
+    except (OSError, EOFError, ValueError, KeyError, TypeError) as e:
+        raise RuntimeError("File is not an event package") from e
+
+    if len(rows["events"]) != 1:
+        raise RuntimeError("Event package must contain exactly one event")
+    return rows
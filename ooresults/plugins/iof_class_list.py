@@ -17,16 +17,11 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import pathlib
-
 from lxml import etree
 from lxml.builder import ElementMaker
 
 from ooresults.otypes.class_type import ClassInfoType
-
-
-schema_file = pathlib.Path(__file__).parent.parent / "schema" / "IOF.xsd"
-xml_schema = etree.XMLSchema(etree.parse(str(schema_file)))
+from ooresults.plugins import iof_schema
 
 
 IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
@@ -55,8 +50,7 @@ def create_class_list(classes: list[ClassInfoType]) -> bytes:
 
         root.append(class_)
 
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
+    iof_schema.validator.validate_created(root=root)
     return etree.tostring(
         root, encoding="UTF-8", xml_declaration=True, pretty_print=True
     )
@@ -68,8 +62,7 @@ def parse_class_list(content: bytes) -> list[dict]:
     namespaces = {"": IOF_NAMESPACE}
 
     root = etree.XML(content)
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
+    iof_schema.validate(root=root)
     if not root.tag == "{" + IOF_NAMESPACE + "}ClassList":
         raise RuntimeError(f"Root element is {root.tag} but should be ClassList")
 
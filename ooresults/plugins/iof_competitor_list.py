@@ -17,81 +17,76 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import pathlib
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import IO
 
 from lxml import etree
-from lxml.builder import ElementMaker
 
 from ooresults.otypes.competitor_type import CompetitorType
-
-
-schema_file = pathlib.Path(__file__).parent.parent / "schema" / "IOF.xsd"
-xml_schema = etree.XMLSchema(etree.parse(str(schema_file)))
+from ooresults.plugins import iof_reader
+from ooresults.plugins import iof_schema
+from ooresults.plugins import iof_writer
 
 
 IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
 NSMAP = {None: IOF_NAMESPACE}
 
+COMPETITOR = iof_reader.q("Competitor")
 
-def create_competitor_list(competitors: list[CompetitorType]) -> bytes:
-    E = ElementMaker(namespace=IOF_NAMESPACE, nsmap=NSMAP)
-
-    COMPETITORLIST = E.CompetitorList
-    COMPETITOR = E.Competitor
-    PERSON = E.Person
-    NAME = E.Name
-    FAMILY = E.Family
-    GIVEN = E.Given
-    BIRTHDATE = E.BirthDate
-    ORGANISATION = E.Organisation
-    CONTROLCARD = E.ControlCard
-
-    root = COMPETITORLIST(
-        iofVersion="3.0",
-        creator="ooresults (https://pypi.org/project/ooresults)",
-    )
 
-    for c in competitors:
-        competitor = COMPETITOR()
-        person = PERSON(
-            NAME(
-                FAMILY(c.last_name),
-                GIVEN(c.first_name),
-            ),
-        )
-        if c.gender:
-            person.set("sex", c.gender)
-        if c.year is not None:
-            person.append(BIRTHDATE(str(c.year) + "-01-01"))
-        competitor.append(person)
-        if c.club_name:
-            competitor.append(ORGANISATION(NAME(c.club_name)))
-        if c.chip:
-            competitor.append(CONTROLCARD(c.chip, punchingSystem="SI"))
-        root.append(competitor)
-
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
-    return etree.tostring(
-        root, encoding="UTF-8", xml_declaration=True, pretty_print=True
+def competitor(c: CompetitorType) -> etree._Element:
+    E = iof_writer.E
+    competitor = E.Competitor()
+    person = E.Person(
+        E.Name(
+            E.Family(c.last_name),
+            E.Given(c.first_name),
+        ),
+    )
+    if c.gender:
+        person.set("sex", c.gender)
+    if c.year is not None:
+        person.append(E.BirthDate(str(c.year) + "-01-01"))
+    competitor.append(person)
+    if c.club_name:
+        competitor.append(E.Organisation(E.Name(c.club_name)))
+    if c.chip:
+        competitor.append(E.ControlCard(c.chip, punchingSystem="SI"))
+    return competitor
+
+
+def iter_competitor_list(competitors: Iterable[CompetitorType]) -> Iterator[bytes]:
+    """Write the competitor list incrementally and return it in chunks.
+
+    The document is not validated.
+    """
+    return iof_writer.iter_document(
+        tag="CompetitorList",
+        attrib={
+            "iofVersion": "3.0",
+            "creator": "ooresults (https://pypi.org/project/ooresults)",
+        },
+        items=(competitor(c=c) for c in competitors),
     )
 
 
-def parse_competitor_list(content: bytes) -> list[dict]:
-    namespaces = {"": IOF_NAMESPACE}
-
-    root = etree.XML(content)
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
-    if not root.tag == "{" + IOF_NAMESPACE + "}CompetitorList":
-        raise RuntimeError(f"Root element is {root.tag} but should be CompetitorList")
-
-    result = []
-    competitors = root.findall("Competitor", namespaces=namespaces)
-    for c in competitors:
-        print(c.tag)
-        for i in c:
-            print(i.tag)
+def create_competitor_list(competitors: list[CompetitorType]) -> bytes:
+    content = b"".join(iter_competitor_list(competitors=competitors))
+    iof_schema.validator.validate_created_content(content=content)
+    return content
+
+
+def iterparse_competitor_list(source: bytes | IO[bytes]) -> Iterator[dict]:
+    """Read the competitors of a competitor list one after the other.
+
+    source is the content of the document or a binary file object.
+    """
+    for c in iof_reader.iterparse(
+        source=source, root="CompetitorList", tags=["Competitor"]
+    ):
+        if c.tag != COMPETITOR:
+            continue
         r = {
             "first_name": "",
             "last_name": "",
@@ -100,23 +95,17 @@ def parse_competitor_list(content: bytes) -> list[dict]:
             "gender": "",
             "year": None,
         }
+        for child in c:
+            if child.tag == iof_reader.PERSON:
+                r.update(iof_reader.person(child))
+            elif child.tag == iof_reader.ORGANISATION and r["club"] == "":
+                e_name = child.find(iof_reader.NAME)
+                if e_name is not None:
+                    r["club"] = e_name.text
+            elif child.tag == iof_reader.CONTROLCARD and r["chip"] == "":
+                r["chip"] = child.text
+        yield r
+
 
-        r["last_name"] = c.find("Person/Name/Family", namespaces=namespaces).text
-        r["first_name"] = c.find("Person/Name/Given", namespaces=namespaces).text
-
-        e_person = c.find("Person", namespaces=namespaces)
-        if e_person.get("sex") is not None:
-            r["gender"] = e_person.get("sex")
-        e_birthdate = c.find("Person/BirthDate", namespaces=namespaces)
-        if e_birthdate is not None:
-            r["year"] = int(e_birthdate.text[0:4])
-        e_organization = c.find("Organisation/Name", namespaces=namespaces)
-        if e_organization is not None:
-            r["club"] = e_organization.text
-        e_controlcard = c.find("ControlCard", namespaces=namespaces)
-        if e_controlcard is not None:
-            r["chip"] = e_controlcard.text
-
-        result.append(r)
-
-    return result
+def parse_competitor_list(content: bytes) -> list[dict]:
+    return list(iterparse_competitor_list(source=content))
@@ -17,8 +17,6 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import pathlib
-
 import iso8601
 from lxml import etree
 from lxml.builder import ElementMaker
@@ -26,10 +24,7 @@ from lxml.builder import ElementMaker
 from ooresults.otypes.class_type import ClassInfoType
 from ooresults.otypes.course_type import CourseType
 from ooresults.otypes.event_type import EventType
-
-
-schema_file = pathlib.Path(__file__).parent.parent / "schema" / "IOF.xsd"
-xml_schema = etree.XMLSchema(etree.parse(str(schema_file)))
+from ooresults.plugins import iof_schema
 
 
 IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
@@ -102,8 +97,7 @@ def create_course_data(
 
     root.append(race_course_data)
 
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
+    iof_schema.validator.validate_created(root=root)
     return etree.tostring(
         root, encoding="UTF-8", xml_declaration=True, pretty_print=True
     )
@@ -117,8 +111,7 @@ def parse_course_data(content: bytes) -> tuple[dict, list[dict], list[dict]]:
     namespaces = {"": IOF_NAMESPACE}
 
     root = etree.XML(content)
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
+    iof_schema.validate(root=root)
     if not root.tag == "{" + IOF_NAMESPACE + "}CourseData":
         raise RuntimeError(f"Root element is {root.tag} but should be CourseData")
 
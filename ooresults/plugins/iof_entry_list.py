@@ -17,142 +17,135 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import pathlib
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import IO
 
-import iso8601
 from lxml import etree
-from lxml.builder import ElementMaker
 
 from ooresults.otypes import result_type
 from ooresults.otypes.entry_type import EntryType
 from ooresults.otypes.event_type import EventType
-
-
-schema_file = pathlib.Path(__file__).parent.parent / "schema" / "IOF.xsd"
-xml_schema = etree.XMLSchema(etree.parse(str(schema_file)))
+from ooresults.plugins import iof_reader
+from ooresults.plugins import iof_schema
+from ooresults.plugins import iof_writer
 
 
 IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
 NSMAP = {None: IOF_NAMESPACE}
 
 
-def create_entry_list(event: EventType, entries: list[EntryType]) -> bytes:
-    E = ElementMaker(namespace=IOF_NAMESPACE, nsmap=NSMAP)
-
-    ENTRYLIST = E.EntryList
-    EVENT = E.Event
-    NAME = E.Name
-    STARTTIME = E.StartTime
-    DATE = E.Date
-    PERSONENTRY = E.PersonEntry
-    PERSON = E.Person
-    FAMILY = E.Family
-    GIVEN = E.Given
-    BIRTHDATE = E.BirthDate
-    ORGANISATION = E.Organisation
-    CONTROLCARD = E.ControlCard
-    CLASS = E.Class
-
-    root = ENTRYLIST(
-        iofVersion="3.0",
-        creator="ooresults (https://pypi.org/project/ooresults)",
+def person_entry(e: EntryType) -> etree._Element:
+    E = iof_writer.E
+    pe = E.PersonEntry()
+    person = E.Person(
+        E.Name(
+            E.Family(e.last_name or ""),
+            E.Given(e.first_name),
+        ),
     )
+    if e.gender:
+        person.set("sex", e.gender)
+    if e.year is not None:
+        person.append(E.BirthDate(str(e.year) + "-01-01"))
+    pe.append(person)
+
+    if e.club_name:
+        pe.append(
+            E.Organisation(
+                E.Name(e.club_name),
+            ),
+        )
 
-    e_event = EVENT()
-    e_event.append(NAME(event.name))
-    e_event.append(STARTTIME(DATE(event.date.isoformat())))
-    root.append(e_event)
+    if e.chip:
+        pe.append(E.ControlCard(e.chip, punchingSystem="SI"))
+    if e.class_name:
+        pe.append(E.Class(E.Name(e.class_name)))
+    return pe
+
+
+def entry_list_items(
+    event: EventType, entries: Iterable[EntryType]
+) -> Iterator[etree._Element]:
+    E = iof_writer.E
+    yield E.Event(
+        E.Name(event.name),
+        E.StartTime(E.Date(event.date.isoformat())),
+    )
 
     for e in entries:
         # do not export pseudo entries without name
         # (used to store not already assigned sportident results)
         if e.last_name is None:
             continue
+        yield person_entry(e=e)
 
-        pe = PERSONENTRY()
-        person = PERSON(
-            NAME(
-                FAMILY(e.last_name),
-                GIVEN(e.first_name),
-            ),
-        )
-        if e.gender:
-            person.set("sex", e.gender)
-        if e.year is not None:
-            person.append(BIRTHDATE(str(e.year) + "-01-01"))
-        pe.append(person)
-
-        if e.club_name:
-            pe.append(
-                ORGANISATION(
-                    NAME(e.club_name),
-                ),
-            )
-
-        if e.chip:
-            pe.append(CONTROLCARD(e.chip, punchingSystem="SI"))
-        if e.class_name:
-            pe.append(CLASS(NAME(e.class_name)))
-
-        root.append(pe)
-
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
-    return etree.tostring(
-        root, encoding="UTF-8", xml_declaration=True, pretty_print=True
+
+def iter_entry_list(event: EventType, entries: Iterable[EntryType]) -> Iterator[bytes]:
+    """Write the entry list incrementally and return it in chunks.
+
+    The document is not validated.
+    """
+    return iof_writer.iter_document(
+        tag="EntryList",
+        attrib={
+            "iofVersion": "3.0",
+            "creator": "ooresults (https://pypi.org/project/ooresults)",
+        },
+        items=entry_list_items(event=event, entries=entries),
+    )
+
+
+def create_entry_list(event: EventType, entries: list[EntryType]) -> bytes:
+    content = b"".join(iter_entry_list(event=event, entries=entries))
+    iof_schema.validator.validate_created_content(content=content)
+    return content
+
+
+def iterparse_entry_list(source: bytes | IO[bytes]) -> tuple[dict, Iterator[dict]]:
+    """Read the event and then the entries of an entry list one after the other.
+
+    source is the content of the document or a binary file object. The
+    document is read up to the event before returning.
+    """
+    elements = iof_reader.iterparse(
+        source=source, root="EntryList", tags=["Event", "PersonEntry"]
     )
+    next(elements)
+
+    # the event precedes the entries
+    event = iof_reader.event(next(elements))
+
+    def entries() -> Iterator[dict]:
+        for pe in elements:
+            e = {
+                "first_name": "",
+                "last_name": "",
+                "class_": "",
+                "club": "",
+                "chip": "",
+                "gender": "",
+                "year": None,
+                "result": result_type.PersonRaceResult(),
+            }
+            for child in pe:
+                if child.tag == iof_reader.PERSON:
+                    e.update(iof_reader.person(child))
+                elif child.tag == iof_reader.ORGANISATION and e["club"] == "":
+                    e_name = child.find(iof_reader.NAME)
+                    if e_name is not None:
+                        e["club"] = e_name.text
+                elif child.tag == iof_reader.CONTROLCARD and e["chip"] == "":
+                    e["chip"] = child.text
+                elif child.tag == iof_reader.CLASS and e["class_"] == "":
+                    e_name = child.find(iof_reader.NAME)
+                    if e_name is not None:
+                        e["class_"] = e_name.text
+            yield e
+
+    return event, entries()
 
 
 def parse_entry_list(content: bytes) -> tuple[dict, list[dict]]:
-    namespaces = {"": IOF_NAMESPACE}
-
-    root = etree.XML(content)
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
-    if not root.tag == "{" + IOF_NAMESPACE + "}EntryList":
-        raise RuntimeError(f"Root element is {root.tag} but should be EntryList")
-
-    event = {}
-    event["name"] = root.find("Event/Name", namespaces=namespaces).text
-    date = root.find("Event/StartTime/Date", namespaces=namespaces)
-    if date is not None:
-        event["date"] = iso8601.parse_date(date.text).date()
-
-    entries = []
-    person_entry_list = root.findall("PersonEntry", namespaces=namespaces)
-    for pe in person_entry_list:
-        e = {
-            "first_name": "",
-            "last_name": "",
-            "class_": "",
-            "club": "",
-            "chip": "",
-            "gender": "",
-            "year": None,
-            "result": result_type.PersonRaceResult(),
-        }
-
-        e["last_name"] = pe.find("Person/Name/Family", namespaces=namespaces).text
-        e["first_name"] = pe.find("Person/Name/Given", namespaces=namespaces).text
-
-        e_person = pe.find("Person", namespaces=namespaces)
-        if e_person.get("sex") is not None:
-            e["gender"] = e_person.get("sex")
-        e_birthdate = pe.find("Person/BirthDate", namespaces=namespaces)
-        if e_birthdate is not None:
-            e["year"] = int(e_birthdate.text[0:4])
-
-        e_organization = pe.find("Organisation/Name", namespaces=namespaces)
-        if e_organization is not None:
-            e["club"] = e_organization.text
-
-        e_controlcard = pe.find("ControlCard", namespaces=namespaces)
-        if e_controlcard is not None:
-            e["chip"] = e_controlcard.text
-        e_class = pe.find("Class/Name", namespaces=namespaces)
-        if e_class is not None:
-            e["class_"] = e_class.text
-
-        entries.append(e)
-
-    return event, entries
+    event, entries = iterparse_entry_list(source=content)
+    return event, list(entries)
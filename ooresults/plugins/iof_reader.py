@@ -0,0 +1,147 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import io
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import IO
+from typing import Optional
+
+import iso8601
+from lxml import etree
+
+from ooresults.plugins import iof_schema
+
+
+"""
+Incremental reader of IOF XML documents.
+
+iterparse reads a document with etree.iterparse and validates it against
+the IOF schema while it is read. It returns the root element when its
+start tag is read and then the elements with the given tags when their
+end tag is read. An element is cleared and removed from the tree when
+the next element is requested, so only the element currently processed
+is kept in memory.
+
+A document failing validation raises RuntimeError, like
+iof_schema.validate. As the document is validated while it is read, the
+error is raised after the elements preceding the error are returned.
+Importers have to use a transaction to discard them.
+"""
+
+
+IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
+
+
+def q(tag: str) -> str:
+    """Return the qualified name of tag in the IOF namespace."""
+    return f"{{{IOF_NAMESPACE}}}{tag}"
+
+
+PERSON = q("Person")
+NAME = q("Name")
+FAMILY = q("Family")
+GIVEN = q("Given")
+BIRTHDATE = q("BirthDate")
+ORGANISATION = q("Organisation")
+CONTROLCARD = q("ControlCard")
+CLASS = q("Class")
+STARTTIME = q("StartTime")
+DATE = q("Date")
+
+
+def _clear(element: etree._Element) -> None:
+    element.clear(keep_tail=True)
+    # remove the already processed elements preceding the element
+    # and its ancestors
+    parent = element.getparent()
+    while parent is not None:
+        while element.getprevious() is not None:
+            del parent[0]
+        element = parent
+        parent = element.getparent()
+
+
+def iterparse(
+    source: bytes | IO[bytes], root: str, tags: Iterable[str]
+) -> Iterator[etree._Element]:
+    """Return the root element and the elements with tags of the document.
+
+    source is the content of the document or a binary file object.
+    """
+    if isinstance(source, bytes):
+        source = io.BytesIO(source)
+    root_tag = q(root)
+    context = etree.iterparse(
+        source,
+        events=("start", "end"),
+        tag=[root_tag] + [q(tag) for tag in tags],
+        schema=iof_schema.thread_schema(),
+    )
+    try:
+        started = False
+        for event, element in context:
+            if not started:
+                if event != "start" or element.tag != root_tag:
+                    tag = element.getroottree().getroot().tag
+                    raise RuntimeError(f"Root element is {tag} but should be {root}")
+                started = True
+                yield element
+            elif event == "end" and element.tag != root_tag:
+                yield element
+                _clear(element)
+        if not started:
+            raise RuntimeError(
+                f"Root element is {context.root.tag} but should be {root}"
+            )
+    except etree.XMLSyntaxError as e:
+        # a malformed document remains a syntax error
+        if etree.ErrorTypes.SCHEMAV_NOROOT <= e.code <= etree.ErrorTypes.SCHEMAV_MISC:
+            raise RuntimeError(e.msg) from e
+        raise
+
+
+def text(element: Optional[etree._Element]) -> Optional[str]:
+    return element.text if element is not None else None
+
+
+def event(element: etree._Element) -> dict:
+    """Return name and date of an Event element."""
+    e = {"name": element.findtext(NAME)}
+    date = element.find(f"{STARTTIME}/{DATE}")
+    if date is not None:
+        e["date"] = iso8601.parse_date(date.text).date()
+    return e
+
+
+def person(element: etree._Element) -> dict:
+    """Return names, gender and year of birth of a Person element."""
+    p = {
+        "first_name": None,
+        "last_name": None,
+        "gender": element.get("sex", ""),
+        "year": None,
+    }
+    for child in element:
+        if child.tag == NAME:
+            p["last_name"] = text(child.find(FAMILY))
+            p["first_name"] = text(child.find(GIVEN))
+        elif child.tag == BIRTHDATE:
+            p["year"] = int(child.text[0:4])
+    return p
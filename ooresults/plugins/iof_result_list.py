@@ -17,14 +17,14 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
-import pathlib
+from collections.abc import Iterator
 from datetime import timedelta
 from enum import Enum
+from typing import IO
 from typing import Optional
 
 import iso8601
 from lxml import etree
-from lxml.builder import ElementMaker
 
 from ooresults.otypes import result_type
 from ooresults.otypes import start_type
@@ -33,15 +33,24 @@ from ooresults.otypes.entry_type import RankedEntryType
 from ooresults.otypes.event_type import EventType
 from ooresults.otypes.result_type import ResultStatus
 from ooresults.otypes.result_type import SpStatus
-
-
-schema_file = pathlib.Path(__file__).parent.parent / "schema" / "IOF.xsd"
-xml_schema = etree.XMLSchema(etree.parse(str(schema_file)))
+from ooresults.plugins import iof_reader
+from ooresults.plugins import iof_schema
+from ooresults.plugins import iof_writer
 
 
 IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
 NSMAP = {None: IOF_NAMESPACE}
 
+EVENT = iof_reader.q("Event")
+CLASS_RESULT = iof_reader.q("ClassResult")
+RESULT = iof_reader.q("Result")
+STATUS_TAG = iof_reader.q("Status")
+START_TIME = iof_reader.q("StartTime")
+FINISH_TIME = iof_reader.q("FinishTime")
+TIME = iof_reader.q("Time")
+SPLIT_TIME = iof_reader.q("SplitTime")
+CONTROL_CODE = iof_reader.q("ControlCode")
+
 
 class ResultListStatus(Enum):
     """Result list status according to IOF XML 3.0.
@@ -63,156 +72,152 @@ class ResultListStatus(Enum):
     SNAPSHOT = "Snapshot"
 
 
-def create_result_list(
+STATUS = {
+    ResultStatus.INACTIVE: "Inactive",
+    ResultStatus.ACTIVE: "Active",
+    ResultStatus.OK: "OK",
+    ResultStatus.MISSING_PUNCH: "MissingPunch",
+    ResultStatus.DID_NOT_START: "DidNotStart",
+    ResultStatus.DID_NOT_FINISH: "DidNotFinish",
+    ResultStatus.DISQUALIFIED: "Disqualified",
+    ResultStatus.OVER_TIME: "OverTime",
+    ResultStatus.FINISHED: "Finished",
+}
+
+SPSTATUS = {
+    SpStatus.OK: "OK",
+    SpStatus.MISSING: "Missing",
+    SpStatus.ADDITIONAL: "Additional",
+}
+
+
+def person_result(ranked_result: RankedEntryType) -> etree._Element:
+    E = iof_writer.E
+    entry = ranked_result.entry
+    result = entry.result
+
+    pr = E.PersonResult()
+    person = E.Person(
+        E.Name(
+            E.Family(entry.last_name),
+            E.Given(entry.first_name),
+        ),
+    )
+    if entry.gender:
+        person.set("sex", entry.gender)
+    if entry.year is not None:
+        person.append(E.BirthDate(str(entry.year) + "-01-01"))
+    pr.append(person)
+
+    if entry.club_name:
+        pr.append(
+            E.Organisation(
+                E.Name(entry.club_name),
+            ),
+        )
+
+    res = E.Result()
+    if result.start_time is not None:
+        res.append(E.StartTime(result.start_time.isoformat(timespec="seconds")))
+    if result.finish_time is not None:
+        res.append(E.FinishTime(result.finish_time.isoformat(timespec="seconds")))
+    if result.time is not None:
+        res.append(E.Time(str(result.time)))
+
+    if result.status == ResultStatus.OK:
+        if entry.not_competing:
+            res.append(E.Status("NotCompeting"))
+        else:
+            if ranked_result.time_behind is not None:
+                res.append(E.TimeBehind(str(ranked_result.time_behind)))
+
+            if ranked_result.rank is not None:
+                res.append(E.Position(str(ranked_result.rank)))
+            res.append(E.Status("OK"))
+    else:
+        res.append(E.Status(STATUS[result.status]))
+    for s in result.split_times:
+        if s.status is not None:
+            split_time = E.SplitTime(E.ControlCode(s.control_code))
+            if s.status != SpStatus.OK:
+                split_time.set("status", SPSTATUS[s.status])
+            if s.time is not None:
+                split_time.append(E.Time(str(s.time)))
+            res.append(split_time)
+    if entry.chip:
+        res.append(E.ControlCard(entry.chip, punchingSystem="SI"))
+    pr.append(res)
+    return pr
+
+
+def result_list_items(
     event: EventType,
     class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
-    status: Optional[ResultListStatus] = None,
-) -> bytes:
-    E = ElementMaker(namespace=IOF_NAMESPACE, nsmap=NSMAP)
-
-    RESULTLIST = E.ResultList
-    EVENT = E.Event
-    NAME = E.Name
-    STARTTIME = E.StartTime
-    DATE = E.Date
-    CLASSRESULT = E.ClassResult
-    CLASS = E.Class
-    COURSE = E.Course
-    LENGTH = E.Length
-    CLIMB = E.Climb
-    NUMBEROFCONTROLS = E.NumberOfControls
-    PERSONRESULT = E.PersonResult
-    PERSON = E.Person
-    FAMILY = E.Family
-    GIVEN = E.Given
-    BIRTHDATE = E.BirthDate
-    ORGANISATION = E.Organisation
-    RESULT = E.Result
-    CONTROLCARD = E.ControlCard
-    POSITION = E.Position
-    STATUS = E.Status
-    STARTTIME = E.StartTime
-    FINISHTIME = E.FinishTime
-    TIME = E.Time
-    TIMEBEHIND = E.TimeBehind
-    SPLITTIME = E.SplitTime
-    CONTROLCODE = E.ControlCode
-
-    root = RESULTLIST(
-        iofVersion="3.0",
-        creator="ooresults (https://pypi.org/project/ooresults)",
+) -> Iterator[iof_writer.Item]:
+    E = iof_writer.E
+    yield E.Event(
+        E.Name(event.name),
+        E.StartTime(E.Date(event.date.isoformat())),
     )
-    if status is not None:
-        root.attrib["status"] = status.value
-
-    e_event = EVENT()
-    e_event.append(NAME(event.name))
-    e_event.append(STARTTIME(DATE(event.date.isoformat())))
-    root.append(e_event)
 
     for class_, ranked_results in class_results:
         if not ranked_results:
             continue
 
-        cr = CLASSRESULT()
-        cr.append(CLASS(NAME(class_.name)))
+        yield iof_writer.Start("ClassResult")
+        yield E.Class(E.Name(class_.name))
 
-        co = COURSE()
+        co = E.Course()
         if class_.course_name:
-            co.append(NAME(class_.course_name))
+            co.append(E.Name(class_.course_name))
         if class_.course_length is not None:
-            co.append(LENGTH(str(round(class_.course_length))))
+            co.append(E.Length(str(round(class_.course_length))))
         if class_.course_climb is not None:
-            co.append(CLIMB(str(round(class_.course_climb))))
+            co.append(E.Climb(str(round(class_.course_climb))))
         if class_.number_of_controls is not None and class_.number_of_controls > 0:
-            co.append(NUMBEROFCONTROLS(str(class_.number_of_controls)))
+            co.append(E.NumberOfControls(str(class_.number_of_controls)))
         if len(co):
-            cr.append(co)
+            yield co
 
         for ranked_result in ranked_results:
-            entry = ranked_result.entry
-            result = entry.result
-
-            pr = PERSONRESULT()
-            person = PERSON(
-                NAME(
-                    FAMILY(entry.last_name),
-                    GIVEN(entry.first_name),
-                ),
-            )
-            if entry.gender:
-                person.set("sex", entry.gender)
-            if entry.year is not None:
-                person.append(BIRTHDATE(str(entry.year) + "-01-01"))
-            pr.append(person)
-
-            if entry.club_name:
-                pr.append(
-                    ORGANISATION(
-                        NAME(entry.club_name),
-                    ),
-                )
-
-            res = RESULT()
-            if result.start_time is not None:
-                res.append(STARTTIME(result.start_time.isoformat(timespec="seconds")))
-            if result.finish_time is not None:
-                res.append(FINISHTIME(result.finish_time.isoformat(timespec="seconds")))
-            if result.time is not None:
-                res.append(TIME(str(result.time)))
-
-            if result.status == ResultStatus.OK:
-                if entry.not_competing:
-                    res.append(STATUS("NotCompeting"))
-                else:
-                    if ranked_result.time_behind is not None:
-                        res.append(TIMEBEHIND(str(ranked_result.time_behind)))
-
-                    if ranked_result.rank is not None:
-                        res.append(POSITION(str(ranked_result.rank)))
-                    res.append(STATUS("OK"))
-            else:
-                res.append(
-                    STATUS(
-                        {
-                            ResultStatus.INACTIVE: "Inactive",
-                            ResultStatus.ACTIVE: "Active",
-                            ResultStatus.OK: "OK",
-                            ResultStatus.MISSING_PUNCH: "MissingPunch",
-                            ResultStatus.DID_NOT_START: "DidNotStart",
-                            ResultStatus.DID_NOT_FINISH: "DidNotFinish",
-                            ResultStatus.DISQUALIFIED: "Disqualified",
-                            ResultStatus.OVER_TIME: "OverTime",
-                            ResultStatus.FINISHED: "Finished",
-                        }[result.status]
-                    )
-                )
-            for s in result.split_times:
-                if s.status is not None:
-                    split_time = SPLITTIME(CONTROLCODE(s.control_code))
-                    if s.status != SpStatus.OK:
-                        SPSTATUS = {
-                            SpStatus.OK: "OK",
-                            SpStatus.MISSING: "Missing",
-                            SpStatus.ADDITIONAL: "Additional",
-                        }
-                        split_time.set("status", SPSTATUS[s.status])
-                    if s.time is not None:
-                        split_time.append(TIME(str(s.time)))
-                    res.append(split_time)
-            if entry.chip:
-                res.append(CONTROLCARD(entry.chip, punchingSystem="SI"))
-            pr.append(res)
-            cr.append(pr)
-        root.append(cr)
-
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
-    return etree.tostring(
-        root, encoding="UTF-8", xml_declaration=True, pretty_print=True
+            yield person_result(ranked_result=ranked_result)
+        yield iof_writer.END
+
+
+def iter_result_list(
+    event: EventType,
+    class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+    status: Optional[ResultListStatus] = None,
+) -> Iterator[bytes]:
+    """Write the result list incrementally and return it in chunks.
+
+    The document is not validated.
+    """
+    attrib = {
+        "iofVersion": "3.0",
+        "creator": "ooresults (https://pypi.org/project/ooresults)",
+    }
+    if status is not None:
+        attrib["status"] = status.value
+    return iof_writer.iter_document(
+        tag="ResultList",
+        attrib=attrib,
+        items=result_list_items(event=event, class_results=class_results),
     )
 
 
+def create_result_list(
+    event: EventType,
+    class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+    status: Optional[ResultListStatus] = None,
+) -> bytes:
+    content = b"".join(
+        iter_result_list(event=event, class_results=class_results, status=status)
+    )
+    iof_schema.validator.validate_created_content(content=content)
+    return content
+
+
 STATUS_MAP = {
     "OK": ResultStatus.OK,
     "Finished": ResultStatus.FINISHED,
@@ -239,36 +244,94 @@ SPSTATUS_MAP = {
 }
 
 
-def parse_result_list(
-    content: bytes,
-) -> tuple[dict, list[dict], Optional[ResultListStatus]]:
-    namespaces = {"": IOF_NAMESPACE}
-
-    root = etree.XML(content)
-    if not xml_schema.validate(root):
-        raise RuntimeError(xml_schema.error_log.last_error)
-    if not root.tag == "{" + IOF_NAMESPACE + "}ResultList":
-        raise RuntimeError(f"Root element is {root.tag} but should be ResultList")
-
-    result_list_status = root.attrib.get("status", None)
-    if result_list_status is not None:
-        result_list_status = ResultListStatus(result_list_status)
-
-    event = {}
-    event["name"] = root.find("Event/Name", namespaces=namespaces).text
-    date = root.find("Event/StartTime/Date", namespaces=namespaces)
-    if date is not None:
-        event["date"] = iso8601.parse_date(date.text).date()
-
-    result = []
-    class_result_list = root.findall("ClassResult", namespaces=namespaces)
-    for c in class_result_list:
-        class_ = c.find("Class/Name", namespaces=namespaces).text
-        person_result_list = c.findall("PersonResult", namespaces=namespaces)
-        for pr in person_result_list:
+def person_race_result(e_result: etree._Element, r: dict) -> None:
+    result = r["result"]
+    start_time = None
+    split_times = []
+    for child in e_result:
+        if child.tag == STATUS_TAG:
+            result.status = STATUS_MAP[child.text]
+            if child.text == "NotCompeting":
+                r["not_competing"] = True
+        elif child.tag == START_TIME:
+            start_time = iso8601.parse_date(child.text)
+        elif child.tag == FINISH_TIME:
+            result.finish_time = iso8601.parse_date(child.text)
+            result.punched_finish_time = result.finish_time
+            result.si_punched_finish_time = result.finish_time
+        elif child.tag == TIME:
+            result.time = int(child.text)
+        elif child.tag == SPLIT_TIME:
+            split_times.append(child)
+        elif child.tag == iof_reader.CONTROLCARD and r["chip"] == "":
+            r["chip"] = child.text
+
+    # the start time depends on the status
+    if start_time is not None:
+        if result.status in [
+            ResultStatus.INACTIVE,
+            ResultStatus.ACTIVE,
+            ResultStatus.DID_NOT_START,
+        ]:
+            r["start"] = start_type.PersonRaceStart(start_time=start_time)
+        else:
+            result.start_time = start_time
+            result.punched_start_time = result.start_time
+            result.si_punched_start_time = result.start_time
+
+    for e_split_time in split_times:
+        split_time = result_type.SplitTime(
+            control_code=e_split_time.findtext(CONTROL_CODE),
+            status=SPSTATUS_MAP[e_split_time.get("status", "OK")],
+        )
+        e_time = e_split_time.find(TIME)
+        if e_time is not None:
+            split_time.time = int(e_time.text)
+            if result.start_time:
+                t = result.start_time + timedelta(seconds=split_time.time)
+                split_time.punch_time = t
+                split_time.si_punch_time = t
+        elif split_time.status == SpStatus.OK:
+            split_time.punch_time = result_type.SplitTime.NO_TIME
+        result.split_times.append(split_time)
+
+
+def iterparse_result_list(
+    source: bytes | IO[bytes],
+) -> tuple[dict, Optional[ResultListStatus], Iterator[dict]]:
+    """Read the event and then the person results of a result list one after the other.
+
+    source is the content of the document or a binary file object. The
+    document is read up to the event before returning.
+    """
+    elements = iof_reader.iterparse(
+        source=source, root="ResultList", tags=["Event", "Class", "PersonResult"]
+    )
+    root = next(elements)
+    result_list_status = root.get("status", None)
+    status = (
+        ResultListStatus(result_list_status) if result_list_status is not None else None
+    )
+
+    # the event precedes the class results
+    for element in elements:
+        if element.tag == EVENT:
+            event = iof_reader.event(element)
+            break
+
+    def person_results() -> Iterator[dict]:
+        class_ = None
+        for element in elements:
+            if element.tag == iof_reader.CLASS:
+                if element.getparent().tag != CLASS_RESULT:
+                    continue
+                # the class precedes the person results of the class result
+                class_ = element.findtext(iof_reader.NAME)
+                continue
+
             r = {
-                "first_name": pr.find("Person/Name/Given", namespaces=namespaces).text,
-                "last_name": pr.find("Person/Name/Family", namespaces=namespaces).text,
+                "first_name": None,
+                "last_name": None,
                 "class_": class_,
                 "club": "",
                 "chip": "",
@@ -277,70 +340,25 @@ def parse_result_list(
                 "not_competing": False,
                 "result": result_type.PersonRaceResult(),
             }
+            e_result = None
+            for child in element:
+                if child.tag == iof_reader.PERSON:
+                    r.update(iof_reader.person(child))
+                elif child.tag == iof_reader.ORGANISATION and r["club"] == "":
+                    e_name = child.find(iof_reader.NAME)
+                    if e_name is not None:
+                        r["club"] = e_name.text
+                elif child.tag == RESULT and e_result is None:
+                    e_result = child
+            if e_result is not None:
+                person_race_result(e_result=e_result, r=r)
+            yield r
+
+    return event, status, person_results()
 
-            e_person = pr.find("Person", namespaces=namespaces)
-            if e_person.get("sex") is not None:
-                r["gender"] = e_person.get("sex")
-            e_birthdate = pr.find("Person/BirthDate", namespaces=namespaces)
-            if e_birthdate is not None:
-                r["year"] = int(e_birthdate.text[0:4])
-
-            e_organization = pr.find("Organisation/Name", namespaces=namespaces)
-            if e_organization is not None:
-                r["club"] = e_organization.text
-
-            e_result = pr.find("Result", namespaces=namespaces)
-            e_controlcard = e_result.find("ControlCard", namespaces=namespaces)
-            if e_controlcard is not None:
-                r["chip"] = e_controlcard.text
-
-            e_status = e_result.find("Status", namespaces=namespaces)
-            r["result"].status = STATUS_MAP[e_status.text]
-            if e_status.text == "NotCompeting":
-                r["not_competing"] = True
 
-            e_start_time = e_result.find("StartTime", namespaces=namespaces)
-            if e_start_time is not None:
-                if r["result"].status in [
-                    ResultStatus.INACTIVE,
-                    ResultStatus.ACTIVE,
-                    ResultStatus.DID_NOT_START,
-                ]:
-                    r["start"] = start_type.PersonRaceStart(
-                        start_time=iso8601.parse_date(e_start_time.text)
-                    )
-                else:
-                    r["result"].start_time = iso8601.parse_date(e_start_time.text)
-                    r["result"].punched_start_time = r["result"].start_time
-                    r["result"].si_punched_start_time = r["result"].start_time
-            e_finish_time = e_result.find("FinishTime", namespaces=namespaces)
-            if e_finish_time is not None:
-                r["result"].finish_time = iso8601.parse_date(e_finish_time.text)
-                r["result"].punched_finish_time = r["result"].finish_time
-                r["result"].si_punched_finish_time = r["result"].finish_time
-            e_time = e_result.find("Time", namespaces=namespaces)
-            if e_time is not None:
-                r["result"].time = int(e_time.text)
-
-            e_split_time_list = e_result.findall("SplitTime", namespaces=namespaces)
-            for e_split_time in e_split_time_list:
-                split_time = result_type.SplitTime(
-                    control_code=e_split_time.find(
-                        "ControlCode", namespaces=namespaces
-                    ).text,
-                    status=SPSTATUS_MAP[e_split_time.get("status", "OK")],
-                )
-                e_time = e_split_time.find("Time", namespaces=namespaces)
-                if e_time is not None:
-                    split_time.time = int(e_time.text)
-                    if r["result"].start_time:
-                        t = r["result"].start_time + timedelta(seconds=split_time.time)
-                        split_time.punch_time = t
-                        split_time.si_punch_time = t
-                elif split_time.status == SpStatus.OK:
-                    split_time.punch_time = result_type.SplitTime.NO_TIME
-                r["result"].split_times.append(split_time)
-
-            result.append(r)
-
-    return event, result, result_list_status
+def parse_result_list(
+    content: bytes,
+) -> tuple[dict, list[dict], Optional[ResultListStatus]]:
+    event, status, person_results = iterparse_result_list(source=content)
+    return event, list(person_results), status
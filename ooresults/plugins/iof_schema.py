@@ -0,0 +1,177 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import enum
+import functools
+import pathlib
+import threading
+import time
+from collections.abc import Iterator
+
+from lxml import etree
+
+
+"""
+Shared XML schemas of the IOF plugins.
+
+A schema is parsed on first use and then kept for all plugins. Imported
+documents are always validated. Documents created by ooresults itself
+are validated according to the validation policy:
+
+    always:  every created document is validated
+    sampled: the first and then every sample_rate-th created document
+             is validated
+    tests:   created documents are not validated, they are validated by
+             the test suite which uses the default policy always
+
+ooresults-server uses the policy of the config entry "iof_validation".
+
+A created document failing validation raises RuntimeError regardless of
+the policy. The time spent on validation is available with metrics().
+"""
+
+
+SCHEMA_PATH = pathlib.Path(__file__).resolve().parent.parent / "schema"
+
+
+class ValidationPolicy(str, enum.Enum):
+    ALWAYS = "always"
+    SAMPLED = "sampled"
+    TESTS = "tests"
+
+
+@functools.cache
+def _load(name: str) -> etree.XMLSchema:
+    return etree.XMLSchema(etree.parse(str(SCHEMA_PATH / name)))
+
+
+def schema(name: str = "IOF.xsd") -> etree.XMLSchema:
+    """Return the schema of the file name in ooresults/schema, parsed on first use."""
+    return _load(name)
+
+
+# a schema and its error log are shared by all threads
+_lock = threading.Lock()
+
+_local = threading.local()
+
+
+def thread_schema(name: str = "IOF.xsd") -> etree.XMLSchema:
+    """Return a schema of the file name used only by the calling thread.
+
+    Used to validate while a document is parsed with iterparse. Reading a
+    document lasts as long as its content is imported, the shared schema
+    would be locked for this time.
+    """
+    schemas = getattr(_local, "schemas", None)
+    if schemas is None:
+        schemas = _local.schemas = {}
+    if name not in schemas:
+        schemas[name] = etree.XMLSchema(etree.parse(str(SCHEMA_PATH / name)))
+    return schemas[name]
+
+
+def validate(root: etree._Element, name: str = "IOF.xsd") -> None:
+    xml_schema = schema(name=name)
+    with _lock:
+        if not xml_schema.validate(root):
+            raise RuntimeError(xml_schema.error_log.last_error)
+
+
+class Validator:
+    def __init__(
+        self, policy: ValidationPolicy = ValidationPolicy.ALWAYS, sample_rate: int = 50
+    ) -> None:
+        self.policy = policy
+        self.sample_rate = sample_rate
+        self.lock = threading.Lock()
+        self.created = 0
+        self.validated = 0
+        self.validation_time = 0.0
+
+    def configure(self, policy: ValidationPolicy, sample_rate: int = 50) -> None:
+        with self.lock:
+            self.policy = policy
+            self.sample_rate = sample_rate
+            self.created = 0
+
+    def due(self) -> bool:
+        with self.lock:
+            n = self.created
+            self.created += 1
+        if self.policy == ValidationPolicy.ALWAYS:
+            return True
+        elif self.policy == ValidationPolicy.SAMPLED:
+            return n % self.sample_rate == 0
+        return False
+
+    def validate_created(self, root: etree._Element, name: str = "IOF.xsd") -> None:
+        """Validate a document created by ooresults if due by the policy."""
+        if not self.due():
+            return
+        t = time.perf_counter()
+        try:
+            validate(root=root, name=name)
+        finally:
+            with self.lock:
+                self.validated += 1
+                self.validation_time += time.perf_counter() - t
+
+    def validate_created_content(self, content: bytes, name: str = "IOF.xsd") -> None:
+        """Validate a serialized document created by ooresults if due by the policy.
+
+        The document is only parsed if it is validated.
+        """
+        if self.due():
+            self._validate_content(content=content, name=name)
+
+    def validate_created_chunks(
+        self, chunks: Iterator[bytes], name: str = "IOF.xsd"
+    ) -> bytes | Iterator[bytes]:
+        """Validate a document created by ooresults in chunks if due by the policy.
+
+        A validated document is returned as bytes. Otherwise the chunks are
+        returned unchanged and the document is written while it is sent.
+        """
+        if not self.due():
+            return chunks
+        content = b"".join(chunks)
+        self._validate_content(content=content, name=name)
+        return content
+
+    def _validate_content(self, content: bytes, name: str) -> None:
+        t = time.perf_counter()
+        try:
+            validate(root=etree.XML(content), name=name)
+        finally:
+            with self.lock:
+                self.validated += 1
+                self.validation_time += time.perf_counter() - t
+
+    def metrics(self) -> dict:
+        with self.lock:
+            return {
+                "policy": self.policy.value,
+                "created": self.created,
+                "validated": self.validated,
+                "validation_time": round(self.validation_time, 3),
+            }
+
+
+validator = Validator()
@@ -0,0 +1,141 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import dataclasses
+import itertools
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import TypeAlias
+
+from lxml import etree
+from lxml.builder import ElementMaker
+
+
+"""
+Incremental writer of the IOF XML documents created by ooresults.
+
+The writer creates the same bytes as
+
+    etree.tostring(root, encoding="UTF-8", xml_declaration=True, pretty_print=True)
+
+of the complete tree, but writes the elements one after the other with
+etree.xmlfile and returns the document in chunks. Only the element
+currently written is kept in memory, so large documents are written
+without building the tree.
+
+The content of a document is given as a sequence of
+
+    element:         a complete element written at the current level
+    Start(tag):      start tag of an element whose children follow
+    END:             end tag of the last started element
+
+The elements are created with E without namespace. They are written
+inside the root element declaring the IOF namespace as default namespace
+and therefore belong to the IOF namespace when the document is parsed.
+Elements created with the namespace would repeat the declaration.
+"""
+
+
+IOF_NAMESPACE = "http://www.orienteering.org/datastandard/3.0"
+NSMAP = {None: IOF_NAMESPACE}
+
+INDENT = "  "
+
+CHUNK_SIZE = 64 * 1024
+
+E = ElementMaker()
+
+
+@dataclasses.dataclass(frozen=True)
+class Start:
+    tag: str
+
+
+class End:
+    pass
+
+
+END = End()
+
+
+Item: TypeAlias = etree._Element | Start | End
+
+
+class _Buffer:
+    def __init__(self) -> None:
+        self.chunks: list[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self.chunks.append(data)
+        self.size += len(data)
+        return len(data)
+
+    def take(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+
+def iter_document(
+    tag: str,
+    attrib: dict[str, str],
+    items: Iterable[Item],
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Write the document with the root element tag and return it in chunks."""
+    it = iter(items)
+    first = next(it, None)
+    if first is None:
+        # the empty root element is written as <tag/>
+        root = etree.Element(f"{{{IOF_NAMESPACE}}}{tag}", attrib=attrib, nsmap=NSMAP)
+        yield etree.tostring(
+            root, encoding="UTF-8", xml_declaration=True, pretty_print=True
+        )
+        return
+
+    buffer = _Buffer()
+    with etree.xmlfile(buffer, encoding="UTF-8") as xf:
+        xf.write_declaration()
+        with xf.element(f"{{{IOF_NAMESPACE}}}{tag}", attrib=attrib, nsmap=NSMAP):
+            level = 1
+            started = []
+            for item in itertools.chain([first], it):
+                if isinstance(item, Start):
+                    xf.write("\n" + INDENT * level)
+                    element = xf.element(item.tag)
+                    element.__enter__()
+                    started.append(element)
+                    level += 1
+                elif isinstance(item, End):
+                    level -= 1
+                    xf.write("\n" + INDENT * level)
+                    started.pop().__exit__(None, None, None)
+                else:
+                    etree.indent(item, space=INDENT, level=level)
+                    xf.write("\n" + INDENT * level)
+                    xf.write(item)
+                # lxml buffers the output of xmlfile internally
+                xf.flush()
+                if buffer.size >= chunk_size:
+                    yield buffer.take()
+            xf.write("\n")
+    buffer.write(b"\n")
+    yield buffer.take()
@@ -17,9 +17,12 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import csv
 import io
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Optional
 
-import clevercsv as csv
 from unidecode import unidecode
 
 from ooresults.otypes.class_type import ClassInfoType
@@ -27,6 +30,9 @@ from ooresults.otypes.entry_type import EntryType
 from ooresults.otypes.result_type import ResultStatus
 
 
+CHUNK_ROWS = 1000
+
+
 def cp1252(value: str) -> str:
     try:
         _ = value.encode("windows-1252")
@@ -35,7 +41,17 @@ def cp1252(value: str) -> str:
         return unidecode(value)
 
 
-def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
+def _take(output: io.StringIO) -> bytes:
+    content = output.getvalue()
+    output.seek(0)
+    output.truncate()
+    return content.encode(encoding="windows-1252")
+
+
+def iter_create(
+    entries: Iterable[EntryType], class_list: list[ClassInfoType]
+) -> Iterator[bytes]:
+    """Write the entries and return the file in chunks of CHUNK_ROWS rows."""
     output = io.StringIO()
     writer = csv.writer(output, delimiter=";", quoting=csv.QUOTE_MINIMAL)
 
@@ -118,20 +134,17 @@ def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
         ResultStatus.DISQUALIFIED: "4",
     }
 
+    # class number, short name and name by class id
+    classes: dict[Optional[int], tuple[str, str, str]] = {
+        c.id: (str(j + 1), c.short_name if c.short_name else c.name, c.name)
+        for j, c in enumerate(class_list)
+    }
+
     # write entries
     for i, e in enumerate(entries):
-        class_no = ""
-        class_name = ""
-        class_short_name = ""
-        for j, c in enumerate(class_list):
-            if c.id == e.class_id:
-                class_no = str(j + 1)
-                class_name = c.name
-                if c.short_name:
-                    class_short_name = c.short_name
-                else:
-                    class_short_name = class_name
-                break
+        class_no, class_short_name, class_name = classes.get(e.class_id, ("", "", ""))
+        if i % CHUNK_ROWS == CHUNK_ROWS - 1:
+            yield _take(output)
 
         # export only items with defined name
         if e.last_name:
@@ -232,6 +245,8 @@ def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
                 ]
             )
 
-    content = output.getvalue()
-    output.close()
-    return content.encode(encoding="windows-1252")
+    yield _take(output)
+
+
+def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
+    return b"".join(iter_create(entries=entries, class_list=class_list))
@@ -17,12 +17,16 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import csv
 import io
+from collections.abc import Iterable
+from collections.abc import Iterator
 from datetime import datetime
 from datetime import timedelta
 from typing import Any
+from typing import Optional
 
-import clevercsv as csv
+import clevercsv
 from unidecode import unidecode
 
 from ooresults.otypes import result_type
@@ -33,6 +37,9 @@ from ooresults.otypes.result_type import ResultStatus
 from ooresults.otypes.result_type import SpStatus
 
 
+CHUNK_ROWS = 1000
+
+
 def cp1252(value: str) -> str:
     try:
         _ = value.encode("windows-1252")
@@ -41,7 +48,17 @@ def cp1252(value: str) -> str:
         return unidecode(value)
 
 
-def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
+def _take(output: io.StringIO) -> bytes:
+    content = output.getvalue()
+    output.seek(0)
+    output.truncate()
+    return content.encode(encoding="windows-1252")
+
+
+def iter_create(
+    entries: Iterable[EntryType], class_list: list[ClassInfoType]
+) -> Iterator[bytes]:
+    """Write the entries and return the file in chunks of CHUNK_ROWS rows."""
     output = io.StringIO()
     writer = csv.writer(output, delimiter=";", quoting=csv.QUOTE_MINIMAL)
 
@@ -83,20 +100,17 @@ def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
         ResultStatus.DISQUALIFIED: "4",
     }
 
+    # class number, short name and name by class id
+    classes: dict[Optional[int], tuple[str, str, str]] = {
+        c.id: (str(j + 1), c.short_name if c.short_name else c.name, c.name)
+        for j, c in enumerate(class_list)
+    }
+
     # write entries
     for i, e in enumerate(entries):
-        class_no = ""
-        class_name = ""
-        class_short_name = ""
-        for j, c in enumerate(class_list):
-            if c.id == e.class_id:
-                class_no = str(j + 1)
-                class_name = c.name
-                if c.short_name:
-                    class_short_name = c.short_name
-                else:
-                    class_short_name = class_name
-                break
+        class_no, class_short_name, class_name = classes.get(e.class_id, ("", "", ""))
+        if i % CHUNK_ROWS == CHUNK_ROWS - 1:
+            yield _take(output)
 
         # export only items with defined name
         if e.last_name:
@@ -156,9 +170,33 @@ def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
                 ]
             )
 
-    content = output.getvalue()
-    output.close()
-    return content.encode(encoding="windows-1252")
+    yield _take(output)
+
+
+def create(entries: list[EntryType], class_list: list[ClassInfoType]) -> bytes:
+    return b"".join(iter_create(entries=entries, class_list=class_list))
+
+
+CHIP_COLUMNS = ["Chip", "Chipno", "Chipnr", "SI card1"]
+
+
+def reader(content: str) -> Iterable[list[str]]:
+    """Return a CSV reader for the content.
+
+    The files written by OE2003, OE12 and OOnet use semicolon, comma or
+    tab as delimiter and double quotes. If the delimiter splits the
+    header into columns containing the chip column, the file is read
+    with the csv module of the standard library. The dialect of other
+    files is detected with clevercsv, which is slow for large files.
+    """
+    header, _, _ = content.partition("\n")
+    for delimiter in ";,\t":
+        columns = [c.strip().strip('"') for c in header.split(delimiter)]
+        if len(columns) > 1 and any(c in CHIP_COLUMNS for c in columns):
+            return csv.reader(io.StringIO(content), delimiter=delimiter)
+
+    dialect = clevercsv.Sniffer().sniff(content, delimiters=",;\t")
+    return clevercsv.reader(io.StringIO(content), dialect=dialect)
 
 
 def parse(content: bytes) -> list[dict[str, Any]]:
@@ -170,11 +208,10 @@ def parse(content: bytes) -> list[dict[str, Any]]:
     except Exception:
         decoded_content = content.decode(encoding="windows-1252")
 
-    dialect = csv.Sniffer().sniff(decoded_content, delimiters=",;\t")
-    for values in csv.reader(io.StringIO(decoded_content), dialect=dialect):
+    for values in reader(decoded_content):
         if column_nr == {}:
             for i, v in enumerate(values):
-                if v in ["Chip", "Chipno", "Chipnr", "SI card1"]:
+                if v in CHIP_COLUMNS:
                     column_nr["chip"] = i
                     break
             else:
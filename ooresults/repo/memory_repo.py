@@ -0,0 +1,1080 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import contextlib
+import dataclasses
+import datetime
+import json
+import sqlite3
+import threading
+from collections.abc import Iterator
+from typing import Optional
+
+from ooresults.otypes import result_type
+from ooresults.otypes import series_type
+from ooresults.otypes import start_type
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.class_type import ClassType
+from ooresults.otypes.club_type import ClubType
+from ooresults.otypes.competitor_type import CompetitorBaseDataType
+from ooresults.otypes.competitor_type import CompetitorType
+from ooresults.otypes.course_type import CourseType
+from ooresults.otypes.entry_type import EntryBaseDataType
+from ooresults.otypes.entry_type import EntryType
+from ooresults.otypes.event_type import EventType
+from ooresults.repo.repo import ClassUsedError
+from ooresults.repo.repo import ClubUsedError
+from ooresults.repo.repo import CompetitorUsedError
+from ooresults.repo.repo import ConstraintError
+from ooresults.repo.repo import CourseUsedError
+from ooresults.repo.repo import EventNotFoundError
+from ooresults.repo.repo import OperationalError
+from ooresults.repo.repo import Repo
+from ooresults.repo.repo import TransactionMode
+from ooresults.repo.sqlite_repo import EVENT_ROWS_COLUMNS
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+"""
+Repository keeping the data in memory.
+
+The records are stored as dicts of the column values, the same values
+SqliteRepo stores in the database, in one dict per table indexed by id.
+The ids of the courses, classes and entries of an event are indexed by
+the event id.
+
+Transactions work with versions of the data: a transaction reads the
+version committed when the transaction was started. The first change
+acquires the writer lock and copies the changed tables, the commit
+replaces the committed version. A deferred transaction fails with
+OperationalError if it wants to write after another transaction has
+committed, like SQLite in WAL mode. Calls outside of a transaction are
+executed in a transaction of their own.
+
+A MemoryRepo is filled from a SqliteRepo with refresh(), completely or
+for one event. A MemoryRepo created with a source is a read replica of
+the source: changed() is registered as callback of cached_result, the
+reported events are copied from the source when the next transaction is
+started.
+"""
+
+
+TIMEOUT = 5.0
+
+EVENT_TABLES = ("courses", "classes", "entries")
+
+
+def _ordered(*values: object) -> tuple:
+    # NULL values are sorted first as in SQLite
+    return tuple((v is not None, v) for v in values)
+
+
+def _integrity_error() -> sqlite3.IntegrityError:
+    return sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+
+
+class _Data:
+    """One version of the stored data."""
+
+    def __init__(self) -> None:
+        self.tables: dict[str, dict[int, dict]] = {t: {} for t in EVENT_ROWS_COLUMNS}
+        self.by_event: dict[str, dict[int, dict[int, None]]] = {
+            t: {} for t in EVENT_TABLES
+        }
+        self.sequences = dict.fromkeys(EVENT_ROWS_COLUMNS, 0)
+        self.settings: Optional[series_type.Settings] = None
+        self.copied: set = set()
+
+    def copy(self) -> "_Data":
+        data = _Data()
+        data.tables = dict(self.tables)
+        data.by_event = dict(self.by_event)
+        data.sequences = dict(self.sequences)
+        data.settings = self.settings
+        return data
+
+    def table(self, table: str) -> dict[int, dict]:
+        """Return the table for changes."""
+        if table not in self.copied:
+            self.tables[table] = dict(self.tables[table])
+            self.copied.add(table)
+        return self.tables[table]
+
+    def ids(self, table: str, event_id: int) -> dict[int, None]:
+        """Return the ids of the records of an event for changes."""
+        if (table, None) not in self.copied:
+            self.by_event[table] = dict(self.by_event[table])
+            self.copied.add((table, None))
+        if (table, event_id) not in self.copied:
+            ids = self.by_event[table].get(event_id, {})
+            self.by_event[table][event_id] = dict(ids)
+            self.copied.add((table, event_id))
+        return self.by_event[table][event_id]
+
+    def event_rows(self, table: str, event_id: int) -> list[dict]:
+        rows = self.tables[table]
+        return [rows[id] for id in self.by_event[table].get(event_id, {})]
+
+    def insert(self, table: str, row: dict, id: Optional[int] = None) -> int:
+        if id is None:
+            id = self.sequences[table] + 1
+        self.sequences[table] = max(self.sequences[table], id)
+        self.table(table)[id] = {"id": id} | row
+        if table in EVENT_TABLES:
+            self.ids(table, row["event_id"])[id] = None
+        return id
+
+    def update(self, table: str, id: int, **values: object) -> None:
+        rows = self.table(table)
+        rows[id] = rows[id] | values
+
+    def delete(self, table: str, id: int) -> None:
+        row = self.table(table).pop(id)
+        if table in EVENT_TABLES:
+            del self.ids(table, row["event_id"])[id]
+
+
+@dataclasses.dataclass
+class _Transaction:
+    data: _Data
+    writer: bool = False
+
+
+class MemoryRepo(Repo):
+    def __init__(self, source: Optional[SqliteRepo] = None) -> None:
+        self._data = _Data()
+        self._lock = threading.Lock()
+        self._ctx = threading.local()
+        self._source = source
+        # the events changed in source since the last refresh, None for all
+        self._changes: set[Optional[int]] = set()
+        self._changes_lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        if source is not None:
+            self.refresh(source=source)
+
+    def changed(self, event_id: Optional[int]) -> None:
+        """Mark an event of source as changed, all events if event_id is None.
+
+        Used as callback of cached_result. The changed events are copied
+        when the next transaction is started.
+        """
+        with self._changes_lock:
+            self._changes.add(event_id)
+
+    def _refresh_changes(self) -> None:
+        # a transaction started during a refresh waits for it, so it never
+        # reads data older than the last reported change
+        with self._refresh_lock:
+            with self._changes_lock:
+                changes, self._changes = self._changes, set()
+            if self._source is None or not changes:
+                return
+            if None in changes:
+                self.refresh(source=self._source)
+            else:
+                for event_id in sorted(e for e in changes if e is not None):
+                    self.refresh(source=self._source, event_id=event_id)
+
+    def _transaction(self) -> Optional[_Transaction]:
+        return getattr(self._ctx, "transaction", None)
+
+    def _read(self) -> _Data:
+        transaction = self._transaction()
+        return self._data if transaction is None else transaction.data
+
+    def _acquire(self) -> None:
+        if not self._lock.acquire(timeout=TIMEOUT):
+            raise OperationalError("database is locked")
+
+    @contextlib.contextmanager
+    def _write(self) -> Iterator[_Data]:
+        transaction = self._transaction()
+        if transaction is None:
+            # a call outside of a transaction is executed in its own transaction
+            self.start_transaction(mode=TransactionMode.IMMEDIATE)
+            try:
+                yield self._ctx.transaction.data
+            except BaseException:
+                self.rollback()
+                raise
+            self.commit()
+            return
+
+        if not transaction.writer:
+            self._acquire()
+            if transaction.data is not self._data:
+                # another transaction has committed since the start
+                self._lock.release()
+                raise OperationalError("database is locked")
+            transaction.data = transaction.data.copy()
+            transaction.writer = True
+        yield transaction.data
+
+    def start_transaction(
+        self, mode: TransactionMode = TransactionMode.DEFERRED
+    ) -> None:
+        if self._transaction() is not None:
+            raise OperationalError("cannot start a transaction within a transaction")
+        self._refresh_changes()
+        if mode == TransactionMode.DEFERRED:
+            self._ctx.transaction = _Transaction(data=self._data)
+        else:
+            self._acquire()
+            self._ctx.transaction = _Transaction(data=self._data.copy(), writer=True)
+
+    def commit(self) -> None:
+        transaction = self._transaction()
+        if transaction is not None:
+            self._ctx.transaction = None
+            if transaction.writer:
+                transaction.data.copied = set()
+                self._data = transaction.data
+                self._lock.release()
+
+    def rollback(self) -> None:
+        transaction = self._transaction()
+        if transaction is not None:
+            self._ctx.transaction = None
+            if transaction.writer:
+                self._lock.release()
+
+    def close(self) -> None:
+        self.rollback()
+
+    def refresh(self, source: SqliteRepo, event_id: Optional[int] = None) -> None:
+        """Copy the data of source, only the event with event_id if not None.
+
+        The courses, classes and entries are read in one transaction per
+        event, the events, clubs, competitors and settings are read
+        afterwards, so they contain the clubs and competitors used.
+        """
+        with source.transaction():
+            if event_id is None:
+                event_ids = [e.id for e in source.get_events()]
+            else:
+                event_ids = [event_id]
+
+        event_rows = {}
+        for id in event_ids:
+            with source.transaction():
+                try:
+                    event_rows[id] = source.get_event_rows(event_id=id)
+                except EventNotFoundError:
+                    # the event has been deleted
+                    event_rows[id] = {}
+
+        catalogue = {}
+        with source.transaction():
+            for table in ("clubs", "competitors", "events"):
+                columns = ", ".join(EVENT_ROWS_COLUMNS[table])
+                cur = source.db.execute(f"SELECT id, {columns} FROM {table}")
+                catalogue[table] = [dict(row) for row in cur]
+            sequences = dict(source.db.execute("SELECT name, seq FROM sqlite_sequence"))
+            settings = source.get_series_settings()
+
+        self._acquire()
+        try:
+            data = _Data() if event_id is None else self._data.copy()
+            for table, rows in catalogue.items():
+                data.tables[table] = {row["id"]: row for row in rows}
+                data.copied.add(table)
+            for id, rows in event_rows.items():
+                for table in EVENT_TABLES:
+                    for row in data.event_rows(table, id):
+                        data.delete(table, row["id"])
+                    for row in rows.get(table, []):
+                        data.insert(table, row, id=row["id"])
+            for table, rows in data.tables.items():
+                data.sequences[table] = max(
+                    [data.sequences[table], sequences.get(table, 0), *rows]
+                )
+            data.settings = settings
+            data.copied = set()
+            self._data = data
+        finally:
+            self._lock.release()
+
+    def get_classes(self, event_id: int) -> list[ClassInfoType]:
+        data = self._read()
+        courses = data.tables["courses"]
+        classes = []
+        for c in data.event_rows("classes", event_id):
+            course = courses.get(c["course_id"], {})
+            number_of_controls = None
+            if course.get("controls") is not None:
+                number_of_controls = len(json.loads(course["controls"]))
+            classes.append(
+                ClassInfoType(
+                    id=c["id"],
+                    name=c["name"],
+                    short_name=c["short_name"],
+                    course_id=course.get("id"),
+                    course_name=course.get("name"),
+                    course_length=course.get("length"),
+                    course_climb=course.get("climb"),
+                    number_of_controls=number_of_controls,
+                    params=ClassParams.from_json(json_data=c["params"]),
+                )
+            )
+        classes.sort(key=lambda c: _ordered(c.name))
+        return classes
+
+    def get_class(self, id: int) -> ClassType:
+        c = self._read().tables["classes"][id]
+        return ClassType(
+            id=c["id"],
+            event_id=c["event_id"],
+            name=c["name"],
+            short_name=c["short_name"],
+            course_id=c["course_id"],
+            params=ClassParams.from_json(json_data=c["params"]),
+        )
+
+    def _check_class(
+        self, data: _Data, event_id: int, name: str, course_id: Optional[int], id=None
+    ) -> None:
+        for c in data.event_rows("classes", event_id):
+            if c["name"] == name and c["id"] != id:
+                raise ConstraintError("Class already exist")
+        if course_id is not None and course_id not in data.tables["courses"]:
+            raise ConstraintError("Class already exist")
+
+    def add_class(
+        self,
+        event_id: int,
+        name: str,
+        short_name: Optional[str],
+        course_id: Optional[int],
+        params: ClassParams,
+    ) -> int:
+        # check if the event still exists
+        self.get_event(id=event_id)
+
+        with self._write() as data:
+            self._check_class(
+                data=data, event_id=event_id, name=name, course_id=course_id
+            )
+            return data.insert(
+                "classes",
+                {
+                    "event_id": event_id,
+                    "name": name,
+                    "short_name": short_name,
+                    "course_id": course_id,
+                    "params": params.to_json(),
+                },
+            )
+
+    def update_class(
+        self,
+        id: int,
+        name: str,
+        short_name: Optional[str],
+        course_id: Optional[int],
+        params: ClassParams,
+    ) -> None:
+        with self._write() as data:
+            c = data.tables["classes"][id]
+            self._check_class(
+                data=data, event_id=c["event_id"], name=name, course_id=course_id, id=id
+            )
+            data.update(
+                "classes",
+                id,
+                name=name,
+                short_name=short_name,
+                course_id=course_id,
+                params=params.to_json(),
+            )
+
+    def delete_classes(self, event_id: int) -> None:
+        with self._write() as data:
+            if data.event_rows("entries", event_id):
+                raise ClassUsedError
+            for c in data.event_rows("classes", event_id):
+                data.delete("classes", c["id"])
+
+    def delete_class(self, id: int) -> None:
+        with self._write() as data:
+            c = data.tables["classes"].get(id)
+            if c is None:
+                return
+            for e in data.event_rows("entries", c["event_id"]):
+                if e["class_id"] == id:
+                    raise ClassUsedError
+            data.delete("classes", id)
+
+    def get_courses(self, event_id: int) -> list[CourseType]:
+        courses = [
+            self._course(row=c) for c in self._read().event_rows("courses", event_id)
+        ]
+        courses.sort(key=lambda c: _ordered(c.name))
+        return courses
+
+    def _course(self, row: dict) -> CourseType:
+        return CourseType(
+            id=row["id"],
+            event_id=row["event_id"],
+            name=row["name"],
+            length=row["length"],
+            climb=row["climb"],
+            controls=json.loads(row["controls"]),
+        )
+
+    def get_course(self, id: int) -> CourseType:
+        return self._course(row=self._read().tables["courses"][id])
+
+    def add_course(
+        self,
+        event_id: int,
+        name: str,
+        length: Optional[float],
+        climb: Optional[float],
+        controls: list[str],
+    ) -> int:
+        # check if the event still exists
+        self.get_event(id=event_id)
+
+        with self._write() as data:
+            for c in data.event_rows("courses", event_id):
+                if c["name"] == name:
+                    raise ConstraintError("Course already exist")
+            return data.insert(
+                "courses",
+                {
+                    "event_id": event_id,
+                    "name": name,
+                    "length": None if length is None else float(length),
+                    "climb": None if climb is None else float(climb),
+                    "controls": json.dumps(controls),
+                },
+            )
+
+    def update_course(
+        self,
+        id: int,
+        name: str,
+        length: Optional[float],
+        climb: Optional[float],
+        controls: list[str],
+    ) -> None:
+        with self._write() as data:
+            event_id = data.tables["courses"][id]["event_id"]
+            for c in data.event_rows("courses", event_id):
+                if c["name"] == name and c["id"] != id:
+                    raise ConstraintError("Course already exist")
+            data.update(
+                "courses",
+                id,
+                name=name,
+                length=None if length is None else float(length),
+                climb=None if climb is None else float(climb),
+                controls=json.dumps(controls),
+            )
+
+    def delete_courses(self, event_id: int) -> None:
+        with self._write() as data:
+            for c in data.event_rows("classes", event_id):
+                if c["course_id"] is not None:
+                    raise CourseUsedError
+            for c in data.event_rows("courses", event_id):
+                data.delete("courses", c["id"])
+
+    def delete_course(self, id: int) -> None:
+        with self._write() as data:
+            c = data.tables["courses"].get(id)
+            if c is None:
+                return
+            for cla in data.tables["classes"].values():
+                if cla["course_id"] == id:
+                    raise CourseUsedError
+            data.delete("courses", id)
+
+    def get_clubs(self) -> list[ClubType]:
+        clubs = [
+            ClubType(id=c["id"], name=c["name"])
+            for c in self._read().tables["clubs"].values()
+        ]
+        clubs.sort(key=lambda c: _ordered(c.name))
+        return clubs
+
+    def get_club(self, id: int) -> ClubType:
+        c = self._read().tables["clubs"][id]
+        return ClubType(id=c["id"], name=c["name"])
+
+    def _check_club(self, data: _Data, name: str, id: Optional[int] = None) -> None:
+        if name is not None:
+            for c in data.tables["clubs"].values():
+                if c["name"] == name and c["id"] != id:
+                    raise ConstraintError("Club already exist")
+
+    def add_club(self, name: str) -> int:
+        with self._write() as data:
+            self._check_club(data=data, name=name)
+            return data.insert("clubs", {"name": name})
+
+    def update_club(self, id: int, name: str) -> None:
+        with self._write() as data:
+            if id not in data.tables["clubs"]:
+                raise KeyError
+            self._check_club(data=data, name=name, id=id)
+            data.update("clubs", id, name=name)
+
+    def _used_by_entries(self, data: _Data, column: str, id: int) -> bool:
+        return any(e[column] == id for e in data.tables["entries"].values())
+
+    def delete_club(self, id: int) -> None:
+        with self._write() as data:
+            if any(
+                c["club_id"] == id for c in data.tables["competitors"].values()
+            ) or self._used_by_entries(data=data, column="club_id", id=id):
+                raise ClubUsedError
+            if id in data.tables["clubs"]:
+                data.delete("clubs", id)
+
+    def _competitor(self, data: _Data, row: dict) -> CompetitorType:
+        club = data.tables["clubs"].get(row["club_id"], {})
+        return CompetitorType(
+            id=row["id"],
+            first_name=row["first_name"],
+            last_name=row["last_name"],
+            gender=row["gender"],
+            year=row["year"],
+            chip=row["chip"],
+            club_id=club.get("id"),
+            club_name=club.get("name"),
+        )
+
+    def get_competitors(self) -> list[CompetitorType]:
+        data = self._read()
+        competitors = [
+            self._competitor(data=data, row=c)
+            for c in data.tables["competitors"].values()
+        ]
+        competitors.sort(key=lambda c: _ordered(c.last_name, c.first_name))
+        return competitors
+
+    def get_competitor(self, id: int) -> CompetitorType:
+        data = self._read()
+        return self._competitor(data=data, row=data.tables["competitors"][id])
+
+    def get_competitor_by_name(
+        self, first_name: str, last_name: str
+    ) -> Optional[CompetitorType]:
+        data = self._read()
+        for c in data.tables["competitors"].values():
+            if c["first_name"] == first_name and c["last_name"] == last_name:
+                return self._competitor(data=data, row=c)
+        return None
+
+    def _check_competitor(
+        self, data: _Data, competitor: dict, id: Optional[int] = None
+    ) -> None:
+        for c in data.tables["competitors"].values():
+            if (
+                c["first_name"] == competitor["first_name"]
+                and c["last_name"] == competitor["last_name"]
+                and c["id"] != id
+            ):
+                raise ConstraintError("Competitor already exist")
+        if (
+            competitor["club_id"] is not None
+            and competitor["club_id"] not in data.tables["clubs"]
+        ):
+            if id is None:
+                raise ConstraintError("Club id does not exist")
+            raise ConstraintError("Competitor already exist")
+
+    def add_competitor(
+        self,
+        first_name: str,
+        last_name: str,
+        club_id: Optional[int],
+        gender: str,
+        year: Optional[int],
+        chip: str,
+    ) -> int:
+        competitor = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "club_id": club_id,
+            "gender": gender,
+            "year": year,
+            "chip": chip,
+        }
+        with self._write() as data:
+            self._check_competitor(data=data, competitor=competitor)
+            return data.insert("competitors", competitor)
+
+    def update_competitor(
+        self,
+        id: int,
+        first_name: str,
+        last_name: str,
+        club_id: Optional[int],
+        gender: str,
+        year: Optional[int],
+        chip: str,
+    ) -> None:
+        competitor = {
+            "first_name": first_name,
+            "last_name": last_name,
+            "club_id": club_id,
+            "gender": gender,
+            "year": year,
+            "chip": chip,
+        }
+        with self._write() as data:
+            if id not in data.tables["competitors"]:
+                raise KeyError
+            self._check_competitor(data=data, competitor=competitor, id=id)
+            data.update("competitors", id, **competitor)
+
+    def delete_competitor(self, id: int) -> None:
+        with self._write() as data:
+            if self._used_by_entries(data=data, column="competitor_id", id=id):
+                raise CompetitorUsedError
+            if id in data.tables["competitors"]:
+                data.delete("competitors", id)
+
+    def add_many_competitors(
+        self, list_of_competitors: list[CompetitorBaseDataType]
+    ) -> None:
+        with self._write() as data:
+            # the records are checked before the first one is inserted
+            copy = data.copy()
+            for c in list_of_competitors:
+                competitor = {
+                    "first_name": c.first_name,
+                    "last_name": c.last_name,
+                    "club_id": c.club_id,
+                    "gender": c.gender,
+                    "year": c.year,
+                    "chip": c.chip,
+                }
+                self._check_competitor(data=copy, competitor=competitor)
+                copy.insert("competitors", competitor)
+            data.tables["competitors"] = copy.tables["competitors"]
+            data.sequences["competitors"] = copy.sequences["competitors"]
+            data.copied.add("competitors")
+
+    def _entry(self, data: _Data, row: dict) -> EntryType:
+        competitor = data.tables["competitors"].get(row["competitor_id"], {})
+        cla = data.tables["classes"].get(row["class_id"], {})
+        club = data.tables["clubs"].get(row["club_id"], {})
+        fields = {int(key): value for key, value in json.loads(row["fields"]).items()}
+        return EntryType(
+            id=row["id"],
+            event_id=row["event_id"],
+            competitor_id=competitor.get("id"),
+            first_name=competitor.get("first_name"),
+            last_name=competitor.get("last_name"),
+            gender=competitor.get("gender"),
+            year=competitor.get("year"),
+            class_id=cla.get("id"),
+            class_name=cla.get("name"),
+            not_competing=bool(row["not_competing"]),
+            chip=row["chip"],
+            fields=fields,
+            result=result_type.PersonRaceResult.from_json(json_data=row["result"]),
+            start=start_type.PersonRaceStart.from_json(json_data=row["start"]),
+            club_id=club.get("id"),
+            club_name=club.get("name"),
+        )
+
+    def get_entries(self, event_id: int) -> list[EntryType]:
+        data = self._read()
+        entries = [
+            self._entry(data=data, row=e) for e in data.event_rows("entries", event_id)
+        ]
+        entries.sort(key=lambda e: _ordered(e.last_name, e.first_name, e.chip))
+        return entries
+
+    def get_entry(self, id: int) -> EntryType:
+        data = self._read()
+        return self._entry(data=data, row=data.tables["entries"][id])
+
+    def get_entry_ids_by_competitor(
+        self, event_id: int, competitor_id: int
+    ) -> list[int]:
+        return [
+            e["id"]
+            for e in self._read().event_rows("entries", event_id)
+            if e["competitor_id"] == competitor_id
+        ]
+
+    def get_entries_by_name(
+        self, event_id: int, first_name: str, last_name: str
+    ) -> list[EntryType]:
+        data = self._read()
+        competitors = data.tables["competitors"]
+        entries = []
+        for e in data.event_rows("entries", event_id):
+            c = competitors.get(e["competitor_id"], {})
+            if c.get("first_name") == first_name and c.get("last_name") == last_name:
+                entries.append(self._entry(data=data, row=e))
+        return entries
+
+    def _check_entry(self, data: _Data, entry: dict) -> None:
+        # the checks of the foreign keys of the table entries
+        for column, table in (
+            ("event_id", "events"),
+            ("competitor_id", "competitors"),
+            ("class_id", "classes"),
+            ("club_id", "clubs"),
+        ):
+            if entry[column] is not None and entry[column] not in data.tables[table]:
+                raise _integrity_error()
+
+    def _add_entry(self, entry: dict) -> int:
+        with self._write() as data:
+            self._check_entry(data=data, entry=entry)
+            return data.insert("entries", entry)
+
+    def add_entry(
+        self,
+        event_id: int,
+        competitor_id: int,
+        class_id: int,
+        club_id: Optional[int],
+        not_competing: bool,
+        chip: str,
+        fields: dict[int, str],
+        result: result_type.PersonRaceResult,
+        start: start_type.PersonRaceStart,
+    ) -> int:
+        return self._add_entry(
+            entry={
+                "event_id": event_id,
+                "competitor_id": competitor_id,
+                "class_id": class_id,
+                "club_id": club_id,
+                "not_competing": int(not_competing),
+                "result": result.to_json(),
+                "start": start.to_json(),
+                "chip": chip,
+                "fields": json.dumps(fields),
+            }
+        )
+
+    def add_entry_result(
+        self,
+        event_id: int,
+        chip: str,
+        result: result_type.PersonRaceResult,
+        start: start_type.PersonRaceStart,
+    ) -> int:
+        # check if the event still exists
+        self.get_event(id=event_id)
+
+        return self._add_entry(
+            entry={
+                "event_id": event_id,
+                "competitor_id": None,
+                "class_id": None,
+                "club_id": None,
+                "not_competing": 0,
+                "result": result.to_json(),
+                "start": start.to_json(),
+                "chip": chip,
+                "fields": json.dumps({}),
+            }
+        )
+
+    def update_entry(
+        self,
+        id: int,
+        class_id: int,
+        club_id: Optional[int],
+        not_competing: bool,
+        chip: str,
+        fields: dict[int, str],
+        result: result_type.PersonRaceResult,
+        start: start_type.PersonRaceStart,
+    ) -> None:
+        with self._write() as data:
+            if id not in data.tables["entries"]:
+                raise KeyError
+            values = {
+                "class_id": class_id,
+                "club_id": club_id,
+                "not_competing": int(not_competing),
+                "chip": chip,
+                "fields": json.dumps(fields),
+                "result": result.to_json(),
+                "start": start.to_json(),
+            }
+            self._check_entry(data=data, entry=data.tables["entries"][id] | values)
+            data.update("entries", id, **values)
+
+    def update_entry_result(
+        self,
+        id: int,
+        chip: str,
+        result: result_type.PersonRaceResult,
+        start: start_type.PersonRaceStart,
+    ) -> None:
+        with self._write() as data:
+            if id not in data.tables["entries"]:
+                raise KeyError
+            data.update(
+                "entries",
+                id,
+                chip=chip,
+                result=result.to_json(),
+                start=start.to_json(),
+            )
+
+    def delete_entries(self, event_id: int) -> None:
+        with self._write() as data:
+            for e in data.event_rows("entries", event_id):
+                data.delete("entries", e["id"])
+
+    def delete_entry(self, id: int) -> None:
+        with self._write() as data:
+            if id in data.tables["entries"]:
+                data.delete("entries", id)
+
+    def add_many_entries(self, list_of_entries: list[EntryBaseDataType]) -> None:
+        entries = [
+            {
+                "event_id": e.event_id,
+                "competitor_id": e.competitor_id,
+                "class_id": e.class_id,
+                "club_id": e.club_id,
+                "not_competing": int(e.not_competing),
+                "result": e.result.to_json(),
+                "start": e.start.to_json(),
+                "chip": e.chip,
+                "fields": json.dumps(e.fields),
+            }
+            for e in list_of_entries
+        ]
+        with self._write() as data:
+            for entry in entries:
+                self._check_entry(data=data, entry=entry)
+            for entry in entries:
+                data.insert("entries", entry)
+
+    def _event(self, row: dict) -> EventType:
+        streaming_enabled = None
+        if row["streaming_enabled"] is not None:
+            streaming_enabled = bool(row["streaming_enabled"])
+
+        return EventType(
+            id=row["id"],
+            name=row["name"],
+            date=datetime.datetime.strptime(row["date"], "%Y-%m-%d").date(),
+            key=row["key"],
+            publish=bool(row["publish"]),
+            series=row["series"],
+            fields=json.loads(row["fields"]),
+            streaming_address=row["streaming_address"],
+            streaming_key=row["streaming_key"],
+            streaming_enabled=streaming_enabled,
+        )
+
+    def get_events(self) -> list[EventType]:
+        events = [self._event(row=e) for e in self._read().tables["events"].values()]
+        events.sort(key=lambda e: _ordered(e.name))
+        return events
+
+    def get_event(self, id: int) -> EventType:
+        e = self._read().tables["events"].get(id)
+        if e is None:
+            raise EventNotFoundError
+        return self._event(row=e)
+
+    def _check_event(self, data: _Data, event: dict, id: Optional[int] = None) -> None:
+        for e in data.tables["events"].values():
+            if e["id"] != id and (
+                e["name"] == event["name"]
+                or (event["key"] is not None and e["key"] == event["key"])
+            ):
+                raise ConstraintError("Event or event key already exist")
+
+    def add_event(
+        self,
+        name: str,
+        date: datetime.date,
+        key: Optional[str],
+        publish: bool,
+        series: Optional[str],
+        fields: list[str],
+        streaming_address: Optional[str] = None,
+        streaming_key: Optional[str] = None,
+        streaming_enabled: Optional[bool] = None,
+    ) -> int:
+        event = {
+            "name": name,
+            "date": date.isoformat(),
+            "key": key,
+            "publish": int(publish),
+            "series": series,
+            "fields": json.dumps(fields),
+            "streaming_address": streaming_address,
+            "streaming_key": streaming_key,
+            "streaming_enabled": (
+                None if streaming_enabled is None else int(streaming_enabled)
+            ),
+        }
+        with self._write() as data:
+            self._check_event(data=data, event=event)
+            return data.insert("events", event)
+
+    def update_event(
+        self,
+        id: int,
+        name: str,
+        date: datetime.date,
+        key: Optional[str],
+        publish: bool,
+        series: Optional[str],
+        fields: list[str],
+        streaming_address: Optional[str] = None,
+        streaming_key: Optional[str] = None,
+        streaming_enabled: Optional[bool] = None,
+    ) -> None:
+        event = {
+            "name": name,
+            "date": date.isoformat(),
+            "key": key,
+            "publish": int(publish),
+            "series": series,
+            "fields": json.dumps(fields),
+            "streaming_address": streaming_address,
+            "streaming_key": streaming_key,
+            "streaming_enabled": (
+                None if streaming_enabled is None else int(streaming_enabled)
+            ),
+        }
+        with self._write() as data:
+            if id not in data.tables["events"]:
+                raise KeyError
+            self._check_event(data=data, event=event, id=id)
+            data.update("events", id, **event)
+
+    def delete_event(self, id: int) -> None:
+        with self._write() as data:
+            if id in data.tables["events"]:
+                if any(data.by_event[t].get(id) for t in EVENT_TABLES):
+                    raise _integrity_error()
+                data.delete("events", id)
+
+    def get_event_rows(self, event_id: int) -> dict[str, list[dict]]:
+        # check if the event still exists
+        self.get_event(id=event_id)
+
+        data = self._read()
+        entries = data.event_rows("entries", event_id)
+        competitor_ids = {e["competitor_id"] for e in entries}
+        competitors = [
+            data.tables["competitors"][id] for id in sorted(competitor_ids - {None})
+        ]
+        club_ids = {e["club_id"] for e in entries} | {c["club_id"] for c in competitors}
+        rows = {
+            "events": [data.tables["events"][event_id]],
+            "clubs": [data.tables["clubs"][id] for id in sorted(club_ids - {None})],
+            "competitors": competitors,
+            "courses": data.event_rows("courses", event_id),
+            "classes": data.event_rows("classes", event_id),
+            "entries": entries,
+        }
+        return {
+            table: [dict(row) for row in sorted(rows[table], key=lambda r: r["id"])]
+            for table in EVENT_ROWS_COLUMNS
+        }
+
+    def add_event_rows(self, rows: dict[str, list[dict]]) -> int:
+        def values(table: str, row: dict, **mapped: Optional[int]) -> dict:
+            return {
+                c: mapped[c] if c in mapped else row[c]
+                for c in EVENT_ROWS_COLUMNS[table]
+            }
+
+        with self._write() as data:
+            (event,) = rows["events"]
+            self._check_event(data=data, event=event)
+            event_id = data.insert("events", values("events", event))
+
+            # clubs and competitors already stored are used unchanged
+            club_ids = {c["name"]: c["id"] for c in data.tables["clubs"].values()}
+            clubs: dict[Optional[int], Optional[int]] = {None: None}
+            for c in rows["clubs"]:
+                if c["name"] not in club_ids:
+                    club_ids[c["name"]] = data.insert("clubs", values("clubs", c))
+                clubs[c["id"]] = club_ids[c["name"]]
+
+            competitor_ids = {
+                (c["first_name"], c["last_name"]): c["id"]
+                for c in data.tables["competitors"].values()
+            }
+            competitors: dict[Optional[int], Optional[int]] = {None: None}
+            for c in rows["competitors"]:
+                name = (c["first_name"], c["last_name"])
+                if name not in competitor_ids:
+                    competitor_ids[name] = data.insert(
+                        "competitors",
+                        values("competitors", c, club_id=clubs[c["club_id"]]),
+                    )
+                competitors[c["id"]] = competitor_ids[name]
+
+            courses: dict[Optional[int], Optional[int]] = {None: None}
+            for c in rows["courses"]:
+                courses[c["id"]] = data.insert(
+                    "courses", values("courses", c, event_id=event_id)
+                )
+
+            classes: dict[Optional[int], Optional[int]] = {None: None}
+            for c in rows["classes"]:
+                classes[c["id"]] = data.insert(
+                    "classes",
+                    values(
+                        "classes",
+                        c,
+                        event_id=event_id,
+                        course_id=courses[c["course_id"]],
+                    ),
+                )
+
+            for e in rows["entries"]:
+                data.insert(
+                    "entries",
+                    values(
+                        "entries",
+                        e,
+                        event_id=event_id,
+                        competitor_id=competitors[e["competitor_id"]],
+                        class_id=classes[e["class_id"]],
+                        club_id=clubs[e["club_id"]],
+                    ),
+                )
+            return event_id
+
+    def get_series_settings(self) -> series_type.Settings:
+        settings = self._read().settings
+        if settings is None:
+            return series_type.Settings()
+        return dataclasses.replace(settings)
+
+    def update_series_settings(self, settings: series_type.Settings) -> None:
+        with self._write() as data:
+            data.settings = dataclasses.replace(settings)
@@ -566,6 +566,31 @@ class Repo:
         """
         raise NotImplementedError
 
+    def get_event_rows(self, event_id: int) -> dict[str, list[dict]]:
+        """Read the records of an event for an event package.
+
+        Returns the records of the tables 'events', 'courses', 'classes' and
+        'entries' of the event and the records of the tables 'clubs' and
+        'competitors' used by the entries. A record is a dict of the column
+        names and the stored values, the column 'id' included.
+
+        Possible errors:
+        - Event does not exist
+        """
+        raise NotImplementedError
+
+    def add_event_rows(self, rows: dict[str, list[dict]]) -> int:
+        """Insert the records read by get_event_rows as a new event.
+
+        The records get new ids and the references are mapped to them. Clubs
+        and competitors already stored are identified by their names and are
+        not changed. Returns the id of the new event.
+
+        Possible errors:
+        - Event or event key already exist
+        """
+        raise NotImplementedError
+
     def get_series_settings(self) -> series_type.Settings:
         """Read a series record from the 'series' table."""
         raise NotImplementedError
@@ -0,0 +1,354 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import collections
+import contextlib
+import logging
+import pathlib
+import sqlite3
+from typing import Optional
+
+from ooresults.otypes import result_type
+from ooresults.otypes import start_type
+from ooresults.otypes.entry_type import EntryBaseDataType
+from ooresults.repo.repo import OperationalError
+from ooresults.repo.repo import TransactionMode
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.repo.update import update_tables
+
+
+"""
+Storage with one SQLite file per event.
+
+The catalogue database contains the tables of the single-file storage.
+The courses, classes and entries of an event are stored in the event
+database <path>/event_<id>.sqlite, which is attached to the connection
+of a thread when the event is used for the first time. The catalogue
+keeps only the events, clubs, competitors and series settings, so the
+active event stays small and closed events cost nothing until they are
+used again.
+
+The ids of courses, classes and entries are unique across all event
+databases: the ids of an event start at event_id << ID_BITS, so the event
+of a record is known from its id alone.
+
+Foreign keys do not work across database files. References to the
+competitors and clubs of the catalogue are checked explicitly.
+
+SQLite allows at most MAX_ATTACHED attached databases per connection.
+Outside of a transaction only the KEEP_ATTACHED most recently used event
+databases stay attached, an event database used in the current
+transaction cannot be detached.
+
+Events stored before the storage was changed to sharded remain in the
+catalogue.
+
+The tables of the catalogue are updated at startup. An event database
+stored by an older version is updated when it is attached, so the
+databases of closed events are only updated when they are used again.
+"""
+
+
+ID_BITS = 32
+MAX_ATTACHED = 10
+KEEP_ATTACHED = 4
+
+
+SHARD_TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS version (
+        value INTEGER PRIMARY KEY
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS courses (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        length FLOAT,
+        climb FLOAT,
+        controls BLOB NOT NULL,
+        UNIQUE (event_id, name)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS classes (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        name TEXT NOT NULL,
+        short_name TEXT,
+        course_id INTEGER REFERENCES courses(id),
+        params BLOB NOT NULL,
+        UNIQUE (event_id, name)
+    )""",
+    """
+    CREATE TABLE IF NOT EXISTS entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        competitor_id INTEGER,
+        class_id INTEGER REFERENCES classes(id),
+        club_id INTEGER,
+        not_competing BOOL NOT NULL,
+        result BLOB NOT NULL,
+        start BLOB NOT NULL,
+        chip TEXT,
+        fields BLOB NOT NULL
+    )""",
+    """
+    CREATE INDEX IF NOT EXISTS entries_idx1 ON entries(
+        event_id,
+        competitor_id
+    )""",
+)
+
+
+class ShardedSqliteRepo(SqliteRepo):
+    def __init__(
+        self, db: str = "ooresults.sqlite", path: Optional[str] = None
+    ) -> None:
+        database = pathlib.Path(db)
+        if path is None:
+            self.path = database.with_name(f"{database.stem}-events")
+        else:
+            self.path = pathlib.Path(path)
+        self.path.mkdir(parents=True, exist_ok=True)
+        # the events whose database has the current version
+        self._updated: set[int] = set()
+        super().__init__(db=db)
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if not hasattr(self._ctx, "db"):
+            self._ctx.attached = collections.OrderedDict()
+            self._ctx.deleted = []
+        return super().db
+
+    def shard_path(self, event_id: int) -> pathlib.Path:
+        return self.path / f"event_{event_id}.sqlite"
+
+    def shard_paths(self) -> list[pathlib.Path]:
+        return sorted(self.path.glob("event_*.sqlite"))
+
+    def start_transaction(
+        self, mode: TransactionMode = TransactionMode.DEFERRED
+    ) -> None:
+        attached = self._attached()
+        while len(attached) > KEEP_ATTACHED and not self.db.in_transaction:
+            event_id, schema = attached.popitem(last=False)
+            self.db.execute(f"DETACH DATABASE {schema}")
+        super().start_transaction(mode=mode)
+
+    def commit(self) -> None:
+        super().commit()
+        # the database of a deleted event is removed after the commit
+        deleted = self._ctx.deleted
+        while deleted:
+            event_id = deleted.pop()
+            schema = self._ctx.attached.pop(event_id, None)
+            if schema is not None:
+                self.db.execute(f"DETACH DATABASE {schema}")
+            try:
+                self.shard_path(event_id).unlink(missing_ok=True)
+            except OSError:
+                logging.exception(f"Database of event {event_id} not removed")
+
+    def rollback(self) -> None:
+        super().rollback()
+        self._ctx.deleted.clear()
+
+    def _attached(self) -> collections.OrderedDict[int, str]:
+        # the event databases attached to the connection of this thread
+        self.db
+        return self._ctx.attached
+
+    def _schema(self, event_id: int) -> str:
+        attached = self._attached()
+        if event_id in attached:
+            attached.move_to_end(event_id)
+            return attached[event_id]
+
+        path = self.shard_path(event_id)
+        if not path.exists() and not self._create_shard(event_id=event_id):
+            return "main"
+
+        if event_id not in self._updated:
+            # an event database stored by an older version is updated with
+            # a separate connection before it is attached
+            self._update_shard(path=path)
+            self._updated.add(event_id)
+
+        if len(attached) >= MAX_ATTACHED:
+            self._detach_unused()
+        schema = f"event_{event_id}"
+        self.db.execute("ATTACH DATABASE ? AS ?", (str(path), schema))
+        attached[event_id] = schema
+        return schema
+
+    def _update_shard(self, path: pathlib.Path) -> None:
+        with contextlib.closing(sqlite3.connect(path)) as db:
+            (version,) = db.execute("SELECT value FROM version").fetchone()
+            if version == update_tables.VERSION:
+                return
+            try:
+                update_tables.update_shard_tables(db=db)
+            except Exception as e:
+                raise RuntimeError(f"DB version of {path} is {version}: {e}") from e
+        logging.info(f"Database {path} updated to version {update_tables.VERSION}")
+
+    def _schema_of(self, id: int) -> str:
+        # ids of other types are looked up in the tables of the catalogue
+        event_id = id >> ID_BITS if isinstance(id, int) else 0
+        return self._schema(event_id=event_id) if event_id else "main"
+
+    def _create_shard(self, event_id: int) -> bool:
+        # events stored in the catalogue and unknown events use the
+        # (empty) tables of the catalogue
+        cur = self.db.execute(
+            """
+            SELECT id FROM events WHERE id=?
+                AND NOT EXISTS (SELECT id FROM main.courses WHERE event_id=?)
+                AND NOT EXISTS (SELECT id FROM main.classes WHERE event_id=?)
+                AND NOT EXISTS (SELECT id FROM main.entries WHERE event_id=?)""",
+            (event_id,) * 4,
+        )
+        if cur.fetchone() is None:
+            return False
+
+        # the event database is created with a separate connection and is
+        # kept even if the current transaction is rolled back
+        with contextlib.closing(sqlite3.connect(self.shard_path(event_id))) as db:
+            db.execute("BEGIN EXCLUSIVE TRANSACTION")
+            for statement in SHARD_TABLES:
+                db.execute(statement)
+            db.execute(
+                "INSERT OR IGNORE INTO version VALUES(?)", (update_tables.VERSION,)
+            )
+            for table in ("courses", "classes", "entries"):
+                if not db.execute(
+                    "SELECT seq FROM sqlite_sequence WHERE name=?", (table,)
+                ).fetchone():
+                    db.execute(
+                        "INSERT INTO sqlite_sequence (name, seq) VALUES(?, ?)",
+                        (table, event_id << ID_BITS),
+                    )
+            db.commit()
+        logging.info(f"Database of event {event_id} created")
+        return True
+
+    def _detach_unused(self) -> None:
+        attached = self._attached()
+        for event_id, schema in list(attached.items()):
+            try:
+                self.db.execute(f"DETACH DATABASE {schema}")
+            except sqlite3.OperationalError:
+                # used in the current transaction
+                continue
+            del attached[event_id]
+            return
+        raise OperationalError("Too many events used in one transaction")
+
+    def _used_by_entries(self, column: str, id: int) -> bool:
+        if super()._used_by_entries(column=column, id=id):
+            return True
+        attached = self._attached()
+        query = f"SELECT id FROM {{}}entries WHERE {column}=?"
+        for path in self.shard_paths():
+            event_id = int(path.stem.removeprefix("event_"))
+            if event_id in attached:
+                cur = self.db.execute(query.format(f"{attached[event_id]}."), (id,))
+                used = cur.fetchone() is not None
+            else:
+                # event databases not attached are read with a separate connection
+                with contextlib.closing(
+                    sqlite3.connect(f"{path.absolute().as_uri()}?mode=ro", uri=True)
+                ) as db:
+                    used = db.execute(query.format(""), (id,)).fetchone() is not None
+            if used:
+                return True
+        return False
+
+    def _check_references(
+        self, competitor_id: Optional[int], club_id: Optional[int]
+    ) -> None:
+        # foreign keys do not work across database files
+        for table, id in (("competitors", competitor_id), ("clubs", club_id)):
+            if id is not None:
+                cur = self.db.execute(f"SELECT id FROM main.{table} WHERE id=?", (id,))
+                if cur.fetchone() is None:
+                    raise sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+
+    def add_entry(
+        self,
+        event_id: int,
+        competitor_id: int,
+        class_id: int,
+        club_id: Optional[int],
+        not_competing: bool,
+        chip: str,
+        fields: dict[int, str],
+        result: result_type.PersonRaceResult,
+        start: start_type.PersonRaceStart,
+    ) -> int:
+        self._check_references(competitor_id=competitor_id, club_id=club_id)
+        return super().add_entry(
+            event_id=event_id,
+            competitor_id=competitor_id,
+            class_id=class_id,
+            club_id=club_id,
+            not_competing=not_competing,
+            chip=chip,
+            fields=fields,
+            result=result,
+            start=start,
+        )
+
+    def update_entry(
+        self,
+        id: int,
+        class_id: int,
+        club_id: Optional[int],
+        not_competing: bool,
+        chip: str,
+        fields: dict[int, str],
+        result: result_type.PersonRaceResult,
+        start: start_type.PersonRaceStart,
+    ) -> None:
+        self._check_references(competitor_id=None, club_id=club_id)
+        super().update_entry(
+            id=id,
+            class_id=class_id,
+            club_id=club_id,
+            not_competing=not_competing,
+            chip=chip,
+            fields=fields,
+            result=result,
+            start=start,
+        )
+
+    def add_many_entries(self, list_of_entries: list[EntryBaseDataType]) -> None:
+        for e in list_of_entries:
+            self._check_references(competitor_id=e.competitor_id, club_id=e.club_id)
+        super().add_many_entries(list_of_entries=list_of_entries)
+
+    def delete_event(self, id: int) -> None:
+        if self.shard_path(id).exists():
+            s = self._schema(event_id=id)
+            for table in ("courses", "classes", "entries"):
+                if self.db.execute(f"SELECT id FROM {s}.{table} LIMIT 1").fetchone():
+                    raise sqlite3.IntegrityError("FOREIGN KEY constraint failed")
+            self._ctx.deleted.append(id)
+        super().delete_event(id=id)
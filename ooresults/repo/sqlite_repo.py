@@ -50,10 +50,47 @@ from ooresults.repo.repo import TransactionMode
 from ooresults.repo.update import update_tables
 
 
+# columns of the records of an event package, without the column id
+EVENT_ROWS_COLUMNS = {
+    "events": (
+        "name",
+        "date",
+        "key",
+        "publish",
+        "series",
+        "fields",
+        "streaming_address",
+        "streaming_key",
+        "streaming_enabled",
+    ),
+    "clubs": ("name",),
+    "competitors": ("first_name", "last_name", "club_id", "gender", "year", "chip"),
+    "courses": ("event_id", "name", "length", "climb", "controls"),
+    "classes": ("event_id", "name", "short_name", "course_id", "params"),
+    "entries": (
+        "event_id",
+        "competitor_id",
+        "class_id",
+        "club_id",
+        "not_competing",
+        "result",
+        "start",
+        "chip",
+        "fields",
+    ),
+}
+
+
 class SqliteRepo(Repo):
-    def __init__(self, db: str = "ooresults.sqlite") -> None:
+    def __init__(self, db: str = "ooresults.sqlite", memory: bool = False) -> None:
         self.database = db
+        self.memory = memory
         self._ctx = threading.local()
+        if memory:
+            # The in-memory database is shared by all threads of the process
+            # and exists as long as at least one connection is open.
+            self.database = f"file:/{db}?vfs=memdb"
+            self._memory_db = sqlite3.connect(database=self.database, uri=True)
 
         # sqlite3.register_adapter(bool, int)
         # sqlite3.register_converter("BOOLEAN", lambda v: v != '0')
@@ -184,7 +221,7 @@ class SqliteRepo(Repo):
     @property
     def db(self) -> sqlite3.Connection:
         if not hasattr(self._ctx, "db"):
-            self._ctx.db = sqlite3.connect(database=self.database)
+            self._ctx.db = sqlite3.connect(database=self.database, uri=self.memory)
             self._ctx.db.row_factory = sqlite3.Row
             self._ctx.db.execute("PRAGMA foreign_keys = on")
 
@@ -210,9 +247,25 @@ class SqliteRepo(Repo):
             self.db.close()
             del self._ctx.db
 
+    def _schema(self, event_id: int) -> str:
+        """Return the schema with the courses, classes and entries of an event."""
+        return "main"
+
+    def _schema_of(self, id: int) -> str:
+        """Return the schema with the course, class or entry with the given id."""
+        return "main"
+
+    def _used_by_entries(self, column: str, id: int) -> bool:
+        cur = self.db.execute(
+            f"SELECT id FROM entries WHERE {column}=?",
+            (id,),
+        )
+        return cur.fetchone() is not None
+
     def get_classes(self, event_id: int) -> list[ClassInfoType]:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 classes.id,
                 classes.name,
@@ -223,8 +276,8 @@ class SqliteRepo(Repo):
                 courses.climb AS course_climb,
                 courses.controls,
                 classes.params
-            FROM classes
-            LEFT JOIN courses ON classes.course_id=courses.id
+            FROM {s}.classes
+            LEFT JOIN {s}.courses ON classes.course_id=courses.id
             WHERE classes.event_id=?
             ORDER BY classes.name ASC""",
             (event_id,),
@@ -252,8 +305,9 @@ class SqliteRepo(Repo):
         return classes
 
     def get_class(self, id: int) -> ClassType:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 id,
                 event_id,
@@ -261,7 +315,7 @@ class SqliteRepo(Repo):
                 short_name,
                 course_id,
                 params
-            FROM classes WHERE id=?""",
+            FROM {s}.classes WHERE id=?""",
             (id,),
         )
         c = cur.fetchone()
@@ -288,10 +342,11 @@ class SqliteRepo(Repo):
         # check if the event still exists
         self.get_event(id=event_id)
 
+        s = self._schema(event_id)
         try:
             cur = self.db.execute(
-                """
-                INSERT into classes (
+                f"""
+                INSERT into {s}.classes (
                     event_id,
                     name,
                     short_name,
@@ -323,10 +378,11 @@ class SqliteRepo(Repo):
         course_id: Optional[int],
         params: ClassParams,
     ) -> None:
+        s = self._schema_of(id)
         try:
             cur = self.db.execute(
-                """
-                UPDATE classes SET
+                f"""
+                UPDATE {s}.classes SET
                     name=?,
                     short_name=?,
                     course_id=?,
@@ -347,34 +403,37 @@ class SqliteRepo(Repo):
             raise ConstraintError("Class already exist")
 
     def delete_classes(self, event_id: int) -> None:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            "SELECT id FROM entries WHERE event_id=?",
+            f"SELECT id FROM {s}.entries WHERE event_id=?",
             (event_id,),
         )
         if cur.fetchone():
             raise ClassUsedError
         else:
             self.db.execute(
-                "DELETE FROM classes WHERE event_id=?",
+                f"DELETE FROM {s}.classes WHERE event_id=?",
                 (event_id,),
             )
 
     def delete_class(self, id: int) -> None:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            "SELECT id FROM entries WHERE class_id=?",
+            f"SELECT id FROM {s}.entries WHERE class_id=?",
             (id,),
         )
         if cur.fetchone():
             raise ClassUsedError
         else:
             self.db.execute(
-                "DELETE FROM classes WHERE id=?",
+                f"DELETE FROM {s}.classes WHERE id=?",
                 (id,),
             )
 
     def get_courses(self, event_id: int) -> list[CourseType]:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 id,
                 event_id,
@@ -382,7 +441,7 @@ class SqliteRepo(Repo):
                 length,
                 climb,
                 controls
-            FROM courses
+            FROM {s}.courses
             WHERE event_id=?
             ORDER BY name ASC""",
             (event_id,),
@@ -403,8 +462,9 @@ class SqliteRepo(Repo):
         return courses
 
     def get_course(self, id: int) -> CourseType:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 id,
                 event_id,
@@ -412,7 +472,7 @@ class SqliteRepo(Repo):
                 length,
                 climb,
                 controls
-            FROM courses WHERE id=?""",
+            FROM {s}.courses WHERE id=?""",
             (id,),
         )
         c = cur.fetchone()
@@ -439,10 +499,11 @@ class SqliteRepo(Repo):
         # check if the event still exists
         self.get_event(id=event_id)
 
+        s = self._schema(event_id)
         try:
             cur = self.db.execute(
-                """
-                INSERT into courses (
+                f"""
+                INSERT into {s}.courses (
                     event_id,
                     name,
                     length,
@@ -474,10 +535,11 @@ class SqliteRepo(Repo):
         climb: Optional[float],
         controls: list[str],
     ) -> None:
+        s = self._schema_of(id)
         try:
             cur = self.db.execute(
-                """
-                UPDATE courses SET
+                f"""
+                UPDATE {s}.courses SET
                     name=?,
                     length=?,
                     climb=?,
@@ -498,28 +560,30 @@ class SqliteRepo(Repo):
             raise ConstraintError("Course already exist")
 
     def delete_courses(self, event_id: int) -> None:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            "SELECT id FROM classes WHERE event_id=? and course_id is not null",
+            f"SELECT id FROM {s}.classes WHERE event_id=? and course_id is not null",
             (event_id,),
         )
         if cur.fetchone():
             raise CourseUsedError
         else:
             self.db.execute(
-                "DELETE FROM courses WHERE event_id=?",
+                f"DELETE FROM {s}.courses WHERE event_id=?",
                 (event_id,),
             )
 
     def delete_course(self, id: int) -> None:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            "SELECT id FROM classes WHERE course_id=?",
+            f"SELECT id FROM {s}.classes WHERE course_id=?",
             (id,),
         )
         if cur.fetchone():
             raise CourseUsedError
         else:
             self.db.execute(
-                "DELETE FROM courses WHERE id=?",
+                f"DELETE FROM {s}.courses WHERE id=?",
                 (id,),
             )
 
@@ -583,11 +647,7 @@ class SqliteRepo(Repo):
             "SELECT id FROM competitors WHERE club_id=?",
             (id,),
         )
-        cur2 = self.db.execute(
-            "SELECT id FROM entries WHERE club_id=?",
-            (id,),
-        )
-        if cur1.fetchone() or cur2.fetchone():
+        if cur1.fetchone() or self._used_by_entries(column="club_id", id=id):
             raise ClubUsedError
         else:
             self.db.execute(
@@ -778,11 +838,7 @@ class SqliteRepo(Repo):
             raise ConstraintError("Competitor already exist")
 
     def delete_competitor(self, id: int) -> None:
-        cur = self.db.execute(
-            "SELECT id FROM entries WHERE competitor_id=?",
-            (id,),
-        )
-        if cur.fetchone():
+        if self._used_by_entries(column="competitor_id", id=id):
             raise CompetitorUsedError
         else:
             self.db.execute(
@@ -828,8 +884,9 @@ class SqliteRepo(Repo):
                 raise
 
     def get_entries(self, event_id: int) -> list[EntryType]:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 entries.id,
                 entries.event_id,
@@ -847,9 +904,9 @@ class SqliteRepo(Repo):
                 entries.start,
                 entries.club_id,
                 clubs.name AS club_name
-            FROM entries
+            FROM {s}.entries
             LEFT JOIN competitors ON entries.competitor_id=competitors.id
-            LEFT JOIN classes ON entries.class_id=classes.id
+            LEFT JOIN {s}.classes ON entries.class_id=classes.id
             LEFT JOIN clubs ON entries.club_id=clubs.id
             WHERE entries.event_id=?
             ORDER BY
@@ -887,8 +944,9 @@ class SqliteRepo(Repo):
         return entries
 
     def get_entry(self, id: int) -> EntryType:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 entries.id,
                 entries.event_id,
@@ -906,9 +964,9 @@ class SqliteRepo(Repo):
                 entries.fields,
                 entries.result,
                 entries.start
-            FROM entries
+            FROM {s}.entries
             LEFT JOIN competitors ON entries.competitor_id=competitors.id
-            LEFT JOIN classes ON entries.class_id=classes.id
+            LEFT JOIN {s}.classes ON entries.class_id=classes.id
             LEFT JOIN clubs ON entries.club_id=clubs.id
             WHERE entries.id=?""",
             (id,),
@@ -942,10 +1000,11 @@ class SqliteRepo(Repo):
     def get_entry_ids_by_competitor(
         self, event_id: int, competitor_id: int
     ) -> list[int]:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT id
-            FROM entries
+            FROM {s}.entries
             WHERE event_id=? AND competitor_id=?""",
             (
                 event_id,
@@ -957,8 +1016,9 @@ class SqliteRepo(Repo):
     def get_entries_by_name(
         self, event_id: int, first_name: str, last_name: str
     ) -> list[EntryType]:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
+            f"""
             SELECT
                 entries.id,
                 entries.event_id,
@@ -976,9 +1036,9 @@ class SqliteRepo(Repo):
                 entries.fields,
                 entries.result,
                 entries.start
-            FROM entries
+            FROM {s}.entries
             LEFT JOIN competitors ON entries.competitor_id=competitors.id
-            LEFT JOIN classes ON entries.class_id=classes.id
+            LEFT JOIN {s}.classes ON entries.class_id=classes.id
             LEFT JOIN clubs ON entries.club_id=clubs.id
             WHERE entries.event_id=?
                 AND competitors.first_name=?
@@ -1029,9 +1089,10 @@ class SqliteRepo(Repo):
         result: result_type.PersonRaceResult,
         start: start_type.PersonRaceStart,
     ) -> int:
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
-            INSERT into entries (
+            f"""
+            INSERT into {s}.entries (
                 event_id,
                 competitor_id,
                 class_id,
@@ -1070,9 +1131,10 @@ class SqliteRepo(Repo):
         # check if the event still exists
         self.get_event(id=event_id)
 
+        s = self._schema(event_id)
         cur = self.db.execute(
-            """
-            INSERT into entries (
+            f"""
+            INSERT into {s}.entries (
                 event_id,
                 competitor_id,
                 class_id,
@@ -1112,9 +1174,10 @@ class SqliteRepo(Repo):
         result: result_type.PersonRaceResult,
         start: start_type.PersonRaceStart,
     ) -> None:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            """
-            UPDATE entries SET
+            f"""
+            UPDATE {s}.entries SET
                 class_id=?,
                 club_id=?,
                 not_competing=?,
@@ -1144,9 +1207,10 @@ class SqliteRepo(Repo):
         result: result_type.PersonRaceResult,
         start: start_type.PersonRaceStart,
     ) -> None:
+        s = self._schema_of(id)
         cur = self.db.execute(
-            """
-            UPDATE entries SET
+            f"""
+            UPDATE {s}.entries SET
                 chip=?,
                 result=?,
                 start=?
@@ -1162,21 +1226,23 @@ class SqliteRepo(Repo):
             raise KeyError
 
     def delete_entries(self, event_id: int) -> None:
+        s = self._schema(event_id)
         self.db.execute(
-            "DELETE FROM entries WHERE event_id=?",
+            f"DELETE FROM {s}.entries WHERE event_id=?",
             (event_id,),
         )
 
     def delete_entry(self, id: int) -> None:
+        s = self._schema_of(id)
         self.db.execute(
-            "DELETE FROM entries WHERE id=?",
+            f"DELETE FROM {s}.entries WHERE id=?",
             (id,),
         )
 
     def add_many_entries(self, list_of_entries: list[EntryBaseDataType]) -> None:
-        entries = []
+        entries: dict[str, list[tuple]] = {}
         for e in list_of_entries:
-            entries.append(
+            entries.setdefault(self._schema(e.event_id), []).append(
                 (
                     e.event_id,
                     e.competitor_id,
@@ -1190,10 +1256,10 @@ class SqliteRepo(Repo):
                 )
             )
 
-        if entries:
+        for s, values in entries.items():
             self.db.executemany(
-                """
-                INSERT into entries (
+                f"""
+                INSERT into {s}.entries (
                     event_id,
                     competitor_id,
                     class_id,
@@ -1205,7 +1271,7 @@ class SqliteRepo(Repo):
                     fields
                 )
                 VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?)""",
-                entries,
+                values,
             )
 
     def get_events(self) -> list[EventType]:
@@ -1383,6 +1449,123 @@ class SqliteRepo(Repo):
             (id,),
         )
 
+    def get_event_rows(self, event_id: int) -> dict[str, list[dict]]:
+        # check if the event still exists
+        self.get_event(id=event_id)
+
+        s = self._schema(event_id)
+        queries = {
+            "events": "FROM events WHERE id=?",
+            "clubs": f"""
+                FROM clubs WHERE id IN (
+                    SELECT club_id FROM {s}.entries WHERE event_id=?
+                    UNION
+                    SELECT competitors.club_id FROM competitors
+                    JOIN {s}.entries ON entries.competitor_id = competitors.id
+                    WHERE entries.event_id=?
+                )""",
+            "competitors": f"""
+                FROM competitors WHERE id IN (
+                    SELECT competitor_id FROM {s}.entries WHERE event_id=?
+                )""",
+            "courses": f"FROM {s}.courses WHERE event_id=?",
+            "classes": f"FROM {s}.classes WHERE event_id=?",
+            "entries": f"FROM {s}.entries WHERE event_id=?",
+        }
+        rows = {}
+        for table, columns in EVENT_ROWS_COLUMNS.items():
+            query = queries[table]
+            cur = self.db.execute(
+                f"SELECT id, {', '.join(columns)} {query} ORDER BY id",
+                (event_id,) * query.count("?"),
+            )
+            rows[table] = [dict(row) for row in cur]
+        return rows
+
+    def add_event_rows(self, rows: dict[str, list[dict]]) -> int:
+        def values(table: str, row: dict, **mapped: Optional[int]) -> tuple:
+            return tuple(
+                mapped[c] if c in mapped else row[c] for c in EVENT_ROWS_COLUMNS[table]
+            )
+
+        def insert(table: str, schema: str = "main") -> str:
+            columns = EVENT_ROWS_COLUMNS[table]
+            return (
+                f"INSERT INTO {schema}.{table} ({', '.join(columns)}) "
+                f"VALUES({', '.join('?' * len(columns))})"
+            )
+
+        (event,) = rows["events"]
+        try:
+            cur = self.db.execute(insert("events"), values("events", event))
+        except sqlite3.IntegrityError:
+            raise ConstraintError("Event or event key already exist")
+        if cur.lastrowid is None:
+            raise DatabaseError("cursor.lastrowid is None")
+        event_id = cur.lastrowid
+
+        # clubs and competitors already stored are used unchanged
+        self.db.executemany(
+            "INSERT OR IGNORE INTO clubs (name) VALUES(?)",
+            [(c["name"],) for c in rows["clubs"]],
+        )
+        club_ids = {
+            c["name"]: c["id"] for c in self.db.execute("SELECT id, name FROM clubs")
+        }
+        clubs = {None: None} | {c["id"]: club_ids[c["name"]] for c in rows["clubs"]}
+
+        self.db.executemany(
+            insert("competitors").replace("INSERT", "INSERT OR IGNORE", 1),
+            [
+                values("competitors", c, club_id=clubs[c["club_id"]])
+                for c in rows["competitors"]
+            ],
+        )
+        competitor_ids = {
+            (c["first_name"], c["last_name"]): c["id"]
+            for c in self.db.execute(
+                "SELECT id, first_name, last_name FROM competitors"
+            )
+        }
+        competitors = {None: None} | {
+            c["id"]: competitor_ids[(c["first_name"], c["last_name"])]
+            for c in rows["competitors"]
+        }
+
+        s = self._schema(event_id)
+        courses: dict[Optional[int], Optional[int]] = {None: None}
+        for c in rows["courses"]:
+            cur = self.db.execute(
+                insert("courses", s), values("courses", c, event_id=event_id)
+            )
+            courses[c["id"]] = cur.lastrowid
+
+        classes: dict[Optional[int], Optional[int]] = {None: None}
+        for c in rows["classes"]:
+            cur = self.db.execute(
+                insert("classes", s),
+                values(
+                    "classes", c, event_id=event_id, course_id=courses[c["course_id"]]
+                ),
+            )
+            classes[c["id"]] = cur.lastrowid
+
+        self.db.executemany(
+            insert("entries", s),
+            [
+                values(
+                    "entries",
+                    e,
+                    event_id=event_id,
+                    competitor_id=competitors[e["competitor_id"]],
+                    class_id=classes[e["class_id"]],
+                    club_id=clubs[e["club_id"]],
+                )
+                for e in rows["entries"]
+            ],
+        )
+        return event_id
+
     def get_series_settings(self) -> series_type.Settings:
         cur = self.db.execute(
             """
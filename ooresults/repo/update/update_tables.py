@@ -19,6 +19,7 @@
 
 import logging
 import sqlite3
+from collections.abc import Callable
 
 from ooresults.repo.update import update_013
 from ooresults.repo.update import update_014
@@ -27,6 +28,12 @@ from ooresults.repo.update import update_015
 
 VERSION = 15
 
+# The event databases of the sharded storage exist since version 15.
+# An update of a later version that changes the tables of the courses,
+# classes or entries adds a step updating an event database here.
+FIRST_SHARD_VERSION = 15
+SHARD_UPDATES: dict[int, Callable[[sqlite3.Connection], None]] = {}
+
 
 def update_tables(db: sqlite3.Connection) -> None:
     db.execute("BEGIN EXCLUSIVE TRANSACTION")
@@ -67,3 +74,27 @@ def update_tables(db: sqlite3.Connection) -> None:
             logging.info(f"DB updated to version {VERSION}")
         else:
             db.rollback()
+
+
+def update_shard_tables(db: sqlite3.Connection) -> None:
+    """Update an event database of the sharded storage to VERSION."""
+    db.execute("BEGIN EXCLUSIVE TRANSACTION")
+    try:
+        (version,) = db.execute("SELECT value FROM version").fetchone()
+        if version > VERSION:
+            raise RuntimeError(
+                f"DB version to high - version = {version}, but must be at most {VERSION}"
+            )
+        if version < FIRST_SHARD_VERSION:
+            raise RuntimeError(
+                f"DB version to low - version = {version}, but must be at least {FIRST_SHARD_VERSION}"
+            )
+        for v in range(version + 1, VERSION + 1):
+            if v in SHARD_UPDATES:
+                logging.info(f"Update event DB to version {v} ...")
+                SHARD_UPDATES[v](db)
+        db.execute("UPDATE version SET value=?", (VERSION,))
+        db.commit()
+    except:
+        db.rollback()
+        raise
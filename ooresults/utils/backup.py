@@ -0,0 +1,235 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import contextlib
+import dataclasses
+import datetime
+import logging
+import pathlib
+import shutil
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import Scheduler
+from ooresults.utils.scheduler import scheduler
+
+
+"""
+Online backup of the database.
+
+A backup thread copies the database every interval seconds into the
+backup directory with the backup API of SQLite. The pages are copied in
+steps of a few pages, the source database is only locked during a step.
+Each step runs in a slot of the background priority, so it waits while
+card readouts are stored. Between the steps the backup sleeps for
+step_delay seconds without holding a slot, so a writer is never blocked
+for longer than one step.
+
+If the database is changed by another connection during the backup,
+SQLite restarts the backup with the next step. After each restart the
+delay before the next step is doubled up to MAX_STEP_DELAY seconds.
+During an event every stored card readout restarts the backup, so after
+max_restarts restarts the pages are copied in one final step. This step
+runs in a background slot too, it starts when no readout is stored and
+lasts a few milliseconds per megabyte.
+
+The copy is written to a file with the suffix .part, checked with
+PRAGMA integrity_check and then renamed to <name>-<timestamp>.sqlite.
+Only the newest keep backups are kept.
+
+With the sharded storage the databases of the events in the directory
+shards are copied into the directory <name>-<timestamp>-events.
+"""
+
+
+MAX_RESTARTS = 10
+MAX_STEP_DELAY = 1.0
+
+
+class _Restart(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class BackupMetrics:
+    backups: int = 0
+    failed: int = 0
+    restarts: int = 0
+    last_backup: Optional[str] = None
+    last_duration: float = 0.0
+    max_step_time: float = 0.0
+
+
+class BackupScheduler:
+    def __init__(
+        self,
+        database: pathlib.Path,
+        path: pathlib.Path,
+        shards: Optional[pathlib.Path] = None,
+        interval: float = 300,
+        keep: int = 10,
+        pages: int = 100,
+        step_delay: float = 0.005,
+        max_restarts: int = MAX_RESTARTS,
+        scheduler: Scheduler = scheduler,
+    ) -> None:
+        self.database = database
+        self.path = path
+        self.shards = shards
+        self.interval = interval
+        self.keep = keep
+        self.pages = pages
+        self.step_delay = step_delay
+        self.max_restarts = max_restarts
+        self.scheduler = scheduler
+        self.lock = threading.Lock()
+        self._metrics = BackupMetrics()
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="backup", daemon=True)
+        self.thread.start()
+
+    def run(self) -> None:
+        while not self.stopped.wait(timeout=self.interval):
+            try:
+                self.backup()
+            except Exception:
+                logging.exception("Backup of the database failed")
+                with self.lock:
+                    self._metrics.failed += 1
+
+    def backup(self) -> pathlib.Path:
+        """Copy the database into the backup directory and return the copy."""
+        self.path.mkdir(parents=True, exist_ok=True)
+        timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        target = self.path / f"{self.database.stem}-{timestamp}.sqlite"
+
+        t1 = time.monotonic()
+        restarts = 0
+        max_step_time = 0.0
+        if self.shards is not None:
+            # the event databases are copied before the catalogue, so the
+            # copy of the catalogue contains all competitors and clubs used
+            events = self.path / f"{target.stem}-events"
+            events.mkdir()
+            try:
+                for shard in sorted(self.shards.glob("event_*.sqlite")):
+                    r, t = self.copy(source=shard, target=events / shard.name)
+                    restarts += r
+                    max_step_time = max(max_step_time, t)
+            except BaseException:
+                shutil.rmtree(events, ignore_errors=True)
+                raise
+        r, t = self.copy(source=self.database, target=target)
+        restarts += r
+        max_step_time = max(max_step_time, t)
+
+        self.rotate()
+        with self.lock:
+            self._metrics.backups += 1
+            self._metrics.restarts += restarts
+            self._metrics.last_backup = target.name
+            self._metrics.last_duration = time.monotonic() - t1
+            self._metrics.max_step_time = max(
+                self._metrics.max_step_time, max_step_time
+            )
+        logging.info(f"Backup {target} created")
+        return target
+
+    def copy(self, source: pathlib.Path, target: pathlib.Path) -> tuple[int, float]:
+        """Copy one database file and return the restarts and the longest step."""
+        part = target.with_name(target.name + ".part")
+        restarts = 0
+        max_step_time = 0.0
+        remaining = None
+        step_start = 0.0
+        # the slot of the current step
+        slot = contextlib.ExitStack()
+
+        def next_step(delay: float) -> None:
+            nonlocal step_start
+            slot.close()
+            time.sleep(delay)
+            slot.enter_context(self.scheduler.slot(Priority.BACKGROUND))
+            step_start = time.monotonic()
+
+        def progress(status: int, pages_remaining: int, pages_total: int) -> None:
+            nonlocal restarts, max_step_time, remaining
+            max_step_time = max(max_step_time, time.monotonic() - step_start)
+            delay = self.step_delay
+            # the backup restarts if the database was changed by another connection
+            if remaining is not None and pages_remaining >= remaining:
+                restarts += 1
+                if restarts >= self.max_restarts:
+                    raise _Restart
+                delay = min(self.step_delay * 2**restarts, MAX_STEP_DELAY)
+            remaining = pages_remaining
+            if pages_remaining > 0:
+                next_step(delay=delay)
+
+        source_db = sqlite3.connect(f"{source.absolute().as_uri()}?mode=ro", uri=True)
+        try:
+            target_db = sqlite3.connect(part)
+            try:
+                try:
+                    with slot:
+                        next_step(delay=0)
+                        source_db.backup(target_db, pages=self.pages, progress=progress)
+                except _Restart:
+                    with slot:
+                        next_step(delay=self.step_delay)
+                        source_db.backup(target_db)
+                        max_step_time = max(
+                            max_step_time, time.monotonic() - step_start
+                        )
+                (result,) = target_db.execute("PRAGMA integrity_check").fetchone()
+            finally:
+                target_db.close()
+            if result != "ok":
+                raise RuntimeError(f"Integrity check of the backup failed: {result}")
+            part.replace(target)
+        finally:
+            source_db.close()
+            part.unlink(missing_ok=True)
+        return restarts, max_step_time
+
+    def rotate(self) -> None:
+        """Delete all but the newest keep backups."""
+        backups = sorted(self.path.glob(f"{self.database.stem}-*.sqlite"))
+        for backup in backups[: -self.keep]:
+            backup.unlink()
+            shutil.rmtree(backup.with_name(f"{backup.stem}-events"), ignore_errors=True)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            m = dataclasses.replace(self._metrics)
+        return {
+            "backups": m.backups,
+            "failed": m.failed,
+            "restarts": m.restarts,
+            "last_backup": m.last_backup,
+            "last_duration": round(m.last_duration, 3),
+            "max_step_time": round(m.max_step_time, 3),
+        }
+
+    def close(self) -> None:
+        self.stopped.set()
+        self.thread.join(timeout=5)
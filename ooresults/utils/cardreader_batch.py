@@ -0,0 +1,83 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from typing import Optional
+
+
+"""
+Batches of card reads sent by ooresults-reader to /cardreader.
+
+The reader offers batches with the header X-Batch, its value is the
+maximal number of card reads per frame. The server answers with the
+number of card reads it accepts per frame. Without the header in the
+handshake response the reader sends single card reads as before.
+
+A batch is a JSON object
+
+    {"batch": [{"seq": 17, "item": {card read}}, ...]}
+
+The server stores all card reads of a batch in one transaction and
+acknowledges each card read with its sequence number:
+
+    {"acks": [{"seq": 17, "readerStatus": "cardRead", ...},
+              {"seq": 18, "rejected": "reason"}]}
+
+Card reads that can not be parsed, whose event does not exist or that
+exceed the accepted number of card reads per frame (TOO_LARGE) are
+rejected and not stored. Card reads without acknowledgement may be
+sent again, storing a card read twice does not change the results.
+"""
+
+
+HEADER = "X-Batch"
+
+# reason of the card reads rejected because they exceed the batch size
+TOO_LARGE = "batch too large"
+
+# maximal number of card reads per frame accepted by the server
+MAX_ITEMS = 500
+
+
+def select(value: Optional[str]) -> Optional[int]:
+    """Return the number of card reads per frame accepted by the server.
+
+    Returns None if the client does not offer batches.
+    """
+    if value is None:
+        return None
+    try:
+        number = int(value)
+    except ValueError:
+        return None
+    return min(number, MAX_ITEMS) if number > 0 else None
+
+
+def accepted(value: Optional[str]) -> int:
+    """Return the batch size of the handshake response, 0 if not supported."""
+    if value is None:
+        return 0
+    try:
+        return max(int(value), 0)
+    except ValueError:
+        return 0
+
+
+def batch(items: list[tuple[int, dict]]) -> dict:
+    """Return the frame for the card reads (seq, item)."""
+    return {"batch": [{"seq": seq, "item": item} for seq, item in items]}
@@ -0,0 +1,120 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import bz2
+import lzma
+import zlib
+from collections.abc import Iterable
+from enum import Enum
+from typing import Optional
+
+
+"""
+Compression of the binary websocket messages.
+
+A client offers the encodings it supports in the HTTP header X-Encoding
+of the websocket handshake, e.g. "X-Encoding: lzma, zlib, bz2". The server
+selects the first encoding of the offer it supports and returns it in the
+X-Encoding header of the handshake response. If the client offers no
+encoding or the server returns no encoding, bz2 is used. This is the
+encoding used by all versions of ooresults without encoding negotiation.
+"""
+
+
+class Encoding(Enum):
+    BZ2 = "bz2"
+    ZLIB = "zlib"
+    LZMA = "lzma"
+
+
+HEADER = "X-Encoding"
+
+DEFAULT_ENCODING = Encoding.BZ2
+
+# encodings offered by ooresults-reader for card reads (small messages)
+CARDREADER_ENCODINGS = [Encoding.ZLIB, Encoding.BZ2]
+
+# encodings offered for streamed result lists (large messages)
+STREAMING_ENCODINGS = [Encoding.LZMA, Encoding.ZLIB, Encoding.BZ2]
+
+
+def compress(data: bytes, encoding: Encoding = DEFAULT_ENCODING) -> bytes:
+    if encoding == Encoding.ZLIB:
+        return zlib.compress(data, level=6)
+    elif encoding == Encoding.LZMA:
+        return lzma.compress(data, preset=1)
+    else:
+        return bz2.compress(data)
+
+
+def compress_chunks(
+    chunks: bytes | Iterable[bytes], encoding: Encoding = DEFAULT_ENCODING
+) -> bytes:
+    """Compress data given in chunks, the result equals compress of the joined data."""
+    if isinstance(chunks, bytes):
+        return compress(chunks, encoding=encoding)
+    if encoding == Encoding.ZLIB:
+        z = zlib.compressobj(level=6)
+        return b"".join([z.compress(chunk) for chunk in chunks] + [z.flush()])
+    elif encoding == Encoding.LZMA:
+        x = lzma.LZMACompressor(preset=1)
+        return b"".join([x.compress(chunk) for chunk in chunks] + [x.flush()])
+    else:
+        b = bz2.BZ2Compressor()
+        return b"".join([b.compress(chunk) for chunk in chunks] + [b.flush()])
+
+
+def decompress(data: bytes, encoding: Encoding = DEFAULT_ENCODING) -> bytes:
+    if encoding == Encoding.ZLIB:
+        return zlib.decompress(data)
+    elif encoding == Encoding.LZMA:
+        return lzma.decompress(data)
+    else:
+        return bz2.decompress(data)
+
+
+def offer(encodings: Iterable[Encoding]) -> str:
+    """Return the value of the X-Encoding header sent by a client."""
+    return ", ".join(e.value for e in encodings)
+
+
+def select(value: Optional[str]) -> Optional[Encoding]:
+    """Select the encoding used by the server.
+
+    Returns the first supported encoding of the X-Encoding header sent by
+    the client or None if the client offers no supported encoding.
+    """
+    if value is not None:
+        for item in value.split(","):
+            try:
+                return Encoding(item.strip().lower())
+            except ValueError:
+                pass
+    return None
+
+
+def accepted(value: Optional[str]) -> Encoding:
+    """Return the encoding of the X-Encoding header of the handshake response.
+
+    Possible errors:
+    - ValueError, if the encoding is not supported
+    """
+    if value is None:
+        return DEFAULT_ENCODING
+    return Encoding(value.strip().lower())
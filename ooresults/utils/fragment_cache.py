@@ -0,0 +1,71 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import threading
+import typing
+from collections import OrderedDict
+from collections.abc import Callable
+from collections.abc import Hashable
+
+
+"""
+LRU cache of rendered HTML fragments.
+
+A fragment is stored under a fingerprint of the data it was rendered
+from. A fragment is therefore never invalidated; a change of the data
+results in a new fingerprint and the unused fragment is evicted later.
+
+The fingerprints are large tuples, they are hashed only once for each
+lookup. The fingerprint is stored with the fragment and compared on a
+hit to detect hash collisions.
+"""
+
+
+class FragmentCache:
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self.lock = threading.Lock()
+        self.cache: typing.OrderedDict[int, tuple[Hashable, str]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> str:
+        h = hash(key)
+        with self.lock:
+            item = self.cache.get(h, None)
+            if item is not None and item[0] == key:
+                self.cache.move_to_end(key=h)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+
+        fragment = render()
+
+        with self.lock:
+            self.cache[h] = (key, fragment)
+            self.cache.move_to_end(key=h)
+            while len(self.cache) > self.max_size:
+                self.cache.popitem(last=False)
+        return fragment
+
+    def clear(self) -> None:
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
@@ -44,6 +44,7 @@ STREAMING_STATUS = {
     streaming_status.Status.INTERNAL_ERROR: "Internal error",
     streaming_status.Status.PROTOCOL_ERROR: "Protocol error",
     streaming_status.Status.EVENT_NOT_FOUND: "Event not found",
+    streaming_status.Status.EVENT_EXISTS: "Event name already used",
     streaming_status.Status.ERROR: "Error",
     streaming_status.Status.OK: "Ok",
 }
@@ -0,0 +1,184 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import hashlib
+import json
+import pathlib
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.course_type import CourseType
+from ooresults.otypes.entry_type import EntryType
+from ooresults.otypes.event_type import EventType
+
+
+"""
+Snapshot of an event used by ooresults-reader to preview results.
+
+The snapshot contains the entries by control card, the parameters and the
+controls of the classes. With it the reader computes the result of a read
+control card itself and gives feedback to the runner without waiting for
+the server. The answer of the server remains authoritative, the reader
+reports a preview differing from it.
+
+The server returns the snapshot of the event given by the header
+"X-Event-Key" at https://<host>:8081/snapshot. The key "version" is a
+digest of the content, a request with the header "If-None-Match: <version>"
+is answered with 304 if the snapshot is unchanged.
+
+    {"format": int, "version": str, "event": str,
+     "classes": {class id: {"name": str, "params": dict, "controls": [str]}},
+     "entries": {control card: [entry]}}
+
+entry:
+
+    {"firstName": str, "lastName": str, "club": str, "classId": int,
+     "startTime": str, "year": int, "gender": str}
+"""
+
+
+VERSION = 1
+
+PATH = "/snapshot"
+
+
+def snapshot(
+    event: EventType,
+    classes: list[ClassInfoType],
+    courses: list[CourseType],
+    entries: list[EntryType],
+) -> dict:
+    controls = {c.id: c.controls for c in courses}
+    by_card: dict[str, list[dict]] = {}
+    for e in entries:
+        # only entries assigned to a class get a computed result
+        if e.chip and e.class_id is not None:
+            start_time = e.start.start_time
+            by_card.setdefault(e.chip, []).append(
+                {
+                    "firstName": e.first_name,
+                    "lastName": e.last_name,
+                    "club": e.club_name,
+                    "classId": e.class_id,
+                    "startTime": start_time.isoformat() if start_time else None,
+                    "year": e.year,
+                    "gender": e.gender,
+                }
+            )
+    data = {
+        "format": VERSION,
+        "event": event.name,
+        "classes": {
+            str(c.id): {
+                "name": c.name,
+                "params": c.params.to_dict(),
+                "controls": (
+                    controls.get(c.course_id, []) if c.course_id is not None else []
+                ),
+            }
+            for c in classes
+        },
+        "entries": by_card,
+    }
+    data["version"] = hashlib.blake2b(
+        json.dumps(data, sort_keys=True).encode(), digest_size=8
+    ).hexdigest()
+    return data
+
+
+def differs(preview: dict, reply: dict) -> bool:
+    """Return True if the preview of a card read differs from the server reply."""
+    keys = ("status", "time", "missingControls", "error")
+    return any(preview.get(k) != reply.get(k) for k in keys)
+
+
+class Preview(threading.Thread):
+    """Snapshot of an event kept up to date by ooresults-reader.
+
+    The snapshot is downloaded every interval seconds and cached in a
+    file, so a restarted reader previews results without a connection.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        key: str,
+        path: Optional[pathlib.Path] = None,
+        ssl_context: Optional[ssl.SSLContext] = None,
+        interval: float = 60,
+    ) -> None:
+        super().__init__()
+        self.daemon = True
+        self.url = url
+        self.key = key
+        self.path = path
+        self.ssl_context = ssl_context
+        self.interval = interval
+        self.snapshot: Optional[dict] = None
+        self.stopped = threading.Event()
+        if self.path is not None and self.path.exists():
+            try:
+                self.snapshot = self.check(json.loads(self.path.read_text()))
+            except ValueError:
+                self.snapshot = None
+
+    @staticmethod
+    def check(data: dict) -> Optional[dict]:
+        return data if data.get("format") == VERSION else None
+
+    def refresh(self) -> bool:
+        """Download the snapshot, return True if it has changed."""
+        headers = {"X-Event-Key": self.key}
+        if self.snapshot is not None:
+            headers["If-None-Match"] = self.snapshot["version"]
+        request = urllib.request.Request(url=self.url, headers=headers)
+        try:
+            with urllib.request.urlopen(
+                request, context=self.ssl_context, timeout=10
+            ) as response:
+                data = self.check(json.loads(response.read()))
+        except urllib.error.HTTPError as e:
+            if e.code != 304:
+                print(f"Snapshot not available: {e}")
+            return False
+        except (urllib.error.URLError, OSError, ValueError) as e:
+            print(f"Snapshot not available: {e}")
+            return False
+
+        if data is None:
+            print("Snapshot format not supported")
+            return False
+        self.snapshot = data
+        if self.path is not None:
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(data))
+            tmp.replace(self.path)
+        return True
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            self.refresh()
+            self.stopped.wait(self.interval)
+
+    def stop(self) -> None:
+        self.stopped.set()
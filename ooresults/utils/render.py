@@ -17,6 +17,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import datetime
 import pathlib
 from typing import Optional
 
@@ -32,11 +33,16 @@ from ooresults.otypes.entry_type import RankedEntryType
 from ooresults.otypes.event_type import EventType
 from ooresults.otypes.series_type import PersonSeriesResult
 from ooresults.otypes.series_type import Settings
+from ooresults.utils.fragment_cache import FragmentCache
+from ooresults.utils.globals import build_columns
 from ooresults.websocket_server.streaming_status import Status
 
 
 EXPERIMENTAL = False
 
+# port of the websocket server, used by the pages to connect to it
+websocket_port = 8081
+
 
 _templates = pathlib.Path(__file__).resolve().parent.parent / "templates"
 
@@ -92,9 +98,47 @@ _series_tab_content = t("series_tab_content.html")
 _series_table = t("series_table.html")
 _unauthorized = t("unauthorized.html")
 
+# rendered classes of the results tables and rendered groups of the entries tables
+fragments = FragmentCache(max_size=2000)
+
+
+def _time_fingerprint(time: Optional[datetime.datetime]) -> Optional[tuple]:
+    # comparing datetimes with different tzinfo objects is slow, the hash
+    # of a datetime is computed only once
+    if time is None:
+        return None
+    return hash(time), time.utcoffset()
+
+
+def _entry_fingerprint(ranked_entry: RankedEntryType) -> tuple:
+    # contains all values of an entry used by the templates
+    entry = ranked_entry.entry
+    result = entry.result
+    return (
+        ranked_entry.rank,
+        entry.id,
+        entry.first_name,
+        entry.last_name,
+        entry.gender,
+        entry.year,
+        entry.chip,
+        entry.club_name,
+        entry.class_name,
+        entry.not_competing,
+        tuple(entry.fields.items()),
+        _time_fingerprint(entry.start.start_time),
+        result.status.value,
+        result.time,
+        _time_fingerprint(result.start_time),
+        _time_fingerprint(result.finish_time),
+        tuple(result.extensions.items()),
+    )
+
 
-def si1_page(event: Optional[EventType], view: int) -> str:
-    return _si__si1_page.render(event=event, view=view)
+def si1_page(event: Optional[EventType], view: int, format: str = "json") -> str:
+    return _si__si1_page.render(
+        event=event, view=view, format=format, websocket_port=websocket_port
+    )
 
 
 def si1_data(message: dict) -> str:
@@ -112,6 +156,14 @@ def si1_results(
     return _si__si1_results.render(event=event, class_results=class_results)
 
 
+def si1_class_result(
+    class_: ClassInfoType, ranked_results: list[RankedEntryType], columns: set[str]
+) -> str:
+    return _si__si1_results.get_def("class_result").render(
+        class_=class_, ranked_results=ranked_results, columns=columns
+    )
+
+
 def classes_table(event: Optional[EventType], classes: list[ClassInfoType]) -> str:
     return _classes_table.render(event=event, classes=classes)
 
@@ -153,8 +205,33 @@ def entries_table(
     view_entries_list: list[tuple[Optional[str], list[RankedEntryType]]],
     columns: set[str],
 ) -> str:
+    number_of_fields = len(event.fields) if event is not None else 0
+    group = _entries_table.get_def("group")
+    content = []
+    for group_name, ranked_entries in view_entries_list:
+        if ranked_entries:
+            key = (
+                "entries",
+                view,
+                frozenset(columns),
+                number_of_fields,
+                group_name,
+                tuple(_entry_fingerprint(e) for e in ranked_entries),
+            )
+            content.append(
+                fragments.get(
+                    key=key,
+                    render=lambda: group.render(
+                        view=view,
+                        columns=columns,
+                        number_of_fields=number_of_fields,
+                        group_name=group_name,
+                        ranked_entries=ranked_entries,
+                    ),
+                )
+            )
     return _entries_table.render(
-        event=event, view=view, view_entries_list=view_entries_list, columns=columns
+        event=event, view=view, columns=columns, fragments=content
     )
 
 
@@ -209,9 +286,24 @@ def reader_table(
     stream_status: Optional[Status],
     event: EventType,
     messages: list[dict],
+    older: bool = False,
 ) -> str:
     return _reader_table.render(
-        status=status, stream_status=stream_status, event=event, messages=messages
+        status=status,
+        stream_status=stream_status,
+        event=event,
+        messages=messages,
+        older=older,
+    )
+
+
+def reader_row(message: dict) -> str:
+    return _reader_table.get_def("row").render(result=message)
+
+
+def reader_status(status: Optional[str], stream_status: Optional[Status]) -> str:
+    return _reader_table.get_def("status_table").render(
+        status=status, stream_status=stream_status
     )
 
 
@@ -219,7 +311,28 @@ def results_table(
     event: EventType,
     class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
 ) -> str:
-    return _results_table.render(event=event, class_results=class_results)
+    columns = build_columns(class_results=class_results)
+    class_result = _results_table.get_def("class_result")
+    content = []
+    for class_, ranked_results in class_results:
+        if ranked_results:
+            key = (
+                "results",
+                frozenset(columns),
+                class_.name,
+                class_.params.otype,
+                tuple(ranked_results[0].entry.result.voided_legs()),
+                tuple(_entry_fingerprint(e) for e in ranked_results),
+            )
+            content.append(
+                fragments.get(
+                    key=key,
+                    render=lambda: class_result.render(
+                        class_=class_, ranked_results=ranked_results, columns=columns
+                    ),
+                )
+            )
+    return _results_table.render(event=event, fragments=content)
 
 
 def series_table(
@@ -237,7 +350,7 @@ def unauthorized() -> str:
 
 
 def demo_reader() -> str:
-    return _demo_reader.render()
+    return _demo_reader.render(websocket_port=websocket_port)
 
 
 def root(results_table: Optional[str]) -> str:
@@ -248,14 +361,14 @@ def main(events: list[EventType]) -> str:
     events_table = _events_table.render(events=events)
     events_tab = _events_tab_content.render(events_table=events_table)
     entries_table = _entries_table.render(
-        event=None, view="entries", view_entries_list=[], columns=set()
+        event=None, view="entries", columns=set(), fragments=[]
     )
     entries_tab = _entries_tab_content.render(entries_table=entries_table)
     classes_table = _classes_table.render(event=None, classes=[])
     classes_tab = _classes_tab_content.render(classes_table=classes_table)
     courses_table = _courses_table.render(event=None, courses=[])
     courses_tab = _courses_tab_content.render(courses_table=courses_table)
-    results_table = _results_table.render(event=None, class_results=[])
+    results_table = _results_table.render(event=None, fragments=[])
     results_tab = _results_tab_content.render(results=results_table)
     series_table = _series_table.render(events=[], results=[])
     series_tab = _series_tab_content.render(results=series_table)
@@ -265,7 +378,7 @@ def main(events: list[EventType]) -> str:
     )
     clubs_table = _clubs_table.render(clubs=[])
     clubs_tab = _clubs_tab_content.render(clubs_table=clubs_table)
-    reader_tab = _reader_tab_content.render()
+    reader_tab = _reader_tab_content.render(websocket_port=websocket_port)
     page = _main.render(
         events_tab_content=events_tab,
         entries_tab_content=entries_tab,
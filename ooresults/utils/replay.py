@@ -0,0 +1,224 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import dataclasses
+import datetime
+import json
+import pathlib
+import ssl
+import time
+from typing import Optional
+
+import jsonschema
+import websockets.exceptions
+from websockets.asyncio.client import ClientConnection
+from websockets.asyncio.client import connect
+
+from ooresults.utils import cardreader_batch
+from ooresults.utils import compression
+
+
+"""
+Non-interactive replay of a cardreader log file.
+
+The card reads of the log file are sent to /cardreader with full speed,
+with the original timing of the readouts or with a scaled rate. Several
+connections send card reads concurrently, each connection sends up to
+batch_size card reads per frame if the server supports batches.
+
+Used to re-feed the card reads of a day into a new server and as a load
+test of storing card reads.
+"""
+
+
+@dataclasses.dataclass
+class ReplayStats:
+    items: int = 0
+    stored: int = 0
+    rejected: int = 0
+    errors: int = 0
+    duration: float = 0.0
+    latencies: list[float] = dataclasses.field(default_factory=list)
+
+    def percentile(self, p: float) -> float:
+        if not self.latencies:
+            return 0.0
+        values = sorted(self.latencies)
+        return values[min(len(values) - 1, int(p * len(values)))]
+
+    def summary(self) -> str:
+        throughput = self.stored / self.duration if self.duration else 0.0
+        return (
+            f"{self.items} card reads, {self.stored} stored, "
+            f"{self.rejected} rejected, {self.errors} errors, "
+            f"{self.duration:.1f} s, {throughput:.1f} card reads/s, latency "
+            f"p50 {1000 * self.percentile(0.50):.0f} ms, "
+            f"p95 {1000 * self.percentile(0.95):.0f} ms, "
+            f"p99 {1000 * self.percentile(0.99):.0f} ms"
+        )
+
+
+def read_log(path: pathlib.Path, schema: Optional[dict] = None) -> list[dict]:
+    """Return the card reads of a cardreader log file."""
+    items = []
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                if schema is not None:
+                    jsonschema.validate(item, schema)
+                items.append(item)
+    return items
+
+
+def schedule(items: list[dict], rate: float) -> list[float]:
+    """Return the send times of the card reads relative to the start.
+
+    With rate 0 all card reads are sent immediately, with rate 1 at the
+    original times of the readouts, with rate 2 twice as fast.
+    """
+    if rate <= 0 or not items:
+        return [0.0] * len(items)
+    times = [datetime.datetime.fromisoformat(item["entryTime"]) for item in items]
+    first = min(times)
+    return [(t - first).total_seconds() / rate for t in times]
+
+
+async def send_frame(
+    websocket: ClientConnection,
+    items: list[dict],
+    encoding: compression.Encoding,
+    batched: bool,
+    seq: int,
+) -> list[dict]:
+    """Send the card reads, return the replies in the order of the items."""
+    if batched:
+        numbered = list(enumerate(items, start=seq))
+        frame = cardreader_batch.batch(items=numbered)
+        await websocket.send(compression.compress(json.dumps(frame).encode(), encoding))
+        acks = {a.get("seq"): a for a in json.loads(await websocket.recv())["acks"]}
+        return [acks.get(s, {}) for s, _ in numbered]
+    else:
+        await websocket.send(
+            compression.compress(json.dumps(items[0]).encode(), encoding)
+        )
+        return [json.loads(await websocket.recv())]
+
+
+async def replay(
+    uri: str,
+    key: str,
+    items: list[dict],
+    rate: float = 0,
+    concurrency: int = 4,
+    batch_size: int = 1,
+    ssl_context: Optional[ssl.SSLContext] = None,
+) -> ReplayStats:
+    stats = ReplayStats(items=len(items))
+    queue: asyncio.Queue[Optional[dict]] = asyncio.Queue()
+    start = time.monotonic()
+
+    async def dispatch() -> None:
+        for t, item in sorted(
+            zip(schedule(items=items, rate=rate), items), key=lambda x: x[0]
+        ):
+            delay = start + t - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await queue.put(item)
+        for _ in range(concurrency):
+            await queue.put(None)
+
+    async def worker() -> None:
+        headers = {
+            "X-Event-Key": key,
+            compression.HEADER: compression.offer(compression.CARDREADER_ENCODINGS),
+            cardreader_batch.HEADER: str(batch_size),
+        }
+        websocket = None
+        seq = 1
+        stop = False
+        while not stop:
+            batch = []
+            item = await queue.get()
+            if item is None:
+                break
+            batch.append(item)
+            # take the card reads already due up to the batch size
+            while len(batch) < batch_size and not queue.empty():
+                item = queue.get_nowait()
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+
+            done = 0
+            try:
+                if websocket is None:
+                    websocket = await connect(
+                        uri=uri, additional_headers=headers, ssl=ssl_context
+                    )
+                response = websocket.response
+                encoding = compression.accepted(
+                    response.headers.get(compression.HEADER) if response else None
+                )
+                accepted = cardreader_batch.accepted(
+                    response.headers.get(cardreader_batch.HEADER) if response else None
+                )
+                # the server rejects the card reads exceeding its batch size
+                size = accepted if accepted > 0 else 1
+                frames = [batch[i : i + size] for i in range(0, len(batch), size)]
+                for frame in frames:
+                    t1 = time.monotonic()
+                    replies = await send_frame(
+                        websocket=websocket,
+                        items=frame,
+                        encoding=encoding,
+                        batched=accepted > 0,
+                        seq=seq,
+                    )
+                    latency = time.monotonic() - t1
+                    seq += len(frame)
+                    done += len(frame)
+                    for r in replies:
+                        stats.latencies.append(latency)
+                        if "readerStatus" in r:
+                            stats.stored += 1
+                        elif "rejected" in r:
+                            stats.rejected += 1
+                        else:
+                            stats.errors += 1
+            except (
+                OSError,
+                ValueError,
+                KeyError,
+                websockets.exceptions.WebSocketException,
+            ):
+                # the server closes the connection after an error
+                stats.errors += len(batch) - done
+                if websocket is not None:
+                    await websocket.close()
+                websocket = None
+        if websocket is not None:
+            await websocket.close()
+
+    await asyncio.gather(dispatch(), *(worker() for _ in range(concurrency)))
+    stats.duration = time.monotonic() - start
+    return stats
@@ -0,0 +1,198 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import contextlib
+import dataclasses
+import enum
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from collections.abc import Iterator
+from typing import Optional
+from typing import ParamSpec
+from typing import TypeVar
+
+
+"""
+Central scheduler for the work of the bottle handlers and the websocket server.
+
+Each piece of work belongs to a priority class. Interactive card readouts
+are never delayed. Work of a lower priority class only starts if no work
+of a higher priority class is waiting. Reports and background computations
+additionally wait while readouts are stored, and their number is limited.
+
+Long running reports call checkpoint() between the classes, so a report
+pauses while a readout is processed.
+"""
+
+
+class Priority(enum.IntEnum):
+    READOUT = 0
+    EDIT = 1
+    REPORT = 2
+    BACKGROUND = 3
+
+
+LIMITS = {Priority.REPORT: 1, Priority.BACKGROUND: 2}
+
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+_T = TypeVar("_T")
+
+
+@dataclasses.dataclass
+class PriorityMetrics:
+    waiting: int = 0
+    running: int = 0
+    completed: int = 0
+    wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+
+class Scheduler:
+    def __init__(
+        self, limits: Optional[dict[Priority, int]] = None, enabled: bool = True
+    ) -> None:
+        self.limits = LIMITS if limits is None else limits
+        self.enabled = enabled
+        self.condition = threading.Condition()
+        self.local = threading.local()
+        self._metrics = {p: PriorityMetrics() for p in Priority}
+
+    def _readouts(self) -> bool:
+        m = self._metrics[Priority.READOUT]
+        return m.waiting > 0 or m.running > 0
+
+    def _may_start(self, priority: Priority) -> bool:
+        if priority == Priority.READOUT:
+            return True
+        limit = self.limits.get(priority)
+        if limit is not None and self._metrics[priority].running >= limit:
+            return False
+        if any(self._metrics[p].waiting for p in Priority if p < priority):
+            return False
+        if priority >= Priority.REPORT and self._readouts():
+            return False
+        return True
+
+    @contextlib.contextmanager
+    def slot(self, priority: Priority) -> Iterator[None]:
+        """Wait until work of the given priority may run and run it.
+
+        Nested slots in the same thread run with the priority of the
+        outermost slot.
+        """
+        if not self.enabled or getattr(self.local, "priority", None) is not None:
+            yield
+            return
+
+        m = self._metrics[priority]
+        submitted = time.monotonic()
+        with self.condition:
+            m.waiting += 1
+            try:
+                self.condition.wait_for(lambda: self._may_start(priority))
+            finally:
+                m.waiting -= 1
+            m.running += 1
+            wait_time = time.monotonic() - submitted
+            m.wait_time += wait_time
+            m.max_wait_time = max(m.max_wait_time, wait_time)
+            self.condition.notify_all()
+
+        self.local.priority = priority
+        try:
+            yield
+        finally:
+            self.local.priority = None
+            with self.condition:
+                m.running -= 1
+                m.completed += 1
+                self.condition.notify_all()
+
+    def run(
+        self,
+        priority: Priority,
+        func: Callable[_P, _R],
+        /,
+        *args: _P.args,
+        **kwargs: _P.kwargs,
+    ) -> _R:
+        with self.slot(priority):
+            return func(*args, **kwargs)
+
+    def iterate(self, priority: Priority, chunks: Iterable[_T]) -> Iterator[_T]:
+        """Produce each chunk of a streamed response in a slot of the priority.
+
+        A response returned as a generator is consumed by the server after
+        the handler has left its slot.
+        """
+        it = iter(chunks)
+        try:
+            while True:
+                with self.slot(priority):
+                    try:
+                        chunk = next(it)
+                    except StopIteration:
+                        return
+                yield chunk
+        finally:
+            close = getattr(it, "close", None)
+            if close is not None:
+                close()
+
+    def checkpoint(self) -> None:
+        """Pause a report or background computation while readouts are stored."""
+        priority = getattr(self.local, "priority", None)
+        if not self.enabled or priority is None or priority < Priority.REPORT:
+            return
+        with self.condition:
+            self.condition.wait_for(lambda: not self._readouts())
+
+    def metrics(self) -> list[dict]:
+        with self.condition:
+            result = []
+            for p, m in self._metrics.items():
+                started = m.completed + m.running
+                result.append(
+                    {
+                        "priority": p.name.lower(),
+                        "limit": self.limits.get(p),
+                        "waiting": m.waiting,
+                        "running": m.running,
+                        "completed": m.completed,
+                        "mean_wait_time": (
+                            round(m.wait_time / started, 3) if started else 0.0
+                        ),
+                        "max_wait_time": round(m.max_wait_time, 3),
+                    }
+                )
+            return result
+
+
+def priority_of_path(path: str) -> Priority:
+    """Priority of a request of the web interface."""
+    if "/pdf" in path or "/export" in path:
+        return Priority.REPORT
+    return Priority.EDIT
+
+
+scheduler = Scheduler()
@@ -0,0 +1,151 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from typing import Any
+from typing import Optional
+
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.entry_type import RankedEntryType
+from ooresults.otypes.event_type import EventType
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.utils.globals import MAP_STATUS
+from ooresults.utils.globals import build_columns
+
+
+"""
+Compact JSON format of the messages sent to the si1 window.
+
+The si1 window renders the results and the read control cards itself
+instead of receiving HTML code rendered by the server. The version of
+the format is sent with each message in the key "format".
+
+Results of an event:
+
+    {"name": str, "date": str, "columns": [str], "classes": [class]}
+
+    "columns" are the optional columns shown for all classes, see
+    ooresults.utils.globals.build_columns.
+
+Results of a class:
+
+    {"id": int, "name": str, "type": str, "rows": [row]}
+
+    "name" contains the voided legs of the class, "type" is the type of
+    the class (standard, net or score).
+
+Result of an entry (row), a list with the elements
+
+    rank, not competing, name, year, club, status, time, running time,
+    penalty, score controls, score overtime, score
+
+    Times are given in seconds, the status is the short text shown for
+    the status (OK, MP, DNF, ...). Trailing elements with value null are
+    omitted.
+
+Read control card:
+
+    {"card": str, "name": str, "class": str, "status": str,
+     "time": int, "error": str}
+"""
+
+
+VERSION = 1
+
+
+def voided_legs(ranked_results: list[RankedEntryType]) -> str:
+    if ranked_results and ranked_results[0].entry.result is not None:
+        voided_legs = ranked_results[0].entry.result.voided_legs()
+        if voided_legs:
+            return " (Voided legs: " + ", ".join(voided_legs) + ")"
+    return ""
+
+
+def row(ranked_result: RankedEntryType, columns: set[str]) -> list[Any]:
+    entry = ranked_result.entry
+    result = entry.result
+    extensions = result.extensions
+
+    penalty: Optional[int] = None
+    if "penalties_controls" in columns:
+        penalty = extensions.get("penalties_controls", None)
+    if "penalties_overtime" in columns:
+        p_overtime = extensions.get("penalties_overtime", None)
+        if p_overtime is not None:
+            penalty = p_overtime if penalty is None else penalty + p_overtime
+
+    values = [
+        ranked_result.rank,
+        1 if entry.not_competing else 0,
+        f"{entry.first_name or ''} {entry.last_name or ''}".strip(),
+        entry.year,
+        entry.club_name,
+        MAP_STATUS[result.status],
+        result.time,
+        extensions.get("running_time", None),
+        penalty,
+        extensions.get("score_controls", None),
+        extensions.get("score_overtime", None),
+        extensions.get("score", None),
+    ]
+    while values[-1] is None:
+        values.pop()
+    return values
+
+
+def class_result(
+    class_: ClassInfoType, ranked_results: list[RankedEntryType], columns: set[str]
+) -> dict:
+    return {
+        "id": class_.id,
+        "name": class_.name + voided_legs(ranked_results),
+        "type": class_.params.otype,
+        "rows": [row(ranked_result=r, columns=columns) for r in ranked_results],
+    }
+
+
+def results(
+    event: EventType,
+    class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+) -> dict:
+    columns = build_columns(class_results=class_results)
+    return {
+        "name": event.name,
+        "date": event.date.isoformat(),
+        "columns": sorted(columns),
+        "classes": [
+            class_result(class_=class_, ranked_results=ranked_results, columns=columns)
+            for class_, ranked_results in class_results
+            if ranked_results
+        ],
+    }
+
+
+def card_read(message: dict) -> dict:
+    if message.get("lastName", None) is not None:
+        name = f'{message["lastName"]}, {message.get("firstName", "")}'
+    else:
+        name = None
+    return {
+        "card": message.get("controlCard", None),
+        "name": name,
+        "class": message.get("class", None),
+        "status": MAP_STATUS[message.get("status", ResultStatus.INACTIVE)],
+        "time": message.get("time", None),
+        "error": message.get("error", None),
+    }
@@ -0,0 +1,154 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import os
+import pathlib
+import threading
+from collections.abc import Iterable
+
+
+"""
+Durable spool of the card reads of ooresults-reader.
+
+Each card read is appended to the file spool.jsonl and written to disk
+before it is sent to the server. The file spool.ack contains the offset
+up to which the server has acknowledged the card reads. After a restart
+or a reconnect the card reads after this offset are sent again in their
+original order.
+
+Acknowledgements received out of order are kept in memory, the offset
+advances over the acknowledged card reads at the start of the file. When
+all card reads are acknowledged, the file is truncated.
+
+Card reads rejected by the server, for example because the event does
+not exist, would be rejected again. They are written with the reason to
+the file spool.rejected.jsonl before they are removed from the spool.
+"""
+
+
+class Spool:
+    def __init__(self, path: pathlib.Path) -> None:
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.data_file = path / "spool.jsonl"
+        self.ack_file = path / "spool.ack"
+        self.rejected_file = path / "spool.rejected.jsonl"
+        self.lock = threading.Lock()
+        self.offset = 0
+        self.seq = 0
+        # sequence number -> (start offset, end offset, item) of pending card reads
+        self.pending: dict[int, tuple[int, int, dict]] = {}
+        self.acknowledged: set[int] = set()
+        self.load()
+
+    def load(self) -> None:
+        if self.ack_file.exists():
+            ack = json.loads(self.ack_file.read_text())
+            self.offset = ack["offset"]
+            self.seq = ack["seq"]
+        if not self.data_file.exists():
+            self.data_file.touch()
+        with open(self.data_file, "r+b") as f:
+            f.seek(self.offset)
+            start = self.offset
+            for line in f:
+                end = start + len(line)
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line is incomplete if the reader crashed
+                    # while writing it, the card read was never sent
+                    f.truncate(start)
+                    break
+                self.pending[record["seq"]] = (start, end, record["item"])
+                self.seq = max(self.seq, record["seq"])
+                start = end
+
+    def append(self, item: dict) -> int:
+        """Write the card read to disk and return its sequence number."""
+        with self.lock:
+            self.seq += 1
+            line = (json.dumps({"seq": self.seq, "item": item}) + "\n").encode()
+            with open(self.data_file, "ab") as f:
+                start = f.tell()
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            self.pending[self.seq] = (start, start + len(line), item)
+            return self.seq
+
+    def items(self) -> list[tuple[int, dict]]:
+        """Return the pending card reads (seq, item) in their original order."""
+        with self.lock:
+            return [
+                (seq, item)
+                for seq, (_, _, item) in sorted(self.pending.items())
+                if seq not in self.acknowledged
+            ]
+
+    @property
+    def pending_count(self) -> int:
+        with self.lock:
+            return len(self.pending) - len(self.acknowledged)
+
+    def reject(self, reasons: dict[int, str]) -> None:
+        """Move the card reads rejected by the server to the rejected file."""
+        with self.lock:
+            lines = [
+                json.dumps({"seq": seq, "item": self.pending[seq][2], "reason": reason})
+                + "\n"
+                for seq, reason in sorted(reasons.items())
+                if seq in self.pending and seq not in self.acknowledged
+            ]
+            if not lines:
+                return
+            with open(self.rejected_file, "ab") as f:
+                f.write("".join(lines).encode())
+                f.flush()
+                os.fsync(f.fileno())
+        self.acknowledge(seqs=reasons)
+
+    def acknowledge(self, seqs: Iterable[int]) -> None:
+        """Mark the card reads as stored by the server."""
+        with self.lock:
+            self.acknowledged.update(s for s in seqs if s in self.pending)
+            offset = self.offset
+            for seq in sorted(self.pending):
+                if seq not in self.acknowledged:
+                    break
+                _, offset, _ = self.pending.pop(seq)
+                self.acknowledged.discard(seq)
+            if offset == self.offset:
+                return
+
+            # all card reads are acknowledged, the file is truncated after
+            # the offset is stored, after a crash in between the card reads
+            # are sent again
+            truncate = not self.pending
+            self.offset = 0 if truncate else offset
+            tmp_file = self.ack_file.with_suffix(".tmp")
+            with open(tmp_file, "w") as f:
+                f.write(json.dumps({"offset": self.offset, "seq": self.seq}))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_file, self.ack_file)
+            if truncate:
+                with open(self.data_file, "wb"):
+                    pass
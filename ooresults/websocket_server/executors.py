@@ -0,0 +1,172 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import dataclasses
+import functools
+import threading
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import ParamSpec
+from typing import TypeVar
+
+
+"""
+Thread pools for the blocking work of the websocket server.
+
+The work is divided into card reads (stored in the database), result
+computations (si1 windows, streaming) and imports of streamed result
+lists, each kind of work is done by its own pool. So a long import
+does not delay the storage of a read control card.
+
+Work submitted with low_priority=True is rejected with ExecutorBusyError
+if more than max_queued tasks are waiting in the pool.
+"""
+
+
+_P = ParamSpec("_P")
+_R = TypeVar("_R")
+
+
+class ExecutorBusyError(Exception):
+    pass
+
+
+@dataclasses.dataclass
+class ExecutorMetrics:
+    submitted: int = 0
+    completed: int = 0
+    rejected: int = 0
+    queued: int = 0
+    running: int = 0
+    max_queued: int = 0
+    wait_time: float = 0.0
+    max_wait_time: float = 0.0
+
+
+class Executor:
+    def __init__(self, name: str, max_workers: int, max_queued: int = 20) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=name
+        )
+        self.lock = threading.Lock()
+        self._metrics = ExecutorMetrics()
+
+    async def run(
+        self,
+        func: Callable[_P, _R],
+        /,
+        *args: _P.args,
+        **kwargs: _P.kwargs,
+    ) -> _R:
+        """Run func in the pool, like asyncio.to_thread."""
+        return await self.submit(functools.partial(func, *args, **kwargs))
+
+    async def run_low_priority(
+        self,
+        func: Callable[_P, _R],
+        /,
+        *args: _P.args,
+        **kwargs: _P.kwargs,
+    ) -> _R:
+        """Run func in the pool, raise ExecutorBusyError if the pool is busy."""
+        return await self.submit(
+            functools.partial(func, *args, **kwargs), low_priority=True
+        )
+
+    async def submit(self, func: Callable[[], _R], low_priority: bool = False) -> _R:
+        with self.lock:
+            if low_priority and self._metrics.queued >= self.max_queued:
+                self._metrics.rejected += 1
+                raise ExecutorBusyError(f"Executor {self.name} is busy")
+            self._metrics.submitted += 1
+            self._metrics.queued += 1
+            self._metrics.max_queued = max(
+                self._metrics.max_queued, self._metrics.queued
+            )
+        submitted = time.monotonic()
+
+        def call() -> _R:
+            wait_time = time.monotonic() - submitted
+            with self.lock:
+                self._metrics.queued -= 1
+                self._metrics.running += 1
+                self._metrics.wait_time += wait_time
+                self._metrics.max_wait_time = max(
+                    self._metrics.max_wait_time, wait_time
+                )
+            try:
+                return func()
+            finally:
+                with self.lock:
+                    self._metrics.running -= 1
+                    self._metrics.completed += 1
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, call)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            m = dataclasses.replace(self._metrics)
+        started = m.submitted - m.queued
+        return {
+            "name": self.name,
+            "workers": self.max_workers,
+            "submitted": m.submitted,
+            "completed": m.completed,
+            "rejected": m.rejected,
+            "queued": m.queued,
+            "running": m.running,
+            "max_queued": m.max_queued,
+            "mean_wait_time": round(m.wait_time / started, 3) if started else 0.0,
+            "max_wait_time": round(m.max_wait_time, 3),
+        }
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+class Executors:
+    def __init__(
+        self,
+        cardreader: int = 2,
+        results: int = 5,
+        imports: int = 2,
+        max_queued: int = 20,
+    ) -> None:
+        self.cardreader = Executor(
+            name="cardreader", max_workers=cardreader, max_queued=max_queued
+        )
+        self.results = Executor(
+            name="results", max_workers=results, max_queued=max_queued
+        )
+        self.imports = Executor(
+            name="imports", max_workers=imports, max_queued=max_queued
+        )
+
+    def metrics(self) -> list[dict]:
+        return [e.metrics() for e in (self.cardreader, self.results, self.imports)]
+
+    def shutdown(self) -> None:
+        for e in (self.cardreader, self.results, self.imports):
+            e.shutdown()
@@ -0,0 +1,160 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import concurrent.futures
+import dataclasses
+import logging
+import queue
+import threading
+import time
+from typing import Optional
+
+from ooresults import model
+from ooresults.otypes.event_type import EventType
+from ooresults.otypes.result_type import CardReaderMessage
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import Scheduler
+from ooresults.utils.scheduler import scheduler
+
+
+"""
+Group commit of card reads.
+
+The card reads of all reader stations are stored by a single writer
+thread. The writer collects up to max_items card reads, or the card reads
+received within max_delay seconds after the first one, and stores them in
+one transaction. The caller is answered after the transaction is
+committed, so a reader station receives its reply only when the card read
+is stored durably.
+"""
+
+
+_Request = tuple[str, CardReaderMessage, concurrent.futures.Future]
+
+
+@dataclasses.dataclass
+class GroupCommitMetrics:
+    transactions: int = 0
+    items: int = 0
+    max_items: int = 0
+    failed: int = 0
+
+
+class GroupCommitWriter:
+    def __init__(
+        self,
+        max_items: int = 20,
+        max_delay: float = 0.01,
+        scheduler: Scheduler = scheduler,
+    ) -> None:
+        self.max_items = max_items
+        self.max_delay = max_delay
+        self.scheduler = scheduler
+        self.queue: queue.Queue[Optional[_Request]] = queue.Queue()
+        self.lock = threading.Lock()
+        self._metrics = GroupCommitMetrics()
+        self.thread = threading.Thread(
+            target=self.run, name="group-commit", daemon=True
+        )
+        self.thread.start()
+
+    async def store(
+        self, event_key: str, item: CardReaderMessage
+    ) -> tuple[str, EventType, dict]:
+        """Store the card read, like model.results.store_cardreader_result."""
+        future: concurrent.futures.Future = concurrent.futures.Future()
+        self.queue.put((event_key, item, future))
+        return await asyncio.wrap_future(future)
+
+    def run(self) -> None:
+        stop = False
+        while not stop:
+            request = self.queue.get()
+            if request is None:
+                break
+            batch = [request]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_items:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    request = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+            # skip the card reads of closed connections
+            batch = [r for r in batch if r[2].set_running_or_notify_cancel()]
+            if batch:
+                self.write(batch=batch)
+
+    def write(self, batch: list[_Request]) -> None:
+        try:
+            results = self.scheduler.run(
+                Priority.READOUT,
+                model.results.store_cardreader_results,
+                items=[(event_key, item) for event_key, item, _ in batch],
+            )
+        except Exception:
+            logging.exception("Group commit failed, storing the card reads singly")
+            with self.lock:
+                self._metrics.failed += 1
+            # only the faulty card read fails
+            for event_key, item, future in batch:
+                try:
+                    future.set_result(
+                        self.scheduler.run(
+                            Priority.READOUT,
+                            model.results.store_cardreader_result,
+                            event_key=event_key,
+                            item=item,
+                        )
+                    )
+                except Exception as e:
+                    future.set_exception(e)
+            return
+
+        with self.lock:
+            self._metrics.transactions += 1
+            self._metrics.items += len(batch)
+            self._metrics.max_items = max(self._metrics.max_items, len(batch))
+        for (_, _, future), result in zip(batch, results):
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def metrics(self) -> dict:
+        with self.lock:
+            m = dataclasses.replace(self._metrics)
+        return {
+            "transactions": m.transactions,
+            "items": m.items,
+            "max_items": m.max_items,
+            "mean_items": round(m.items / m.transactions, 1) if m.transactions else 0,
+            "failed": m.failed,
+        }
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join(timeout=5)
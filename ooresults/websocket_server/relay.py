@@ -0,0 +1,158 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import dataclasses
+import datetime
+import threading
+import time
+from collections.abc import Callable
+from collections.abc import Iterable
+from typing import Optional
+
+from ooresults import model
+from ooresults.plugins import iof_result_list
+from ooresults.repo.repo import ConstraintError
+from ooresults.repo.repo import EventNotFoundError
+
+
+@dataclasses.dataclass
+class Upstream:
+    address: str
+    received: float
+    updates: int = 0
+    size: int = 0
+    import_time: float = 0.0
+
+
+class Relay:
+    """Relay the results streamed by an ooresults server.
+
+    A relay imports the received result lists into its database to serve
+    the public pages and the si1 clients, and forwards the last received
+    result list unchanged to the downstream servers. Events unknown to the
+    relay are created with the event key used by the upstream server if
+    the key is one of the configured keys.
+    """
+
+    def __init__(self, downstream: str = "", keys: Iterable[str] = ()) -> None:
+        self.downstream = downstream
+        self.keys = frozenset(keys)
+        self.lock = threading.Lock()
+        # creating an event waits for the event loop, the lock used by
+        # the event loop must not be held meanwhile
+        self.add_event_lock = threading.Lock()
+        self.result_lists: dict[int, bytes] = {}
+        self.upstream: dict[int, Upstream] = {}
+        self.callbacks: set[Callable[[Optional[int]], None]] = set()
+
+    def register(self, callback: Callable[[Optional[int]], None]) -> None:
+        with self.lock:
+            self.callbacks.add(callback)
+
+    def unregister(self, callback: Callable[[Optional[int]], None]) -> None:
+        with self.lock:
+            self.callbacks.remove(callback)
+
+    def get_result_list(self, event_id: int) -> Optional[bytes]:
+        with self.lock:
+            return self.result_lists.get(event_id, None)
+
+    def add_event(self, event_key: str, content: bytes) -> None:
+        """Create the event of the result list.
+
+        EventNotFoundError is raised if the key is not configured and
+        ConstraintError if another event has the name of the result list.
+        """
+        if event_key not in self.keys:
+            raise EventNotFoundError(f'Event for key "{event_key}" not found')
+
+        events = model.events.get_events()
+        for e in events:
+            if e.key == event_key:
+                return
+
+        # only the event is read, the results are imported afterwards
+        event, _, _ = iof_result_list.iterparse_result_list(source=content)
+        for e in events:
+            if e.name == event["name"]:
+                raise ConstraintError(
+                    f'Event "{e.name}" already exists with another key'
+                )
+        model.events.add_event(
+            name=event["name"],
+            date=event.get("date", datetime.date.today()),
+            key=event_key,
+            publish=True,
+            series=None,
+            fields=[],
+            streaming_address=self.downstream if self.downstream else None,
+            streaming_key=event_key if self.downstream else None,
+            streaming_enabled=bool(self.downstream),
+        )
+
+    def import_result_list(
+        self, event_key: str, content: bytes, address: str = ""
+    ) -> int:
+        t1 = time.time()
+        try:
+            event_id = model.entries.import_iof_result_list(
+                event_key=event_key, content=content
+            )
+        except EventNotFoundError:
+            if event_key == "":
+                raise
+            with self.add_event_lock:
+                self.add_event(event_key=event_key, content=content)
+            event_id = model.entries.import_iof_result_list(
+                event_key=event_key, content=content
+            )
+        t2 = time.time()
+
+        with self.lock:
+            self.result_lists[event_id] = content
+            upstream = self.upstream.setdefault(
+                event_id, Upstream(address=address, received=t2)
+            )
+            upstream.address = address
+            upstream.received = t2
+            upstream.updates += 1
+            upstream.size = len(content)
+            upstream.import_time = t2 - t1
+            callbacks = list(self.callbacks)
+
+        for c in callbacks:
+            c(event_id)
+        return event_id
+
+    def health(self) -> list[dict]:
+        """Return the age of the last received result list of all events."""
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "event_id": event_id,
+                    "address": u.address,
+                    "received": u.received,
+                    "age": now - u.received,
+                    "updates": u.updates,
+                    "size": u.size,
+                    "import_time": u.import_time,
+                }
+                for event_id, u in self.upstream.items()
+            ]
@@ -18,31 +18,69 @@
 
 
 import asyncio
-import bz2
 import copy
-import functools
 import json
 import logging
 import ssl
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Iterator
+from typing import Optional
 
 import websockets.exceptions
+from websockets.asyncio.client import ClientConnection
 from websockets.asyncio.client import connect
 from websockets.protocol import State
 
 from ooresults import model
+from ooresults.model import cached_result
 from ooresults.otypes.event_type import EventType
 from ooresults.plugins import iof_result_list
+from ooresults.plugins import iof_schema
 from ooresults.repo.repo import EventNotFoundError
+from ooresults.utils import compression
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import scheduler
 from ooresults.websocket_server import streaming_status
+from ooresults.websocket_server.executors import Executor
+from ooresults.websocket_server.relay import Relay
+
+
+def addresses(streaming_address: Optional[str]) -> list[str]:
+    """Return the addresses of the live servers.
+
+    An event can be streamed to several live servers or relays,
+    their addresses are separated by commas.
+    """
+    result: list[str] = []
+    for address in (streaming_address or "").split(","):
+        address = address.strip()
+        if address and address not in result:
+            result.append(address)
+    return result if result else [streaming_address or ""]
 
 
 class Streaming:
-    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        min_interval: float = 2.0,
+        relay: Optional[Relay] = None,
+        executor: Optional[Executor] = None,
+    ) -> None:
         self.loop = loop
+        self.min_interval = min_interval
+        self.relay = relay
         self.tasks: dict[int, asyncio.Task] = {}
         self.events: dict[int, EventType] = {}
-        self.executor = ThreadPoolExecutor(max_workers=5)
+        self.changed: dict[int, list[asyncio.Event]] = {}
+        self.executor = (
+            executor
+            if executor is not None
+            else Executor(name="streaming", max_workers=5)
+        )
+        if self.relay is not None:
+            self.relay.register(callback=self.result_changed)
+        else:
+            cached_result.register(callback=self.result_changed)
 
         events = model.events.get_events()
         model.db.close()
@@ -52,6 +90,42 @@ class Streaming:
                 self.events[event.id] = e
                 self.tasks[event.id] = self.loop.create_task(coro=self.stream(event=e))
 
+    def close(self) -> None:
+        if self.relay is not None:
+            self.relay.unregister(callback=self.result_changed)
+        else:
+            cached_result.unregister(callback=self.result_changed)
+
+    def result_changed(self, event_id: Optional[int]) -> None:
+        """Wake up the streaming tasks of the changed event.
+
+        This callback is called by cached_result.clear_cache (or by the
+        relay if a result list is received) and may be called from any thread.
+        """
+        try:
+            self.loop.call_soon_threadsafe(self.set_changed, event_id)
+        except RuntimeError:
+            # event loop is already closed
+            pass
+
+    def set_changed(self, event_id: Optional[int]) -> None:
+        streaming_status.status.set_changed(event_id=event_id)
+        for id, changed_list in self.changed.items():
+            if event_id is None or event_id == id:
+                for changed in changed_list:
+                    changed.set()
+
+    def get_content(self, event_id: int):
+        """Return the actual result of the event.
+
+        A relay forwards the result list received from upstream unchanged,
+        otherwise the result cache shared with the other parts of the
+        software is used.
+        """
+        if self.relay is not None:
+            return self.relay.get_result_list(event_id=event_id)
+        return cached_result.get_cached_data(event_id=event_id)
+
     async def update_event(self, event: EventType) -> None:
         if event.id in self.tasks:
             e = self.events[event.id]
@@ -70,18 +144,85 @@ class Streaming:
             self.events[event.id] = e
             self.tasks[event.id] = asyncio.create_task(coro=self.stream(event=e))
 
+    async def wait_for_change(
+        self,
+        websocket: ClientConnection,
+        changed: asyncio.Event,
+        not_before: float,
+    ) -> bool:
+        """Wait until the results of the event have changed.
+
+        All changes notified before not_before are coalesced into one update.
+        Returns False if data is received from the server while waiting,
+        because the server only answers to sent results.
+        """
+        if changed.is_set() and self.loop.time() >= not_before:
+            return True
+
+        receive = asyncio.ensure_future(websocket.recv())
+        change = asyncio.ensure_future(changed.wait())
+        try:
+            await asyncio.wait({receive, change}, return_when=asyncio.FIRST_COMPLETED)
+            delay = not_before - self.loop.time()
+            if not receive.done() and delay > 0:
+                await asyncio.wait({receive}, timeout=delay)
+            if receive.done():
+                # raises ConnectionClosed if the connection is closed
+                receive.result()
+                return False
+            return True
+        finally:
+            receive.cancel()
+            change.cancel()
+
     async def stream(self, event: EventType) -> None:
+        # stream to each address independently
+        changed = {a: asyncio.Event() for a in addresses(event.streaming_address)}
+        changed_list = list(changed.values())
+        self.changed[event.id] = changed_list
+        tasks = [
+            asyncio.ensure_future(self.stream_to(event=event, address=a, changed=c))
+            for a, c in changed.items()
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            raise
+        except EventNotFoundError:
+            pass
+        except Exception:
+            logging.exception(msg="", exc_info=True, stack_info=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if (
+                event.id in self.tasks
+                and self.tasks[event.id] == asyncio.current_task()
+            ):
+                del self.events[event.id]
+                del self.tasks[event.id]
+            if self.changed.get(event.id, None) is changed_list:
+                del self.changed[event.id]
+            await streaming_status.status.delete(event=event)
+
+    async def stream_to(
+        self, event: EventType, address: str, changed: asyncio.Event
+    ) -> None:
+        since: Optional[float] = None
         try:
             await streaming_status.status.set(
                 event=event,
                 status=streaming_status.Status.NOT_CONNECTED,
+                address=address,
             )
 
-            uri = f"wss://{event.streaming_address}/import"
+            uri = f"wss://{address}/import"
             headers = {
                 "Content-Type": "application/octet-stream",
                 "X-Event-Key": event.streaming_key if event.streaming_key else "",
                 "X-Suffix": ".json",
+                compression.HEADER: compression.offer(compression.STREAMING_ENCODINGS),
             }
 
             ssl_context = ssl.SSLContext(protocol=ssl.PROTOCOL_TLS_CLIENT)
@@ -105,78 +246,117 @@ class Streaming:
                             event=event,
                             status=streaming_status.Status.NOT_CONNECTED,
                             comment=str(e),
+                            address=address,
                         )
                         websocket = None
                         await asyncio.sleep(delay=20)
 
                 # websocket is opened
-                sent_event = None
-                sent_class_results = None
+                sent_content = None
+                not_before = self.loop.time()
                 result = None
+                changed.set()
 
                 while True:
                     error = False
                     wait_time = 0
                     try:
-                        # compute actual result
-                        (
-                            act_event,
-                            act_class_results,
-                        ) = await asyncio.get_event_loop().run_in_executor(
-                            executor=self.executor,
-                            func=functools.partial(
-                                model.results.event_class_results,
+                        if await self.wait_for_change(
+                            websocket=websocket,
+                            changed=changed,
+                            not_before=not_before,
+                        ):
+                            changed.clear()
+                            streaming_status.status.restore_changed(
                                 event_id=event.id,
-                            ),
-                        )
+                                address=address,
+                                changed=since,
+                            )
+                            since = streaming_status.status.take_changed(
+                                event_id=event.id, address=address
+                            )
 
-                        # send actual result as IOF result list only if it has changed
-                        if (
-                            sent_event != act_event
-                            or sent_class_results != act_class_results
-                        ):
-                            content = iof_result_list.create_result_list(
-                                event=act_event,
-                                class_results=act_class_results,
-                                status=iof_result_list.ResultListStatus.SNAPSHOT,
+                            # get actual result
+                            content = await self.executor.run(
+                                scheduler.run,
+                                Priority.BACKGROUND,
+                                self.get_content,
+                                event_id=event.id,
                             )
-                            data = bz2.compress(content)
 
-                            await websocket.send(data)
-                            answer = await asyncio.wait_for(websocket.recv(), 30)
+                            # send actual result as IOF result list only if it has changed
+                            if content is not sent_content and content != sent_content:
+                                chunks: bytes | Iterator[bytes]
+                                if isinstance(content, bytes):
+                                    act_event, chunks = event, content
+                                else:
+                                    act_event, act_class_results = content
+                                    # the result list is compressed while it is written
+                                    chunks = iof_schema.validator.validate_created_chunks(
+                                        iof_result_list.iter_result_list(
+                                            event=act_event,
+                                            class_results=act_class_results,
+                                            status=iof_result_list.ResultListStatus.SNAPSHOT,
+                                        )
+                                    )
+                                # use the encoding selected by the server
+                                encoding = compression.accepted(
+                                    websocket.response.headers.get(compression.HEADER)
+                                    if websocket.response is not None
+                                    else None
+                                )
+                                data = compression.compress_chunks(
+                                    chunks, encoding=encoding
+                                )
 
-                            answer = json.loads(answer)
-                            result = answer["result"]
+                                await websocket.send(data)
+                                not_before = self.loop.time() + self.min_interval
+                                answer = await asyncio.wait_for(websocket.recv(), 30)
 
-                            if result == "ok":
-                                sent_event = act_event
-                                sent_class_results = act_class_results
+                                answer = json.loads(answer)
+                                result = answer["result"]
 
-                                # new state: OK
-                                await streaming_status.status.set(
-                                    event=act_event,
-                                    status=streaming_status.Status.OK,
-                                )
-                            elif result == "eventNotFound":
-                                # new state: EVENT_NOT_FOUND (on live server)
-                                await streaming_status.status.set(
-                                    event=act_event,
-                                    status=streaming_status.Status.EVENT_NOT_FOUND,
-                                )
-                                wait_time = 45
-                                break
+                                if result == "ok":
+                                    sent_content = content
+                                    streaming_status.status.acknowledged(
+                                        event_id=event.id,
+                                        address=address,
+                                        changed=since,
+                                    )
+                                    since = None
+
+                                    # new state: OK
+                                    await streaming_status.status.set(
+                                        event=act_event,
+                                        status=streaming_status.Status.OK,
+                                        address=address,
+                                    )
+                                elif result in ("eventNotFound", "eventExists"):
+                                    # new state: EVENT_NOT_FOUND or EVENT_EXISTS
+                                    # (on live server)
+                                    await streaming_status.status.set(
+                                        event=act_event,
+                                        status=(
+                                            streaming_status.Status.EVENT_NOT_FOUND
+                                            if result == "eventNotFound"
+                                            else streaming_status.Status.EVENT_EXISTS
+                                        ),
+                                        address=address,
+                                    )
+                                    wait_time = 45
+                                    break
+                                else:
+                                    # new state: ERROR
+                                    # repeat sending the actual result
+                                    error = True
+                                    wait_time = 30
+                                    changed.set()
                             else:
-                                # new state: ERROR
-                                error = True
-
-                        try:
-                            await asyncio.wait_for(websocket.recv(), 30)
-                        except asyncio.TimeoutError:
-                            # no data received, this is ok
-                            pass
+                                # the change does not affect the result list
+                                since = None
                         else:
-                            # if no exception is raised, an unexpected answer is received
-                            # set the status to error and close the connection
+                            # if data is received without sending a result, an unexpected
+                            # answer is received, set the status to error and close the connection
                             await websocket.close()
                             # new state: ERROR
                             error = True
@@ -198,6 +378,7 @@ class Streaming:
                         await streaming_status.status.set(
                             event=event,
                             status=streaming_status.Status.NOT_CONNECTED,
+                            address=address,
                         )
                         wait_time = 30
                         break
@@ -207,6 +388,7 @@ class Streaming:
                         await streaming_status.status.set(
                             event=event,
                             status=streaming_status.Status.INTERNAL_ERROR,
+                            address=address,
                         )
                         wait_time = 30
                         break
@@ -220,28 +402,20 @@ class Streaming:
                                 await streaming_status.status.set(
                                     event=event,
                                     status=streaming_status.Status.ERROR,
+                                    address=address,
                                 )
                             else:
                                 await streaming_status.status.set(
                                     event=event,
                                     status=streaming_status.Status.PROTOCOL_ERROR,
+                                    address=address,
                                 )
                         await asyncio.sleep(delay=wait_time)
 
                     if websocket.state == State.CLOSED:
                         break
-
-        except asyncio.CancelledError:
-            raise
-        except EventNotFoundError:
-            pass
-        except Exception:
-            logging.exception(msg="", exc_info=True, stack_info=True)
         finally:
-            if (
-                event.id in self.tasks
-                and self.tasks[event.id] == asyncio.current_task()
-            ):
-                del self.events[event.id]
-                del self.tasks[event.id]
-            await streaming_status.status.delete(event=event)
+            # the result is sent again after reconnecting
+            streaming_status.status.restore_changed(
+                event_id=event.id, address=address, changed=since
+            )
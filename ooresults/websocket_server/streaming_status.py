@@ -17,8 +17,10 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 
+import dataclasses
 import logging
 import threading
+import time
 from collections.abc import Awaitable
 from collections.abc import Callable
 from enum import Enum
@@ -32,13 +34,28 @@ class Status(Enum):
     INTERNAL_ERROR = "InternalError"
     PROTOCOL_ERROR = "ProtocolError"
     EVENT_NOT_FOUND = "EventNotFound"
+    EVENT_EXISTS = "EventExists"
     ERROR = "Error"
     OK = "Ok"
 
 
+@dataclasses.dataclass
+class Hop:
+    """Status of the stream of an event to one live server or relay."""
+
+    status: Optional[Status] = None
+    # time of the oldest change not yet acknowledged by the live server
+    changed: Optional[float] = None
+    # time of the last acknowledged result
+    acknowledged: Optional[float] = None
+    # seconds between the change and the acknowledgement of the last result
+    lag: Optional[float] = None
+
+
 class StreamingStatus:
     def __init__(self) -> None:
         self.status: dict[int, Status] = {}
+        self.hops: dict[int, dict[str, Hop]] = {}
         self.lock = threading.Lock()
         self.callback: Optional[Callable[[EventType], Awaitable[None]]] = None
 
@@ -46,12 +63,31 @@ class StreamingStatus:
         with self.lock:
             return self.status.get(id, None)
 
-    async def set(self, event: EventType, status: Status, comment: str = "") -> None:
+    async def set(
+        self,
+        event: EventType,
+        status: Status,
+        comment: str = "",
+        address: Optional[str] = None,
+    ) -> None:
+        """Set the streaming status of an event.
+
+        If the event is streamed to several addresses, the status of each
+        address is stored and the status of the event is the status of
+        the first address not streaming successfully.
+        """
         with self.lock:
+            if address is not None:
+                hops = self.hops.setdefault(event.id, {})
+                hops.setdefault(address, Hop()).status = status
+                for hop in hops.values():
+                    if hop.status is not None and hop.status != Status.OK:
+                        status = hop.status
+                        break
             changed = self.status.get(event.id, None) != status
             self.status[event.id] = status
         if changed:
-            logging.info(f"Streaming status: {status}, {comment}")
+            logging.info(f"Streaming status: {status}, {address or ''}, {comment}")
         if changed and self.callback:
             await self.callback(event)
 
@@ -59,9 +95,69 @@ class StreamingStatus:
         with self.lock:
             if event.id in self.status:
                 del self.status[event.id]
+            if event.id in self.hops:
+                del self.hops[event.id]
         if self.callback:
             await self.callback(event)
 
+    def set_changed(self, event_id: Optional[int]) -> None:
+        """Remember the time of a change of the results of an event."""
+        now = time.time()
+        with self.lock:
+            for id, hops in self.hops.items():
+                if event_id is None or event_id == id:
+                    for hop in hops.values():
+                        if hop.changed is None:
+                            hop.changed = now
+
+    def take_changed(self, event_id: int, address: str) -> Optional[float]:
+        """Return and reset the time of the oldest change not yet sent."""
+        with self.lock:
+            hop = self.hops.get(event_id, {}).get(address, None)
+            if hop is None:
+                return None
+            changed, hop.changed = hop.changed, None
+            return changed
+
+    def restore_changed(
+        self, event_id: int, address: str, changed: Optional[float]
+    ) -> None:
+        """Restore the time of a change if sending the result failed."""
+        with self.lock:
+            hop = self.hops.get(event_id, {}).get(address, None)
+            if hop is not None and changed is not None:
+                if hop.changed is None or changed < hop.changed:
+                    hop.changed = changed
+
+    def acknowledged(
+        self, event_id: int, address: str, changed: Optional[float]
+    ) -> None:
+        """Store the time and the lag of an acknowledged result."""
+        now = time.time()
+        with self.lock:
+            hop = self.hops.get(event_id, {}).get(address, None)
+            if hop is not None:
+                hop.acknowledged = now
+                if changed is not None:
+                    hop.lag = now - changed
+
+    def health(self) -> list[dict]:
+        """Return the status and the lag of all streamed events per address."""
+        now = time.time()
+        with self.lock:
+            return [
+                {
+                    "event_id": event_id,
+                    "address": address,
+                    "status": hop.status.value if hop.status is not None else None,
+                    "acknowledged": hop.acknowledged,
+                    "lag": hop.lag,
+                    "pending": now - hop.changed if hop.changed is not None else None,
+                }
+                for event_id, hops in self.hops.items()
+                for address, hop in hops.items()
+            ]
+
     def register(
         self, callback: Optional[Callable[[EventType], Awaitable[None]]]
     ) -> None:
@@ -18,35 +18,53 @@
 
 
 import asyncio
-import bz2
-import copy
 import dataclasses
 import datetime
 import functools
+import hashlib
 import json
 import logging
 import time
 from collections import defaultdict
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
+from collections import deque
 from typing import Optional
-from typing import ParamSpec
-from typing import TypeVar
 
 import tzlocal
 import websockets.exceptions
 from websockets.asyncio.server import ServerConnection
+from websockets.asyncio.server import broadcast
+from websockets.datastructures import Headers
 from websockets.frames import CloseCode
+from websockets.http11 import Request
+from websockets.http11 import Response
 
 from ooresults import model
+from ooresults.model import cached_result
 from ooresults.otypes import result_type
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.entry_type import RankedEntryType
 from ooresults.otypes.event_type import EventType
 from ooresults.otypes.result_type import ResultStatus
 from ooresults.otypes.result_type import SpStatus
+from ooresults.plugins import iof_schema
+from ooresults.repo.repo import ConstraintError
 from ooresults.repo.repo import EventNotFoundError
+from ooresults.utils import cardreader_batch
+from ooresults.utils import compression
+from ooresults.utils import preview
 from ooresults.utils import render
+from ooresults.utils import si1_json
+from ooresults.utils.backup import BackupScheduler
+from ooresults.utils.globals import build_columns
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import Scheduler
+from ooresults.utils.scheduler import scheduler
 from ooresults.websocket_server import streaming_status
 from ooresults.websocket_server.credentials import credentials
+from ooresults.websocket_server.executors import ExecutorBusyError
+from ooresults.websocket_server.executors import Executors
+from ooresults.websocket_server.group_commit import GroupCommitWriter
+from ooresults.websocket_server.relay import Relay
 
 
 class MessageError(Exception):
@@ -60,21 +78,99 @@ class MessageError(Exception):
 class ConnectionParameter:
     event_id: Optional[int] = None
     show_result: bool = False
+    results_sent: bool = False
+    format: str = "html"
 
 
-_P = ParamSpec("_P")
-_R = TypeVar("_R")
+@dataclasses.dataclass
+class EventResults:
+    """Results of an event last sent to the si1 clients."""
+
+    layout: tuple
+    fingerprints: dict[int, bytes]
+
+
+@dataclasses.dataclass
+class PendingUpdate:
+    """Requested update of the results of an event (time.monotonic values)."""
+
+    first: float
+    last: float
+    immediate: bool = False
+
+
+@dataclasses.dataclass
+class UpdateMetrics:
+    requests: int = 0
+    updates: int = 0
+    max_delay: float = 0.0
+    last_update: float = 0.0
+
+    @property
+    def coalesced(self) -> int:
+        return self.requests - self.updates
+
+
+def fingerprint(class_: ClassInfoType, ranked_results: list[RankedEntryType]) -> bytes:
+    """Return a digest of the results of a class used to detect changes."""
+    return hashlib.blake2b(
+        repr((class_, ranked_results)).encode(), digest_size=16
+    ).digest()
+
+
+# maximum of data buffered for a client of /si1 or /si2 (bytes)
+MAX_WRITE_BUFFER = 4 * 2**20
+
+# formats of the messages sent to the si1 window, see ooresults.utils.si1_json
+FORMATS = ("html", "json")
+
+# default number of card reader messages kept in memory for each event
+READER_MESSAGES = 200
+
+# default window (seconds) in which result updates of an event are combined
+# and maximum delay (seconds) of an update
+RESULT_INTERVAL = 1.0
+RESULT_MAX_LATENCY = 5.0
 
 
 class WebSocketHandler:
-    def __init__(self, demo_reader: bool = False, import_stream: bool = False):
+    def __init__(
+        self,
+        demo_reader: bool = False,
+        import_stream: bool = False,
+        relay: Optional[Relay] = None,
+        reader_messages: int = READER_MESSAGES,
+        result_interval: float = RESULT_INTERVAL,
+        result_max_latency: float = RESULT_MAX_LATENCY,
+        executors: Optional[Executors] = None,
+        scheduler: Scheduler = scheduler,
+        writer: Optional[GroupCommitWriter] = None,
+        backup: Optional[BackupScheduler] = None,
+    ):
         self.demo_reader = demo_reader
         self.import_stream = import_stream
+        self.relay = relay
+        self.reader_messages = reader_messages
+        self.result_interval = result_interval
+        self.result_max_latency = max(result_max_latency, result_interval)
         self.connections: dict[ServerConnection, ConnectionParameter] = {}
-        self.messages: defaultdict[int, list[dict]] = defaultdict(list)
+        # the latest card reader messages, older ones are rebuilt from the db
+        self.messages: defaultdict[int, deque[dict]] = defaultdict(
+            functools.partial(deque, maxlen=reader_messages)
+        )
         self.cardreader_status: dict[int, str] = {}
-        self.executor = ThreadPoolExecutor(max_workers=2)
+        # the status of each station of a card reader with several stations
+        self.station_status: defaultdict[int, dict[str, str]] = defaultdict(dict)
+        self.executors = executors if executors is not None else Executors()
+        self.scheduler = scheduler
+        # card reads are stored in one transaction per group if given
+        self.writer = writer
+        self.backup = backup
         self.update_result = asyncio.Event()
+        self.results: dict[int, EventResults] = {}
+        self.pending: dict[int, PendingUpdate] = {}
+        self.metrics: defaultdict[int, UpdateMetrics] = defaultdict(UpdateMetrics)
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
         streaming_status.status.register(callback=self.update_event)
 
         #
@@ -89,94 +185,425 @@ class WebSocketHandler:
         # result
         #
 
-    async def to_thread(
-        self, func: Callable[_P, _R], /, *args: _P.args, **kwargs: _P.kwargs
-    ) -> _R:
-        """Replace asyncio.to_thread and use a ThreadPoolExecutor(2) instance."""
-        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
-        func_call: Callable[[], _R] = functools.partial(func, *args, **kwargs)
-        return await loop.run_in_executor(self.executor, func_call)
+    def health(self) -> dict:
+        """Return the state of the received and the sent result streams."""
+        return {
+            "relay": self.relay is not None,
+            "upstream": self.relay.health() if self.relay is not None else [],
+            "downstream": streaming_status.status.health(),
+            "executors": self.executors.metrics(),
+            "scheduler": self.scheduler.metrics(),
+            "group_commit": self.writer.metrics() if self.writer is not None else None,
+            "backup": self.backup.metrics() if self.backup is not None else None,
+            "iof_validation": iof_schema.validator.metrics(),
+            "results": [
+                {
+                    "event_id": event_id,
+                    "requests": m.requests,
+                    "updates": m.updates,
+                    "coalesced": m.coalesced,
+                    "max_delay": round(m.max_delay, 3),
+                }
+                for event_id, m in self.metrics.items()
+            ],
+        }
+
+    async def process_request(
+        self, connection: ServerConnection, request: Request
+    ) -> Optional[Response]:
+        """Answer a http request of /health or /snapshot instead of opening a websocket."""
+        if request.path == preview.PATH:
+            return await self.snapshot_response(request=request)
+        if request.path != "/health":
+            return None
+        body = json.dumps(self.health()).encode()
+        headers = Headers(
+            [
+                ("Content-Type", "application/json"),
+                ("Content-Length", str(len(body))),
+                ("Connection", "close"),
+            ]
+        )
+        return Response(200, "OK", headers, body)
+
+    async def snapshot_response(self, request: Request) -> Response:
+        """Return the snapshot of the event used by the reader to preview results."""
+        event_key = request.headers.get("X-Event-Key", "")
+        try:
+            snapshot = await self.executors.results.run(
+                self.scheduler.run,
+                Priority.REPORT,
+                model.results.event_snapshot,
+                event_key=event_key,
+            )
+        except EventNotFoundError:
+            return Response(404, "Not Found", Headers([("Connection", "close")]))
+
+        version = snapshot["version"]
+        headers = Headers([("ETag", version), ("Connection", "close")])
+        if request.headers.get("If-None-Match") == version:
+            return Response(304, "Not Modified", headers, b"")
+        body = json.dumps(snapshot).encode()
+        headers["Content-Type"] = "application/json"
+        headers["Content-Length"] = str(len(body))
+        return Response(200, "OK", headers, body)
+
+    def process_response(
+        self, connection: ServerConnection, request: Request, response: Response
+    ) -> None:
+        """Return the selected encoding of binary messages in the handshake response."""
+        encoding = compression.select(request.headers.get(compression.HEADER))
+        if encoding is not None:
+            response.headers[compression.HEADER] = encoding.value
+        if request.path == "/cardreader":
+            batch_size = cardreader_batch.select(
+                request.headers.get(cardreader_batch.HEADER)
+            )
+            if batch_size is not None:
+                response.headers[cardreader_batch.HEADER] = str(batch_size)
 
-    async def send_new_result(self) -> None:
-        while True:
-            try:
-                await asyncio.wait_for(self.update_result.wait(), timeout=60)
-                self.update_result.clear()
-            except asyncio.TimeoutError:
-                pass
+    def encoding(self, websocket: ServerConnection) -> compression.Encoding:
+        if websocket.response is None:
+            return compression.DEFAULT_ENCODING
+        return compression.accepted(websocket.response.headers.get(compression.HEADER))
 
-            try:
-                d: defaultdict[int, list[ServerConnection]] = defaultdict(list)
-                for conn, v in self.connections.items():
-                    if v.event_id is not None and v.show_result:
-                        d[v.event_id].append(conn)
+    def result_changed(self, event_id: Optional[int]) -> None:
+        """Request an update of the results shown in the si1 windows.
 
-                for event_id, connections in d.items():
-                    try:
-                        event, class_results = await asyncio.to_thread(
-                            model.results.event_class_results, event_id=event_id
-                        )
+        This callback is called by cached_result.clear_cache and may be
+        called from any thread.
+        """
+        if self.loop is None:
+            return
+        try:
+            self.loop.call_soon_threadsafe(self.request_update, event_id)
+        except RuntimeError:
+            # event loop is already closed
+            pass
 
-                        # display only finished entries
-                        finished_class_results = []
-                        for class_, ranked_results in class_results:
-                            results = [
-                                r
-                                for r in ranked_results
-                                if r.entry.result.status
-                                not in (
-                                    ResultStatus.INACTIVE,
-                                    ResultStatus.ACTIVE,
-                                    ResultStatus.DID_NOT_START,
-                                )
-                            ]
-                            finished_class_results.append((class_, results))
+    def result_connections(self) -> defaultdict[int, list[ServerConnection]]:
+        d: defaultdict[int, list[ServerConnection]] = defaultdict(list)
+        for conn, v in self.connections.items():
+            if v.event_id is not None and v.show_result:
+                d[v.event_id].append(conn)
+        return d
+
+    def request_update(self, event_id: Optional[int], immediate: bool = False) -> None:
+        """Request an update of the results of an event (None: all events).
+
+        Requests are combined, see due_updates. Immediate requests are used
+        for new clients waiting for the results.
+        """
+        if event_id is None:
+            event_ids = list(self.result_connections())
+        else:
+            event_ids = [event_id]
+
+        now = time.monotonic()
+        for id in event_ids:
+            pending = self.pending.get(id, None)
+            if pending is None:
+                pending = PendingUpdate(first=now, last=now)
+                self.pending[id] = pending
+            pending.last = now
+            pending.immediate = pending.immediate or immediate
+            self.metrics[id].requests += 1
+        self.update_result.set()
+
+    def due_updates(self, now: float) -> tuple[list[int], Optional[float]]:
+        """Return the events to update now and the delay until the next update.
+
+        An update is sent if no further update of the event was requested
+        within result_interval seconds, at most once per result_interval
+        seconds and at the latest result_max_latency seconds after the
+        first request.
+        """
+        due_events = []
+        delay: Optional[float] = None
+        for event_id, pending in list(self.pending.items()):
+            metrics = self.metrics[event_id]
+            if pending.immediate:
+                due = now
+            else:
+                due = min(
+                    max(
+                        pending.last + self.result_interval,
+                        metrics.last_update + self.result_interval,
+                    ),
+                    pending.first + self.result_max_latency,
+                )
+            if due <= now:
+                del self.pending[event_id]
+                metrics.updates += 1
+                metrics.max_delay = max(metrics.max_delay, now - pending.first)
+                metrics.last_update = now
+                due_events.append(event_id)
+            elif delay is None or due - now < delay:
+                delay = due - now
+        return due_events, delay
 
-                        html_code = render.si1_results(
-                            event=event, class_results=finished_class_results
-                        )
-                        data = json.dumps({"status": "result", "data": html_code})
+    async def send_new_result(self) -> None:
+        self.loop = asyncio.get_running_loop()
+        cached_result.register(callback=self.result_changed)
+        delay: Optional[float] = None
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self.update_result.wait(), timeout=delay)
+                    self.update_result.clear()
+                except asyncio.TimeoutError:
+                    pass
 
-                        for conn in connections:
-                            try:
-                                await conn.send(data)
-                            except websockets.exceptions.ConnectionClosed:
-                                pass
-                    except EventNotFoundError:
-                        pass
+                try:
+                    due_events, delay = self.due_updates(now=time.monotonic())
+                    d = self.result_connections()
+
+                    # forget the results of events without connected clients
+                    for event_id in list(self.results):
+                        if event_id not in d:
+                            del self.results[event_id]
+                    for event_id in list(self.metrics):
+                        if event_id not in d and event_id not in self.pending:
+                            del self.metrics[event_id]
+
+                    for event_id in due_events:
+                        connections = d.get(event_id, [])
+                        if not connections:
+                            continue
+                        try:
+                            event, class_results = (
+                                await self.executors.results.run_low_priority(
+                                    self.scheduler.run,
+                                    Priority.BACKGROUND,
+                                    model.results.event_class_results,
+                                    event_id=event_id,
+                                )
+                            )
+                            self.send_class_results(
+                                connections=connections,
+                                event=event,
+                                class_results=class_results,
+                            )
+                        except EventNotFoundError:
+                            pass
+                        except ExecutorBusyError:
+                            # defer the update until the computations are done
+                            logging.warning(f"Result update deferred, {event_id}")
+                            self.request_update(event_id=event_id)
 
-            except asyncio.CancelledError:
-                raise
-            except Exception as e:
-                logging.exception(e)
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    logging.exception(e)
+        finally:
+            cached_result.unregister(callback=self.result_changed)
+
+    def send_class_results(
+        self,
+        connections: list[ServerConnection],
+        event: EventType,
+        class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+    ) -> None:
+        """Send the finished results of an event to the si1 clients.
+
+        Clients already showing the results receive only the classes whose
+        results have changed, new clients receive all classes. All clients
+        receive all classes if the layout of the page has changed.
+        """
+        # display only finished entries
+        finished_class_results = []
+        for class_, ranked_results in class_results:
+            results = [
+                r
+                for r in ranked_results
+                if r.entry.result.status
+                not in (
+                    ResultStatus.INACTIVE,
+                    ResultStatus.ACTIVE,
+                    ResultStatus.DID_NOT_START,
+                )
+            ]
+            finished_class_results.append((class_, results))
+
+        columns = build_columns(class_results=finished_class_results)
+        layout = (
+            event.name,
+            event.date,
+            tuple(class_.id for class_, results in finished_class_results if results),
+            tuple(sorted(columns)),
+        )
+        fingerprints = {
+            class_.id: fingerprint(class_=class_, ranked_results=results)
+            for class_, results in finished_class_results
+            if results
+        }
+        previous = self.results.get(event.id, None)
+        self.results[event.id] = EventResults(layout=layout, fingerprints=fingerprints)
+
+        old_connections: list[ServerConnection] = []
+        if previous is None or previous.layout != layout:
+            new_connections = connections
+        else:
+            new_connections = []
+            for conn in connections:
+                if self.connections[conn].results_sent:
+                    old_connections.append(conn)
+                else:
+                    new_connections.append(conn)
+
+        changed_class_results = []
+        if old_connections and previous is not None:
+            changed_class_results = [
+                (class_, results)
+                for class_, results in finished_class_results
+                if results
+                and previous.fingerprints[class_.id] != fingerprints[class_.id]
+            ]
+
+        # the frames are rendered only for the formats used by the clients
+        for format in FORMATS:
+            conns = [c for c in new_connections if self.connections[c].format == format]
+            if conns:
+                data = self.render_results(
+                    format=format, event=event, class_results=finished_class_results
+                )
+                self.broadcast(connections=conns, data=data)
+                for conn in conns:
+                    self.connections[conn].results_sent = True
+
+            conns = [c for c in old_connections if self.connections[c].format == format]
+            if conns and changed_class_results:
+                data = self.render_patch(
+                    format=format, class_results=changed_class_results, columns=columns
+                )
+                self.broadcast(connections=conns, data=data)
+
+    def render_results(
+        self,
+        format: str,
+        event: EventType,
+        class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+    ) -> str:
+        if format == "json":
+            return json.dumps(
+                {
+                    "status": "result",
+                    "format": si1_json.VERSION,
+                    "data": si1_json.results(event=event, class_results=class_results),
+                },
+                separators=(",", ":"),
+            )
+        html_code = render.si1_results(event=event, class_results=class_results)
+        return json.dumps({"status": "result", "data": html_code})
+
+    def render_patch(
+        self,
+        format: str,
+        class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+        columns: set[str],
+    ) -> str:
+        if format == "json":
+            return json.dumps(
+                {
+                    "status": "resultPatch",
+                    "format": si1_json.VERSION,
+                    "classes": {
+                        str(class_.id): si1_json.class_result(
+                            class_=class_, ranked_results=results, columns=columns
+                        )
+                        for class_, results in class_results
+                    },
+                },
+                separators=(",", ":"),
+            )
+        classes = {
+            str(class_.id): render.si1_class_result(
+                class_=class_, ranked_results=results, columns=columns
+            )
+            for class_, results in class_results
+        }
+        return json.dumps({"status": "resultPatch", "classes": classes})
 
     async def update_event(self, event: EventType) -> None:
-        for conn, value in self.connections.items():
-            if event.id == value.event_id:
-                await self.send(conn=conn, event=copy.deepcopy(event), message={})
+        await self.send_to_all(event=event, message={})
+
+    def broadcast(self, connections: list[ServerConnection], data: str) -> None:
+        """Send data to all connections without waiting for slow clients.
+
+        Clients not reading the sent frames are disconnected before their
+        buffer grows without limit, the pages reconnect automatically.
+        """
+        receivers = []
+        for conn in connections:
+            if conn.transport.get_write_buffer_size() > MAX_WRITE_BUFFER:
+                logging.warning(f"Slow websocket client, {conn.remote_address}")
+                conn.transport.abort()
+            else:
+                receivers.append(conn)
+        broadcast(connections=receivers, message=data)
 
     async def send_to_all(self, event: EventType, message: dict) -> None:
+        """Render the frame once for each path and send it to all clients.
+
+        Clients of /si2 got the whole table when connecting, they receive
+        only the reader status and the row of a new card read.
+        """
+        connections: defaultdict[tuple[bool, str], list[ServerConnection]] = (
+            defaultdict(list)
+        )
         for conn, value in self.connections.items():
             if event.id == value.event_id:
-                await self.send(conn=conn, event=copy.deepcopy(event), message=message)
+                connections[(self.is_si2(conn=conn), value.format)].append(conn)
+        for (si2, format), conns in connections.items():
+            if si2:
+                data = self.render_update(event=event, message=message)
+            else:
+                data = self.render(si2=si2, event=event, message=message, format=format)
+            self.broadcast(connections=conns, data=data)
+
+    def is_si2(self, conn: ServerConnection) -> bool:
+        return conn.request is not None and conn.request.path == "/si2"
 
     async def send(
         self, conn: ServerConnection, event: EventType, message: dict
     ) -> None:
+        parameter = self.connections.get(conn, ConnectionParameter())
+        data = self.render(
+            si2=self.is_si2(conn=conn),
+            event=event,
+            message=message,
+            format=parameter.format,
+        )
+        try:
+            await conn.send(data)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+    def render(
+        self, si2: bool, event: EventType, message: dict, format: str = "html"
+    ) -> str:
         status = self.cardreader_status.get(event.id, "readerOffline")
 
-        if conn.request and conn.request.path == "/si2":
+        if si2:
             stream_status = streaming_status.status.get(id=event.id)
             print("stream_status:", stream_status)
+            messages = self.messages.get(event.id, deque())
             data = render.reader_table(
                 status=status,
                 stream_status=stream_status,
                 event=event,
-                messages=self.messages.get(event.id, []),
+                messages=list(messages),
+                older=len(messages) == self.reader_messages,
             )
         else:
+            read: Optional[dict] = None
             if status != "cardRead":
                 data = message.get("controlCard", "")
+            elif format == "json" and (
+                message.get("error", None) is not None
+                or message.get("lastName", None) is not None
+            ):
+                read = si1_json.card_read(message=message)
             elif message.get("error", None) is not None:
                 data = render.si1_error(message=message)
             elif message.get("lastName", None) is not None:
@@ -188,16 +615,152 @@ class WebSocketHandler:
                 if status == "cardRead":
                     status = "readerConnected"
 
-            data = json.dumps(
-                {
-                    "status": status,
-                    "name": event.name,
-                    "date": event.date.isoformat(),
-                    "data": str(data),
-                }
-            )
+            if format == "json":
+                data = json.dumps(
+                    {
+                        "status": status,
+                        "format": si1_json.VERSION,
+                        "name": event.name,
+                        "date": event.date.isoformat(),
+                        "data": read if read is not None else str(data),
+                    },
+                    separators=(",", ":"),
+                )
+            else:
+                data = json.dumps(
+                    {
+                        "status": status,
+                        "name": event.name,
+                        "date": event.date.isoformat(),
+                        "data": str(data),
+                    }
+                )
+        return str(data)
+
+    def render_update(self, event: EventType, message: dict) -> str:
+        status = self.cardreader_status.get(event.id, "readerOffline")
+        stream_status = streaming_status.status.get(id=event.id)
+        if status == "cardRead" and message:
+            row = render.reader_row(message=message)
+        else:
+            row = None
+        return json.dumps(
+            {
+                "status": render.reader_status(
+                    status=status, stream_status=stream_status
+                ),
+                "row": row,
+                "limit": self.reader_messages,
+            }
+        )
+
+    async def store_cardreader_result(
+        self, event_key: str, item: result_type.CardReaderMessage
+    ) -> tuple[str, EventType, dict]:
+        if self.writer is not None:
+            return await self.writer.store(event_key=event_key, item=item)
+        return await self.executors.cardreader.run(
+            self.scheduler.run,
+            Priority.READOUT,
+            model.results.store_cardreader_result,
+            event_key=event_key,
+            item=item,
+        )
+
+    def reader_status(self, event_id: int, station: Optional[str], status: str) -> str:
+        """Return the status of the card reader after a message of a station.
+
+        A card reader with several stations is disconnected with its last
+        station, messages without station are from a single station.
+        """
+        if station is None:
+            return status
+        stations = self.station_status[event_id]
+        if status == "readerDisconnected":
+            stations.pop(station, None)
+            if stations:
+                return "readerConnected"
+        else:
+            stations[station] = status
+        return status
+
+    async def cardreader_result(self, status: str, event: EventType, res: dict) -> dict:
+        """Show the stored card reader message and return the reply to the reader."""
+        self.cardreader_status[event.id] = status
+
+        if "entryTime" in res:
+            res["entryTime"] = res["entryTime"].strftime("%H:%M:%S")
+
+        if status == "cardRead":
+            self.messages[event.id].append(res.copy())
+        await self.send_to_all(event=event, message=res.copy())
+
+        res["readerStatus"] = status
+        res["event"] = event.name
+        if "status" in res:
+            res["status"] = res["status"].name
+        return res
+
+    async def store_batch(
+        self, event_key: str, batch: list
+    ) -> tuple[list[dict], Optional[EventType]]:
+        """Store the card reads of a batch in one transaction.
+
+        Returns the acknowledgements, in any order, and the event of the
+        card reads. Card reads that can not be parsed or whose event does
+        not exist are rejected, the other card reads of the batch are stored.
+        """
+        acks: list[dict] = []
+        items: list[tuple[str, result_type.CardReaderMessage]] = []
+        seqs = []
+        for element in batch:
+            try:
+                seq = element["seq"]
+                item = model.results.parse_cardreader_log(item=element["item"])
+            except Exception as e:
+                seq = element.get("seq") if isinstance(element, dict) else None
+                acks.append({"seq": seq, "rejected": str(e)})
+                continue
+            items.append((event_key, item))
+            seqs.append(seq)
+        if not items:
+            return acks, None
+
+        results = await self.executors.cardreader.run(
+            self.scheduler.run,
+            Priority.READOUT,
+            model.results.store_cardreader_results,
+            items=items,
+        )
+        event = None
+        for seq, result in zip(seqs, results):
+            if isinstance(result, EventNotFoundError):
+                acks.append({"seq": seq, "rejected": str(result)})
+                continue
+            status, event, res = result
+            res = await self.cardreader_result(status=status, event=event, res=res)
+            res["seq"] = seq
+            acks.append(res)
+
+        return acks, event
+
+    async def send_history(self, conn: ServerConnection, event_id: int) -> None:
+        """Send the table with all card reads of the event stored in the db."""
+        event = await self.executors.results.run(model.events.get_event, id=event_id)
+        messages = await self.executors.results.run_low_priority(
+            self.scheduler.run,
+            Priority.REPORT,
+            model.results.cardreader_history,
+            event_id=event_id,
+        )
+        data = render.reader_table(
+            status=self.cardreader_status.get(event.id, "readerOffline"),
+            stream_status=streaming_status.status.get(id=event.id),
+            event=event,
+            messages=messages,
+        )
         try:
-            await conn.send(str(data))
+            await conn.send(data)
         except websockets.exceptions.ConnectionClosed:
             pass
 
@@ -211,6 +774,7 @@ class WebSocketHandler:
 
         if websocket.request.path == "/import":
             event_key = websocket.request.headers.get("X-Event-Key", "")
+            encoding = self.encoding(websocket=websocket)
             try:
                 if self.import_stream:
                     async for message in websocket:
@@ -218,15 +782,27 @@ class WebSocketHandler:
                         if isinstance(message, str):
                             raise MessageError(code=CloseCode.INVALID_DATA)
                         try:
-                            data = bz2.decompress(message)
+                            data = compression.decompress(message, encoding=encoding)
                         except Exception:
                             data = message
 
-                        await asyncio.to_thread(
-                            model.entries.import_iof_result_list,
-                            event_key=event_key,
-                            content=data,
-                        )
+                        if self.relay is not None:
+                            await self.executors.imports.run(
+                                self.scheduler.run,
+                                Priority.BACKGROUND,
+                                self.relay.import_result_list,
+                                event_key=event_key,
+                                content=data,
+                                address=websocket.remote_address[0],
+                            )
+                        else:
+                            await self.executors.imports.run(
+                                self.scheduler.run,
+                                Priority.BACKGROUND,
+                                model.entries.import_iof_result_list,
+                                event_key=event_key,
+                                content=data,
+                            )
                         await websocket.send(json.dumps({"result": "ok"}))
                         t2 = time.time()
                         logging.info(
@@ -237,6 +813,9 @@ class WebSocketHandler:
                 pass
             except EventNotFoundError:
                 await websocket.send(json.dumps({"result": "eventNotFound"}))
+            except ConstraintError as e:
+                logging.warning(f"Importing result rejected, {addr}: {e}")
+                await websocket.send(json.dumps({"result": "eventExists"}))
             except Exception as e:
                 logging.exception(e)
                 await websocket.send(json.dumps({"result": "error"}))
@@ -273,7 +852,9 @@ class WebSocketHandler:
                         )
 
                         # add the event date to the times entered on the webpage
-                        events = await asyncio.to_thread(model.events.get_events)
+                        events = await self.executors.cardreader.run(
+                            model.events.get_events
+                        )
                         date_of_event = datetime.date.today()
                         for e in events:
                             if e.key == item.get("key", None):
@@ -318,35 +899,18 @@ class WebSocketHandler:
                         d.result = result
 
                         try:
-                            xxx = await asyncio.to_thread(
-                                model.results.store_cardreader_result,
-                                event_key=item["key"],
-                                item=d,
+                            xxx = await self.store_cardreader_result(
+                                event_key=item["key"], item=d
                             )
                             status, event, res = xxx
                         except EventNotFoundError as e:
                             raise RuntimeError(str(e))
 
-                        self.cardreader_status[event.id] = status
-
-                        if "entryTime" in res:
-                            res["entryTime"] = res["entryTime"].strftime("%H:%M:%S")
-
-                        if status == "cardRead":
-                            self.messages[event.id].append(res.copy())
-                        await self.send_to_all(
-                            event=copy.deepcopy(event), message=res.copy()
+                        res = await self.cardreader_result(
+                            status=status, event=event, res=res
                         )
-
-                        res["readerStatus"] = status
-                        res["event"] = event.name
-                        if "status" in res:
-                            res["status"] = res["status"].name
                         print(res)
 
-                        if status == "cardRead":
-                            self.update_result.set()
-
             except websockets.exceptions.ConnectionClosed:
                 pass
             except Exception as e:
@@ -357,62 +921,77 @@ class WebSocketHandler:
                 if event:
                     if event.id in self.cardreader_status:
                         del self.cardreader_status[event.id]
-                    await self.send_to_all(event=copy.deepcopy(event), message={})
+                    await self.send_to_all(event=event, message={})
 
         elif websocket.request.path == "/cardreader":
             event = None
             event_key = websocket.request.headers.get("X-Event-Key", "")
+            encoding = self.encoding(websocket=websocket)
+            batch_size = (
+                cardreader_batch.accepted(
+                    websocket.response.headers.get(cardreader_batch.HEADER)
+                )
+                if websocket.response is not None
+                else 0
+            )
             try:
                 print(f">>>>>> cardreader, key: {event_key}, {addr}")
                 async for message in websocket:
                     try:
                         if isinstance(message, str):
                             raise MessageError(code=CloseCode.INVALID_DATA)
-                        data = bz2.decompress(message).decode()
+                        data = compression.decompress(
+                            message, encoding=encoding
+                        ).decode()
                     except Exception:
-                        raise RuntimeError("Data not bz2 encoded")
+                        raise RuntimeError(f"Data not {encoding.value} encoded")
 
                     try:
                         item = json.loads(data)
                     except Exception:
                         raise RuntimeError("Data not json deserialisable")
 
+                    if batch_size and isinstance(item, dict) and "batch" in item:
+                        acks, batch_event = await self.store_batch(
+                            event_key=event_key, batch=item["batch"][:batch_size]
+                        )
+                        # card reads exceeding the negotiated size are not stored
+                        for element in item["batch"][batch_size:]:
+                            seq = (
+                                element.get("seq")
+                                if isinstance(element, dict)
+                                else None
+                            )
+                            acks.append(
+                                {"seq": seq, "rejected": cardreader_batch.TOO_LARGE}
+                            )
+                        event = batch_event or event
+                        await websocket.send(json.dumps({"acks": acks}))
+                        continue
+
+                    station = item.get("station") if isinstance(item, dict) else None
                     try:
                         item = model.results.parse_cardreader_log(item=item)
                     except Exception as e:
                         raise RuntimeError(str(e))
 
                     try:
-                        xxx = await asyncio.to_thread(
-                            model.results.store_cardreader_result,
-                            event_key=event_key,
-                            item=item,
+                        xxx = await self.store_cardreader_result(
+                            event_key=event_key, item=item
                         )
                         status, event, res = xxx
                     except EventNotFoundError as e:
                         raise RuntimeError(str(e))
 
-                    self.cardreader_status[event.id] = status
-
-                    if "entryTime" in res:
-                        res["entryTime"] = res["entryTime"].strftime("%H:%M:%S")
-
-                    if status == "cardRead":
-                        self.messages[event.id].append(res.copy())
-                    await self.send_to_all(
-                        event=copy.deepcopy(event), message=res.copy()
+                    status = self.reader_status(
+                        event_id=event.id, station=station, status=status
+                    )
+                    res = await self.cardreader_result(
+                        status=status, event=event, res=res
                     )
-
-                    res["readerStatus"] = status
-                    res["event"] = event.name
-                    if "status" in res:
-                        res["status"] = res["status"].name
                     print(res)
                     await websocket.send(json.dumps(res))
 
-                    if status == "cardRead":
-                        self.update_result.set()
-
             except websockets.exceptions.ConnectionClosed:
                 pass
             except Exception as e:
@@ -424,7 +1003,8 @@ class WebSocketHandler:
                 if event:
                     if event.id in self.cardreader_status:
                         del self.cardreader_status[event.id]
-                    await self.send_to_all(event=copy.deepcopy(event), message={})
+                    self.station_status.pop(event.id, None)
+                    await self.send_to_all(event=event, message={})
 
         elif websocket.request.path in ("/si1", "/si2"):
 
@@ -471,11 +1051,15 @@ class WebSocketHandler:
                             self.connections[websocket] = ConnectionParameter()
                             event_id = message["event_id"]
                             results = message["view"] == 0
+                            format = message.get("format", "html")
+                            if format not in FORMATS:
+                                raise MessageError(code=CloseCode.INVALID_DATA)
                             self.connections[websocket].event_id = event_id
                             self.connections[websocket].show_result = results
+                            self.connections[websocket].format = format
 
                             try:
-                                event = await asyncio.to_thread(
+                                event = await self.executors.results.run(
                                     model.events.get_event, id=event_id
                                 )
                             except EventNotFoundError:
@@ -483,7 +1067,7 @@ class WebSocketHandler:
 
                             if event:
                                 await self.send(conn=websocket, event=event, message={})
-                                self.update_result.set()
+                                self.request_update(event_id=event_id, immediate=True)
                             else:
                                 await websocket.send(
                                     json.dumps({"status": "readerOffline", "data": ""})
@@ -495,13 +1079,27 @@ class WebSocketHandler:
                             self.connections[websocket].event_id = event_id
 
                             try:
-                                event = await asyncio.to_thread(
+                                event = await self.executors.results.run(
                                     model.events.get_event, id=event_id
                                 )
                                 await self.send(conn=websocket, event=event, message={})
                             except EventNotFoundError:
                                 pass
 
+                        elif (
+                            websocket.request.path == "/si2"
+                            and "history" in message
+                            and websocket in self.connections
+                        ):
+                            event_id = self.connections[websocket].event_id
+                            if event_id is not None:
+                                try:
+                                    await self.send_history(
+                                        conn=websocket, event_id=event_id
+                                    )
+                                except (EventNotFoundError, ExecutorBusyError):
+                                    pass
+
                         else:
                             raise MessageError(
                                 code=CloseCode.INVALID_DATA,
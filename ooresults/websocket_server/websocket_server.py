@@ -24,17 +24,46 @@ from typing import Optional
 
 from websockets.asyncio.server import Server
 from websockets.asyncio.server import serve
+from websockets.extensions.permessage_deflate import ServerPerMessageDeflateFactory
 
 from ooresults.otypes.event_type import EventType
+from ooresults.utils.backup import BackupScheduler
+from ooresults.websocket_server.executors import Executors
+from ooresults.websocket_server.group_commit import GroupCommitWriter
+from ooresults.websocket_server.relay import Relay
 from ooresults.websocket_server.streaming import Streaming
+from ooresults.websocket_server.websocket_handler import READER_MESSAGES
+from ooresults.websocket_server.websocket_handler import RESULT_INTERVAL
+from ooresults.websocket_server.websocket_handler import RESULT_MAX_LATENCY
 from ooresults.websocket_server.websocket_handler import WebSocketHandler
 
 
+# The html frames sent to /si1 and /si2 are large and sent to each client.
+# Compared to the websockets defaults (window 12 bits, memLevel 5, level 6)
+# these settings need 96 KiB instead of 32 KiB per connection, compress the
+# result frames to the same size and need only a third of the time.
+EXTENSIONS = [
+    ServerPerMessageDeflateFactory(
+        server_max_window_bits=14,
+        client_max_window_bits=12,
+        compress_settings={"memLevel": 6, "level": 1},
+    )
+]
+
+
 class WebSocketServer(threading.Thread):
     def __init__(
         self,
         demo_reader: bool = False,
         import_stream: bool = False,
+        streaming_interval: float = 2.0,
+        relay: Optional[Relay] = None,
+        reader_messages: int = READER_MESSAGES,
+        result_interval: float = RESULT_INTERVAL,
+        result_max_latency: float = RESULT_MAX_LATENCY,
+        executors: Optional[Executors] = None,
+        writer: Optional[GroupCommitWriter] = None,
+        backup: Optional[BackupScheduler] = None,
         host: str = "0.0.0.0",
         port: int = 8081,
         ssl_cert=None,
@@ -44,6 +73,14 @@ class WebSocketServer(threading.Thread):
         self.server: Optional[Server] = None
         self.demo_reader = demo_reader
         self.import_stream = import_stream
+        self.streaming_interval = streaming_interval
+        self.relay = relay
+        self.reader_messages = reader_messages
+        self.result_interval = result_interval
+        self.result_max_latency = result_max_latency
+        self.executors = executors if executors is not None else Executors()
+        self.writer = writer
+        self.backup = backup
         self.handler: Optional[WebSocketHandler] = None
         self.streaming: Optional[Streaming] = None
         self.host = host
@@ -61,9 +98,22 @@ class WebSocketServer(threading.Thread):
 
         asyncio.set_event_loop(loop=self.loop)
 
-        self.streaming = Streaming(loop=self.loop)
+        self.streaming = Streaming(
+            loop=self.loop,
+            min_interval=self.streaming_interval,
+            relay=self.relay,
+            executor=self.executors.results,
+        )
         self.handler = WebSocketHandler(
-            demo_reader=self.demo_reader, import_stream=self.import_stream
+            demo_reader=self.demo_reader,
+            import_stream=self.import_stream,
+            relay=self.relay,
+            reader_messages=self.reader_messages,
+            result_interval=self.result_interval,
+            result_max_latency=self.result_max_latency,
+            executors=self.executors,
+            writer=self.writer,
+            backup=self.backup,
         )
         self.loop.create_task(self.start_server(ssl_context=ssl_context))
         self.loop.create_task(self.handler.send_new_result())
@@ -76,6 +126,9 @@ class WebSocketServer(threading.Thread):
         if self.handler:
             self.server = await serve(
                 handler=self.handler.handler,
+                process_request=self.handler.process_request,
+                process_response=self.handler.process_response,
+                extensions=EXTENSIONS,
                 host=self.host,
                 port=self.port,
                 ssl=ssl_context,
@@ -92,7 +145,13 @@ class WebSocketServer(threading.Thread):
             await self.streaming.update_event(event=event)
 
     def close(self) -> None:
+        if self.streaming:
+            self.streaming.close()
         if self.loop:
             if self.server:
                 self.server.close()
             self.loop.call_soon_threadsafe(self.loop.stop)
+        if self.writer:
+            self.writer.close()
+        if self.backup:
+            self.backup.close()
@@ -0,0 +1,242 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+from collections.abc import Iterator
+from datetime import timezone
+
+import pytest
+
+from ooresults import model
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.otypes.start_type import PersonRaceStart
+from ooresults.plugins import event_package
+from ooresults.repo.repo import ConstraintError
+from ooresults.repo.repo import EventNotFoundError
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.repo.update import update_tables
+
+
+S1 = datetime.datetime(2021, 8, 19, 10, 0, 0, tzinfo=timezone.utc)
+F1 = datetime.datetime(2021, 8, 19, 10, 33, 21, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def db() -> Iterator[SqliteRepo]:
+    model.db = SqliteRepo(db=":memory:")
+    yield model.db
+    model.db.close()
+
+
+@pytest.fixture
+def event_id(db: SqliteRepo) -> int:
+    with db.transaction():
+        event_id = db.add_event(
+            name="Event",
+            date=datetime.date(year=2021, month=8, day=19),
+            key="local",
+            publish=True,
+            series="Run 1",
+            fields=["Region"],
+        )
+        club_id = db.add_club(name="OL Bundestag")
+        competitor_1_id = db.add_competitor(
+            first_name="Angela",
+            last_name="Merkel",
+            club_id=club_id,
+            gender="F",
+            year=1957,
+            chip="1234567",
+        )
+        competitor_2_id = db.add_competitor(
+            first_name="Jogi",
+            last_name="Löw",
+            club_id=None,
+            gender="M",
+            year=None,
+            chip="",
+        )
+        course_id = db.add_course(
+            event_id=event_id,
+            name="Bahn A",
+            length=4500,
+            climb=90,
+            controls=["101", "102"],
+        )
+        class_1_id = db.add_class(
+            event_id=event_id,
+            name="Elite",
+            short_name="E",
+            course_id=course_id,
+            params=ClassParams(),
+        )
+        class_2_id = db.add_class(
+            event_id=event_id,
+            name="Open",
+            short_name=None,
+            course_id=None,
+            params=ClassParams(otype="score"),
+        )
+        db.add_entry(
+            event_id=event_id,
+            competitor_id=competitor_1_id,
+            class_id=class_1_id,
+            club_id=club_id,
+            not_competing=False,
+            chip="1234567",
+            fields={0: "Nord"},
+            result=PersonRaceResult(
+                status=ResultStatus.OK, start_time=S1, finish_time=F1, time=2001
+            ),
+            start=PersonRaceStart(start_time=S1),
+        )
+        db.add_entry(
+            event_id=event_id,
+            competitor_id=competitor_2_id,
+            class_id=class_2_id,
+            club_id=None,
+            not_competing=True,
+            chip="",
+            fields={},
+            result=PersonRaceResult(),
+            start=PersonRaceStart(),
+        )
+        db.add_entry_result(
+            event_id=event_id,
+            chip="7654321",
+            result=PersonRaceResult(status=ResultStatus.FINISHED),
+            start=PersonRaceStart(),
+        )
+        # data of another event is not exported
+        other_event_id = db.add_event(
+            name="Other event",
+            date=datetime.date(year=2021, month=8, day=20),
+            key=None,
+            publish=False,
+            series=None,
+            fields=[],
+        )
+        db.add_club(name="Unused club")
+        db.add_course(
+            event_id=other_event_id,
+            name="Bahn B",
+            length=None,
+            climb=None,
+            controls=[],
+        )
+    return event_id
+
+
+def content(db: SqliteRepo, event_id: int) -> tuple:
+    with db.transaction():
+        event = db.get_event(id=event_id)
+        courses = db.get_courses(event_id=event_id)
+        classes = db.get_classes(event_id=event_id)
+        entries = db.get_entries(event_id=event_id)
+    return (
+        (event.name, event.date, event.key, event.publish, event.series, event.fields),
+        [(c.name, c.length, c.climb, c.controls) for c in courses],
+        [(c.name, c.short_name, c.course_name, c.params) for c in classes],
+        sorted(
+            [
+                (
+                    e.first_name or "",
+                    e.last_name or "",
+                    e.class_name or "",
+                    e.club_name or "",
+                    e.not_competing,
+                    e.chip,
+                    e.fields,
+                    e.result,
+                    e.start,
+                )
+                for e in entries
+            ]
+        ),
+    )
+
+
+def test_export_and_import_into_another_database(db: SqliteRepo, event_id: int):
+    expected = content(db=db, event_id=event_id)
+    package = model.events.export_event_package(event_id=event_id)
+
+    other_db = SqliteRepo(db=":memory:")
+    try:
+        model.db = other_db
+        new_event_id = model.events.import_event_package(source=package)
+        assert content(db=other_db, event_id=new_event_id) == expected
+        with other_db.transaction():
+            assert [c.name for c in other_db.get_clubs()] == ["OL Bundestag"]
+            assert len(other_db.get_competitors()) == 2
+    finally:
+        other_db.close()
+
+
+def test_import_uses_stored_clubs_and_competitors(db: SqliteRepo, event_id: int):
+    expected = content(db=db, event_id=event_id)
+    package = model.events.export_event_package(event_id=event_id)
+    with db.transaction():
+        event = db.get_event(id=event_id)
+        db.update_event(
+            id=event_id,
+            name="Renamed",
+            date=event.date,
+            key=None,
+            publish=event.publish,
+            series=event.series,
+            fields=event.fields,
+        )
+        number_of_competitors = len(db.get_competitors())
+        number_of_clubs = len(db.get_clubs())
+
+    new_event_id = model.events.import_event_package(source=package)
+    assert new_event_id != event_id
+    assert content(db=db, event_id=new_event_id) == expected
+    with db.transaction():
+        assert len(db.get_competitors()) == number_of_competitors
+        assert len(db.get_clubs()) == number_of_clubs
+
+
+def test_import_existing_event_fails(db: SqliteRepo, event_id: int):
+    package = model.events.export_event_package(event_id=event_id)
+    with pytest.raises(ConstraintError, match="Event or event key already exist"):
+        model.events.import_event_package(source=package)
+    with db.transaction():
+        assert len(db.get_events()) == 2
+
+
+def test_export_deleted_event_fails(db: SqliteRepo, event_id: int):
+    model.events.delete_event(id=event_id)
+    with pytest.raises(EventNotFoundError):
+        model.events.export_event_package(event_id=event_id)
+
+
+def test_import_invalid_package_fails(db: SqliteRepo):
+    with pytest.raises(RuntimeError, match="File is not an event package"):
+        model.events.import_event_package(source=b"<xml/>")
+
+
+def test_import_package_of_another_db_version_fails(db: SqliteRepo, event_id: int):
+    with db.transaction():
+        rows = db.get_event_rows(event_id=event_id)
+    package = event_package.create(rows=rows, db_version=update_tables.VERSION - 1)
+    with pytest.raises(RuntimeError, match="DB version"):
+        model.events.import_event_package(source=package)
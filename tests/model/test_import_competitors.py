@@ -264,3 +264,18 @@ def test_import_competitors_missing_values_do_not_change_anything(
         year=1957,
         chip="1234567",
     )
+
+
+def test_competitors_are_read_before_the_database_is_locked(db: SqliteRepo) -> None:
+    def competitors() -> Iterator[dict]:
+        # a card readout may be stored while the competitors are read
+        assert not db.db.in_transaction
+        yield {
+            "first_name": "Angela",
+            "last_name": "Merkel",
+            "club": "",
+            "chip": "",
+        }
+
+    model.competitors.import_competitors(competitors=competitors())
+    assert len(model.competitors.get_competitors()) == 1
@@ -1190,3 +1190,22 @@ def test_if_clear_entries_is_true_then_all_entries_are_deleted_before_the_import
             club_name="OL Bundestag",
         ),
     ]
+
+
+def test_entries_are_read_before_the_database_is_locked(
+    db: SqliteRepo, event_2_id: int
+) -> None:
+    def entries() -> Iterator[dict]:
+        # a card readout may be stored while the entries are read
+        assert not db.db.in_transaction
+        yield {
+            "first_name": "Angela",
+            "last_name": "Merkel",
+            "class_": "Class 1",
+            "club": "",
+            "chip": "4455",
+            "result": result_type.PersonRaceResult(),
+        }
+
+    model.entries.import_entries(event_id=event_2_id, entries=entries())
+    assert len(model.entries.get_entries(event_id=event_2_id)) == 1
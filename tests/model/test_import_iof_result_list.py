@@ -423,3 +423,53 @@ def test_import_iof_result_list_delta(
             club_name=None,
         ),
     ]
+
+
+def test_import_iof_result_list_is_discarded_if_the_document_is_invalid(
+    event_id: int,
+    entry_id: int,
+) -> None:
+    person_result = """\
+    <PersonResult>
+      <Person>
+        <Name>
+          <Family>Merkel {i}</Family>
+          <Given>Angela</Given>
+        </Name>
+      </Person>
+      <Result>
+        <Status>OK</Status>
+      </Result>
+    </PersonResult>
+"""
+    # the persons preceding the invalid element are read before the error
+    content = (
+        """\
+<?xml version='1.0' encoding='UTF-8'?>
+<ResultList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0" status="Snapshot">
+  <Event>
+    <Name>1. O-Cup 2020</Name>
+  </Event>
+  <ClassResult>
+    <Class>
+      <Name>Bahn A - Kurz</Name>
+    </Class>
+"""
+        + "".join(person_result.format(i=i) for i in range(1000))
+        + """\
+    <Unknown/>
+  </ClassResult>
+</ResultList>
+"""
+    )
+    entries = model.entries.get_entries(event_id=event_id)
+    competitors = model.competitors.get_competitors()
+
+    with pytest.raises(RuntimeError):
+        model.entries.import_iof_result_list(
+            event_key="local",
+            content=content.encode(),
+        )
+
+    assert model.entries.get_entries(event_id=event_id) == entries
+    assert model.competitors.get_competitors() == competitors
@@ -19,6 +19,7 @@
 
 import copy
 import datetime
+import json
 from collections.abc import Iterator
 
 import pytest
@@ -1614,3 +1615,178 @@ def test_raise_exception_if_event_key_is_unknown(
     assert entries[0] == entry_1
     assert entries[1] == entry_2
     assert entries[2] == entry_3
+
+
+def test_cardreader_history_contains_all_read_cards_sorted_by_finish_time(
+    db: SqliteRepo, event_id: int, entry_1: EntryType, entry_2: EntryType
+) -> None:
+    for control_card, finish_time in (("12734", f1), ("9999", c3)):
+        item = CardReaderMessage(
+            entry_type="cardRead",
+            entry_time=entry_time,
+            control_card=control_card,
+            result=PersonRaceResult(
+                status=ResultStatus.FINISHED,
+                punched_start_time=s1,
+                punched_finish_time=finish_time,
+                si_punched_start_time=s1,
+                si_punched_finish_time=finish_time,
+                split_times=[
+                    SplitTime(
+                        control_code="101",
+                        punch_time=c1,
+                        si_punch_time=c1,
+                        status=SpStatus.ADDITIONAL,
+                    ),
+                ],
+            ),
+        )
+        model.results.store_cardreader_result(event_key="4711", item=item)
+
+    messages = model.results.cardreader_history(event_id=event_id)
+    assert messages == [
+        {
+            "entryTime": "12:39:05",
+            "eventId": event_id,
+            "controlCard": "9999",
+            "firstName": None,
+            "lastName": None,
+            "club": None,
+            "class": None,
+            "status": ResultStatus.FINISHED,
+            "time": t(s1, c3),
+            "error": "Result not assigned to an entry",
+            "missingControls": [],
+        },
+        {
+            "entryTime": "12:39:07",
+            "eventId": event_id,
+            "controlCard": "12734",
+            "firstName": "Robert",
+            "lastName": "Lewandowski",
+            "club": None,
+            "class": "Elite",
+            "status": ResultStatus.MISSING_PUNCH,
+            "time": t(s1, f1),
+            "error": None,
+            "missingControls": ["102", "103"],
+        },
+    ]
+
+
+def test_store_several_messages_in_one_transaction(
+    db: SqliteRepo,
+    event_id: int,
+    entry_1: EntryType,
+    entry_2: EntryType,
+    entry_3: EntryType,
+) -> None:
+    result = PersonRaceResult(
+        status=ResultStatus.FINISHED,
+        punched_start_time=s1,
+        punched_finish_time=f1,
+        si_punched_start_time=s1,
+        si_punched_finish_time=f1,
+        time=None,
+        split_times=[],
+    )
+    item_1 = CardReaderMessage(
+        entry_type="cardRead",
+        entry_time=entry_time,
+        control_card="9999",
+        result=result,
+    )
+    item_2 = CardReaderMessage(
+        entry_type="cardInserted",
+        entry_time=entry_time,
+        control_card="9998",
+        result=None,
+    )
+
+    results = model.results.store_cardreader_results(
+        items=[("4711", item_1), ("4712", copy.deepcopy(item_1)), ("4711", item_2)]
+    )
+    assert len(results) == 3
+    result_1, result_2, result_3 = results
+    assert not isinstance(result_1, repo.EventNotFoundError)
+    assert result_1[0] == "cardRead"
+    assert result_1[1].id == event_id
+    assert result_1[2]["controlCard"] == "9999"
+    assert result_1[2]["error"] == "Control card unknown"
+    assert isinstance(result_2, repo.EventNotFoundError)
+    assert not isinstance(result_3, repo.EventNotFoundError)
+    assert result_3[0] == "cardInserted"
+    assert result_3[2] == {"eventId": event_id, "controlCard": "9998"}
+
+    with db.transaction():
+        entries = db.get_entries(event_id=event_id)
+    assert len(entries) == 4
+    assert [e.class_name for e in entries if e.chip == "9999"] == [None]
+
+
+@pytest.mark.parametrize("control_card", ["7410", "12734", "9999"])
+def test_preview_of_a_card_read_equals_the_stored_result(
+    db: SqliteRepo,
+    event_id: int,
+    entry_1: EntryType,
+    entry_2: EntryType,
+    entry_3: EntryType,
+    control_card: str,
+) -> None:
+    result = PersonRaceResult(
+        status=ResultStatus.FINISHED,
+        punched_start_time=s1,
+        punched_finish_time=f1,
+        si_punched_start_time=s1,
+        si_punched_finish_time=f1,
+        time=None,
+        split_times=[
+            SplitTime(
+                control_code="101",
+                punch_time=c1,
+                si_punch_time=c1,
+                status=SpStatus.ADDITIONAL,
+            ),
+        ],
+    )
+    item = CardReaderMessage(
+        entry_type="cardRead",
+        entry_time=entry_time,
+        control_card=control_card,
+        result=result,
+    )
+
+    # the snapshot is sent to the reader as json
+    snapshot = json.loads(json.dumps(model.results.event_snapshot(event_key="4711")))
+    preview = model.results.preview_cardreader_result(snapshot=snapshot, item=item)
+    assert item.result == result
+
+    _, _, res = model.results.store_cardreader_result(event_key="4711", item=item)
+    del res["eventId"]
+    assert preview == res
+
+
+def test_snapshot_version_changes_with_the_entries(
+    db: SqliteRepo, event_id: int, entry_1: EntryType
+) -> None:
+    snapshot = model.results.event_snapshot(event_key="4711")
+    assert (
+        snapshot["version"] == model.results.event_snapshot(event_key="4711")["version"]
+    )
+    assert list(snapshot["entries"]) == ["12734"]
+    assert snapshot["classes"][str(entry_1.class_id)]["controls"] == [
+        "101",
+        "102",
+        "103",
+    ]
+
+    with db.transaction():
+        db.update_entry_result(
+            id=entry_1.id, chip="12735", result=entry_1.result, start=entry_1.start
+        )
+    assert (
+        snapshot["version"] != model.results.event_snapshot(event_key="4711")["version"]
+    )
+
+    with pytest.raises(repo.EventNotFoundError):
+        model.results.event_snapshot(event_key="4712")
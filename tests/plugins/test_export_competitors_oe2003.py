@@ -741,3 +741,35 @@ def test_status_diacritic_characters_cp1252_encoding() -> None:
     )
 
     assert content == bytes(header + "\r\n" + v1, encoding="windows-1252")
+
+
+def test_export_is_written_in_chunks() -> None:
+    classes = [
+        ClassInfoType(
+            id=i,
+            name=f"Class {i}",
+            short_name=None,
+            course_id=None,
+            course_name=None,
+            course_length=None,
+            course_climb=None,
+            number_of_controls=None,
+            params=ClassParams(),
+        )
+        for i in range(10)
+    ]
+    entries = [
+        EntryType(
+            id=i,
+            event_id=1,
+            competitor_id=i,
+            first_name="v",
+            last_name=f"n{i}",
+            class_id=i % 10,
+        )
+        for i in range(2500)
+    ]
+    chunks = list(oe2003.iter_create(entries=entries, class_list=classes))
+    assert len(chunks) == 3
+    assert b"".join(chunks) == oe2003.create(entries=entries, class_list=classes)
+    assert b"".join(chunks).count(b"\r\n") == 2501
@@ -20,6 +20,8 @@
 from datetime import datetime
 from datetime import timezone
 
+import pytest
+
 from ooresults.otypes import result_type
 from ooresults.otypes import start_type
 from ooresults.otypes.result_type import ResultStatus
@@ -989,3 +991,20 @@ def test_import_extra_fields() -> None:
             "start": start_type.PersonRaceStart(),
         },
     ]
+
+
+def test_quoted_header() -> None:
+    value = '"c";"v";"n";"";"";"";"";"";"";"";"";"";""'
+    content = bytes(
+        ";".join(f'"{h}"' for h in header) + "\r\n" + value, encoding="utf-8"
+    )
+    assert [(e["chip"], e["first_name"], e["last_name"]) for e in parse(content)] == [
+        ("c", "v", "n")
+    ]
+
+
+def test_unknown_dialect_is_detected() -> None:
+    # no chip column, the dialect is detected by clevercsv
+    content = bytes("Vorname|Nachname\nv|n", encoding="utf-8")
+    with pytest.raises(RuntimeError, match="Chip column not found"):
+        parse(content)
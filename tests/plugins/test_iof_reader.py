@@ -0,0 +1,96 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import io
+
+import pytest
+from lxml import etree
+
+from ooresults.plugins import iof_competitor_list
+from ooresults.plugins import iof_reader
+from ooresults.plugins import iof_result_list
+
+
+COMPETITOR = """\
+  <Competitor>
+    <Person>
+      <Name>
+        <Family>Merkel {i}</Family>
+        <Given>Angela</Given>
+      </Name>
+    </Person>
+  </Competitor>
+"""
+
+
+def competitor_list(n: int, tail: str = "") -> bytes:
+    return (
+        '<CompetitorList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0">\n'
+        + "".join(COMPETITOR.format(i=i) for i in range(n))
+        + tail
+        + "</CompetitorList>\n"
+    ).encode()
+
+
+def test_the_root_element_is_returned_first() -> None:
+    elements = iof_reader.iterparse(
+        source=competitor_list(n=2), root="CompetitorList", tags=["Competitor"]
+    )
+    assert next(elements).tag == iof_reader.q("CompetitorList")
+    assert [e.tag for e in elements] == 2 * [iof_reader.q("Competitor")]
+
+
+def test_processed_elements_are_removed() -> None:
+    elements = iof_reader.iterparse(
+        source=competitor_list(n=1000), root="CompetitorList", tags=["Competitor"]
+    )
+    next(elements)
+    for element in elements:
+        # only the element returned before is kept
+        assert len(list(element.itersiblings(preceding=True))) <= 1
+
+
+def test_a_binary_file_object_is_read() -> None:
+    competitors = iof_competitor_list.iterparse_competitor_list(
+        source=io.BytesIO(competitor_list(n=3))
+    )
+    assert [c["last_name"] for c in competitors] == [
+        "Merkel 0",
+        "Merkel 1",
+        "Merkel 2",
+    ]
+
+
+def test_a_wrong_root_element_raises_runtime_error() -> None:
+    with pytest.raises(RuntimeError, match="should be ResultList"):
+        iof_result_list.parse_result_list(competitor_list(n=1))
+
+
+def test_an_invalid_document_raises_runtime_error_after_the_valid_elements() -> None:
+    competitors = iof_competitor_list.iterparse_competitor_list(
+        source=competitor_list(n=10, tail="  <Unknown/>\n")
+    )
+    assert next(competitors)["last_name"] == "Merkel 0"
+    with pytest.raises(RuntimeError, match="Unknown"):
+        list(competitors)
+
+
+def test_a_malformed_document_raises_xml_syntax_error() -> None:
+    with pytest.raises(etree.XMLSyntaxError):
+        iof_competitor_list.parse_competitor_list(competitor_list(n=10)[:-20])
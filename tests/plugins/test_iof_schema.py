@@ -0,0 +1,99 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import threading
+
+import pytest
+from lxml import etree
+
+from ooresults.plugins import iof_schema
+from ooresults.plugins.iof_schema import ValidationPolicy
+from ooresults.plugins.iof_schema import Validator
+
+
+VALID = (
+    b'<ClassList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0">'
+    b"<Class><Name>Elite</Name></Class></ClassList>"
+)
+INVALID = (
+    b'<ClassList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0">'
+    b"<Class><ShortName>E</ShortName></Class></ClassList>"
+)
+
+
+def test_the_schema_is_parsed_once() -> None:
+    assert iof_schema.schema() is iof_schema.schema(name="IOF.xsd")
+
+
+def test_each_thread_has_its_own_schema_for_iterparse() -> None:
+    schemas = []
+    thread = threading.Thread(target=lambda: schemas.append(iof_schema.thread_schema()))
+    thread.start()
+    thread.join()
+    assert iof_schema.thread_schema() is iof_schema.thread_schema()
+    assert iof_schema.thread_schema() is not schemas[0]
+    assert iof_schema.thread_schema() is not iof_schema.schema()
+
+
+def test_validate_raises_runtime_error() -> None:
+    iof_schema.validate(root=etree.XML(VALID))
+    with pytest.raises(RuntimeError):
+        iof_schema.validate(root=etree.XML(INVALID))
+
+
+@pytest.mark.parametrize(
+    "policy,validated",
+    [
+        (ValidationPolicy.ALWAYS, 7),
+        (ValidationPolicy.SAMPLED, 3),
+        (ValidationPolicy.TESTS, 0),
+    ],
+)
+def test_created_documents_are_validated_according_to_the_policy(
+    policy: ValidationPolicy, validated: int
+) -> None:
+    validator = Validator(policy=policy, sample_rate=3)
+    for _ in range(7):
+        validator.validate_created(root=etree.XML(VALID))
+    assert validator.metrics()["created"] == 7
+    assert validator.metrics()["validated"] == validated
+
+
+def test_an_invalid_sample_raises_runtime_error() -> None:
+    validator = Validator(policy=ValidationPolicy.SAMPLED, sample_rate=2)
+    with pytest.raises(RuntimeError):
+        validator.validate_created(root=etree.XML(INVALID))
+    # not sampled
+    validator.validate_created(root=etree.XML(INVALID))
+
+
+def test_chunks_are_returned_unchanged_if_not_validated() -> None:
+    validator = Validator(policy=ValidationPolicy.TESTS)
+    chunks = iter([INVALID])
+    assert validator.validate_created_chunks(chunks) is chunks
+    assert validator.metrics()["validated"] == 0
+
+
+def test_validated_chunks_are_returned_as_document() -> None:
+    validator = Validator(policy=ValidationPolicy.ALWAYS)
+    content = validator.validate_created_chunks(iter([VALID[:10], VALID[10:]]))
+    assert content == VALID
+    assert validator.metrics()["validated"] == 1
+    with pytest.raises(RuntimeError):
+        validator.validate_created_chunks(iter([INVALID]))
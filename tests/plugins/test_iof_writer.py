@@ -0,0 +1,115 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from lxml import etree
+from lxml.builder import ElementMaker
+
+from ooresults.otypes.competitor_type import CompetitorType
+from ooresults.plugins import iof_competitor_list
+from ooresults.plugins import iof_writer
+from ooresults.plugins.iof_writer import END
+from ooresults.plugins.iof_writer import Start
+
+
+E = iof_writer.E
+N = ElementMaker(namespace=iof_writer.IOF_NAMESPACE, nsmap=iof_writer.NSMAP)
+
+ATTRIB = {"iofVersion": "3.0"}
+
+
+def tostring(root: etree._Element) -> bytes:
+    return etree.tostring(
+        root, encoding="UTF-8", xml_declaration=True, pretty_print=True
+    )
+
+
+def test_the_document_equals_the_serialized_tree() -> None:
+    items: list[iof_writer.Item] = [
+        E.Event(E.Name("Event")),
+        Start("ClassResult"),
+        E.Class(E.Name("Elite")),
+        Start("PersonResult"),
+        E.Person(E.Name(E.Family("Merkel"), E.Given("Angela"))),
+        END,
+        END,
+    ]
+    root = N.ResultList(
+        N.Event(N.Name("Event")),
+        N.ClassResult(
+            N.Class(N.Name("Elite")),
+            N.PersonResult(
+                N.Person(N.Name(N.Family("Merkel"), N.Given("Angela"))),
+            ),
+        ),
+        **ATTRIB,
+    )
+    document = b"".join(iof_writer.iter_document("ResultList", ATTRIB, items))
+    assert document == tostring(root)
+
+
+def test_an_empty_document_equals_the_serialized_tree() -> None:
+    document = b"".join(iof_writer.iter_document("CompetitorList", ATTRIB, []))
+    assert document == tostring(N.CompetitorList(**ATTRIB))
+
+
+def test_the_document_is_returned_in_chunks() -> None:
+    items = [E.Competitor(E.Person(E.Name(E.Family(str(i))))) for i in range(100)]
+    chunks = list(
+        iof_writer.iter_document("CompetitorList", ATTRIB, items, chunk_size=256)
+    )
+    assert len(chunks) > 10
+    assert all(len(chunk) < 2 * 256 for chunk in chunks)
+
+    root = N.CompetitorList(
+        *[N.Competitor(N.Person(N.Name(N.Family(str(i))))) for i in range(100)],
+        **ATTRIB,
+    )
+    assert b"".join(chunks) == tostring(root)
+
+
+def test_the_items_are_consumed_incrementally() -> None:
+    consumed = []
+
+    def items():
+        for i in range(100):
+            consumed.append(i)
+            yield E.Competitor(E.Person(E.Name(E.Family(str(i)))))
+
+    chunks = iof_writer.iter_document("CompetitorList", ATTRIB, items(), chunk_size=256)
+    next(chunks)
+    assert len(consumed) < 100
+
+
+def test_iter_competitor_list_equals_create_competitor_list() -> None:
+    competitors = [
+        CompetitorType(
+            id=i,
+            first_name="Angela",
+            last_name=f"Merkel {i}",
+            gender="F",
+            year=1954,
+            chip=str(1000 + i),
+            club_id=None,
+            club_name="OL Bundestag",
+        )
+        for i in range(500)
+    ]
+    document = b"".join(iof_competitor_list.iter_competitor_list(competitors))
+    assert document == iof_competitor_list.create_competitor_list(competitors)
+    assert etree.QName(etree.fromstring(document)).localname == "CompetitorList"
@@ -18,6 +18,7 @@
 
 
 import datetime
+import threading
 from collections.abc import Iterator
 
 import pytest
@@ -359,3 +360,29 @@ def test_delete_event_with_unknown_id_do_not_change_anything(
             fields=[],
         ),
     ]
+
+
+def test_memory_database_is_shared_by_all_threads() -> None:
+    db = SqliteRepo(db="test-events-memory", memory=True)
+    db.close()
+
+    def add_event() -> None:
+        with db.transaction():
+            db.add_event(
+                name="XX",
+                date=D_2021_03_02,
+                key="4711",
+                publish=False,
+                series=None,
+                fields=[],
+            )
+        db.close()
+
+    thread = threading.Thread(target=add_event)
+    thread.start()
+    thread.join()
+
+    with db.transaction():
+        c = db.get_events()
+    db.close()
+    assert [e.name for e in c] == ["XX"]
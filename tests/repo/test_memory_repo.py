@@ -0,0 +1,218 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import pathlib
+import tempfile
+import threading
+from collections.abc import Iterator
+from unittest import mock
+
+import pytest
+
+from ooresults import model
+from ooresults.model import cached_result
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.start_type import PersonRaceStart
+from ooresults.repo.memory_repo import MemoryRepo
+from ooresults.repo.repo import OperationalError
+from ooresults.repo.repo import Repo
+from ooresults.repo.repo import TransactionMode
+from ooresults.repo.sqlite_repo import SqliteRepo
+
+
+@pytest.fixture
+def source() -> Iterator[SqliteRepo]:
+    with tempfile.TemporaryDirectory() as td:
+        _db = SqliteRepo(db=str(pathlib.Path(td) / "ooresults.sqlite"))
+        yield _db
+        _db.close()
+
+
+@pytest.fixture
+def db() -> MemoryRepo:
+    return MemoryRepo()
+
+
+def add_event(db: Repo, name: str) -> int:
+    with db.transaction():
+        event_id = db.add_event(
+            name=name,
+            date=datetime.date(year=2026, month=10, day=17),
+            key=name.lower(),
+            publish=True,
+            series=None,
+            fields=["Start number"],
+        )
+        club_id = db.add_club(name=f"Club {name}")
+        competitor_id = db.add_competitor(
+            first_name="Angela",
+            last_name=f"Merkel {name}",
+            club_id=club_id,
+            gender="F",
+            year=1954,
+            chip="",
+        )
+        course_id = db.add_course(
+            event_id=event_id,
+            name="Bahn A",
+            length=4500,
+            climb=90,
+            controls=["101", "102"],
+        )
+        class_id = db.add_class(
+            event_id=event_id,
+            name="D21",
+            short_name=None,
+            course_id=course_id,
+            params=ClassParams(),
+        )
+        db.add_entry(
+            event_id=event_id,
+            competitor_id=competitor_id,
+            class_id=class_id,
+            club_id=club_id,
+            not_competing=True,
+            chip="1234567",
+            fields={0: "17"},
+            result=PersonRaceResult(),
+            start=PersonRaceStart(),
+        )
+    return event_id
+
+
+def test_refresh_copies_all_records(source: SqliteRepo, db: MemoryRepo) -> None:
+    event_id = add_event(db=source, name="Event")
+
+    db.refresh(source=source)
+    with source.transaction():
+        expected = source.get_event_rows(event_id=event_id)
+        events = source.get_events()
+        competitors = source.get_competitors()
+        entries = source.get_entries(event_id=event_id)
+    with db.transaction():
+        assert db.get_event_rows(event_id=event_id) == expected
+        assert db.get_events() == events
+        assert db.get_competitors() == competitors
+        assert db.get_entries(event_id=event_id) == entries
+
+
+def test_refresh_of_an_event_changes_only_the_event(
+    source: SqliteRepo, db: MemoryRepo
+) -> None:
+    event_1_id = add_event(db=source, name="Event 1")
+    event_2_id = add_event(db=source, name="Event 2")
+    db.refresh(source=source)
+
+    with source.transaction():
+        source.delete_entries(event_id=event_1_id)
+        source.delete_entries(event_id=event_2_id)
+    db.refresh(source=source, event_id=event_1_id)
+
+    with db.transaction():
+        assert db.get_entries(event_id=event_1_id) == []
+        assert len(db.get_entries(event_id=event_2_id)) == 1
+
+
+def test_records_added_after_refresh_get_new_ids(
+    source: SqliteRepo, db: MemoryRepo
+) -> None:
+    event_id = add_event(db=source, name="Event 1")
+    db.refresh(source=source)
+
+    new_event_id = add_event(db=db, name="Event 2")
+    assert new_event_id > event_id
+    with db.transaction():
+        assert [e.name for e in db.get_events()] == ["Event 1", "Event 2"]
+
+
+def test_rollback_discards_the_changes(db: MemoryRepo) -> None:
+    with pytest.raises(RuntimeError):
+        with db.transaction(mode=TransactionMode.IMMEDIATE):
+            db.add_club(name="OL Bundestag")
+            assert len(db.get_clubs()) == 1
+            raise RuntimeError
+    assert db.get_clubs() == []
+
+
+def test_transaction_reads_the_data_committed_at_its_start(db: MemoryRepo) -> None:
+    with db.transaction():
+        assert db.get_clubs() == []
+
+        def add_club() -> None:
+            db.add_club(name="OL Bundestag")
+
+        thread = threading.Thread(target=add_club)
+        thread.start()
+        thread.join()
+        assert db.get_clubs() == []
+
+        # the transaction cannot write after another transaction has committed
+        with pytest.raises(OperationalError, match="database is locked"):
+            db.add_club(name="OL Bundesrat")
+
+    assert [c.name for c in db.get_clubs()] == ["OL Bundestag"]
+
+
+def test_transactions_cannot_be_nested(db: MemoryRepo) -> None:
+    with db.transaction():
+        with pytest.raises(OperationalError):
+            db.start_transaction()
+
+
+def test_a_replica_copies_the_reported_changes_at_the_next_transaction(
+    source: SqliteRepo,
+) -> None:
+    event_1_id = add_event(db=source, name="Event 1")
+    event_2_id = add_event(db=source, name="Event 2")
+    replica = MemoryRepo(source=source)
+
+    with source.transaction():
+        source.delete_entries(event_id=event_1_id)
+        source.delete_entries(event_id=event_2_id)
+    with replica.transaction():
+        assert len(replica.get_entries(event_id=event_1_id)) == 1
+
+    replica.changed(event_id=event_1_id)
+    with replica.transaction():
+        assert replica.get_entries(event_id=event_1_id) == []
+        assert len(replica.get_entries(event_id=event_2_id)) == 1
+
+    replica.changed(event_id=None)
+    with replica.transaction():
+        assert replica.get_entries(event_id=event_2_id) == []
+
+
+def test_cached_results_are_computed_from_the_replica(source: SqliteRepo) -> None:
+    event_id = add_event(db=source, name="Event")
+    replica = MemoryRepo(source=source)
+    cached_result.use_replica(db=replica)
+    try:
+        with mock.patch.object(model, "db", None):
+            _, class_results = cached_result.get_cached_data(event_id=event_id)
+            assert len(class_results[0][1]) == 1
+
+            with source.transaction():
+                source.delete_entries(event_id=event_id)
+            cached_result.clear_cache(event_id=event_id)
+            _, class_results = cached_result.get_cached_data(event_id=event_id)
+            assert class_results[0][1] == []
+    finally:
+        cached_result.use_replica(db=None)
@@ -0,0 +1,310 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import pathlib
+import sqlite3
+import tempfile
+from collections.abc import Iterator
+
+import pytest
+
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.start_type import PersonRaceStart
+from ooresults.repo.repo import ClubUsedError
+from ooresults.repo.repo import CompetitorUsedError
+from ooresults.repo.repo import OperationalError
+from ooresults.repo.sharded_repo import ID_BITS
+from ooresults.repo.sharded_repo import MAX_ATTACHED
+from ooresults.repo.sharded_repo import ShardedSqliteRepo
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.repo.update import update_tables
+
+
+@pytest.fixture
+def path() -> Iterator[pathlib.Path]:
+    with tempfile.TemporaryDirectory() as td:
+        yield pathlib.Path(td)
+
+
+@pytest.fixture
+def db(path: pathlib.Path) -> Iterator[ShardedSqliteRepo]:
+    _db = ShardedSqliteRepo(db=str(path / "ooresults.sqlite"))
+    yield _db
+    _db.close()
+
+
+def add_event(db: SqliteRepo, name: str) -> int:
+    with db.transaction():
+        return db.add_event(
+            name=name,
+            date=datetime.date(year=2026, month=10, day=17),
+            key=None,
+            publish=False,
+            series=None,
+            fields=[],
+        )
+
+
+def add_class(db: SqliteRepo, event_id: int, name: str = "D21") -> int:
+    with db.transaction():
+        return db.add_class(
+            event_id=event_id,
+            name=name,
+            short_name=None,
+            course_id=None,
+            params=ClassParams(),
+        )
+
+
+def add_entry(db: SqliteRepo, event_id: int, competitor_id: int, **kwargs) -> int:
+    class_id = add_class(db=db, event_id=event_id)
+    with db.transaction():
+        return db.add_entry(
+            event_id=event_id,
+            competitor_id=competitor_id,
+            class_id=class_id,
+            club_id=kwargs.get("club_id"),
+            not_competing=False,
+            chip="1234567",
+            fields={},
+            result=PersonRaceResult(),
+            start=PersonRaceStart(),
+        )
+
+
+def add_competitor(db: SqliteRepo, club_id: int | None = None) -> int:
+    with db.transaction():
+        return db.add_competitor(
+            first_name="Angela",
+            last_name="Merkel",
+            club_id=club_id,
+            gender="F",
+            year=None,
+            chip="",
+        )
+
+
+def count(database: pathlib.Path, table: str) -> int:
+    with sqlite3.connect(database) as db:
+        return db.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+
+def test_event_data_is_stored_in_the_event_database(
+    path: pathlib.Path, db: ShardedSqliteRepo
+) -> None:
+    event_id = add_event(db=db, name="Event")
+    competitor_id = add_competitor(db=db)
+    entry_id = add_entry(db=db, event_id=event_id, competitor_id=competitor_id)
+
+    shard = path / "ooresults-events" / f"event_{event_id}.sqlite"
+    assert db.shard_path(event_id=event_id) == shard
+    assert count(database=shard, table="classes") == 1
+    assert count(database=shard, table="entries") == 1
+    assert count(database=path / "ooresults.sqlite", table="classes") == 0
+    assert count(database=path / "ooresults.sqlite", table="entries") == 0
+    assert count(database=path / "ooresults.sqlite", table="competitors") == 1
+
+    # the event of a record is encoded in its id
+    assert entry_id >> ID_BITS == event_id
+    with db.transaction():
+        (entry,) = db.get_entries(event_id=event_id)
+    assert entry.id == entry_id
+    assert entry.last_name == "Merkel"
+    assert entry.class_name == "D21"
+
+
+def test_records_of_several_events_are_found_by_id(db: ShardedSqliteRepo) -> None:
+    event_1_id = add_event(db=db, name="Event 1")
+    event_2_id = add_event(db=db, name="Event 2")
+    class_1_id = add_class(db=db, event_id=event_1_id)
+    class_2_id = add_class(db=db, event_id=event_2_id)
+    db.close()
+
+    with db.transaction():
+        assert db.get_class(id=class_1_id).event_id == event_1_id
+        assert db.get_class(id=class_2_id).event_id == event_2_id
+        db.delete_class(id=class_1_id)
+    with db.transaction():
+        assert db.get_classes(event_id=event_1_id) == []
+        assert [c.id for c in db.get_classes(event_id=event_2_id)] == [class_2_id]
+        with pytest.raises(KeyError):
+            db.get_class(id=class_1_id)
+
+
+def test_events_of_a_single_file_database_remain_in_the_catalogue(
+    path: pathlib.Path,
+) -> None:
+    single = SqliteRepo(db=str(path / "ooresults.sqlite"))
+    event_1_id = add_event(db=single, name="Event 1")
+    class_1_id = add_class(db=single, event_id=event_1_id)
+    single.close()
+
+    db = ShardedSqliteRepo(db=str(path / "ooresults.sqlite"))
+    try:
+        with db.transaction():
+            assert [c.id for c in db.get_classes(event_id=event_1_id)] == [class_1_id]
+        add_class(db=db, event_id=event_1_id, name="H21")
+        assert not db.shard_path(event_id=event_1_id).exists()
+
+        event_2_id = add_event(db=db, name="Event 2")
+        add_class(db=db, event_id=event_2_id)
+        assert db.shard_path(event_id=event_2_id).exists()
+    finally:
+        db.close()
+
+
+def test_event_database_is_removed_after_the_event_is_deleted(
+    db: ShardedSqliteRepo,
+) -> None:
+    event_id = add_event(db=db, name="Event")
+    class_id = add_class(db=db, event_id=event_id)
+    with db.transaction():
+        db.delete_class(id=class_id)
+
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            db.delete_event(id=event_id)
+            raise RuntimeError
+    assert db.shard_path(event_id=event_id).exists()
+
+    with db.transaction():
+        db.delete_event(id=event_id)
+    assert not db.shard_path(event_id=event_id).exists()
+
+
+def test_event_with_classes_cannot_be_deleted(db: ShardedSqliteRepo) -> None:
+    event_id = add_event(db=db, name="Event")
+    add_class(db=db, event_id=event_id)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with db.transaction():
+            db.delete_event(id=event_id)
+
+
+def test_competitor_and_club_used_in_an_event_cannot_be_deleted(
+    db: ShardedSqliteRepo,
+) -> None:
+    event_id = add_event(db=db, name="Event")
+    with db.transaction():
+        club_id = db.add_club(name="OL Bundestag")
+    competitor_id = add_competitor(db=db)
+    add_entry(db=db, event_id=event_id, competitor_id=competitor_id, club_id=club_id)
+
+    # checked with the attached event database
+    with pytest.raises(CompetitorUsedError):
+        with db.transaction():
+            db.delete_competitor(id=competitor_id)
+
+    # checked with a separate connection to the event database
+    db.close()
+    with pytest.raises(CompetitorUsedError):
+        with db.transaction():
+            db.delete_competitor(id=competitor_id)
+    with pytest.raises(ClubUsedError):
+        with db.transaction():
+            db.delete_club(id=club_id)
+
+
+def test_entry_with_unknown_competitor_is_rejected(db: ShardedSqliteRepo) -> None:
+    event_id = add_event(db=db, name="Event")
+
+    with pytest.raises(sqlite3.IntegrityError):
+        add_entry(db=db, event_id=event_id, competitor_id=4711)
+
+
+def test_many_events_are_used_in_successive_transactions(
+    db: ShardedSqliteRepo,
+) -> None:
+    event_ids = [add_event(db=db, name=f"Event {i}") for i in range(MAX_ATTACHED + 3)]
+    for event_id in event_ids:
+        add_class(db=db, event_id=event_id)
+
+    for event_id in event_ids:
+        with db.transaction():
+            assert len(db.get_classes(event_id=event_id)) == 1
+
+    with pytest.raises(OperationalError, match="Too many events"):
+        with db.transaction():
+            for event_id in event_ids:
+                db.get_classes(event_id=event_id)
+
+
+def test_event_database_with_a_newer_version_is_rejected(
+    db: ShardedSqliteRepo,
+) -> None:
+    event_id = add_event(db=db, name="Event")
+    add_class(db=db, event_id=event_id)
+    db.close()
+    with sqlite3.connect(db.shard_path(event_id=event_id)) as shard:
+        shard.execute("UPDATE version SET value=value+1")
+
+    db = ShardedSqliteRepo(db=str(db.database), path=str(db.path))
+    with pytest.raises(RuntimeError, match="DB version of .* to high"):
+        with db.transaction():
+            db.get_classes(event_id=event_id)
+    db.close()
+
+
+def test_event_database_is_updated_when_it_is_used(
+    db: ShardedSqliteRepo, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    event_id = add_event(db=db, name="Event")
+    add_class(db=db, event_id=event_id)
+    db.close()
+
+    def update_016(db: sqlite3.Connection) -> None:
+        db.execute("ALTER TABLE classes ADD COLUMN note TEXT")
+
+    # the next version changes the tables of the event databases
+    monkeypatch.setattr(update_tables, "VERSION", update_tables.VERSION + 1)
+    monkeypatch.setitem(update_tables.SHARD_UPDATES, update_tables.VERSION, update_016)
+    with sqlite3.connect(db.database) as catalogue:
+        catalogue.execute("UPDATE version SET value=?", (update_tables.VERSION,))
+
+    db = ShardedSqliteRepo(db=str(db.database), path=str(db.path))
+    try:
+        with db.transaction():
+            assert [c.name for c in db.get_classes(event_id=event_id)] == ["D21"]
+    finally:
+        db.close()
+    shard = db.shard_path(event_id=event_id)
+    with sqlite3.connect(shard) as s:
+        (version,) = s.execute("SELECT value FROM version").fetchone()
+        assert version == update_tables.VERSION
+        assert "note" in [c[1] for c in s.execute("PRAGMA table_info(classes)")]
+
+
+def test_event_rows_are_copied_into_a_new_event_database(
+    db: ShardedSqliteRepo,
+) -> None:
+    event_id = add_event(db=db, name="Event")
+    competitor_id = add_competitor(db=db)
+    add_entry(db=db, event_id=event_id, competitor_id=competitor_id)
+
+    with db.transaction():
+        rows = db.get_event_rows(event_id=event_id)
+        rows["events"][0]["name"] = "Copy"
+        copy_id = db.add_event_rows(rows=rows)
+    with db.transaction():
+        (entry,) = db.get_entries(event_id=copy_id)
+    assert entry.id >> ID_BITS == copy_id
+    assert entry.competitor_id == competitor_id
+    assert entry.class_name == "D21"
@@ -0,0 +1,162 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+from typing import Optional
+
+import pytest
+
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.entry_type import EntryType
+from ooresults.otypes.entry_type import RankedEntryType
+from ooresults.otypes.event_type import EventType
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.utils import render
+from ooresults.utils.fragment_cache import FragmentCache
+from tests.templates.conftest import Html
+
+
+@pytest.fixture()
+def event() -> EventType:
+    return EventType(
+        id=3,
+        name="Test-Lauf 1",
+        date=datetime.date(year=2023, month=12, day=29),
+        key=None,
+        publish=False,
+        series=None,
+        fields=[],
+    )
+
+
+def class_info(id: int, name: str) -> ClassInfoType:
+    return ClassInfoType(
+        id=id,
+        name=name,
+        short_name=None,
+        course_id=None,
+        course_name=None,
+        course_length=None,
+        course_climb=None,
+        number_of_controls=None,
+        params=ClassParams(),
+    )
+
+
+@pytest.fixture()
+def class_results() -> list[tuple[ClassInfoType, list[RankedEntryType]]]:
+    class_results = []
+    for i in range(3):
+        entry = EntryType(
+            id=100 + i,
+            event_id=3,
+            competitor_id=200 + i,
+            first_name="Angela",
+            last_name=f"Merkel {i}",
+        )
+        entry.result.status = ResultStatus.OK
+        entry.result.time = 600 + i
+        class_results.append(
+            (class_info(id=i, name=f"Class {i}"), [RankedEntryType(entry, rank=1)])
+        )
+    return class_results
+
+
+@pytest.fixture(autouse=True)
+def clear_fragments() -> None:
+    render.fragments.clear()
+
+
+def test_cache_returns_rendered_fragment() -> None:
+    cache = FragmentCache(max_size=10)
+    assert cache.get(key=1, render=lambda: "a") == "a"
+    assert cache.get(key=1, render=lambda: "b") == "a"
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_cache_evicts_least_recently_used_fragment() -> None:
+    cache = FragmentCache(max_size=2)
+    cache.get(key=1, render=lambda: "a")
+    cache.get(key=2, render=lambda: "b")
+    cache.get(key=1, render=lambda: "x")
+    cache.get(key=3, render=lambda: "c")
+
+    assert [fragment for _, fragment in cache.cache.values()] == ["a", "c"]
+
+
+def test_cache_detects_hash_collisions() -> None:
+    # hash(-1) == hash(-2) in CPython
+    cache = FragmentCache(max_size=10)
+    cache.get(key=(-1,), render=lambda: "a")
+    assert cache.get(key=(-2,), render=lambda: "b") == "b"
+    assert cache.get(key=(-2,), render=lambda: "c") == "b"
+
+
+def test_results_table_renders_only_changed_class(
+    event: EventType,
+    class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+) -> None:
+    render.results_table(event=event, class_results=class_results)
+    assert (render.fragments.hits, render.fragments.misses) == (0, 3)
+
+    class_results[1][1][0].entry.result.time = 700
+    html = Html(text=render.results_table(event=event, class_results=class_results))
+    assert (render.fragments.hits, render.fragments.misses) == (2, 4)
+
+    elem = html.find(path=".//table[@id='res.table']/tbody[2]/tr[1]/td[4]")
+    assert elem.text == "11:40"
+
+
+def test_results_table_renders_all_classes_if_columns_change(
+    event: EventType,
+    class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+) -> None:
+    render.results_table(event=event, class_results=class_results)
+
+    class_results[2][0].params = ClassParams(apply_handicap_rule=True)
+    render.results_table(event=event, class_results=class_results)
+    assert (render.fragments.hits, render.fragments.misses) == (0, 6)
+
+
+def test_entries_table_renders_only_changed_group(
+    event: EventType,
+    class_results: list[tuple[ClassInfoType, list[RankedEntryType]]],
+) -> None:
+    view_entries_list: list[tuple[Optional[str], list[RankedEntryType]]] = [
+        (c.name, r) for c, r in class_results
+    ]
+    render.entries_table(
+        event=event, view="classes", view_entries_list=view_entries_list, columns=set()
+    )
+    assert (render.fragments.hits, render.fragments.misses) == (0, 3)
+
+    class_results[0][1][0].entry.chip = "4711"
+    html = Html(
+        text=render.entries_table(
+            event=event,
+            view="classes",
+            view_entries_list=view_entries_list,
+            columns=set(),
+        )
+    )
+    assert (render.fragments.hits, render.fragments.misses) == (2, 4)
+
+    elem = html.find(path=".//table[@id='entr.table']/tbody/tr[2]/td[6]")
+    assert elem.text == "4711"
@@ -389,6 +389,7 @@ def test_cardreader_status(
         (Status.INTERNAL_ERROR, "Internal error", "red"),
         (Status.PROTOCOL_ERROR, "Protocol error", "red"),
         (Status.EVENT_NOT_FOUND, "Event not found", "red"),
+        (Status.EVENT_EXISTS, "Event name already used", "red"),
         (Status.ERROR, "Error", "red"),
         (Status.OK, "Ok", "green"),
     ],
@@ -79,3 +79,16 @@ def test_view(event: EventType, view: int, value: str) -> None:
     assert elem is not None and elem.text is not None
     script = [line.strip() for line in elem.text.splitlines()]
     assert f"var view = {value};  // 0: both, 1: only reader" in script
+
+
+@pytest.mark.parametrize("format", ["json", "html"])
+def test_format(event: EventType, format: str) -> None:
+    html = Html(text=render.si1_page(event=event, view=0, format=format))
+
+    elem = html.find(path="body/script")
+    assert elem is not None and elem.text is not None
+    script = [line.strip() for line in elem.text.splitlines()]
+    assert (
+        f'var format = "{format}";  // json: rendered by this page, html: rendered by the server'
+        in script
+    )
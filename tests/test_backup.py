@@ -0,0 +1,309 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import contextlib
+import datetime
+import pathlib
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+
+import pytest
+
+from ooresults.otypes.class_params import ClassParams
+from ooresults.repo.sharded_repo import ShardedSqliteRepo
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils.backup import BackupScheduler
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import Scheduler
+
+
+@pytest.fixture
+def path() -> Iterator[pathlib.Path]:
+    with tempfile.TemporaryDirectory() as td:
+        yield pathlib.Path(td)
+
+
+@pytest.fixture
+def database(path: pathlib.Path) -> pathlib.Path:
+    database = path / "ooresults.sqlite"
+    db = SqliteRepo(db=str(database))
+    with db.transaction():
+        for i in range(200):
+            db.add_club(name=f"Club {i:03}")
+    db.close()
+    return database
+
+
+def clubs(database: pathlib.Path) -> list[str]:
+    db = SqliteRepo(db=str(database))
+    try:
+        with db.transaction():
+            return [c.name for c in db.get_clubs()]
+    finally:
+        db.close()
+
+
+class WritingScheduler(Scheduler):
+    """Changes the database with another connection before the backup steps."""
+
+    def __init__(self, database: pathlib.Path, writes: int) -> None:
+        super().__init__()
+        self.database = database
+        self.max_writes = writes
+        self.writes = 0
+
+    @contextlib.contextmanager
+    def slot(self, priority: Priority) -> Iterator[None]:
+        assert priority == Priority.BACKGROUND
+        # the first step is made before the first write
+        if 0 < self.metrics()[priority]["completed"] <= self.max_writes:
+            self.writes += 1
+            with sqlite3.connect(self.database) as db:
+                db.execute(
+                    "INSERT INTO clubs (name) VALUES(?)", (f"New {self.writes}",)
+                )
+        with super().slot(priority):
+            yield
+
+
+def test_backup_creates_a_checked_copy(path: pathlib.Path, database: pathlib.Path):
+    backup = BackupScheduler(
+        database=database, path=path / "backups", interval=3600, pages=2
+    )
+    try:
+        target = backup.backup()
+    finally:
+        backup.close()
+
+    assert target.parent == path / "backups"
+    assert target.name.startswith("ooresults-")
+    assert target.suffix == ".sqlite"
+    assert [p.name for p in (path / "backups").iterdir()] == [target.name]
+    assert clubs(database=target) == clubs(database=database)
+
+    metrics = backup.metrics()
+    assert metrics["backups"] == 1
+    assert metrics["failed"] == 0
+    assert metrics["restarts"] == 0
+    assert metrics["last_backup"] == target.name
+
+
+def test_only_the_newest_backups_are_kept(path: pathlib.Path, database: pathlib.Path):
+    backup_path = path / "backups"
+    backup_path.mkdir()
+    for day in range(1, 6):
+        (backup_path / f"ooresults-202610{day:02}-120000.sqlite").touch()
+    (backup_path / "other.sqlite").touch()
+
+    backup = BackupScheduler(database=database, path=backup_path, interval=3600, keep=3)
+    try:
+        target = backup.backup()
+    finally:
+        backup.close()
+
+    assert sorted(p.name for p in backup_path.iterdir()) == [
+        "ooresults-20261004-120000.sqlite",
+        "ooresults-20261005-120000.sqlite",
+        target.name,
+        "other.sqlite",
+    ]
+
+
+def test_each_step_of_the_backup_runs_in_a_slot(
+    path: pathlib.Path, database: pathlib.Path
+):
+    scheduler = Scheduler()
+    backup = BackupScheduler(
+        database=database,
+        path=path / "backups",
+        interval=3600,
+        pages=2,
+        scheduler=scheduler,
+    )
+    try:
+        backup.backup()
+    finally:
+        backup.close()
+
+    pages = sqlite3.connect(database).execute("PRAGMA page_count").fetchone()[0]
+    metrics = scheduler.metrics()[Priority.BACKGROUND]
+    assert metrics["completed"] == (pages + 1) // 2
+    assert metrics["running"] == 0
+
+
+def test_backup_continues_in_steps_after_restarts(
+    path: pathlib.Path, database: pathlib.Path
+):
+    scheduler = WritingScheduler(database=database, writes=2)
+    backup = BackupScheduler(
+        database=database,
+        path=path / "backups",
+        interval=3600,
+        pages=5,
+        max_restarts=3,
+        scheduler=scheduler,
+    )
+    try:
+        target = backup.backup()
+    finally:
+        backup.close()
+
+    assert backup.metrics()["restarts"] == 2
+    # the copy contains all changes made before the backup was finished
+    assert clubs(database=target) == clubs(database=database)
+    assert "New 2" in clubs(database=target)
+
+
+def test_backup_is_finished_in_one_step_if_writes_never_stop(
+    path: pathlib.Path, database: pathlib.Path
+):
+    scheduler = WritingScheduler(database=database, writes=sys.maxsize)
+    backup = BackupScheduler(
+        database=database,
+        path=path / "backups",
+        interval=3600,
+        pages=5,
+        max_restarts=3,
+        scheduler=scheduler,
+    )
+    try:
+        target = backup.backup()
+    finally:
+        backup.close()
+
+    assert backup.metrics()["restarts"] == 3
+    # the final step is made after the last write
+    assert clubs(database=target) == clubs(database=database)
+    assert f"New {scheduler.writes}" in clubs(database=target)
+
+
+def test_backup_is_finished_while_another_thread_writes(
+    path: pathlib.Path, database: pathlib.Path
+):
+    stop = threading.Event()
+
+    def write() -> None:
+        with sqlite3.connect(database, timeout=10) as db:
+            i = 0
+            while not stop.is_set():
+                i += 1
+                db.execute("INSERT INTO clubs (name) VALUES(?)", (f"Thread {i}",))
+                db.commit()
+                time.sleep(0.001)
+
+    thread = threading.Thread(target=write)
+    thread.start()
+    backup = BackupScheduler(
+        database=database,
+        path=path / "backups",
+        interval=3600,
+        pages=1,
+        step_delay=0.001,
+        max_restarts=5,
+    )
+    try:
+        target = backup.backup()
+    finally:
+        stop.set()
+        thread.join()
+        backup.close()
+
+    assert backup.metrics()["restarts"] >= 1
+    assert "Club 199" in clubs(database=target)
+
+
+def test_backup_contains_the_event_databases(path: pathlib.Path):
+    database = path / "ooresults.sqlite"
+    db = ShardedSqliteRepo(db=str(database))
+    with db.transaction():
+        event_id = db.add_event(
+            name="Event",
+            date=datetime.date(year=2026, month=10, day=17),
+            key=None,
+            publish=False,
+            series=None,
+            fields=[],
+        )
+        db.add_class(
+            event_id=event_id,
+            name="D21",
+            short_name=None,
+            course_id=None,
+            params=ClassParams(),
+        )
+    db.close()
+
+    backup = BackupScheduler(
+        database=database,
+        path=path / "backups",
+        shards=db.path,
+        interval=3600,
+        keep=1,
+    )
+    try:
+        target = backup.backup()
+    finally:
+        backup.close()
+
+    events = target.with_name(f"{target.stem}-events")
+    assert [p.name for p in events.iterdir()] == [f"event_{event_id}.sqlite"]
+    copy = ShardedSqliteRepo(db=str(target), path=str(events))
+    try:
+        with copy.transaction():
+            assert [c.name for c in copy.get_classes(event_id=event_id)] == ["D21"]
+    finally:
+        copy.close()
+
+    # the event databases are deleted together with the backup
+    (path / "backups" / "ooresults-20261001-120000.sqlite").touch()
+    (path / "backups" / "ooresults-20261001-120000-events").mkdir()
+    backup.rotate()
+    assert sorted(p.name for p in (path / "backups").iterdir()) == sorted(
+        [target.name, events.name]
+    )
+
+
+def test_backups_are_created_periodically(path: pathlib.Path, database: pathlib.Path):
+    backup = BackupScheduler(database=database, path=path / "backups", interval=0.05)
+    try:
+        deadline = time.monotonic() + 5
+        while backup.metrics()["backups"] == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        backup.close()
+
+    assert backup.metrics()["backups"] >= 1
+    assert not list((path / "backups").glob("*.part"))
+
+
+def test_backup_name_contains_the_time(path: pathlib.Path, database: pathlib.Path):
+    backup = BackupScheduler(database=database, path=path / "backups", interval=3600)
+    try:
+        t1 = datetime.datetime.now().replace(microsecond=0)
+        target = backup.backup()
+        t2 = datetime.datetime.now()
+    finally:
+        backup.close()
+
+    t = datetime.datetime.strptime(target.stem, "ooresults-%Y%m%d-%H%M%S")
+    assert t1 <= t <= t2
@@ -0,0 +1,52 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from typing import Optional
+
+import pytest
+
+from ooresults.utils import cardreader_batch
+
+
+@pytest.mark.parametrize(
+    "value,expected",
+    [
+        (None, None),
+        ("", None),
+        ("abc", None),
+        ("0", None),
+        ("100", 100),
+        ("1000", cardreader_batch.MAX_ITEMS),
+    ],
+)
+def test_select(value: Optional[str], expected: Optional[int]) -> None:
+    assert cardreader_batch.select(value) == expected
+
+
+@pytest.mark.parametrize(
+    "value,expected", [(None, 0), ("abc", 0), ("-1", 0), ("500", 500)]
+)
+def test_accepted(value: Optional[str], expected: int) -> None:
+    assert cardreader_batch.accepted(value) == expected
+
+
+def test_batch() -> None:
+    assert cardreader_batch.batch(items=[(1, {"a": 1}), (2, {"b": 2})]) == {
+        "batch": [{"seq": 1, "item": {"a": 1}}, {"seq": 2, "item": {"b": 2}}]
+    }
@@ -0,0 +1,85 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+from typing import Optional
+
+import pytest
+
+from ooresults.utils import compression
+from ooresults.utils.compression import Encoding
+
+
+DATA = b"<ResultList>" + 1000 * b"<PersonResult>abc</PersonResult>" + b"</ResultList>"
+
+
+@pytest.mark.parametrize("encoding", list(Encoding))
+def test_decompress_compressed_data(encoding: Encoding) -> None:
+    data = compression.compress(DATA, encoding=encoding)
+    assert len(data) < len(DATA)
+    assert compression.decompress(data, encoding=encoding) == DATA
+
+
+def test_default_encoding_is_bz2() -> None:
+    data = compression.compress(DATA)
+    assert data.startswith(b"BZh")
+    assert compression.decompress(data) == DATA
+
+
+def test_offer() -> None:
+    value = compression.offer([Encoding.LZMA, Encoding.ZLIB, Encoding.BZ2])
+    assert value == "lzma, zlib, bz2"
+
+
+@pytest.mark.parametrize(
+    "value, encoding",
+    [
+        (None, None),
+        ("", None),
+        ("br", None),
+        ("zlib", Encoding.ZLIB),
+        ("lzma, zlib, bz2", Encoding.LZMA),
+        ("br, BZ2 ,zlib", Encoding.BZ2),
+    ],
+)
+def test_select_first_supported_encoding(
+    value: Optional[str], encoding: Optional[Encoding]
+) -> None:
+    assert compression.select(value) == encoding
+
+
+def test_if_no_encoding_is_accepted_then_bz2_is_used() -> None:
+    assert compression.accepted(None) == Encoding.BZ2
+
+
+def test_accepted_encoding() -> None:
+    assert compression.accepted("lzma") == Encoding.LZMA
+
+
+def test_if_accepted_encoding_is_unknown_then_an_exception_is_raised() -> None:
+    with pytest.raises(ValueError):
+        compression.accepted("br")
+
+
+@pytest.mark.parametrize("encoding", list(Encoding))
+def test_compressed_chunks_equal_the_compressed_data(encoding: Encoding) -> None:
+    data = b"".join(f"<Entry>{i}</Entry>\n".encode() for i in range(5000))
+    chunks = [data[i : i + 4096] for i in range(0, len(data), 4096)]
+    compressed = compression.compress_chunks(chunks, encoding=encoding)
+    assert compressed == compression.compress(data, encoding=encoding)
+    assert compression.compress_chunks(data, encoding=encoding) == compressed
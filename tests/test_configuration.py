@@ -24,6 +24,7 @@ from unittest.mock import patch
 import pytest
 
 from ooresults import configuration
+from ooresults.plugins.iof_schema import ValidationPolicy
 
 
 def test_configuration_create_default_config_if_not_exists() -> None:
@@ -222,3 +223,501 @@ def test_configuration_config_file_is_read_if_exists_2() -> None:
             c = configuration.Config(path=home)
             assert c.demo_reader is True
             assert c.import_stream is False
+
+
+def test_configuration_streaming_interval_default_is_2_seconds() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+
+            c = configuration.Config(path=home)
+            assert c.streaming_interval == 2.0
+
+
+def test_configuration_streaming_interval_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("streaming_interval = 0.5\n")
+
+            c = configuration.Config(path=home)
+            assert c.streaming_interval == 0.5
+
+
+def test_configuration_exception_if_streaming_interval_is_not_a_number() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("streaming_interval = fast\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match="Value for 'streaming_interval' must be a number",
+            ):
+                configuration.Config(path=home)
+
+
+def test_configuration_ports_and_relay_defaults() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+
+            c = configuration.Config(path=home)
+            assert c.http_port == 8080
+            assert c.websocket_port == 8081
+            assert c.relay is False
+            assert c.relay_downstream == ""
+            assert c.relay_keys == []
+            assert c.reader_messages == 200
+            assert c.result_interval == 1.0
+            assert c.result_max_latency == 5.0
+            assert c.threads_cardreader == 2
+            assert c.threads_results == 5
+            assert c.threads_imports == 2
+            assert c.max_queued_tasks == 20
+
+
+def test_configuration_relay_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("http_port = 9080\n")
+                f.write("websocket_port = 9081\n")
+                f.write("relay = on\n")
+                f.write("relay_downstream = localhost:9181, localhost:9281\n")
+                f.write("relay_keys = key-1, ,key-2 \n")
+
+            c = configuration.Config(path=home)
+            assert c.http_port == 9080
+            assert c.websocket_port == 9081
+            assert c.relay is True
+            assert c.relay_downstream == "localhost:9181, localhost:9281"
+            assert c.relay_keys == ["key-1", "key-2"]
+            # a relay imports the streamed results
+            assert c.import_stream is True
+
+
+@pytest.mark.parametrize("value", ["http", "0", "65536"])
+def test_configuration_exception_if_port_is_not_valid(value: str) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write(f"websocket_port = {value}\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match="Value for 'websocket_port' must be",
+            ):
+                configuration.Config(path=home)
+
+
+@pytest.mark.parametrize(
+    "value, message",
+    [("many", "must be an integer"), ("0", "must be positive")],
+)
+def test_configuration_exception_if_reader_messages_is_not_valid(
+    value: str, message: str
+) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write(f"reader_messages = {value}\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match=f"Value for 'reader_messages' {message}",
+            ):
+                configuration.Config(path=home)
+
+
+def test_configuration_result_interval_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("result_interval = 0.5\n")
+                f.write("result_max_latency = 2\n")
+
+            c = configuration.Config(path=home)
+            assert c.result_interval == 0.5
+            assert c.result_max_latency == 2.0
+
+
+@pytest.mark.parametrize(
+    "value, message",
+    [("soon", "must be a number"), ("-1", "must not be negative")],
+)
+def test_configuration_exception_if_result_max_latency_is_not_valid(
+    value: str, message: str
+) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write(f"result_max_latency = {value}\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match=f"Value for 'result_max_latency' {message}",
+            ):
+                configuration.Config(path=home)
+
+
+def test_configuration_threads_are_read_if_exist() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("threads_cardreader = 1\n")
+                f.write("threads_results = 8\n")
+                f.write("threads_imports = 3\n")
+                f.write("max_queued_tasks = 50\n")
+
+            c = configuration.Config(path=home)
+            assert c.threads_cardreader == 1
+            assert c.threads_results == 8
+            assert c.threads_imports == 3
+            assert c.max_queued_tasks == 50
+
+
+def test_configuration_exception_if_threads_is_not_positive() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("threads_imports = 0\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match="Value for 'threads_imports' must be positive",
+            ):
+                configuration.Config(path=home)
+
+
+def test_configuration_group_commit_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            c = configuration.Config(path=home)
+            assert c.group_commit is False
+            assert c.group_commit_size == 20
+            assert c.group_commit_delay == 0.01
+
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("group_commit = on\n")
+                f.write("group_commit_size = 50\n")
+                f.write("group_commit_delay = 0.05\n")
+
+            c = configuration.Config(path=home)
+            assert c.group_commit is True
+            assert c.group_commit_size == 50
+            assert c.group_commit_delay == 0.05
+
+
+@pytest.mark.parametrize(
+    "option,value,message",
+    [
+        ("group_commit", "maybe", "Allowed values for 'group_commit' are"),
+        ("group_commit_size", "0", "Value for 'group_commit_size' must be positive"),
+        (
+            "group_commit_delay",
+            "-1",
+            "Value for 'group_commit_delay' must not be negative",
+        ),
+    ],
+)
+def test_configuration_exception_if_group_commit_is_not_valid(
+    option: str, value: str, message: str
+) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write(f"{option} = {value}\n")
+
+            with pytest.raises(expected_exception=RuntimeError, match=message):
+                configuration.Config(path=home)
+
+
+def test_configuration_iof_validation_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            c = configuration.Config(path=home)
+            assert c.iof_validation == ValidationPolicy.SAMPLED
+            assert c.iof_validation_sample_rate == 50
+
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("iof_validation = tests\n")
+                f.write("iof_validation_sample_rate = 10\n")
+
+            c = configuration.Config(path=home)
+            assert c.iof_validation == ValidationPolicy.TESTS
+            assert c.iof_validation_sample_rate == 10
+
+
+@pytest.mark.parametrize(
+    "option,value,message",
+    [
+        ("iof_validation", "never", "Allowed values for 'iof_validation' are"),
+        (
+            "iof_validation_sample_rate",
+            "0",
+            "Value for 'iof_validation_sample_rate' must be positive",
+        ),
+    ],
+)
+def test_configuration_exception_if_iof_validation_is_not_valid(
+    option: str, value: str, message: str
+) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write(f"{option} = {value}\n")
+
+            with pytest.raises(expected_exception=RuntimeError, match=message):
+                configuration.Config(path=home)
+
+
+def test_configuration_backup_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+
+            c = configuration.Config(path=home)
+            assert c.backup_interval == 0
+            assert c.backup_path == home / "backups"
+            assert c.backup_keep == 10
+            assert c.backup_pages == 100
+
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("backup_interval = 600\n")
+                f.write("backup_path = snapshots\n")
+                f.write("backup_keep = 3\n")
+                f.write("backup_pages = 50\n")
+
+            c = configuration.Config(path=home)
+            assert c.backup_interval == 600
+            assert c.backup_path == home / "snapshots"
+            assert c.backup_keep == 3
+            assert c.backup_pages == 50
+
+
+@pytest.mark.parametrize(
+    "option,value,message",
+    [
+        ("backup_interval", "hourly", "Value for 'backup_interval' must be a number"),
+        ("backup_interval", "-1", "Value for 'backup_interval' must not be negative"),
+        ("backup_keep", "0", "Value for 'backup_keep' must be positive"),
+        ("backup_pages", "many", "Value for 'backup_pages' must be an integer"),
+    ],
+)
+def test_configuration_exception_if_backup_is_not_valid(
+    option: str, value: str, message: str
+) -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write(f"{option} = {value}\n")
+
+            with pytest.raises(expected_exception=RuntimeError, match=message):
+                configuration.Config(path=home)
+
+
+def test_configuration_storage_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+
+            c = configuration.Config(path=home)
+            assert c.storage == "single"
+
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("storage = sharded\n")
+
+            c = configuration.Config(path=home)
+            assert c.storage == "sharded"
+
+
+def test_configuration_exception_if_storage_is_not_valid() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("storage = split\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match="Allowed values for 'storage' are 'single', 'sharded'",
+            ):
+                configuration.Config(path=home)
+
+
+def test_configuration_result_replica_is_read_if_exists() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+
+            c = configuration.Config(path=home)
+            assert c.result_replica is False
+
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("result_replica = on\n")
+
+            c = configuration.Config(path=home)
+            assert c.result_replica is True
+
+
+def test_configuration_exception_if_result_replica_is_not_valid() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        home = pathlib.Path(td)
+
+        def my_home() -> pathlib.Path:
+            return home
+
+        with patch.object(pathlib.Path, "home", my_home):
+            config_file = home / "config.ini"
+            with open(config_file, "w") as f:
+                f.write("[Server]\n")
+                f.write("result_replica = memory\n")
+
+            with pytest.raises(
+                expected_exception=RuntimeError,
+                match="Allowed values for 'result_replica' are",
+            ):
+                configuration.Config(path=home)
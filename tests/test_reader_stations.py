@@ -0,0 +1,297 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import functools
+import os
+import select
+import threading
+import time
+from collections.abc import Iterator
+from typing import Any
+from typing import Optional
+from typing import cast
+
+import pytest
+import sireader
+
+from ooresults import _reader
+from ooresults._reader import Cardreader
+from ooresults._reader import Station
+from ooresults.utils.preview import Preview
+
+
+class SIStation(threading.Thread):
+    """SPORTident readout station in extended protocol mode on a pseudo-terminal.
+
+    The station answers the commands used by sireader to connect and to read
+    out SI-Card 5 cards. A card inserted with insert_card is removed when
+    the reader acknowledges the readout.
+    """
+
+    def __init__(self, code: int = 1):
+        super().__init__()
+        self.daemon = True
+        self.code = code
+        self.master, self.slave = os.openpty()
+        self.port = os.ttyname(self.slave)
+        self.card: Optional[bytes] = None
+        self.acks = 0
+        self.stopped = False
+
+    def frame(self, cmd: bytes, data: bytes) -> bytes:
+        s = cmd + bytes([len(data) + 2]) + self.code.to_bytes(2, "big") + data
+        return sireader.SIReader.STX + s + sireader.SIReader._crc(s) + b"\x03"
+
+    def insert_card(self, card_number: int, punches: list[tuple[int, int]]) -> None:
+        """Insert an SI-Card 5, punches are (control code, seconds) tuples."""
+        data = bytearray(b"\xee" * 128)
+        data[4:6] = card_number.to_bytes(2, "big")
+        data[6] = 0
+        data[23] = len(punches) + 1
+        i = 32
+        for code, seconds in punches:
+            if i % 16 == 0:
+                i += 1
+            data[i] = code
+            data[i + 1 : i + 3] = (seconds % 43200).to_bytes(2, "big")
+            i += 3
+        self.card = bytes(data)
+        os.write(
+            self.master,
+            self.frame(sireader.SIReader.C_SI5_DET, b"\x00\x00" + data[4:6]),
+        )
+
+    def answer(self, cmd: bytes, params: bytes) -> bytes:
+        if cmd == sireader.SIReader.C_SET_MS:
+            return self.frame(cmd, params)
+        elif cmd == sireader.SIReader.C_GET_SYS_VAL:
+            # extended protocol, readout mode
+            value = {b"\x74": b"\x01", b"\x71": b"\x05"}[params[:1]]
+            return self.frame(cmd, params[:1] + value)
+        elif cmd == sireader.SIReader.C_GET_SI5 and self.card is not None:
+            return self.frame(cmd, self.card)
+        return sireader.SIReader.NAK
+
+    def run(self) -> None:
+        buffer = b""
+        while not self.stopped:
+            r, _, _ = select.select([self.master], [], [], 0.05)
+            if not r:
+                continue
+            buffer += os.read(self.master, 1024)
+            while buffer:
+                if buffer[:1] == sireader.SIReader.ACK:
+                    self.acks += 1
+                    buffer = buffer[1:]
+                    self.card = None
+                    os.write(self.master, self.frame(sireader.SIReader.C_SI_REM, b""))
+                elif buffer[:1] == sireader.SIReader.STX and len(buffer) >= 3:
+                    length = 3 + buffer[2] + 3
+                    if len(buffer) < length:
+                        break
+                    response = self.answer(buffer[1:2], buffer[3 : 3 + buffer[2]])
+                    buffer = buffer[length:]
+                    os.write(self.master, response)
+                elif buffer[:1] != sireader.SIReader.STX:
+                    buffer = buffer[1:]
+                else:
+                    break
+
+    def close(self) -> None:
+        self.stopped = True
+        self.join()
+        os.close(self.master)
+        os.close(self.slave)
+
+
+class WebSocketClient:
+    """Records the messages sent by the stations."""
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        # (station, entry type) of the sent state messages
+        self.states: list[tuple[Optional[str], str]] = []
+        self.card_reads: list[dict] = []
+        self.reply = {"status": "OK"}
+
+    def state(
+        self,
+        entry_type: str,
+        entry_time: datetime.datetime,
+        card: Optional[str] = None,
+        station: Optional[str] = None,
+    ) -> dict:
+        return {}
+
+    def set_state(
+        self,
+        entry_type: str,
+        entry_time: datetime.datetime,
+        card: Optional[str] = None,
+        station: Optional[str] = None,
+    ) -> dict:
+        with self.lock:
+            self.states.append((station, entry_type))
+        return {}
+
+    def send_card_read(self, item: dict) -> dict:
+        with self.lock:
+            self.card_reads.append(item)
+        return self.reply
+
+
+def create_cardreader(client: Optional[WebSocketClient], **kwargs: Any) -> Cardreader:
+    # the test client records the messages instead of sending them
+    return Cardreader(webSocketClient=cast(_reader.WebSocketClient, client), **kwargs)
+
+
+@pytest.fixture
+def si_stations() -> Iterator[list[SIStation]]:
+    stations = [SIStation(code=1), SIStation(code=2)]
+    for s in stations:
+        s.start()
+    yield stations
+    for s in stations:
+        s.close()
+
+
+@pytest.fixture(autouse=True)
+def cwd(tmp_path, monkeypatch) -> None:
+    # the card reads are written to the cardreader log in the working directory
+    monkeypatch.chdir(tmp_path)
+
+
+def wait_for(predicate, timeout: float = 10) -> None:
+    t = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < t
+        time.sleep(0.01)
+
+
+def test_a_configured_list_of_serial_numbers_creates_one_station_each() -> None:
+    cardreader = create_cardreader(client=None, serial_number="0815, 4711")
+    stations = cardreader.stations()
+    assert [s.serial_number for s in stations] == ["0815", "4711"]
+    assert [
+        s.serial_number
+        for s in create_cardreader(client=None, serial_number=None).stations()
+    ] == [""]
+
+
+def test_several_stations_are_read_out_concurrently(
+    si_stations: list[SIStation],
+) -> None:
+    client = WebSocketClient()
+    cardreader = create_cardreader(client=client)
+    stations = [
+        Station(
+            cardreader=cardreader,
+            serial_number=str(s.code),
+            connect=functools.partial(sireader.SIReaderReadout, s.port),
+            poll_interval=0.01,
+        )
+        for s in si_stations
+    ]
+    threading.Thread(
+        target=cardreader.process_cards, kwargs={"stations": stations}, daemon=True
+    ).start()
+    wait_for(lambda: len(cardreader.connected) == 2)
+
+    si_stations[0].insert_card(card_number=4711, punches=[(31, 3600), (32, 3700)])
+    si_stations[1].insert_card(card_number=815, punches=[(33, 3650)])
+    wait_for(lambda: si_stations[0].acks == 1 and si_stations[1].acks == 1)
+    si_stations[1].insert_card(card_number=816, punches=[])
+    wait_for(lambda: si_stations[1].acks == 2)
+
+    for station in stations:
+        station.stop()
+    for station in stations:
+        station.join()
+
+    reads = {r["controlCard"]: r for r in client.card_reads}
+    assert sorted(reads) == ["4711", "815", "816"]
+    assert [p["controlCode"] for p in reads["4711"]["punches"]] == ["31", "32"]
+    assert [p["controlCode"] for p in reads["815"]["punches"]] == ["33"]
+    assert reads["816"]["punches"] == []
+    assert [reads[c]["station"] for c in ["4711", "815", "816"]] == ["1", "2", "2"]
+    # each station sends its own state
+    for code, inserted in [("1", 1), ("2", 2)]:
+        states = [e for s, e in client.states if s == code]
+        assert states[0] == "readerConnected"
+        assert states.count("cardInserted") == inserted
+        assert states[-1] == "readerDisconnected"
+
+
+def test_the_preview_gives_feedback_without_a_connection(
+    si_stations: list[SIStation],
+) -> None:
+    client = WebSocketClient()
+    # the server is not available
+    client.reply = {}
+    snapshot = Preview(url="", key="")
+    snapshot.snapshot = {
+        "format": 1,
+        "version": "",
+        "event": "Event",
+        "classes": {"1": {"name": "Elite", "params": {}, "controls": ["31", "32"]}},
+        "entries": {
+            "4711": [
+                {
+                    "firstName": "Angela",
+                    "lastName": "Merkel",
+                    "club": None,
+                    "classId": 1,
+                    "startTime": None,
+                    "year": None,
+                    "gender": None,
+                }
+            ]
+        },
+    }
+    cardreader = create_cardreader(client=client, preview=snapshot)
+    station = Station(
+        cardreader=cardreader,
+        connect=lambda: sireader.SIReaderReadout(si_stations[0].port),
+        poll_interval=0.01,
+    )
+    station.start()
+    wait_for(lambda: len(cardreader.connected) == 1)
+
+    item = {
+        "entryType": "cardRead",
+        "entryTime": "2021-05-18T17:24:00+02:00",
+        "controlCard": "4711",
+        "startTime": "2021-05-18T16:31:19+02:00",
+        "finishTime": "2021-05-18T17:20:00+02:00",
+        "punches": [{"controlCode": "31", "punchTime": "2021-05-18T16:41:19+02:00"}],
+    }
+    preview = cardreader.preview_result(item=item)
+    assert preview is not None
+    assert preview["status"] == "MISSING_PUNCH"
+    assert preview["missingControls"] == ["32"]
+
+    si_stations[0].insert_card(card_number=4711, punches=[(31, 3600)])
+    wait_for(lambda: si_stations[0].acks == 1)
+    station.stop()
+    station.join()
+    assert [r["controlCard"] for r in client.card_reads] == ["4711"]
+    # a single station without serial number sends no station
+    assert "station" not in client.card_reads[0]
+    assert {s for s, _ in client.states} == {None}
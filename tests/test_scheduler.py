@@ -0,0 +1,171 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import threading
+import time
+from collections.abc import Iterator
+
+from ooresults.utils.scheduler import Priority
+from ooresults.utils.scheduler import Scheduler
+from ooresults.utils.scheduler import priority_of_path
+
+
+def wait_until(condition, timeout: float = 5) -> None:
+    t = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < t
+        time.sleep(0.001)
+
+
+def metrics(scheduler: Scheduler, priority: Priority) -> dict:
+    return scheduler.metrics()[priority]
+
+
+def test_run_returns_the_result_and_updates_the_metrics() -> None:
+    scheduler = Scheduler()
+    assert scheduler.run(Priority.EDIT, pow, 2, 10) == 1024
+    assert metrics(scheduler, Priority.EDIT) == {
+        "priority": "edit",
+        "limit": None,
+        "waiting": 0,
+        "running": 0,
+        "completed": 1,
+        "mean_wait_time": 0.0,
+        "max_wait_time": 0.0,
+    }
+    assert metrics(scheduler, Priority.REPORT)["limit"] == 1
+
+
+def test_reports_wait_while_a_readout_is_stored() -> None:
+    scheduler = Scheduler()
+    release = threading.Event()
+    order = []
+
+    def readout() -> None:
+        with scheduler.slot(Priority.READOUT):
+            release.wait(timeout=10)
+            order.append("readout")
+
+    def report() -> None:
+        with scheduler.slot(Priority.REPORT):
+            order.append("report")
+
+    t1 = threading.Thread(target=readout)
+    t1.start()
+    wait_until(lambda: metrics(scheduler, Priority.READOUT)["running"] == 1)
+    t2 = threading.Thread(target=report)
+    t2.start()
+    wait_until(lambda: metrics(scheduler, Priority.REPORT)["waiting"] == 1)
+    # edits are not delayed by readouts
+    scheduler.run(Priority.EDIT, order.append, "edit")
+
+    release.set()
+    t1.join()
+    t2.join()
+    assert order == ["edit", "readout", "report"]
+
+
+def test_the_number_of_reports_is_limited() -> None:
+    scheduler = Scheduler()
+    release = threading.Event()
+
+    def report() -> None:
+        with scheduler.slot(Priority.REPORT):
+            release.wait(timeout=10)
+
+    threads = [threading.Thread(target=report) for _ in range(3)]
+    for t in threads:
+        t.start()
+    wait_until(lambda: metrics(scheduler, Priority.REPORT)["waiting"] == 2)
+    assert metrics(scheduler, Priority.REPORT)["running"] == 1
+
+    release.set()
+    for t in threads:
+        t.join()
+    assert metrics(scheduler, Priority.REPORT)["completed"] == 3
+
+
+def test_a_report_pauses_at_a_checkpoint_while_a_readout_is_stored() -> None:
+    scheduler = Scheduler()
+    in_report = threading.Event()
+    continue_report = threading.Event()
+    release = threading.Event()
+    order = []
+
+    def report() -> None:
+        with scheduler.slot(Priority.REPORT):
+            in_report.set()
+            continue_report.wait(timeout=10)
+            scheduler.checkpoint()
+            order.append("report")
+
+    def readout() -> None:
+        with scheduler.slot(Priority.READOUT):
+            # nested slots use the priority of the outer slot
+            with scheduler.slot(Priority.BACKGROUND):
+                continue_report.set()
+                release.wait(timeout=10)
+                order.append("readout")
+
+    t1 = threading.Thread(target=report)
+    t1.start()
+    in_report.wait(timeout=10)
+    t2 = threading.Thread(target=readout)
+    t2.start()
+    continue_report.wait(timeout=10)
+    time.sleep(0.01)
+    assert order == []
+
+    release.set()
+    t1.join()
+    t2.join()
+    assert order == ["readout", "report"]
+    assert metrics(scheduler, Priority.BACKGROUND)["completed"] == 0
+
+
+def test_each_chunk_of_a_streamed_response_is_produced_in_a_slot() -> None:
+    scheduler = Scheduler()
+    running = []
+
+    def chunks() -> Iterator[bytes]:
+        for chunk in (b"a", b"b"):
+            running.append(metrics(scheduler, Priority.REPORT)["running"])
+            yield chunk
+
+    # the generator is created in the slot of the handler but consumed later
+    with scheduler.slot(Priority.REPORT):
+        content = chunks()
+    assert b"".join(scheduler.iterate(Priority.REPORT, content)) == b"ab"
+    assert running == [1, 1]
+    assert metrics(scheduler, Priority.REPORT)["running"] == 0
+    assert metrics(scheduler, Priority.REPORT)["completed"] == 4
+
+
+def test_a_disabled_scheduler_does_not_delay_work() -> None:
+    scheduler = Scheduler(enabled=False)
+    with scheduler.slot(Priority.READOUT):
+        assert scheduler.run(Priority.REPORT, str, 1) == "1"
+
+
+def test_priority_of_path() -> None:
+    assert priority_of_path("/result/pdfResult") == Priority.REPORT
+    assert priority_of_path("/result/pdfSplittimes") == Priority.REPORT
+    assert priority_of_path("/series/pdfResult") == Priority.REPORT
+    assert priority_of_path("/entry/export") == Priority.REPORT
+    assert priority_of_path("/entry/update") == Priority.EDIT
@@ -0,0 +1,209 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import json
+from typing import Optional
+
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.class_type import ClassInfoType
+from ooresults.otypes.entry_type import EntryType
+from ooresults.otypes.entry_type import RankedEntryType
+from ooresults.otypes.event_type import EventType
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.utils import render
+from ooresults.utils import si1_json
+
+
+EVENT = EventType(
+    id=3,
+    name="Test-Lauf 1",
+    date=datetime.date(year=2023, month=12, day=29),
+    key=None,
+    publish=False,
+    series=None,
+    fields=[],
+)
+
+
+def class_info(id: int, name: str, params: ClassParams) -> ClassInfoType:
+    return ClassInfoType(
+        id=id,
+        name=name,
+        short_name=None,
+        course_id=None,
+        course_name=None,
+        course_length=None,
+        course_climb=None,
+        number_of_controls=None,
+        params=params,
+    )
+
+
+def ranked_entry(
+    id: int,
+    rank: Optional[int],
+    result: PersonRaceResult,
+    club_name: Optional[str] = None,
+    not_competing: bool = False,
+    time_behind: Optional[int] = None,
+) -> RankedEntryType:
+    entry = EntryType(
+        id=id,
+        event_id=EVENT.id,
+        competitor_id=id,
+        first_name="Angela",
+        last_name="Merkel",
+        year=1957,
+        club_name=club_name,
+        not_competing=not_competing,
+        result=result,
+    )
+    return RankedEntryType(entry=entry, rank=rank, time_behind=time_behind)
+
+
+def test_results_of_a_class_without_optional_columns() -> None:
+    class_results = [
+        (class_info(id=1, name="Empty", params=ClassParams()), []),
+        (
+            class_info(id=2, name="Elite", params=ClassParams()),
+            [
+                ranked_entry(
+                    id=10,
+                    rank=1,
+                    club_name="OL Bundestag",
+                    result=PersonRaceResult(status=ResultStatus.OK, time=1801),
+                ),
+                ranked_entry(
+                    id=11,
+                    rank=None,
+                    not_competing=True,
+                    result=PersonRaceResult(status=ResultStatus.OK, time=1900),
+                    # the time behind is not shown
+                    time_behind=99,
+                ),
+                ranked_entry(
+                    id=12,
+                    rank=None,
+                    result=PersonRaceResult(status=ResultStatus.MISSING_PUNCH),
+                ),
+            ],
+        ),
+    ]
+
+    assert si1_json.results(event=EVENT, class_results=class_results) == {
+        "name": "Test-Lauf 1",
+        "date": "2023-12-29",
+        "columns": [],
+        "classes": [
+            {
+                "id": 2,
+                "name": "Elite",
+                "type": "standard",
+                "rows": [
+                    [1, 0, "Angela Merkel", 1957, "OL Bundestag", "OK", 1801],
+                    [None, 1, "Angela Merkel", 1957, None, "OK", 1900],
+                    [None, 0, "Angela Merkel", 1957, None, "MP"],
+                ],
+            },
+        ],
+    }
+
+
+def test_penalties_are_added_if_shown() -> None:
+    params = ClassParams(penalty_controls=120, penalty_overtime=60)
+    result = PersonRaceResult(
+        status=ResultStatus.OK,
+        time=1900,
+        extensions={
+            "running_time": 1600,
+            "penalties_controls": 240,
+            "penalties_overtime": 60,
+        },
+    )
+    class_results = [
+        (class_info(id=2, name="Elite", params=params), [ranked_entry(10, 1, result)])
+    ]
+
+    data = si1_json.results(event=EVENT, class_results=class_results)
+    assert data["columns"] == ["penalties_controls", "penalties_overtime"]
+    assert data["classes"][0]["rows"][0][5:9] == ["OK", 1900, 1600, 300]
+
+
+def test_json_message_is_smaller_than_html() -> None:
+    class_results = [
+        (
+            class_info(id=i, name=f"Class {i}", params=ClassParams()),
+            [
+                ranked_entry(
+                    id=100 * i + j,
+                    rank=j + 1,
+                    club_name="OL Bundestag",
+                    result=PersonRaceResult(status=ResultStatus.OK, time=1800 + j),
+                )
+                for j in range(20)
+            ],
+        )
+        for i in range(10)
+    ]
+
+    data = json.dumps(
+        si1_json.results(event=EVENT, class_results=class_results),
+        separators=(",", ":"),
+    )
+    html = render.si1_results(event=EVENT, class_results=class_results)
+    assert 4 * len(data) < len(html)
+
+
+def test_card_read() -> None:
+    message = {
+        "controlCard": "4711",
+        "firstName": "Angela",
+        "lastName": "Merkel",
+        "class": "Elite",
+        "status": ResultStatus.OK,
+        "time": 1801,
+        "error": None,
+    }
+    assert si1_json.card_read(message=message) == {
+        "card": "4711",
+        "name": "Merkel, Angela",
+        "class": "Elite",
+        "status": "OK",
+        "time": 1801,
+        "error": None,
+    }
+
+
+def test_card_read_with_error() -> None:
+    message = {
+        "controlCard": "4711",
+        "status": ResultStatus.FINISHED,
+        "time": None,
+        "error": "Control card unknown",
+    }
+    assert si1_json.card_read(message=message) == {
+        "card": "4711",
+        "name": None,
+        "class": None,
+        "status": "Finished",
+        "time": None,
+        "error": "Control card unknown",
+    }
@@ -0,0 +1,188 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import json
+import pathlib
+import queue
+import tempfile
+from collections.abc import Iterator
+
+import pytest
+
+from ooresults._reader import WebSocketClient
+from ooresults.utils import cardreader_batch
+from ooresults.utils.spool import Spool
+
+
+@pytest.fixture
+def path() -> Iterator[pathlib.Path]:
+    with tempfile.TemporaryDirectory() as td:
+        yield pathlib.Path(td) / "spool"
+
+
+def card_read(card: str) -> dict:
+    return {"entryType": "cardRead", "controlCard": card}
+
+
+def test_pending_card_reads_are_kept_after_a_restart(path: pathlib.Path) -> None:
+    spool = Spool(path=path)
+    assert spool.append(item=card_read("1")) == 1
+    assert spool.append(item=card_read("2")) == 2
+    assert spool.append(item=card_read("3")) == 3
+    assert spool.pending_count == 3
+
+    spool.acknowledge(seqs=[1])
+    assert spool.items() == [(2, card_read("2")), (3, card_read("3"))]
+
+    spool = Spool(path=path)
+    assert spool.pending_count == 2
+    assert spool.items() == [(2, card_read("2")), (3, card_read("3"))]
+    assert spool.append(item=card_read("4")) == 4
+
+
+def test_acknowledgements_out_of_order(path: pathlib.Path) -> None:
+    spool = Spool(path=path)
+    for card in ("1", "2", "3"):
+        spool.append(item=card_read(card))
+
+    # unknown and repeated acknowledgements are ignored
+    spool.acknowledge(seqs=[2, 2, 17])
+    assert spool.pending_count == 2
+    assert spool.items() == [(1, card_read("1")), (3, card_read("3"))]
+
+    # the offset on disk only advances over acknowledged card reads at
+    # the start of the file, card read 2 is sent again after a restart
+    assert Spool(path=path).pending_count == 3
+
+    spool.acknowledge(seqs=[1])
+    assert Spool(path=path).items() == [(3, card_read("3"))]
+
+
+def test_the_file_is_truncated_if_all_card_reads_are_acknowledged(
+    path: pathlib.Path,
+) -> None:
+    spool = Spool(path=path)
+    spool.append(item=card_read("1"))
+    spool.append(item=card_read("2"))
+    spool.acknowledge(seqs=[1, 2])
+    assert spool.pending_count == 0
+    assert (path / "spool.jsonl").stat().st_size == 0
+
+    # the sequence numbers are not reused
+    spool = Spool(path=path)
+    assert spool.items() == []
+    assert spool.append(item=card_read("3")) == 3
+
+
+def test_an_incomplete_last_line_is_removed(path: pathlib.Path) -> None:
+    spool = Spool(path=path)
+    spool.append(item=card_read("1"))
+    with open(path / "spool.jsonl", "a") as f:
+        f.write('{"seq": 2, "item": {"entryT')
+
+    spool = Spool(path=path)
+    assert spool.items() == [(1, card_read("1"))]
+    assert spool.append(item=card_read("2")) == 2
+    assert Spool(path=path).items() == [(1, card_read("1")), (2, card_read("2"))]
+
+
+def test_rejected_card_reads_are_moved_to_the_rejected_file(
+    path: pathlib.Path,
+) -> None:
+    spool = Spool(path=path)
+    for card in ("1", "2", "3"):
+        spool.append(item=card_read(card))
+
+    spool.reject(reasons={2: "Event not found"})
+    assert spool.items() == [(1, card_read("1")), (3, card_read("3"))]
+    with open(path / "spool.rejected.jsonl") as f:
+        assert [json.loads(line) for line in f] == [
+            {"seq": 2, "item": card_read("2"), "reason": "Event not found"}
+        ]
+
+
+class BatchClient(WebSocketClient):
+    """Answers the batches with the given acknowledgements."""
+
+    def __init__(self, spool: Spool, replies: list[dict | Exception]) -> None:
+        super().__init__(spool=spool)
+        self.opened = True
+        self.batch_size = 2
+        self.replies = replies
+
+    def send_and_receive(self, item, timeout=None, expected=None) -> dict:
+        r = self.replies.pop(0)
+        if isinstance(r, Exception):
+            raise r
+        return r
+
+
+def test_flush_removes_only_stored_card_reads_from_the_spool(
+    path: pathlib.Path,
+) -> None:
+    spool = Spool(path=path)
+    for card in ("1", "2", "3", "4"):
+        spool.append(item=card_read(card))
+    client = BatchClient(
+        spool=spool,
+        replies=[
+            {
+                "acks": [
+                    {"seq": 1, "readerStatus": "cardRead"},
+                    {"seq": 2, "rejected": cardreader_batch.TOO_LARGE},
+                ]
+            },
+            {
+                "acks": [
+                    {"seq": 3, "rejected": "Event not found"},
+                    {"seq": 4, "readerStatus": "cardRead"},
+                ]
+            },
+        ],
+    )
+
+    replies = client.flush()
+    assert sorted(replies) == [1, 2, 3, 4]
+    # a card read exceeding the batch size is sent again
+    assert spool.items() == [(2, card_read("2"))]
+    with open(path / "spool.rejected.jsonl") as f:
+        assert [json.loads(line)["seq"] for line in f] == [3]
+
+
+def test_flush_keeps_the_replies_received_before_sending_fails(
+    path: pathlib.Path,
+) -> None:
+    spool = Spool(path=path)
+    for card in ("1", "2", "3"):
+        spool.append(item=card_read(card))
+    client = BatchClient(
+        spool=spool,
+        replies=[
+            {
+                "acks": [
+                    {"seq": 1, "readerStatus": "cardRead"},
+                    {"seq": 2, "readerStatus": "cardRead"},
+                ]
+            },
+            queue.Empty(),
+        ],
+    )
+
+    assert sorted(client.flush()) == [1, 2]
+    assert spool.items() == [(3, card_read("3"))]
@@ -0,0 +1,95 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import threading
+
+import pytest
+
+from ooresults.websocket_server.executors import Executor
+from ooresults.websocket_server.executors import ExecutorBusyError
+from ooresults.websocket_server.executors import Executors
+
+
+@pytest.mark.asyncio
+async def test_run_returns_the_result_and_updates_the_metrics() -> None:
+    executor = Executor(name="results", max_workers=2)
+    try:
+        assert await executor.run(pow, 2, 10) == 1024
+        assert await executor.run_low_priority(max, 3, 7) == 7
+    finally:
+        executor.shutdown()
+
+    metrics = executor.metrics()
+    assert metrics["name"] == "results"
+    assert metrics["workers"] == 2
+    assert metrics["submitted"] == 2
+    assert metrics["completed"] == 2
+    assert metrics["rejected"] == 0
+    assert metrics["queued"] == 0
+    assert metrics["running"] == 0
+
+
+@pytest.mark.asyncio
+async def test_low_priority_work_is_rejected_if_too_many_tasks_are_waiting() -> None:
+    executor = Executor(name="imports", max_workers=1, max_queued=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def blocking() -> str:
+        started.set()
+        release.wait(timeout=10)
+        return "done"
+
+    try:
+        running = asyncio.create_task(executor.run(blocking))
+        await asyncio.to_thread(started.wait, 10)
+        waiting = asyncio.create_task(executor.run(str, 1))
+        await asyncio.sleep(0)
+
+        with pytest.raises(ExecutorBusyError, match="Executor imports is busy"):
+            await executor.run_low_priority(str, 2)
+
+        await asyncio.sleep(0.01)
+        release.set()
+        assert await running == "done"
+        assert await waiting == "1"
+        # the queue is empty again
+        assert await executor.run_low_priority(str, 3) == "3"
+    finally:
+        release.set()
+        executor.shutdown()
+
+    metrics = executor.metrics()
+    assert metrics["submitted"] == 3
+    assert metrics["rejected"] == 1
+    assert metrics["max_queued"] == 1
+    assert metrics["max_wait_time"] > 0
+
+
+def test_executors_are_named_by_the_kind_of_work() -> None:
+    executors = Executors(cardreader=1, results=3, imports=2)
+    try:
+        assert [(m["name"], m["workers"]) for m in executors.metrics()] == [
+            ("cardreader", 1),
+            ("results", 3),
+            ("imports", 2),
+        ]
+    finally:
+        executors.shutdown()
@@ -0,0 +1,135 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import datetime
+import tempfile
+from collections.abc import Iterator
+from unittest import mock
+
+import pytest
+
+from ooresults import model
+from ooresults.otypes.result_type import CardReaderMessage
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.result_type import ResultStatus
+from ooresults.repo.repo import EventNotFoundError
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.websocket_server.group_commit import GroupCommitWriter
+
+
+@pytest.fixture
+def db() -> Iterator[SqliteRepo]:
+    # the writer thread needs its own connection to the database
+    with tempfile.NamedTemporaryFile() as db_file:
+        model.db = SqliteRepo(db=db_file.name)
+        yield model.db
+        model.db.close()
+
+
+@pytest.fixture
+def event_id(db: SqliteRepo) -> int:
+    with db.transaction():
+        return db.add_event(
+            name="Event",
+            date=datetime.date(year=2020, month=1, day=1),
+            key="local",
+            publish=False,
+            series=None,
+            fields=[],
+        )
+
+
+@pytest.fixture
+def writer() -> Iterator[GroupCommitWriter]:
+    writer = GroupCommitWriter(max_items=3, max_delay=0.2)
+    yield writer
+    writer.close()
+
+
+def card_read(control_card: str) -> CardReaderMessage:
+    t = datetime.datetime(2020, 1, 1, 10, 0, 0, tzinfo=datetime.timezone.utc)
+    return CardReaderMessage(
+        entry_type="cardRead",
+        entry_time=t,
+        control_card=control_card,
+        result=PersonRaceResult(
+            status=ResultStatus.FINISHED,
+            punched_start_time=t,
+            punched_finish_time=t + datetime.timedelta(minutes=30),
+        ),
+    )
+
+
+@pytest.mark.asyncio
+async def test_card_reads_are_stored_in_groups(
+    db: SqliteRepo, event_id: int, writer: GroupCommitWriter
+) -> None:
+    results = await asyncio.gather(
+        *(
+            writer.store(event_key="local", item=card_read(str(1000 + i)))
+            for i in range(5)
+        )
+    )
+    assert [r[2]["controlCard"] for r in results] == [str(1000 + i) for i in range(5)]
+    assert all(r[0] == "cardRead" and r[1].id == event_id for r in results)
+
+    # the results are committed before the callers are answered
+    with db.transaction():
+        entries = db.get_entries(event_id=event_id)
+    assert sorted(str(e.chip) for e in entries) == [str(1000 + i) for i in range(5)]
+    assert writer.metrics() == {
+        "transactions": 2,
+        "items": 5,
+        "max_items": 3,
+        "mean_items": 2.5,
+        "failed": 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_unknown_event_key_fails_only_its_card_read(
+    db: SqliteRepo, event_id: int, writer: GroupCommitWriter
+) -> None:
+    results = await asyncio.gather(
+        writer.store(event_key="local", item=card_read("1000")),
+        writer.store(event_key="unknown", item=card_read("1001")),
+        return_exceptions=True,
+    )
+    assert not isinstance(results[0], BaseException)
+    assert results[0][2]["controlCard"] == "1000"
+    assert isinstance(results[1], EventNotFoundError)
+    assert writer.metrics()["transactions"] == 1
+
+
+@pytest.mark.asyncio
+async def test_card_reads_are_stored_singly_if_the_group_fails(
+    db: SqliteRepo, event_id: int, writer: GroupCommitWriter
+) -> None:
+    with mock.patch(
+        "ooresults.model.results.store_cardreader_results",
+        side_effect=RuntimeError("disk I/O error"),
+    ):
+        results = await asyncio.gather(
+            writer.store(event_key="local", item=card_read("1000")),
+            writer.store(event_key="local", item=card_read("1001")),
+        )
+    assert [r[2]["controlCard"] for r in results] == ["1000", "1001"]
+    assert writer.metrics()["failed"] == 1
+    assert writer.metrics()["transactions"] == 0
@@ -21,6 +21,7 @@ import asyncio
 import bz2
 import datetime
 import json
+import lzma
 import pathlib
 import tempfile
 import threading
@@ -147,6 +148,7 @@ class WebSocketServer(threading.Thread):
     async def start_server(self) -> None:
         self.server = await serve(
             handler=self.handler.handler,
+            process_response=self.handler.process_response,
             host=self.host,
             port=self.port,
         )
@@ -263,6 +265,37 @@ async def test_live_server_event_key_found(
         assert response == {"result": "ok"}
 
 
+@pytest.mark.asyncio
+async def test_live_server_event_key_found_and_lzma_encoding_selected(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    content = """\
+<?xml version='1.0' encoding='UTF-8'?>
+<ResultList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0">
+  <Event>
+    <Name>1. O-Cup 2020</Name>
+    <StartTime>
+      <Date>2020-02-09</Date>
+    </StartTime>
+  </Event>
+</ResultList>
+"""
+    async with connect(
+        uri="ws://localhost:8081/import",
+        additional_headers={"X-Event-Key": "local", "X-Encoding": "lzma, zlib, bz2"},
+    ) as client:
+        assert client.response is not None
+        assert client.response.headers["X-Encoding"] == "lzma"
+
+        # send a compressed IOF ResultList
+        await client.send(lzma.compress(content.encode()))
+        response = await client.recv()
+        response = json.loads(response)
+        jsonschema.validate(instance=response, schema=schema_streaming_result)
+        assert response == {"result": "ok"}
+
+
 @pytest.mark.asyncio
 async def test_live_server_import_result_list_snapshot(
     event_id: int,
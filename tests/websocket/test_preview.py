@@ -0,0 +1,131 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import datetime
+import pathlib
+import tempfile
+from collections.abc import Iterator
+
+import pytest
+from websockets.asyncio.server import serve
+
+from ooresults import model
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.result_type import PersonRaceResult
+from ooresults.otypes.start_type import PersonRaceStart
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils import preview
+from ooresults.utils.preview import Preview
+from ooresults.websocket_server.websocket_handler import WebSocketHandler
+
+
+@pytest.fixture
+def db() -> Iterator[SqliteRepo]:
+    with tempfile.NamedTemporaryFile() as db_file:
+        model.db = SqliteRepo(db=db_file.name)
+        yield model.db
+        model.db.close()
+
+
+@pytest.fixture
+def event_id(db: SqliteRepo) -> int:
+    with db.transaction():
+        event_id = db.add_event(
+            name="Event",
+            date=datetime.date(year=2021, month=5, day=18),
+            key="local",
+            publish=False,
+            series=None,
+            fields=[],
+        )
+        course_id = db.add_course(
+            event_id=event_id,
+            name="Bahn A",
+            length=None,
+            climb=None,
+            controls=["101", "102"],
+        )
+        class_id = db.add_class(
+            event_id=event_id,
+            name="Elite",
+            short_name=None,
+            course_id=course_id,
+            params=ClassParams(),
+        )
+        competitor_id = db.add_competitor(
+            first_name="Angela",
+            last_name="Merkel",
+            club_id=None,
+            gender="F",
+            year=1957,
+            chip="",
+        )
+        db.add_entry(
+            event_id=event_id,
+            competitor_id=competitor_id,
+            class_id=class_id,
+            club_id=None,
+            not_competing=False,
+            chip="4711",
+            fields={},
+            result=PersonRaceResult(),
+            start=PersonRaceStart(),
+        )
+        return event_id
+
+
+@pytest.mark.asyncio
+async def test_reader_downloads_the_snapshot_once(
+    db: SqliteRepo, event_id: int
+) -> None:
+    handler = WebSocketHandler()
+    with tempfile.TemporaryDirectory() as td:
+        path = pathlib.Path(td) / "snapshot.json"
+        p = Preview(url=f"http://localhost:8082{preview.PATH}", key="local", path=path)
+        async with serve(
+            handler=handler.handler,
+            process_request=handler.process_request,
+            host="localhost",
+            port=8082,
+        ):
+            assert await asyncio.to_thread(p.refresh)
+            assert p.snapshot is not None
+            assert p.snapshot["format"] == preview.VERSION
+            assert list(p.snapshot["entries"]) == ["4711"]
+            # the snapshot is unchanged, the server answers 304
+            assert not await asyncio.to_thread(p.refresh)
+
+            unknown = Preview(url=f"http://localhost:8082{preview.PATH}", key="xxx")
+            assert not await asyncio.to_thread(unknown.refresh)
+            assert unknown.snapshot is None
+
+        # the cached snapshot is used after a restart without a connection
+        restarted = Preview(
+            url=f"http://localhost:8082{preview.PATH}", key="local", path=path
+        )
+        assert restarted.snapshot == p.snapshot
+        assert not await asyncio.to_thread(restarted.refresh)
+        assert restarted.snapshot == p.snapshot
+
+
+def test_differs() -> None:
+    p = {"status": "OK", "time": 300, "error": None, "missingControls": []}
+    assert not preview.differs(preview=p, reply=dict(p, readerStatus="cardRead"))
+    assert preview.differs(preview=p, reply=dict(p, status="MISSING_PUNCH"))
@@ -0,0 +1,244 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import asyncio
+import datetime
+import json
+import tempfile
+import threading
+import urllib.request
+import zlib
+from collections.abc import Iterator
+from typing import Optional
+from unittest import mock
+
+import pytest
+from websockets.asyncio.client import connect
+from websockets.asyncio.server import Server
+from websockets.asyncio.server import serve
+
+from ooresults import model
+from ooresults.otypes.event_type import EventType
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.websocket_server.relay import Relay
+from ooresults.websocket_server.websocket_handler import WebSocketHandler
+
+
+CONTENT = b"""\
+<?xml version='1.0' encoding='UTF-8'?>
+<ResultList xmlns="http://www.orienteering.org/datastandard/3.0" iofVersion="3.0" status="Snapshot">
+  <Event>
+    <Name>1. O-Cup 2020</Name>
+    <StartTime>
+      <Date>2020-02-09</Date>
+    </StartTime>
+  </Event>
+</ResultList>
+"""
+
+
+@pytest.fixture
+def db() -> Iterator[SqliteRepo]:
+    with tempfile.NamedTemporaryFile() as db_file:
+        model.db = SqliteRepo(db=db_file.name)
+        yield model.db
+        model.db.close()
+
+
+class WebSocketServer(threading.Thread):
+    def __init__(
+        self,
+        barrier: threading.Barrier,
+        relay: Relay,
+        host: str = "0.0.0.0",
+        port: int = 8081,
+    ):
+        super().__init__()
+        self.barrier = barrier
+        self.relay = relay
+        self.handler = WebSocketHandler(import_stream=True, relay=relay)
+        self.host = host
+        self.port = port
+        self.server: Optional[Server] = None
+        self.loop = asyncio.new_event_loop()
+        self.update_event = mock.AsyncMock()
+
+    def run(self) -> None:
+        asyncio.set_event_loop(loop=self.loop)
+        self.loop.create_task(self.start_server())
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.close()
+
+    async def start_server(self) -> None:
+        self.server = await serve(
+            handler=self.handler.handler,
+            process_request=self.handler.process_request,
+            process_response=self.handler.process_response,
+            host=self.host,
+            port=self.port,
+        )
+        self.barrier.wait()
+
+    def close(self) -> None:
+        if self.loop and self.server:
+            self.server.close()
+            future = asyncio.run_coroutine_threadsafe(
+                coro=self.server.wait_closed(), loop=self.loop
+            )
+            future.result()
+            self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+@pytest.fixture
+def relay() -> Relay:
+    return Relay(downstream="localhost:9081, localhost:9082", keys=["key-1", "key-2"])
+
+
+@pytest.fixture
+def websocket_server(relay: Relay) -> Iterator[WebSocketServer]:
+    barrier = threading.Barrier(parties=2, timeout=10)
+    websocket_server = WebSocketServer(barrier=barrier, relay=relay)
+    websocket_server.start()
+    barrier.wait()
+    with mock.patch.object(model.results, "websocket_server", websocket_server):
+        yield websocket_server
+    websocket_server.close()
+
+
+async def send(event_key: str, content: bytes) -> dict:
+    async with connect(
+        uri="ws://localhost:8081/import",
+        additional_headers={"X-Event-Key": event_key, "X-Encoding": "zlib"},
+    ) as client:
+        await client.send(zlib.compress(content))
+        return json.loads(await client.recv())
+
+
+@pytest.mark.asyncio
+async def test_relay_creates_an_unknown_event_and_streams_it_downstream(
+    db: SqliteRepo,
+    relay: Relay,
+    websocket_server: WebSocketServer,
+) -> None:
+    assert await send(event_key="key-1", content=CONTENT) == {"result": "ok"}
+
+    with db.transaction():
+        events = db.get_events()
+    assert len(events) == 1
+    event = events[0]
+    assert event == EventType(
+        id=event.id,
+        name="1. O-Cup 2020",
+        date=datetime.date(year=2020, month=2, day=9),
+        key="key-1",
+        publish=True,
+        series=None,
+        fields=[],
+        streaming_address="localhost:9081, localhost:9082",
+        streaming_key="key-1",
+        streaming_enabled=True,
+    )
+    websocket_server.update_event.assert_awaited_once_with(event=event)
+
+    # the received result list is forwarded unchanged
+    assert relay.get_result_list(event_id=event.id) == CONTENT
+
+
+@pytest.mark.asyncio
+async def test_relay_uses_an_existing_event(
+    db: SqliteRepo,
+    relay: Relay,
+    websocket_server: WebSocketServer,
+) -> None:
+    callback = mock.Mock()
+    relay.register(callback=callback)
+
+    assert await send(event_key="key-1", content=CONTENT) == {"result": "ok"}
+    assert await send(event_key="key-1", content=CONTENT) == {"result": "ok"}
+
+    with db.transaction():
+        events = db.get_events()
+    assert len(events) == 1
+    websocket_server.update_event.assert_awaited_once()
+    assert callback.call_args_list == [mock.call(events[0].id)] * 2
+
+    health = relay.health()
+    assert len(health) == 1
+    assert health[0]["event_id"] == events[0].id
+    assert health[0]["updates"] == 2
+    assert health[0]["size"] == len(CONTENT)
+
+
+@pytest.mark.asyncio
+async def test_relay_without_event_key_does_not_create_an_event(
+    db: SqliteRepo,
+    websocket_server: WebSocketServer,
+) -> None:
+    assert await send(event_key="", content=CONTENT) == {"result": "eventNotFound"}
+
+    with db.transaction():
+        assert db.get_events() == []
+    websocket_server.update_event.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_relay_does_not_create_an_event_for_a_key_not_configured(
+    db: SqliteRepo,
+    websocket_server: WebSocketServer,
+) -> None:
+    assert await send(event_key="key-3", content=CONTENT) == {"result": "eventNotFound"}
+
+    with db.transaction():
+        assert db.get_events() == []
+    websocket_server.update_event.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_relay_does_not_create_an_event_with_the_name_of_another_event(
+    db: SqliteRepo,
+    websocket_server: WebSocketServer,
+) -> None:
+    assert await send(event_key="key-1", content=CONTENT) == {"result": "ok"}
+    assert await send(event_key="key-2", content=CONTENT) == {"result": "eventExists"}
+
+    with db.transaction():
+        events = db.get_events()
+    assert [e.key for e in events] == ["key-1"]
+    websocket_server.update_event.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_health_is_returned_for_a_http_request(
+    db: SqliteRepo,
+    websocket_server: WebSocketServer,
+) -> None:
+    assert await send(event_key="key-1", content=CONTENT) == {"result": "ok"}
+
+    def get() -> tuple[str, dict]:
+        with urllib.request.urlopen("http://localhost:8081/health") as response:
+            return response.headers["Content-Type"], json.loads(response.read())
+
+    content_type, health = await asyncio.to_thread(get)
+    assert content_type == "application/json"
+    assert health["relay"] is True
+    assert [u["updates"] for u in health["upstream"]] == [1]
+    assert health["upstream"][0]["address"] == "127.0.0.1"
+    assert isinstance(health["downstream"], list)
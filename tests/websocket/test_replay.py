@@ -0,0 +1,169 @@
+# Copyright (C) 2022 Rainer Garus
+#
+# This file is part of the ooresults Python package, a software to
+# compute results of orienteering events.
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Affero General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Affero General Public License for more details.
+#
+# You should have received a copy of the GNU Affero General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+
+import datetime
+import json
+import pathlib
+import tempfile
+from collections.abc import Iterator
+
+import pytest
+from websockets.asyncio.server import serve
+
+from ooresults import model
+from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.utils import cardreader_batch
+from ooresults.utils import replay
+from ooresults.websocket_server.websocket_handler import WebSocketHandler
+
+
+@pytest.fixture
+def db() -> Iterator[SqliteRepo]:
+    with tempfile.NamedTemporaryFile() as db_file:
+        model.db = SqliteRepo(db=db_file.name)
+        yield model.db
+        model.db.close()
+
+
+@pytest.fixture
+def event_id(db: SqliteRepo) -> int:
+    with db.transaction():
+        return db.add_event(
+            name="Event",
+            date=datetime.date(year=2021, month=5, day=18),
+            key="local",
+            publish=False,
+            series=None,
+            fields=[],
+        )
+
+
+def card_reads(number: int) -> list[dict]:
+    items = []
+    for i in range(number):
+        items.append(
+            {
+                "entryType": "cardRead",
+                "entryTime": f"2021-05-18T17:24:{i:02}+02:00",
+                "cardType": "SI10",
+                "controlCard": str(8084700 + i),
+                "startTime": "2021-05-18T16:31:19+02:00",
+                "finishTime": f"2021-05-18T17:20:{i:02}+02:00",
+                "punches": [],
+            }
+        )
+    return items
+
+
+def test_read_log() -> None:
+    with tempfile.TemporaryDirectory() as td:
+        path = pathlib.Path(td) / "cardreader.log"
+        with open(path, "w") as f:
+            for item in card_reads(3):
+                f.write(json.dumps(item) + "\n")
+        assert replay.read_log(path=path) == card_reads(3)
+
+
+def test_schedule() -> None:
+    items = card_reads(3)
+    items[2]["entryTime"] = "2021-05-18T17:25:00+02:00"
+    assert replay.schedule(items=items, rate=0) == [0, 0, 0]
+    assert replay.schedule(items=items, rate=1) == [0, 1, 60]
+    assert replay.schedule(items=items, rate=10) == [0, 0.1, 6]
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("batch_size", [1, 5])
+async def test_replay_stores_all_card_reads(
+    db: SqliteRepo, event_id: int, batch_size: int
+) -> None:
+    handler = WebSocketHandler()
+    async with serve(
+        handler=handler.handler,
+        process_response=handler.process_response,
+        host="localhost",
+        port=8082,
+    ):
+        stats = await replay.replay(
+            uri="ws://localhost:8082/cardreader",
+            key="local",
+            items=card_reads(12),
+            concurrency=2,
+            batch_size=batch_size,
+        )
+
+    assert stats.items == 12
+    assert stats.stored == 12
+    assert stats.rejected == 0
+    assert stats.errors == 0
+    assert len(stats.latencies) == 12
+    assert "12 stored" in stats.summary()
+    with db.transaction():
+        entries = db.get_entries(event_id=event_id)
+    assert sorted(str(e.chip) for e in entries) == [str(8084700 + i) for i in range(12)]
+
+
+@pytest.mark.asyncio
+async def test_replay_counts_the_rejected_card_reads(
+    db: SqliteRepo, event_id: int
+) -> None:
+    handler = WebSocketHandler()
+    async with serve(
+        handler=handler.handler,
+        process_response=handler.process_response,
+        host="localhost",
+        port=8082,
+    ):
+        stats = await replay.replay(
+            uri="ws://localhost:8082/cardreader",
+            key="unknown",
+            items=card_reads(4),
+            concurrency=1,
+            batch_size=2,
+        )
+
+    # the card reads of an unknown event are rejected
+    assert stats.stored == 0
+    assert stats.rejected == 4
+    assert stats.errors == 0
+
+
+@pytest.mark.asyncio
+async def test_replay_splits_the_batches_into_the_size_accepted_by_the_server(
+    db: SqliteRepo, event_id: int, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(cardreader_batch, "MAX_ITEMS", 3)
+    handler = WebSocketHandler()
+    async with serve(
+        handler=handler.handler,
+        process_response=handler.process_response,
+        host="localhost",
+        port=8082,
+    ):
+        stats = await replay.replay(
+            uri="ws://localhost:8082/cardreader",
+            key="local",
+            items=card_reads(12),
+            concurrency=1,
+            batch_size=5,
+        )
+
+    assert stats.stored == 12
+    assert stats.rejected == 0
+    assert stats.errors == 0
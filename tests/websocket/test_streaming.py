@@ -19,6 +19,10 @@
 
 import asyncio
 import datetime
+import lzma
+import zlib
+from collections.abc import Awaitable
+from collections.abc import Callable
 from typing import Any
 from unittest import mock
 
@@ -27,14 +31,18 @@ import pytest_asyncio
 import websockets.exceptions
 from websockets.asyncio.client import ClientConnection
 from websockets.asyncio.client import connect
+from websockets.datastructures import Headers
+from websockets.http11 import Response
 from websockets.protocol import State
 
 import ooresults.model
+from ooresults.model import cached_result
 from ooresults.otypes.class_params import ClassParams
 from ooresults.otypes.class_type import ClassInfoType
 from ooresults.otypes.event_type import EventType
 from ooresults.websocket_server import streaming
 from ooresults.websocket_server import streaming_status
+from ooresults.websocket_server.relay import Relay
 from ooresults.websocket_server.streaming_status import Status
 
 
@@ -54,6 +62,11 @@ def event() -> EventType:
     )
 
 
+@pytest.fixture(autouse=True)
+def clear_cache() -> None:
+    cached_result.clear_cache()
+
+
 @pytest.fixture
 def class_info() -> ClassInfoType:
     return ClassInfoType(
@@ -150,6 +163,22 @@ def parent(
     return parent
 
 
+# the mocked recv blocks until it is cancelled
+BLOCK = object()
+
+
+def recv_side_effect(values: list) -> Callable[[], Awaitable[Any]]:
+    async def recv() -> Any:
+        value = values.pop(0)
+        if value is BLOCK:
+            await asyncio.Event().wait()
+        if isinstance(value, BaseException):
+            raise value
+        return value
+
+    return recv
+
+
 class C:
     def __init__(self, name: str, args=None, kwargs=None, value: Any = None) -> None:
         self.name = name
@@ -188,10 +217,15 @@ def value_calls(parent: mock.MagicMock, calls: list[C]) -> None:
             if c.value == ClientConnection:
                 parent.mock_connect.side_effect = None
                 parent.mock_connect.return_value = mock.create_autospec(
-                    spec=ClientConnection, spec_set=True
+                    spec=ClientConnection
                 )
                 parent.attach_mock(parent.mock_connect.return_value, "mock_ws")
                 parent.mock_connect.return_value.state = State.OPEN
+                parent.mock_connect.return_value.response = Response(
+                    status_code=101,
+                    reason_phrase="Switching Protocols",
+                    headers=Headers({"X-Encoding": "lzma"}),
+                )
             else:
                 parent.mock_connect.side_effect = c.value
 
@@ -202,7 +236,7 @@ def value_calls(parent: mock.MagicMock, calls: list[C]) -> None:
     c = [v.value for v in calls if v.name == "mock_ws.send"]
     parent.mock_connect.return_value.send.side_effect = c
     c = [v.value for v in calls if v.name == "mock_ws.recv"]
-    parent.mock_connect.return_value.recv.side_effect = c
+    parent.mock_connect.return_value.recv.side_effect = recv_side_effect(values=c)
 
 
 @pytest.mark.asyncio
@@ -218,7 +252,7 @@ async def test_if_streaming_is_disabled_then_connect_is_not_called_after_softwar
         spec=ClientConnection, spec_set=True
     )
 
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
     await asyncio.sleep(0)
     mock_connect.assert_not_awaited()
     assert streaming_status.status.get(id=event.id) is None
@@ -245,7 +279,6 @@ async def test_if_streaming_is_enabled_then_connect_is_called_until_connected(
     # event_class_results -> event(3), []
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
 
     calls = [
@@ -257,7 +290,7 @@ async def test_if_streaming_is_enabled_then_connect_is_called_until_connected(
         C(name="mock_sleep", kwargs={"delay": 20}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -289,8 +322,6 @@ async def test_if_streaming_is_enabled_then_connect_is_called_until_connected(
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
@@ -325,7 +356,7 @@ async def test_if_answer_is_event_not_found_then_reconnect_after_45_sec(
     # recv -> '{"result": "eventNotFound"}'
     # sleep(45)
     # connect -> ClientConnection()
-    # event_class_results -> event, []
+    # (cached result)
     # send
     # recv -> '{"result": "eventNotFound"}'
     # sleep(45)
@@ -345,7 +376,7 @@ async def test_if_answer_is_event_not_found_then_reconnect_after_45_sec(
         C(name="mock_sleep", kwargs={"delay": 45}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -356,8 +387,7 @@ async def test_if_answer_is_event_not_found_then_reconnect_after_45_sec(
     c1 = [
         # connect -> ClientConnection()
         C(name="mock_connect", value=ClientConnection),
-        # event_class_results(3) -> event, []
-        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # the cached result is used, event_class_results is not called
         # send
         C(name="mock_ws.send"),
         # recv -> '{"result": "eventNotFound"}'
@@ -396,7 +426,7 @@ async def test_if_no_answer_then_reconnect_after_45_sec(
     # recv -> TimeoutError()'
     # sleep(15)
     # connect -> ClientConnection()
-    # event_class_results -> event, []
+    # (cached result)
     # send
     # recv -> TimeoutError()'
     # sleep(15)
@@ -416,7 +446,7 @@ async def test_if_no_answer_then_reconnect_after_45_sec(
         C(name="mock_sleep", kwargs={"delay": 15}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -427,8 +457,7 @@ async def test_if_no_answer_then_reconnect_after_45_sec(
     c1 = [
         # connect -> ClientConnection()
         C(name="mock_connect", value=ClientConnection),
-        # event_class_results(3) -> event, []
-        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # the cached result is used, event_class_results is not called
         # send
         C(name="mock_ws.send"),
         # recv -> TimeoutError}'
@@ -467,7 +496,7 @@ async def test_if_unexpected_answer_then_reconnect_after_45_sec(
     # recv -> '???'
     # sleep(45)
     # connect -> ClientConnection()
-    # event_class_results -> event, []
+    # (cached result)
     # send
     # recv -> '???'
     # sleep(45)
@@ -487,7 +516,7 @@ async def test_if_unexpected_answer_then_reconnect_after_45_sec(
         C(name="mock_sleep", kwargs={"delay": 45}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -498,8 +527,7 @@ async def test_if_unexpected_answer_then_reconnect_after_45_sec(
     c1 = [
         # connect -> ClientConnection()
         C(name="mock_connect", value=ClientConnection),
-        # event_class_results(3) -> event, []
-        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # the cached result is used, event_class_results is not called
         # send
         C(name="mock_ws.send"),
         # recv -> '???'
@@ -536,13 +564,10 @@ async def test_if_answer_is_error_then_repeat_sending_actual_result_after_30_sec
     # event_class_results -> event, []
     # send
     # recv -> '{"result": "error"}'
-    # recv -> Timeout
-    # sleep(0)
-    # event_class_results -> event, []
+    # sleep(30)
     # send
     # recv -> '{"result": "error"}'
-    # recv -> Timeout()
-    # sleep(0)
+    # sleep(30)
 
     calls = [
         # get_events -> [event]
@@ -555,13 +580,11 @@ async def test_if_answer_is_error_then_repeat_sending_actual_result_after_30_sec
         C(name="mock_ws.send"),
         # recv -> '{"result": "error"}'
         C(name="mock_ws.recv", value='{"result": "error"}'),
-        # recv -> Timeout
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
-        # sleep(0)
-        C(name="mock_sleep", kwargs={"delay": 0}),
+        # sleep(30)
+        C(name="mock_sleep", kwargs={"delay": 30}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -570,16 +593,13 @@ async def test_if_answer_is_error_then_repeat_sending_actual_result_after_30_sec
 
     check_calls(parent=parent, calls=calls)
     c1 = [
-        # event_class_results(3) -> event, []
-        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # the cached result is used, event_class_results is not called
         # send
         C(name="mock_ws.send"),
         # recv -> '{"result": "error"}'
         C(name="mock_ws.recv", value='{"result": "error"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
-        # sleep(0)
-        C(name="mock_sleep", kwargs={"delay": 0}),
+        # sleep(30)
+        C(name="mock_sleep", kwargs={"delay": 30}),
     ]
     calls += c1
 
@@ -624,7 +644,7 @@ async def test_if_after_connect_an_unknown_exception_is_raised_new_state_is_inte
         C(name="mock_sleep", kwargs={"delay": 30}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -655,7 +675,7 @@ async def test_if_after_connect_an_unknown_exception_is_raised_new_state_is_inte
 
 
 @pytest.mark.asyncio
-async def test_if_answer_is_ok_then_repeat_sending_different_results_every_30_sec(
+async def test_if_the_result_has_changed_then_the_changed_result_is_sent(
     event: EventType,
     class_info: ClassInfoType,
     parent: mock.MagicMock,
@@ -670,12 +690,13 @@ async def test_if_answer_is_ok_then_repeat_sending_different_results_every_30_se
     # event_class_results -> event, []
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
-    # event_class_results -> event, []
+    #
+    # clear_cache(event_id=3)
+    #
+    # event_class_results -> event, [(class_info, [])]
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
 
     calls = [
@@ -689,13 +710,11 @@ async def test_if_answer_is_ok_then_repeat_sending_different_results_every_30_se
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -714,15 +733,14 @@ async def test_if_answer_is_ok_then_repeat_sending_different_results_every_30_se
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
-        # sleep(0))
+        # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
     calls += c1
     value_calls(parent=parent, calls=c1)
 
     # synchronize
+    cached_result.clear_cache(event_id=event.id)
     await parent.mock_sleep.sync()
     # assertions
     assert streaming_status.status.get(id=event.id) == Status.OK
@@ -749,15 +767,18 @@ async def test_if_answer_is_ok_then_do_not_send_the_same_result_again(
     # event_class_results -> event, []
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
+    #
+    # clear_cache(event_id=3)
+    #
     # event_class_results -> event, []
-    # recv -> Timeout()
     # sleep(0)
+    #
+    # clear_cache(event_id=3)
+    #
     # event_class_results -> event, [(class_info, [])]
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
 
     calls = [
@@ -771,13 +792,11 @@ async def test_if_answer_is_ok_then_do_not_send_the_same_result_again(
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -788,8 +807,6 @@ async def test_if_answer_is_ok_then_do_not_send_the_same_result_again(
     c1 = [
         # event_class_results(3) -> event, []
         C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
@@ -797,6 +814,7 @@ async def test_if_answer_is_ok_then_do_not_send_the_same_result_again(
     value_calls(parent=parent, calls=c1)
 
     # synchronize
+    cached_result.clear_cache(event_id=event.id)
     await parent.mock_sleep.sync()
     # assertions
     assert streaming_status.status.get(id=event.id) == Status.OK
@@ -813,8 +831,6 @@ async def test_if_answer_is_ok_then_do_not_send_the_same_result_again(
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
@@ -822,9 +838,161 @@ async def test_if_answer_is_ok_then_do_not_send_the_same_result_again(
     value_calls(parent=parent, calls=c1)
 
     # synchronize
+    cached_result.clear_cache(event_id=event.id)
+    await parent.mock_sleep.sync()
+    # assertions
+    assert streaming_status.status.get(id=event.id) == Status.OK
+
+    check_calls(parent=parent, calls=calls)
+    # stop streaming
+    event.streaming_enabled = False
+    await s.update_event(event)
+
+
+@pytest.mark.asyncio
+async def test_if_the_result_has_changed_several_times_then_the_changes_are_coalesced(
+    event: EventType,
+    class_info: ClassInfoType,
+    parent: mock.MagicMock,
+) -> None:
+    loop = asyncio.get_running_loop()
+    event.streaming_enabled = True
+
+    # call order of mocked objects in Streaming.stream()
+    #
+    # get_events -> [event]
+    # connect -> ClientConnection()
+    # event_class_results -> event, []
+    # send
+    # recv -> '{"result": "ok"}'
+    # sleep(0)
+    #
+    # clear_cache(event_id=3)
+    # clear_cache(event_id=3)
+    # clear_cache(event_id=3)
+    #
+    # recv -> (waiting until min_interval is elapsed)
+    # event_class_results -> event, [(class_info, [])]
+    # send
+    # recv -> '{"result": "ok"}'
+    # sleep(0)
+
+    calls = [
+        # get_events -> [event]
+        C(name="mock_get_events", value=[event]),
+        # connect -> ClientConnection()
+        C(name="mock_connect", value=ClientConnection),
+        # event_class_results(3) -> event, []
+        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # send
+        C(name="mock_ws.send"),
+        # recv -> '{"result": "ok"}'
+        C(name="mock_ws.recv", value='{"result": "ok"}'),
+        # sleep(0)
+        C(name="mock_sleep", kwargs={"delay": 0}),
+    ]
+    value_calls(parent=parent, calls=calls)
+    s = streaming.Streaming(loop=loop, min_interval=0.2)
+
+    # synchronize
+    await parent.mock_sleep.sync()
+    t1 = loop.time()
+    # assertions
+    assert streaming_status.status.get(id=event.id) == Status.OK
+
+    check_calls(parent=parent, calls=calls)
+    c1 = [
+        # recv -> (waiting until min_interval is elapsed)
+        C(name="mock_ws.recv", value=BLOCK),
+        # event_class_results(3) -> event, [(class_info, [])]
+        C(
+            name="mock_event_class_results",
+            kwargs={"event_id": 3},
+            value=(event, [(class_info, [])]),
+        ),
+        # send
+        C(name="mock_ws.send"),
+        # recv -> '{"result": "ok"}'
+        C(name="mock_ws.recv", value='{"result": "ok"}'),
+        # sleep(0)
+        C(name="mock_sleep", kwargs={"delay": 0}),
+    ]
+    calls += c1
+    value_calls(parent=parent, calls=c1)
+
+    # synchronize
+    for i in range(3):
+        cached_result.clear_cache(event_id=event.id)
     await parent.mock_sleep.sync()
+    t2 = loop.time()
     # assertions
     assert streaming_status.status.get(id=event.id) == Status.OK
+    assert t2 - t1 >= 0.15
+
+    check_calls(parent=parent, calls=calls)
+    # stop streaming
+    event.streaming_enabled = False
+    await s.update_event(event)
+
+
+@pytest.mark.asyncio
+async def test_if_data_is_received_while_waiting_for_a_change_then_the_state_is_error(
+    event: EventType,
+    parent: mock.MagicMock,
+) -> None:
+    loop = asyncio.get_running_loop()
+    event.streaming_enabled = True
+
+    # call order of mocked objects in Streaming.stream()
+    #
+    # get_events -> [event]
+    # connect -> ClientConnection()
+    # event_class_results -> event, []
+    # send
+    # recv -> '{"result": "ok"}'
+    # sleep(0)
+    # recv -> '???'
+    # close
+    # sleep(15)
+
+    calls = [
+        # get_events -> [event]
+        C(name="mock_get_events", value=[event]),
+        # connect -> ClientConnection()
+        C(name="mock_connect", value=ClientConnection),
+        # event_class_results(3) -> event, []
+        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # send
+        C(name="mock_ws.send"),
+        # recv -> '{"result": "ok"}'
+        C(name="mock_ws.recv", value='{"result": "ok"}'),
+        # sleep(0)
+        C(name="mock_sleep", kwargs={"delay": 0}),
+    ]
+    value_calls(parent=parent, calls=calls)
+    s = streaming.Streaming(loop=loop, min_interval=0)
+
+    # synchronize
+    await parent.mock_sleep.sync()
+    # assertions
+    assert streaming_status.status.get(id=event.id) == Status.OK
+
+    check_calls(parent=parent, calls=calls)
+    c1 = [
+        # recv -> '???'
+        C(name="mock_ws.recv", value="???"),
+        # close
+        C(name="mock_ws.close"),
+        # sleep(15)
+        C(name="mock_sleep", kwargs={"delay": 15}),
+    ]
+    calls += c1
+    value_calls(parent=parent, calls=c1)
+
+    # synchronize
+    await parent.mock_sleep.sync()
+    # assertions
+    assert streaming_status.status.get(id=event.id) == Status.ERROR
 
     check_calls(parent=parent, calls=calls)
     # stop streaming
@@ -847,14 +1015,14 @@ async def test_if_answer_is_ok_and_connection_closed_then_reconnect_after_30_sec
     # event_class_results -> event, []
     # send
     # recv -> '{"result": "ok"}'
+    # sleep(0)
     # recv -> ConnectionClosed()
     # sleep(30)
     # connect -> ClientConnection()
-    # event_class_results -> event, []
+    # (cached result)
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
-    # sleep(30)
+    # sleep(0)
 
     calls = [
         # get_events -> [event]
@@ -867,6 +1035,19 @@ async def test_if_answer_is_ok_and_connection_closed_then_reconnect_after_30_sec
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
+        # sleep(0)
+        C(name="mock_sleep", kwargs={"delay": 0}),
+    ]
+    value_calls(parent=parent, calls=calls)
+    s = streaming.Streaming(loop=loop, min_interval=0)
+
+    # synchronize
+    await parent.mock_sleep.sync()
+    # assertions
+    assert streaming_status.status.get(id=event.id) == Status.OK
+
+    check_calls(parent=parent, calls=calls)
+    c1 = [
         # recv -> ConnectionClosed
         C(
             name="mock_ws.recv",
@@ -875,8 +1056,8 @@ async def test_if_answer_is_ok_and_connection_closed_then_reconnect_after_30_sec
         # sleep(30)
         C(name="mock_sleep", kwargs={"delay": 30}),
     ]
-    value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    calls += c1
+    value_calls(parent=parent, calls=c1)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -887,14 +1068,11 @@ async def test_if_answer_is_ok_and_connection_closed_then_reconnect_after_30_sec
     c1 = [
         # connect -> ClientConnection()
         C(name="mock_connect", value=ClientConnection),
-        # event_class_results(3) -> event, []
-        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # the cached result is used, event_class_results is not called
         # send
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
@@ -927,16 +1105,14 @@ async def test_if_stream_parameters_are_changed_then_reconnect(
     # event_class_results -> event, []
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
     #
     # await s.update_event(event=event)
     #
     # connect -> ClientConnection()
-    # event_class_results -> event, []
+    # (cached result)
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
 
     calls = [
@@ -950,13 +1126,11 @@ async def test_if_stream_parameters_are_changed_then_reconnect(
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     event.streaming_key = "b"
@@ -968,14 +1142,11 @@ async def test_if_stream_parameters_are_changed_then_reconnect(
     c1 = [
         # connect -> ClientConnection()
         C(name="mock_connect", value=ClientConnection),
-        # event_class_results(3) -> event, []
-        C(name="mock_event_class_results", kwargs={"event_id": 3}, value=(event, [])),
+        # the cached result is used, event_class_results is not called
         # send
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
@@ -1012,7 +1183,6 @@ async def test_if_stream_is_disabled_then_results_are_no_longer_send(
     # event_class_results -> event, []
     # send
     # recv -> '{"result": "ok"}'
-    # recv -> Timeout()
     # sleep(0)
     #
     # await s.update_event(event=event)
@@ -1028,13 +1198,11 @@ async def test_if_stream_is_disabled_then_results_are_no_longer_send(
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     # synchronize
     await parent.mock_sleep.sync()
@@ -1074,7 +1242,7 @@ async def test_if_stream_is_disabled_then_connect_is_not_called(
         C(name="mock_get_events", value=[event]),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=loop)
+    s = streaming.Streaming(loop=loop, min_interval=0)
 
     assert len(s.events) == 0
     assert len(s.tasks) == 0
@@ -1099,7 +1267,7 @@ async def test_if_stream_is_enabled_then_connect_to_server(
         C(name="mock_get_events", value=[event]),
     ]
     value_calls(parent=parent, calls=calls)
-    s = streaming.Streaming(loop=asyncio.get_running_loop())
+    s = streaming.Streaming(loop=asyncio.get_running_loop(), min_interval=0)
 
     assert len(s.events) == 0
     assert len(s.tasks) == 0
@@ -1114,8 +1282,6 @@ async def test_if_stream_is_enabled_then_connect_to_server(
         C(name="mock_ws.send"),
         # recv -> '{"result": "ok"}'
         C(name="mock_ws.recv", value='{"result": "ok"}'),
-        # recv -> Timeout()
-        C(name="mock_ws.recv", value=asyncio.TimeoutError()),
         # sleep(0)
         C(name="mock_sleep", kwargs={"delay": 0}),
     ]
@@ -1135,6 +1301,80 @@ async def test_if_stream_is_enabled_then_connect_to_server(
     assert streaming_status.status.get(id=event.id) == Status.OK
 
     check_calls(parent=parent, calls=calls)
+    # the encodings are offered and the result list is sent lzma compressed
+    kwargs = parent.mock_connect.await_args.kwargs
+    assert kwargs["additional_headers"]["X-Encoding"] == "lzma, zlib, bz2"
+    data = parent.mock_connect.return_value.send.await_args.args[0]
+    assert lzma.decompress(data).startswith(b"<?xml")
+
     # stop streaming
     event.streaming_enabled = False
     await s.update_event(event)
+
+
+@pytest.mark.parametrize(
+    "streaming_address, addresses",
+    [
+        (None, [""]),
+        ("a:8081", ["a:8081"]),
+        ("a:8081, b:8082,a:8081,", ["a:8081", "b:8082"]),
+    ],
+)
+def test_addresses(streaming_address, addresses) -> None:
+    assert streaming.addresses(streaming_address=streaming_address) == addresses
+
+
+@pytest.mark.asyncio
+async def test_if_relay_then_the_received_result_list_is_sent_to_all_addresses(
+    event: EventType,
+    mock_get_events: mock.Mock,
+    mock_connect: mock.AsyncMock,
+    mock_event_class_results: mock.Mock,
+) -> None:
+    relay = Relay()
+    relay.result_lists[event.id] = b"<ResultList/>"
+    mock_get_events.return_value = []
+
+    connections: dict[str, mock.MagicMock] = {}
+
+    async def connect(uri, ssl, additional_headers) -> mock.MagicMock:
+        ws = mock.create_autospec(spec=ClientConnection)
+        ws.state = State.OPEN
+        ws.response = Response(
+            status_code=101,
+            reason_phrase="Switching Protocols",
+            headers=Headers({"X-Encoding": "zlib"}),
+        )
+        ws.recv.side_effect = recv_side_effect(values=['{"result": "ok"}', BLOCK])
+        connections[uri] = ws
+        return ws
+
+    mock_connect.side_effect = connect
+    s = streaming.Streaming(
+        loop=asyncio.get_running_loop(), min_interval=0, relay=relay
+    )
+
+    event.streaming_enabled = True
+    event.streaming_address = "a, b"
+    await s.update_event(event=event)
+    for _ in range(100):
+        if streaming_status.status.get(id=event.id) == Status.OK:
+            break
+        await asyncio.sleep(0.01)
+
+    assert streaming_status.status.get(id=event.id) == Status.OK
+    assert sorted(connections) == ["wss://a/import", "wss://b/import"]
+    for ws in connections.values():
+        assert zlib.decompress(ws.send.await_args.args[0]) == b"<ResultList/>"
+    # the result is not computed by the relay
+    mock_event_class_results.assert_not_called()
+    assert [h["address"] for h in streaming_status.status.health()] == ["a", "b"]
+
+    # stop streaming
+    task = s.tasks[event.id]
+    event.streaming_enabled = False
+    await s.update_event(event)
+    with pytest.raises(asyncio.CancelledError):
+        await asyncio.wait_for(task, timeout=0.1)
+    assert streaming_status.status.get(id=event.id) is None
+    s.close()
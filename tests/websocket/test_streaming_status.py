@@ -20,6 +20,7 @@
 import asyncio
 import datetime
 from unittest.mock import AsyncMock
+from unittest.mock import patch
 
 import pytest
 
@@ -131,3 +132,65 @@ def test_awaitable_not_called_after_register_none(
     status_1.register(callback=None)
     asyncio.run(status_1.set(event=event, status=Status.OK))
     a.assert_not_awaited()
+
+
+def test_if_streamed_to_several_addresses_then_first_error_is_the_status(
+    event: EventType,
+) -> None:
+    s = StreamingStatus()
+    asyncio.run(s.set(event=event, status=Status.OK, address="a"))
+    asyncio.run(s.set(event=event, status=Status.NOT_CONNECTED, address="b"))
+    assert s.get(id=event.id) == Status.NOT_CONNECTED
+
+    asyncio.run(s.set(event=event, status=Status.OK, address="b"))
+    assert s.get(id=event.id) == Status.OK
+    assert [h["status"] for h in s.health()] == ["Ok", "Ok"]
+
+    asyncio.run(s.delete(event=event))
+    assert s.get(id=event.id) is None
+    assert s.health() == []
+
+
+def test_lag_is_the_time_between_change_and_acknowledgement(
+    event: EventType,
+) -> None:
+    s = StreamingStatus()
+    asyncio.run(s.set(event=event, status=Status.OK, address="a"))
+
+    with patch("time.time", return_value=100.0):
+        s.set_changed(event_id=event.id)
+    with patch("time.time", return_value=101.0):
+        # later changes do not overwrite the oldest change
+        s.set_changed(event_id=None)
+    with patch("time.time", return_value=102.5):
+        assert s.health()[0]["pending"] == 2.5
+
+    changed = s.take_changed(event_id=event.id, address="a")
+    assert changed == 100.0
+    with patch("time.time", return_value=103.0):
+        s.acknowledged(event_id=event.id, address="a", changed=changed)
+
+    assert s.health() == [
+        {
+            "event_id": event.id,
+            "address": "a",
+            "status": "Ok",
+            "acknowledged": 103.0,
+            "lag": 3.0,
+            "pending": None,
+        }
+    ]
+
+
+def test_if_sending_fails_then_the_change_is_restored(event: EventType) -> None:
+    s = StreamingStatus()
+    asyncio.run(s.set(event=event, status=Status.OK, address="a"))
+
+    with patch("time.time", return_value=100.0):
+        s.set_changed(event_id=event.id)
+    changed = s.take_changed(event_id=event.id, address="a")
+    with patch("time.time", return_value=101.0):
+        s.set_changed(event_id=event.id)
+
+    s.restore_changed(event_id=event.id, address="a", changed=changed)
+    assert s.take_changed(event_id=event.id, address="a") == 100.0
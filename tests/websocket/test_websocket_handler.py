@@ -23,9 +23,11 @@ import datetime
 import json
 import tempfile
 import threading
+import zlib
 from collections.abc import AsyncGenerator
 from collections.abc import Iterator
 from typing import Optional
+from unittest import mock
 
 import pytest
 import pytest_asyncio
@@ -33,18 +35,28 @@ import websockets.exceptions
 from websockets.asyncio.client import ClientConnection
 from websockets.asyncio.client import connect
 from websockets.asyncio.server import Server
+from websockets.asyncio.server import ServerConnection
 from websockets.asyncio.server import serve
 from websockets.frames import Close
 from websockets.frames import CloseCode
+from websockets.http11 import Request
 
 from ooresults import model
+from ooresults.model import cached_result
+from ooresults.otypes.class_params import ClassParams
+from ooresults.otypes.class_type import ClassInfoType
 from ooresults.otypes.entry_type import EntryType
+from ooresults.otypes.entry_type import RankedEntryType
+from ooresults.otypes.event_type import EventType
 from ooresults.otypes.result_type import PersonRaceResult
 from ooresults.otypes.result_type import ResultStatus
 from ooresults.otypes.result_type import SplitTime
 from ooresults.otypes.result_type import SpStatus
+from ooresults.repo.repo import EventNotFoundError
 from ooresults.repo.sqlite_repo import SqliteRepo
+from ooresults.websocket_server import websocket_handler
 from ooresults.websocket_server.credentials import credentials
+from ooresults.websocket_server.websocket_handler import ConnectionParameter
 from ooresults.websocket_server.websocket_handler import WebSocketHandler
 
 
@@ -100,6 +112,7 @@ class WebSocketServer(threading.Thread):
     async def start_server(self) -> None:
         self.server = await serve(
             handler=self.handler.handler,
+            process_response=self.handler.process_response,
             host=self.host,
             port=self.port,
         )
@@ -176,6 +189,42 @@ async def test_reader_status_received_if_event_found(
         await si1_client.close()
 
 
+@pytest.mark.asyncio
+async def test_si2_client_receives_older_card_reads_from_the_db(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    token = credentials.create_token()
+    history = [
+        {
+            "entryTime": "10:00:00",
+            "eventId": event_id,
+            "controlCard": "4711",
+            "status": ResultStatus.FINISHED,
+            "time": None,
+            "error": "Result not assigned to an entry",
+        }
+    ]
+
+    with mock.patch.object(
+        model.results, "cardreader_history", return_value=history
+    ) as cardreader_history:
+        async with connect(uri="ws://localhost:8081/si2") as si2_client:
+            await si2_client.send(json.dumps({"token": token}))
+            await si2_client.send(json.dumps({"event_id": event_id}))
+            response = await si2_client.recv()
+            assert "4711" not in response
+
+            await si2_client.send(json.dumps({"history": True}))
+            response = await si2_client.recv()
+            assert isinstance(response, str)
+            assert response.count('<tr class="rdt"') == 1
+            assert "Result not assigned to an entry" in response
+            await si2_client.close()
+
+    cardreader_history.assert_called_once_with(event_id=event_id)
+
+
 @pytest.mark.asyncio
 async def test_cardreader_event_key_not_found(
     event_id: int,
@@ -256,6 +305,86 @@ async def test_cardreader_event_key_found_and_reader_disconnected(
         await si1_client.close()
 
 
+@pytest.mark.asyncio
+async def test_cardreader_is_disconnected_with_its_last_station(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    async with connect(
+        uri="ws://localhost:8081/cardreader",
+        additional_headers={"X-Event-Key": "local"},
+    ) as reader:
+
+        async def send(entry_type: str, station: str) -> str:
+            item = {
+                "entryType": entry_type,
+                "entryTime": "2021-05-18T17:24:33+02:00",
+                "station": station,
+            }
+            await reader.send(bz2.compress(json.dumps(item).encode()))
+            return json.loads(await reader.recv())["readerStatus"]
+
+        assert await send(entry_type="readerConnected", station="1") == (
+            "readerConnected"
+        )
+        assert await send(entry_type="readerConnected", station="2") == (
+            "readerConnected"
+        )
+        # station 2 is still connected
+        assert await send(entry_type="readerDisconnected", station="1") == (
+            "readerConnected"
+        )
+        assert await send(entry_type="readerDisconnected", station="2") == (
+            "readerDisconnected"
+        )
+
+
+@pytest.mark.asyncio
+async def test_cardreader_if_no_encoding_is_offered_then_bz2_is_used(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    async with connect(
+        uri="ws://localhost:8081/cardreader",
+        additional_headers={"X-Event-Key": "local"},
+    ) as reader:
+        assert reader.response is not None
+        assert "X-Encoding" not in reader.response.headers
+
+        item = {
+            "entryType": "readerDisconnected",
+            "entryTime": "2021-05-18T17:24:33+02:00",
+        }
+        await reader.send(zlib.compress(json.dumps(item).encode()))
+        response = await reader.recv()
+        assert response == "Data not bz2 encoded"
+
+
+@pytest.mark.asyncio
+async def test_cardreader_the_first_supported_encoding_of_the_offer_is_used(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    async with connect(
+        uri="ws://localhost:8081/cardreader",
+        additional_headers={"X-Event-Key": "local", "X-Encoding": "br, zlib, bz2"},
+    ) as reader:
+        assert reader.response is not None
+        assert reader.response.headers["X-Encoding"] == "zlib"
+
+        item = {
+            "entryType": "readerDisconnected",
+            "entryTime": "2021-05-18T17:24:33+02:00",
+        }
+        await reader.send(zlib.compress(json.dumps(item).encode()))
+        response = await reader.recv()
+        assert json.loads(response) == {
+            "eventId": event_id,
+            "readerStatus": "readerDisconnected",
+            "event": EVENT_NAME,
+        }
+
+
 @pytest_asyncio.fixture
 async def reader(
     event_id: int,
@@ -527,3 +656,584 @@ async def test_cardreader_card_read(
             ),
         ),
     ]
+
+
+@pytest.mark.asyncio
+async def test_cardreader_batches_are_acknowledged_per_card_read(
+    db: SqliteRepo,
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    async with connect(
+        uri="ws://localhost:8081/cardreader",
+        additional_headers={"X-Event-Key": "local", "X-Batch": "1000"},
+    ) as reader:
+        assert reader.response is not None
+        assert reader.response.headers["X-Batch"] == "500"
+
+        items = []
+        for i in range(3):
+            items.append(
+                {
+                    "entryType": "cardRead",
+                    "entryTime": "2021-05-18T17:24:33+02:00",
+                    "cardType": "SI10",
+                    "controlCard": str(8084750 + i),
+                    "startTime": "2021-05-18T16:31:19+02:00",
+                    "finishTime": f"2021-05-18T16:31:5{i}+02:00",
+                    "punches": [],
+                }
+            )
+        frame = {
+            "batch": [
+                {"seq": 7, "item": items[0]},
+                {"seq": 8, "item": {"entryType": "unknown"}},
+                {"seq": 9, "item": items[1]},
+                {"seq": 10, "item": items[2]},
+            ]
+        }
+        await reader.send(bz2.compress(json.dumps(frame).encode()))
+        response = json.loads(await reader.recv())
+
+        acks = {a["seq"]: a for a in response["acks"]}
+        assert sorted(acks) == [7, 8, 9, 10]
+        assert "rejected" in acks[8]
+        for seq, card in ((7, "8084750"), (9, "8084751"), (10, "8084752")):
+            assert acks[seq]["readerStatus"] == "cardRead"
+            assert acks[seq]["controlCard"] == card
+            assert acks[seq]["error"] == "Control card unknown"
+
+    with db.transaction():
+        entries = db.get_entries(event_id=event_id)
+    assert sorted(str(e.chip) for e in entries) == ["8084750", "8084751", "8084752"]
+
+
+@pytest.mark.asyncio
+async def test_card_reads_exceeding_the_batch_size_are_rejected(
+    db: SqliteRepo,
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    async with connect(
+        uri="ws://localhost:8081/cardreader",
+        additional_headers={"X-Event-Key": "local", "X-Batch": "2"},
+    ) as reader:
+        assert reader.response is not None
+        assert reader.response.headers["X-Batch"] == "2"
+
+        items = [
+            {
+                "seq": i,
+                "item": {
+                    "entryType": "cardRead",
+                    "entryTime": "2021-05-18T17:24:33+02:00",
+                    "cardType": "SI10",
+                    "controlCard": str(8084750 + i),
+                    "startTime": "2021-05-18T16:31:19+02:00",
+                    "finishTime": f"2021-05-18T16:31:5{i}+02:00",
+                    "punches": [],
+                },
+            }
+            for i in range(3)
+        ]
+        await reader.send(bz2.compress(json.dumps({"batch": items}).encode()))
+        response = json.loads(await reader.recv())
+        acks = {a["seq"]: a for a in response["acks"]}
+        assert sorted(acks) == [0, 1, 2]
+        assert acks[0]["readerStatus"] == "cardRead"
+        assert acks[1]["readerStatus"] == "cardRead"
+        assert acks[2] == {"seq": 2, "rejected": "batch too large"}
+
+    with db.transaction():
+        entries = db.get_entries(event_id=event_id)
+    assert sorted(str(e.chip) for e in entries) == ["8084750", "8084751"]
+
+
+@pytest.mark.asyncio
+async def test_card_reads_of_a_batch_are_acknowledged_if_others_fail(
+    db: SqliteRepo, event_id: int
+) -> None:
+    handler = WebSocketHandler()
+    with db.transaction():
+        event = db.get_event(id=event_id)
+
+    def store_cardreader_results(items: list) -> list:
+        return [
+            ("cardRead", event, {"eventId": event_id, "controlCard": "8084750"}),
+            EventNotFoundError(),
+        ]
+
+    item = {
+        "entryType": "cardRead",
+        "entryTime": "2021-05-18T17:24:33+02:00",
+        "cardType": "SI10",
+        "controlCard": "8084750",
+        "startTime": "2021-05-18T16:31:19+02:00",
+        "finishTime": "2021-05-18T16:31:50+02:00",
+        "punches": [],
+    }
+    with mock.patch.object(
+        model.results,
+        "store_cardreader_results",
+        side_effect=store_cardreader_results,
+    ):
+        acks, batch_event = await handler.store_batch(
+            event_key="local",
+            batch=[{"seq": 1, "item": item}, {"seq": 2, "item": item}],
+        )
+
+    assert batch_event == event
+    assert [a["seq"] for a in acks] == [1, 2]
+    assert acks[0]["readerStatus"] == "cardRead"
+    assert "rejected" in acks[1]
+
+
+@pytest.mark.asyncio
+async def test_cardreader_batches_are_not_accepted_if_not_offered(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    async with connect(
+        uri="ws://localhost:8081/cardreader",
+        additional_headers={"X-Event-Key": "local"},
+    ) as reader:
+        assert reader.response is not None
+        assert "X-Batch" not in reader.response.headers
+
+        # the frame is handled as a single card read
+        frame: dict[str, list] = {"batch": []}
+        await reader.send(bz2.compress(json.dumps(frame).encode()))
+        response = await reader.recv()
+        assert "is a required property" in response
+
+
+@pytest.mark.asyncio
+async def test_demo_reader_card_reads_are_shown_like_card_reads_of_a_reader(
+    event_id: int,
+    websocket_server: WebSocketServer,
+) -> None:
+    handler = websocket_server.handler
+    handler.demo_reader = True
+    item = {
+        "key": "local",
+        "code": ["Check", "Start", "31", "", "", "", "", "", "", "", "Finish"],
+        "time": ["10:11:12", "10:12:00", "10:15:00"] + [""] * 7 + ["10:23:23"],
+        "card": "1111",
+    }
+    with mock.patch.object(
+        handler, "cardreader_result", wraps=handler.cardreader_result
+    ) as cardreader_result:
+        async with connect(uri="ws://localhost:8081/demo") as demo:
+            await demo.send(json.dumps(item))
+            # the reply to a ping is sent after the card read is handled
+            await demo.send("__ping__")
+            assert await demo.recv() == "__pong__"
+
+    cardreader_result.assert_awaited_once()
+    assert cardreader_result.call_args.kwargs["status"] == "cardRead"
+    messages = list(handler.messages[event_id])
+    assert [m["controlCard"] for m in messages] == ["1111"]
+    assert isinstance(messages[0]["entryTime"], str)
+
+
+def server_connection(path: str, buffered: int = 0) -> mock.MagicMock:
+    conn = mock.create_autospec(spec=ServerConnection)
+    conn.request = Request(path=path, headers=mock.MagicMock())
+    conn.transport = mock.MagicMock()
+    conn.transport.get_write_buffer_size.return_value = buffered
+    return conn
+
+
+@pytest.mark.asyncio
+async def test_frames_are_rendered_once_and_broadcast_to_all_clients() -> None:
+    event = EventType(
+        id=3,
+        name=EVENT_NAME,
+        date=datetime.date(year=2023, month=12, day=29),
+        key=None,
+        publish=False,
+        series=None,
+        fields=[],
+    )
+    handler = WebSocketHandler()
+    si1 = [server_connection(path="/si1") for _ in range(3)]
+    si2 = [server_connection(path="/si2") for _ in range(3)]
+    other_event = server_connection(path="/si1")
+    for conn in si1 + si2:
+        handler.connections[conn] = ConnectionParameter(event_id=event.id)
+    handler.connections[other_event] = ConnectionParameter(event_id=event.id + 1)
+
+    with (
+        mock.patch.object(
+            websocket_handler.render, "reader_status", return_value="<table/>"
+        ) as reader_status,
+        mock.patch.object(websocket_handler.render, "reader_table") as reader_table,
+        mock.patch.object(websocket_handler, "broadcast") as broadcast,
+    ):
+        await handler.send_to_all(event=event, message={})
+
+    reader_status.assert_called_once()
+    reader_table.assert_not_called()
+    assert broadcast.call_count == 2
+    frames = {
+        c.kwargs["message"]: c.kwargs["connections"] for c in broadcast.call_args_list
+    }
+    frame = json.dumps({"status": "<table/>", "row": None, "limit": 200})
+    assert frames[frame] == si2
+    frame = json.dumps(
+        {
+            "status": "readerOffline",
+            "name": EVENT_NAME,
+            "date": EVENT_DATE,
+            "data": "",
+        }
+    )
+    assert frames[frame] == si1
+
+
+@pytest.mark.asyncio
+async def test_slow_clients_are_disconnected() -> None:
+    handler = WebSocketHandler()
+    fast = server_connection(path="/si1")
+    slow = server_connection(
+        path="/si1", buffered=websocket_handler.MAX_WRITE_BUFFER + 1
+    )
+
+    with mock.patch.object(websocket_handler, "broadcast") as broadcast:
+        handler.broadcast(connections=[fast, slow], data="data")
+
+    broadcast.assert_called_once_with(connections=[fast], message="data")
+    slow.transport.abort.assert_called_once_with()
+    fast.transport.abort.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_si2_clients_receive_only_the_row_of_a_new_card_read() -> None:
+    event = EventType(
+        id=3,
+        name=EVENT_NAME,
+        date=datetime.date(year=2023, month=12, day=29),
+        key=None,
+        publish=False,
+        series=None,
+        fields=[],
+    )
+    handler = WebSocketHandler(reader_messages=2)
+    si2 = server_connection(path="/si2")
+    handler.connections[si2] = ConnectionParameter(event_id=event.id)
+    handler.cardreader_status[event.id] = "cardRead"
+
+    messages = [
+        {
+            "entryTime": f"10:00:0{i}",
+            "eventId": event.id,
+            "controlCard": str(4711 + i),
+            "status": ResultStatus.OK,
+            "time": 100 + i,
+            "lastName": "Merkel",
+            "firstName": "Angela",
+            "class": "Elite",
+            "missingControls": [],
+        }
+        for i in range(3)
+    ]
+    with mock.patch.object(websocket_handler, "broadcast") as broadcast:
+        for message in messages:
+            handler.messages[event.id].append(message)
+            await handler.send_to_all(event=event, message=message)
+
+    # only the latest messages are kept
+    assert list(handler.messages[event.id]) == messages[1:]
+
+    assert broadcast.call_count == 3
+    for message, c in zip(messages, broadcast.call_args_list):
+        assert c.kwargs["connections"] == [si2]
+        frame = json.loads(c.kwargs["message"])
+        assert frame["limit"] == 2
+        assert frame["row"].count("<tr") == 1
+        assert message["controlCard"] in frame["row"]
+        assert 'id="read.status"' in frame["status"]
+
+    # the whole table is rendered for a new client
+    table = handler.render(si2=True, event=event, message={})
+    assert table.count('<tr class="rdt"') == 2
+    assert "4711" not in table
+    assert 'id="read.older" onclick="read_history()" style="display: inline"' in table
+
+
+def class_results(
+    times: list[int],
+) -> list[tuple[ClassInfoType, list[RankedEntryType]]]:
+    class_results = []
+    for i, time in enumerate(times):
+        class_ = ClassInfoType(
+            id=i + 1,
+            name=f"Class {i + 1}",
+            short_name=None,
+            course_id=None,
+            course_name=None,
+            course_length=None,
+            course_climb=None,
+            number_of_controls=None,
+            params=ClassParams(),
+        )
+        entry = EntryType(
+            id=i + 10,
+            event_id=3,
+            competitor_id=i + 20,
+            first_name="Angela",
+            last_name=f"Merkel {i + 1}",
+            result=PersonRaceResult(status=ResultStatus.OK, time=time),
+        )
+        class_results.append((class_, [RankedEntryType(entry=entry, rank=1)]))
+    return class_results
+
+
+def sent_frames(broadcast: mock.MagicMock) -> list[tuple[dict, list]]:
+    frames = [
+        (json.loads(c.kwargs["data"]), c.kwargs["connections"])
+        for c in broadcast.call_args_list
+    ]
+    broadcast.reset_mock()
+    return frames
+
+
+def test_si1_clients_receive_only_the_changed_classes() -> None:
+    event = EventType(
+        id=3,
+        name=EVENT_NAME,
+        date=datetime.date(year=2023, month=12, day=29),
+        key=None,
+        publish=False,
+        series=None,
+        fields=[],
+    )
+    handler = WebSocketHandler()
+    si1: list[ServerConnection] = [server_connection(path="/si1") for _ in range(2)]
+    for conn in si1:
+        handler.connections[conn] = ConnectionParameter(
+            event_id=event.id, show_result=True
+        )
+
+    with mock.patch.object(handler, "broadcast") as broadcast:
+        # all classes are sent to the new clients
+        handler.send_class_results(
+            connections=si1, event=event, class_results=class_results([100, 200])
+        )
+        [(frame, connections)] = sent_frames(broadcast)
+        assert frame["status"] == "result"
+        assert "Merkel 1" in frame["data"] and "Merkel 2" in frame["data"]
+        assert connections == si1
+
+        # nothing is sent if the results are unchanged
+        handler.send_class_results(
+            connections=si1, event=event, class_results=class_results([100, 200])
+        )
+        assert sent_frames(broadcast) == []
+
+        # only the changed class is sent, a new client receives all classes
+        new = server_connection(path="/si1")
+        handler.connections[new] = ConnectionParameter(
+            event_id=event.id, show_result=True
+        )
+        handler.send_class_results(
+            connections=si1 + [new],
+            event=event,
+            class_results=class_results([100, 150]),
+        )
+        [(frame_1, connections_1), (frame_2, connections_2)] = sent_frames(broadcast)
+        assert frame_1["status"] == "result"
+        assert connections_1 == [new]
+        assert frame_2["status"] == "resultPatch"
+        assert list(frame_2["classes"]) == ["2"]
+        assert 'id="res.head.2"' in frame_2["classes"]["2"]
+        assert 'id="res.class.2"' in frame_2["classes"]["2"]
+        assert "2:30" in frame_2["classes"]["2"]
+        assert connections_2 == si1
+
+        # all classes are sent to all clients if a class is added
+        handler.send_class_results(
+            connections=si1 + [new],
+            event=event,
+            class_results=class_results([100, 150, 300]),
+        )
+        [(frame, connections)] = sent_frames(broadcast)
+        assert frame["status"] == "result"
+        assert connections == si1 + [new]
+
+
+def test_si1_clients_receive_the_results_in_the_selected_format() -> None:
+    event = EventType(
+        id=3,
+        name=EVENT_NAME,
+        date=datetime.date(year=2023, month=12, day=29),
+        key=None,
+        publish=False,
+        series=None,
+        fields=[],
+    )
+    handler = WebSocketHandler()
+    html_client = server_connection(path="/si1")
+    json_client = server_connection(path="/si1")
+    handler.connections[html_client] = ConnectionParameter(
+        event_id=event.id, show_result=True
+    )
+    handler.connections[json_client] = ConnectionParameter(
+        event_id=event.id, show_result=True, format="json"
+    )
+
+    with mock.patch.object(handler, "broadcast") as broadcast:
+        handler.send_class_results(
+            connections=[html_client, json_client],
+            event=event,
+            class_results=class_results([100, 200]),
+        )
+        [(html_frame, html_conns), (json_frame, json_conns)] = sent_frames(broadcast)
+        assert html_conns == [html_client]
+        assert "<table" in html_frame["data"]
+        assert json_conns == [json_client]
+        assert json_frame["format"] == 1
+        assert [c["name"] for c in json_frame["data"]["classes"]] == [
+            "Class 1",
+            "Class 2",
+        ]
+
+        handler.send_class_results(
+            connections=[html_client, json_client],
+            event=event,
+            class_results=class_results([100, 150]),
+        )
+        [(html_frame, _), (json_frame, _)] = sent_frames(broadcast)
+        assert html_frame["status"] == "resultPatch"
+        assert "<tbody" in html_frame["classes"]["2"]
+        assert json_frame == {
+            "status": "resultPatch",
+            "format": 1,
+            "classes": {
+                "2": {
+                    "id": 2,
+                    "name": "Class 2",
+                    "type": "standard",
+                    "rows": [[1, 0, "Angela Merkel 2", None, None, "OK", 150]],
+                }
+            },
+        }
+
+    handler.cardreader_status[event.id] = "cardRead"
+    message = {
+        "controlCard": "4711",
+        "firstName": "Angela",
+        "lastName": "Merkel",
+        "class": "Elite",
+        "status": ResultStatus.OK,
+        "time": 1801,
+        "error": None,
+    }
+    frame = json.loads(
+        handler.render(si2=False, event=event, message=message, format="json")
+    )
+    assert frame == {
+        "status": "cardRead",
+        "format": 1,
+        "name": EVENT_NAME,
+        "date": EVENT_DATE,
+        "data": {
+            "card": "4711",
+            "name": "Merkel, Angela",
+            "class": "Elite",
+            "status": "OK",
+            "time": 1801,
+            "error": None,
+        },
+    }
+
+
+@pytest.mark.asyncio
+async def test_a_stored_card_read_requests_one_result_update(
+    db: SqliteRepo, event_id: int
+) -> None:
+    handler = WebSocketHandler()
+    handler.loop = asyncio.get_running_loop()
+    with db.transaction():
+        event = db.get_event(id=event_id)
+
+    def store_cardreader_results(items: list) -> list:
+        # the stored result changes the results of the event
+        cached_result.clear_cache(event_id=event_id, entry_id=1)
+        return [("cardRead", event, {"eventId": event_id}) for _ in items]
+
+    item = {
+        "entryType": "cardRead",
+        "entryTime": "2021-05-18T17:24:33+02:00",
+        "cardType": "SI10",
+        "controlCard": "8084750",
+        "startTime": "2021-05-18T16:31:19+02:00",
+        "finishTime": "2021-05-18T16:31:50+02:00",
+        "punches": [],
+    }
+    cached_result.register(callback=handler.result_changed)
+    try:
+        with mock.patch.object(
+            model.results,
+            "store_cardreader_results",
+            side_effect=store_cardreader_results,
+        ):
+            await handler.store_batch(
+                event_key="local", batch=[{"seq": 1, "item": item}]
+            )
+        await asyncio.sleep(0.1)
+    finally:
+        cached_result.unregister(callback=handler.result_changed)
+
+    assert handler.metrics[event_id].requests == 1
+
+
+def test_result_updates_of_an_event_are_coalesced() -> None:
+    handler = WebSocketHandler(result_interval=1.0, result_max_latency=3.0)
+
+    def request(now: float, event_id: Optional[int], immediate: bool = False) -> None:
+        with mock.patch.object(websocket_handler.time, "monotonic", return_value=now):
+            handler.request_update(event_id=event_id, immediate=immediate)
+
+    # several card reads within the interval
+    request(now=100.0, event_id=3)
+    request(now=100.4, event_id=3)
+    request(now=100.8, event_id=4)
+    assert handler.due_updates(now=101.0) == ([], pytest.approx(0.4))
+    assert handler.due_updates(now=101.4) == ([3], pytest.approx(0.4))
+    assert handler.due_updates(now=101.8) == ([4], None)
+
+    # updates are delayed until no card is read for an interval,
+    # but not longer than the maximum latency
+    for i in range(6):
+        request(now=102.0 + 0.5 * i, event_id=3)
+    assert handler.due_updates(now=104.9) == ([], pytest.approx(0.1))
+    assert handler.due_updates(now=105.0) == ([3], None)
+    request(now=105.5, event_id=3)
+    assert handler.due_updates(now=106.0) == ([], pytest.approx(0.5))
+    assert handler.due_updates(now=106.5) == ([3], None)
+
+    # new clients get the results immediately
+    request(now=107.0, event_id=4, immediate=True)
+    assert handler.due_updates(now=107.0) == ([4], None)
+
+    assert handler.metrics[3].requests == 9
+    assert handler.metrics[3].updates == 3
+    assert handler.metrics[3].coalesced == 6
+    assert handler.metrics[3].max_delay == pytest.approx(3.0)
+    assert handler.health()["results"] == [
+        {
+            "event_id": 3,
+            "requests": 9,
+            "updates": 3,
+            "coalesced": 6,
+            "max_delay": 3.0,
+        },
+        {
+            "event_id": 4,
+            "requests": 2,
+            "updates": 2,
+            "coalesced": 0,
+            "max_delay": 1.0,
+        },
+    ]